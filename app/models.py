@@ -248,6 +248,7 @@ class Lesson(Base):
     lesson_number = mapped_column(Integer, nullable=False, default=0)
     order_in_course = mapped_column(Integer, nullable=True)  # Pořadí v kurzu
     required_score = mapped_column(Float, nullable=False, default=90.0)
+    scoring_thresholds = mapped_column(JSON, nullable=True)  # Prahy lokálního hodnocení odpovědí (viz answer_scoring.py)
     lesson_type = mapped_column(String(20), nullable=False, default="test")  # "test", "teaching", "scenario"
     estimated_duration = mapped_column(Integer, nullable=True)  # Minutes
     ai_generated = mapped_column(Boolean, nullable=False, default=False)  # Was generated by AI
@@ -371,4 +372,17 @@ class Attempt(Base):
         if not self.answers:
             return 0.0
         total_score = sum(answer.score for answer in self.answers)
-        return total_score / len(self.answers) 
\ No newline at end of file
+        return total_score / len(self.answers) 
+
+# Persistentní cache hodnocení odpovědí (viz app/services/evaluation_cache.py)
+class EvaluationCacheEntry(Base):
+    __tablename__ = "evaluation_cache"
+    id = mapped_column(Integer, primary_key=True)
+    cache_key = mapped_column(String(64), nullable=False, unique=True, index=True)  # sha256(lekce | otázka | normalizovaná odpověď)
+    lesson_id = mapped_column(Integer, nullable=True, index=True)
+    question_text = mapped_column(Text, nullable=False)
+    normalized_answer = mapped_column(Text, nullable=False)
+    score = mapped_column(Float, nullable=False)
+    feedback = mapped_column(Text, nullable=True)
+    hits = mapped_column(Integer, nullable=False, default=0)
+    created_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,116 @@
+import logging
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Číselná obtížnost otázek pro adaptivní výběr
+DIFFICULTY_MAP = {"easy": 25, "medium": 50, "hard": 75}
+
+# Od tohoto skóre se odpověď počítá jako zvládnutá (obtížnost roste)
+PASS_SCORE = 80
+
+DIFFICULTY_INDICATORS = {"easy": "⭐", "medium": "⭐⭐", "hard": "⭐⭐⭐"}
+
+
+def adjust_difficulty(current_difficulty: float, question: dict, passed: bool) -> Tuple[float, float]:
+    """Nové skóre obtížnosti po odpovědi; vrací (nové skóre 0-100, velikost změny)"""
+    q_difficulty_val = DIFFICULTY_MAP.get(question.get("difficulty", "medium"), 50)
+    if passed:
+        adjustment = (100 - q_difficulty_val) / 10
+        new_difficulty = current_difficulty + adjustment
+    else:
+        adjustment = q_difficulty_val / 10
+        new_difficulty = current_difficulty - adjustment
+    return max(0, min(100, new_difficulty)), adjustment
+
+
+def select_next_question(all_questions: list, answered_indices: Iterable[int], difficulty_score: float) -> Optional[dict]:
+    """Nezodpovězená otázka s obtížností nejblíže difficulty_score (kopie s 'original_index')"""
+    answered = set(answered_indices)
+    best_question = None
+    min_diff = float('inf')
+
+    for idx, q_data in enumerate(all_questions):
+        if idx in answered:
+            continue
+        q_difficulty = DIFFICULTY_MAP.get(q_data.get("difficulty", "medium"), 50)
+        diff = abs(q_difficulty - difficulty_score)
+
+        if diff < min_diff:
+            min_diff = diff
+            best_question = q_data.copy()  # Vytvoříme kopii
+            best_question['original_index'] = idx
+
+    return best_question
+
+
+def get_next_adaptive_question(test_session) -> Optional[dict]:
+    """
+    Vybere další otázku na základě adaptivní obtížnosti.
+    """
+    if isinstance(test_session, dict):
+        answered_indices = {a['question_index'] for a in test_session.get('answers', [])}
+        all_questions = test_session.get('questions_data', [])
+        difficulty_score = test_session.get('difficulty_score', 50.0)
+    else:  # Je to TestSession objekt
+        # Bezpečnější přístup k potentially None 'answers'
+        answered_indices = {a['question_index'] for a in (test_session.answers or [])}
+        all_questions = test_session.questions_data
+        difficulty_score = getattr(test_session, 'difficulty_score', 50.0) or 50.0
+
+    return select_next_question(all_questions, answered_indices, difficulty_score)
+
+
+def next_question_prompt(question: dict) -> str:
+    """Text další otázky pro TwiML (bez feedbacku k předchozí odpovědi)"""
+    indicator = DIFFICULTY_INDICATORS.get(question.get('difficulty', 'medium'), "⭐⭐")
+    return f"Další otázka {indicator}: {question.get('question', '')}"
+
+
+class PlannedBranch:
+    """Předpočítaný výsledek tahu pro jednu větev (odpověď zvládnutá / nezvládnutá)"""
+
+    def __init__(self, passed: bool, difficulty_score: float, adjustment: float,
+                 next_question: Optional[dict], is_last: bool):
+        self.passed = passed
+        self.difficulty_score = difficulty_score
+        self.adjustment = adjustment
+        self.next_question = next_question
+        self.is_last = is_last
+        self.prompt = next_question_prompt(next_question) if next_question else ""
+
+
+class NextQuestionPlan:
+    """
+    Spekulativní plán dalšího kroku vstupního testu.
+
+    Výběr další otázky závisí jen na tom, zda skóre odpovědi dosáhne PASS_SCORE
+    (obtížnost se posune nahoru, nebo dolů), takže obě větve se dají spočítat
+    ještě během vyhodnocování odpovědi. Po příchodu skóre se jen vybere větev.
+    """
+
+    def __init__(self, question_index: int, passed: PlannedBranch, failed: PlannedBranch):
+        self.question_index = question_index
+        self.passed = passed
+        self.failed = failed
+
+    def for_score(self, score: float) -> PlannedBranch:
+        return self.passed if score >= PASS_SCORE else self.failed
+
+
+def plan_next_question(test_session: Dict[str, Any], question_index: int) -> NextQuestionPlan:
+    """Spočítá obě větve dalšího kroku pro odpověď na otázku question_index"""
+    questions = test_session['questions_data']
+    question = questions[question_index]
+    current_difficulty = test_session.get('difficulty_score', 50.0) or 50.0
+    answered_indices = {a['question_index'] for a in (test_session.get('answers') or [])}
+    answered_indices.add(question_index)
+    is_last = len(test_session.get('answers') or []) + 1 >= test_session['total_questions']
+
+    branches = []
+    for passed in (True, False):
+        difficulty_score, adjustment = adjust_difficulty(current_difficulty, question, passed)
+        next_question = None if is_last else select_next_question(questions, answered_indices, difficulty_score)
+        branches.append(PlannedBranch(passed, difficulty_score, adjustment, next_question, is_last))
+
+    return NextQuestionPlan(question_index, branches[0], branches[1])
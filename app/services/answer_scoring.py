@@ -0,0 +1,205 @@
+import logging
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from app.services.text_matching import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+# Synonyma a varianty klíčových slov (včetně typických chyb ASR)
+ANSWER_SYNONYMS = {
+    'chlazení': ['hlazení', 'chladění', 'ochlazování', 'chlazen', 'ochlazován'],
+    'mazání': ['mazaní', 'lubrication', 'lubrikace', 'mazan', 'mazán'],
+    'odvod': ['odvedení', 'odvádění', 'odváděn', 'odváděný'],
+    'refraktometr': ['refraktometric', 'refraktometrický', 'refraktometrů'],
+    'koncentrace': ['koncentrac', 'koncentraci', 'koncentrovat'],
+    'bakterie': ['bakterií', 'bakteriálního', 'mikroorganismy'],
+    'pH': ['ph', 'kyselost', 'kyselá', 'zásaditá'],
+    'emulze': ['emulzní', 'emulgovat', 'emulgovaný'],
+    'separátor': ['separátor oleje', 'separátorem', 'operátorem', 'operátor', 'reparátor', 'reparátorem'],
+    'odstranění': ['odstranit', 'odstraňuje', 'odstraněno', 'odstraňování'],
+    'skimmer': ['skimmerem', 'skimmeru', 'skimmer']
+}
+
+# Počet zkompilovaných sad klíčových slov držených v paměti (jedna sada = jedna otázka)
+KEYWORD_MATCHER_CACHE_SIZE = 512
+
+# Výchozí prahy lokálního hodnocení (lze přepsat per lekce v Lesson.scoring_thresholds)
+DEFAULT_SCORING_THRESHOLDS = {
+    "enabled": True,
+    "full_coverage": 100.0,   # pokrytí klíčových slov (%) od kterého je odpověď jednoznačně správná
+    "zero_coverage": 0.0,     # pokrytí (%) do kterého je odpověď jednoznačně špatná
+    "zero_max_words": 6,      # delší odpovědi bez klíčových slov mohou být parafráze -> LLM
+    "min_keywords": 1         # otázky bez klíčových slov hodnotí vždy LLM
+}
+
+
+@lru_cache(maxsize=KEYWORD_MATCHER_CACHE_SIZE)
+def get_keyword_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """Automat pro sadu klíčových slov otázky - kompiluje se jednou, pak se jen používá"""
+    return KeywordMatcher(keywords, ANSWER_SYNONYMS)
+
+
+def match_keywords(keywords: List[str], user_answer: str) -> Dict[str, Any]:
+    """
+    Porovná odpověď s klíčovými slovy otázky.
+
+    Odpověď i klíčová slova se normalizují (malá písmena, bez diakritiky, kmeny)
+    a hledají jedním průchodem Aho-Corasick automatu.
+    Pořadí: přesná shoda -> substring / useknuté slovo -> synonymum/varianta.
+
+    Returns:
+        Dict s klíči found, missing, matches [(keyword, match_type, matched_text)], coverage (0-100)
+    """
+    return get_keyword_matcher(tuple(keywords)).match(user_answer)
+
+
+class LocalScore:
+    """Výsledek lokálního (deterministického) hodnocení"""
+
+    def __init__(self, score: int, feedback: str, coverage: float, found: List[str], missing: List[str]):
+        self.score = score
+        self.feedback = feedback
+        self.coverage = coverage
+        self.found = found
+        self.missing = missing
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "score": self.score,
+            "feedback": self.feedback,
+            "coverage": self.coverage,
+            "found": self.found,
+            "missing": self.missing
+        }
+
+
+class LocalAnswerScorer:
+    """
+    Deterministické předhodnocení odpovědí podle klíčových slov otázky.
+
+    Vrací skóre jen pro jednoznačné případy (plné nebo nulové pokrytí);
+    pro střední pásmo vrací None a odpověď vyhodnotí LLM.
+    """
+
+    def __init__(self, thresholds: Optional[Dict[str, Any]] = None):
+        config = dict(DEFAULT_SCORING_THRESHOLDS)
+        if thresholds:
+            config.update({k: v for k, v in thresholds.items() if k in DEFAULT_SCORING_THRESHOLDS and v is not None})
+        self.enabled = bool(config["enabled"])
+        self.full_coverage = float(config["full_coverage"])
+        self.zero_coverage = float(config["zero_coverage"])
+        self.zero_max_words = int(config["zero_max_words"])
+        self.min_keywords = int(config["min_keywords"])
+
+    @classmethod
+    def for_lesson(cls, lesson: Optional[Dict[str, Any]]) -> "LocalAnswerScorer":
+        """Scorer s prahy dané lekce (lesson je slovník ze stavu hovoru)"""
+        return cls((lesson or {}).get('scoring_thresholds'))
+
+    def score(self, question: dict, user_answer: str) -> Optional[LocalScore]:
+        """Vrátí LocalScore pro jednoznačné odpovědi, jinak None"""
+        if not self.enabled or not user_answer or not user_answer.strip():
+            return None
+
+        keywords = [kw for kw in (question.get('keywords') or []) if isinstance(kw, str) and kw.strip()]
+        if len(keywords) < self.min_keywords:
+            return None
+
+        result = match_keywords(keywords, user_answer)
+        coverage = result["coverage"]
+
+        if coverage >= self.full_coverage:
+            return LocalScore(100, "Výborně, úplná odpověď!", coverage, result["found"], result["missing"])
+
+        if coverage <= self.zero_coverage and len(user_answer.split()) <= self.zero_max_words:
+            return LocalScore(0, f"Chybí: {', '.join(result['missing'])}.", coverage, result["found"], result["missing"])
+
+        return None
+
+
+def build_agreement_report(test_sessions: Iterable[Dict[str, Any]],
+                           thresholds_by_lesson: Optional[Dict[int, Dict[str, Any]]] = None,
+                           pass_score: float = 80.0,
+                           max_examples: int = 20) -> Dict[str, Any]:
+    """
+    Spočítá, jak často by se lokální scorer shodl s LLM na historických odpovědích.
+
+    test_sessions: slovníky s klíči lesson_id, questions_data, answers.
+    Shoda = stejné rozhodnutí správně/špatně vůči pass_score (stejný práh
+    používá adaptivní obtížnost). Referencí jsou jen odpovědi hodnocené LLM
+    (scored_by "llm", u starších záznamů chybí) - lokálně hodnocené a odpovědi
+    z cache hodnocení se přeskočí.
+    """
+    thresholds_by_lesson = thresholds_by_lesson or {}
+    scorers = {}
+    report = {
+        "answers_total": 0,
+        "answers_skipped": 0,
+        "decided_locally": 0,
+        "agreements": 0,
+        "disagreements": 0,
+        "local_full": {"count": 0, "llm_pass": 0},
+        "local_zero": {"count": 0, "llm_fail": 0},
+        "mean_abs_diff": 0.0,
+        "per_lesson": {},
+        "disagreement_examples": []
+    }
+    abs_diff_total = 0.0
+
+    for test_session in test_sessions:
+        lesson_id = test_session.get("lesson_id")
+        if lesson_id not in scorers:
+            scorers[lesson_id] = LocalAnswerScorer(thresholds_by_lesson.get(lesson_id))
+        scorer = scorers[lesson_id]
+        questions = test_session.get("questions_data") or []
+        lesson_stats = report["per_lesson"].setdefault(
+            str(lesson_id), {"answers": 0, "decided_locally": 0, "agreements": 0}
+        )
+
+        for answer in test_session.get("answers") or []:
+            report["answers_total"] += 1
+            question_index = answer.get("question_index")
+            if (answer.get("scored_by", "llm") != "llm" or question_index is None
+                    or question_index >= len(questions) or answer.get("score") is None):
+                report["answers_skipped"] += 1
+                continue
+
+            lesson_stats["answers"] += 1
+            local = scorer.score(questions[question_index], answer.get("user_answer", ""))
+            if local is None:
+                continue
+
+            llm_score = float(answer["score"])
+            report["decided_locally"] += 1
+            lesson_stats["decided_locally"] += 1
+            abs_diff_total += abs(local.score - llm_score)
+
+            agrees = (local.score >= pass_score) == (llm_score >= pass_score)
+            if local.score == 100:
+                report["local_full"]["count"] += 1
+                report["local_full"]["llm_pass"] += int(llm_score >= pass_score)
+            else:
+                report["local_zero"]["count"] += 1
+                report["local_zero"]["llm_fail"] += int(llm_score < pass_score)
+
+            if agrees:
+                report["agreements"] += 1
+                lesson_stats["agreements"] += 1
+            else:
+                report["disagreements"] += 1
+                if len(report["disagreement_examples"]) < max_examples:
+                    report["disagreement_examples"].append({
+                        "lesson_id": lesson_id,
+                        "question": questions[question_index].get("question", ""),
+                        "user_answer": answer.get("user_answer", ""),
+                        "llm_score": llm_score,
+                        "local_score": local.score,
+                        "coverage": round(local.coverage, 1)
+                    })
+
+    evaluated = report["answers_total"] - report["answers_skipped"]
+    report["local_decision_rate"] = round(report["decided_locally"] / evaluated, 3) if evaluated else 0.0
+    report["agreement_rate"] = round(report["agreements"] / report["decided_locally"], 3) if report["decided_locally"] else 0.0
+    report["mean_abs_diff"] = round(abs_diff_total / report["decided_locally"], 1) if report["decided_locally"] else 0.0
+    return report
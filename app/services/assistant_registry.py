@@ -0,0 +1,217 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from typing import Optional, Dict, Any, Deque, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+ASSISTANT_NAME = "AI Asistent pro výuku jazyků"
+DEFAULT_ASSISTANT_MODEL = "gpt-4-1106-preview"
+ASSISTANT_INSTRUCTIONS = """Jsi AI asistent pro výuku jazyků. Komunikuješ POUZE v češtině.
+
+TVOJE ROLE:
+- Pomáháš studentům s výukou jazyků
+- Mluvíš pouze česky, přirozeně a srozumitelně
+- Jsi trpělivý, povzbuzující a přátelský
+- Odpovídáš stručně a jasně
+
+TVOJE ÚKOLY:
+- Odpovídej na otázky studentů
+- Vysvětluj jazykové koncepty
+- Poskytuj zpětnou vazbu na odpovědi
+- Kladeš jednoduché otázky pro ověření porozumění
+- Buď konstruktivní a motivující
+
+STYL KOMUNIKACE:
+- Používej přirozený konverzační styl
+- Krátké, srozumitelné věty
+- Pozitivní přístup
+- Pokud student něco neví, vysvětli to jednoduše
+
+Vždy zůstávaj v roli učitele jazyků a komunikuj pouze v češtině."""
+
+# Asistent použitý, když se vytvoření ani vyhledání nepovede
+FALLBACK_ASSISTANT_ID = "asst_W6120kPP1lLBzU5OQLYvH6W1"
+
+# Klíč v metadatech asistenta, podle kterého ho po restartu najdeme
+METADATA_HASH_KEY = "instructions_hash"
+
+
+def instructions_hash(instructions: str, model: str, name: str = ASSISTANT_NAME) -> str:
+    payload = "\n".join((name, model, instructions.strip()))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class AssistantRegistry:
+    """
+    Sdílené OpenAI Assistants pro Media Stream hovory.
+
+    Asistent se vytvoří jednou pro každou kombinaci (instrukce, model, název)
+    a jeho id se drží v paměti; hash je uložený v metadatech asistenta, takže
+    po restartu se najde existující asistent místo vytvoření dalšího. Vedle
+    toho registr drží malou zásobu předem vytvořených threadů - nový hovor
+    si jeden vezme hned a zásoba se doplní na pozadí. Thread obsahuje
+    konverzaci, takže se po hovoru nevrací, ale maže.
+
+    Klient je synchronní openai.OpenAI (stejný jako v /audio), volání API
+    běží přes asyncio.to_thread, aby neblokovala event loop.
+    """
+
+    def __init__(self, pool_size: int = None, max_thread_age: float = None, model: str = None):
+        if pool_size is None:
+            pool_size = int(os.getenv('ASSISTANT_THREAD_POOL_SIZE', '2'))
+        if max_thread_age is None:
+            max_thread_age = float(os.getenv('ASSISTANT_THREAD_MAX_AGE', '3600'))
+        self.pool_size = pool_size
+        self.max_thread_age = max_thread_age
+        self.model = model or os.getenv('OPENAI_ASSISTANT_MODEL', DEFAULT_ASSISTANT_MODEL)
+        self.configured_assistant_id = os.getenv('OPENAI_ASSISTANT_ID') or None
+        self._assistants: Dict[str, str] = {}
+        self._assistant_locks: Dict[str, asyncio.Lock] = {}
+        self._threads: Deque[Tuple[str, float]] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._client = None
+        self.assistants_created = 0
+        self.assistants_found = 0
+        self.threads_created = 0
+        self.pool_hits = 0
+        self.pool_misses = 0
+
+    async def get_assistant_id(self, client, instructions: str = ASSISTANT_INSTRUCTIONS,
+                               model: str = None, name: str = ASSISTANT_NAME) -> str:
+        """Id asistenta pro dané instrukce - z paměti, z účtu podle metadat, nebo nově vytvořený"""
+        if self.configured_assistant_id:
+            return self.configured_assistant_id
+        model = model or self.model
+        key = instructions_hash(instructions, model, name)
+        assistant_id = self._assistants.get(key)
+        if assistant_id is not None:
+            return assistant_id
+
+        # Souběžné první hovory čekají na jedno vytvoření
+        lock = self._assistant_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            assistant_id = self._assistants.get(key)
+            if assistant_id is not None:
+                return assistant_id
+            try:
+                assistant_id = await asyncio.to_thread(self._find_assistant, client, key)
+                if assistant_id is not None:
+                    self.assistants_found += 1
+                    logger.info(f"🔄 Používám existující Assistant: {assistant_id}")
+                else:
+                    assistant = await asyncio.to_thread(
+                        client.beta.assistants.create,
+                        name=name,
+                        instructions=instructions,
+                        model=model,
+                        tools=[],
+                        metadata={METADATA_HASH_KEY: key}
+                    )
+                    assistant_id = assistant.id
+                    self.assistants_created += 1
+                    logger.info(f"✅ Vytvořen nový Assistant: {assistant_id}")
+            except Exception as e:
+                logger.error(f"❌ Chyba při získávání Assistanta: {e}")
+                logger.info(f"🔄 Používám záložní Assistant: {FALLBACK_ASSISTANT_ID}")
+                return FALLBACK_ASSISTANT_ID
+            self._assistants[key] = assistant_id
+            return assistant_id
+
+    async def acquire_thread(self, client) -> str:
+        """Thread pro nový hovor - ze zásoby, jinak hned vytvořený"""
+        self._client = client
+        now = time.monotonic()
+        thread_id = None
+        while self._threads:
+            candidate, created_at = self._threads.popleft()
+            if now - created_at <= self.max_thread_age:
+                thread_id = candidate
+                break
+            self._spawn(self._delete_thread(client, candidate))
+
+        if thread_id is not None:
+            self.pool_hits += 1
+        else:
+            self.pool_misses += 1
+            thread_id = await self._create_thread(client)
+        self.schedule_refill(client)
+        return thread_id
+
+    async def release_thread(self, client, thread_id: str) -> None:
+        """Konec hovoru - thread s konverzací smažeme"""
+        await self._delete_thread(client, thread_id)
+
+    def schedule_refill(self, client) -> None:
+        if self.pool_size <= 0 or len(self._threads) >= self.pool_size:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = self._spawn(self._refill(client))
+
+    async def warm_up(self, client) -> Dict[str, Any]:
+        """Při startu: dohledá/vytvoří asistenta a naplní zásobu threadů"""
+        self._client = client
+        assistant_id = await self.get_assistant_id(client)
+        await self._refill(client)
+        return {'assistant_id': assistant_id, 'pooled_threads': len(self._threads)}
+
+    async def close(self) -> None:
+        """Vypnutí aplikace - smaže nepoužité thready ze zásoby"""
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+        threads: List[str] = [thread_id for thread_id, _ in self._threads]
+        self._threads.clear()
+        if self._client is not None:
+            for thread_id in threads:
+                await self._delete_thread(self._client, thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'assistants': len(self._assistants),
+            'configured_assistant_id': self.configured_assistant_id,
+            'assistants_created': self.assistants_created,
+            'assistants_found': self.assistants_found,
+            'pooled_threads': len(self._threads),
+            'pool_size': self.pool_size,
+            'threads_created': self.threads_created,
+            'pool_hits': self.pool_hits,
+            'pool_misses': self.pool_misses
+        }
+
+    def _find_assistant(self, client, key: str) -> Optional[str]:
+        for assistant in client.beta.assistants.list(limit=100, order="desc"):
+            if (getattr(assistant, 'metadata', None) or {}).get(METADATA_HASH_KEY) == key:
+                return assistant.id
+        return None
+
+    async def _create_thread(self, client) -> str:
+        thread = await asyncio.to_thread(client.beta.threads.create)
+        self.threads_created += 1
+        return thread.id
+
+    async def _refill(self, client) -> None:
+        while len(self._threads) < self.pool_size:
+            try:
+                thread_id = await self._create_thread(client)
+            except Exception as e:
+                logger.warning(f"⚠️ Předvytvoření threadu selhalo: {e}")
+                return
+            self._threads.append((thread_id, time.monotonic()))
+
+    async def _delete_thread(self, client, thread_id: str) -> None:
+        try:
+            await asyncio.to_thread(client.beta.threads.delete, thread_id)
+            logger.info(f"Thread {thread_id} smazán")
+        except Exception as e:
+            logger.debug(f"Smazání threadu {thread_id} selhalo: {e}")
+
+    @staticmethod
+    def _spawn(coro) -> asyncio.Task:
+        return asyncio.get_running_loop().create_task(coro)
+
+
+# Globální registr (asistent a thready pro /audio)
+assistant_registry = AssistantRegistry()
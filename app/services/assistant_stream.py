@@ -0,0 +1,158 @@
+import re
+import time
+import asyncio
+import logging
+import threading
+from typing import Optional, List, AsyncIterator
+
+from app.services.czech_text import sentence_ends
+from app.services.voice_metrics import voice_metrics
+
+logger = logging.getLogger(__name__)
+
+# Konec řádku ukončuje větu i bez interpunkce (odrážky, seznamy)
+_NEWLINE_RE = re.compile(r'\n+')
+
+_RUN_FAILED_EVENTS = ("thread.run.failed", "thread.run.cancelled", "thread.run.expired")
+_RUN_FINISHED_EVENTS = ("thread.run.completed",) + _RUN_FAILED_EVENTS
+_END = object()
+
+
+def _sentence_breaks(text: str) -> List[int]:
+    """Konce vět podle czech_text.sentence_ends (zkratky, řadové číslovky) plus konce řádků"""
+    breaks = set(sentence_ends(text))
+    breaks.update(match.end() for match in _NEWLINE_RE.finditer(text))
+    return sorted(breaks)
+
+
+class SentenceSplitter:
+    """
+    Skládá text ze streamu do celých vět pro TTS.
+
+    Věta se vydá, jakmile za interpunkcí přijde mezera (další delta), takže
+    první věta jde do syntézy dřív, než model dopíše zbytek odpovědi. Tečka
+    za zkratkou nebo řadovou číslovkou ("např.", "3.") větu neukončuje.
+    Úseky kratší než min_chars ("Ano.") se připojí k další větě, aby TTS
+    nedostávalo příliš krátké klipy.
+    """
+
+    def __init__(self, min_chars: int = 12):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Přidá kus textu a vrátí dokončené věty"""
+        if not delta:
+            return []
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for end in _sentence_breaks(self._buffer):
+            sentence = self._buffer[start:end].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = end
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Konec streamu - zbytek textu jako poslední věta"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest or None
+
+
+def _event_text(event) -> str:
+    """Text z eventu thread.message.delta (ostatní eventy vrací prázdný řetězec)"""
+    if getattr(event, 'event', None) != "thread.message.delta":
+        return ""
+    parts = []
+    for block in getattr(event.data.delta, 'content', None) or ():
+        text = getattr(block, 'text', None)
+        if getattr(block, 'type', None) == "text" and text is not None and text.value:
+            parts.append(text.value)
+    return "".join(parts)
+
+
+async def stream_run_text(client, thread_id: str, assistant_id: str) -> AsyncIterator[str]:
+    """
+    Spustí Assistant run se streamováním a vrací textové delty odpovědi.
+
+    Synchronní klient čte SSE stream ve vlákně executoru a delty předává
+    do event loopu přes frontu - žádné dotazování runs.retrieve. Když
+    volající iteraci ukončí (barge-in, zrušení tasku), vlákno stream zavře
+    u dalšího eventu a nedokončený run zruší - jinak by thread zůstal
+    zamčený a další zprávu uživatele by do něj nešlo přidat.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            stop.set()  # Event loop už neběží
+
+    def produce() -> None:
+        run_id = None
+        finished = False
+        try:
+            with client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=assistant_id) as stream:
+                for event in stream:
+                    if stop.is_set():
+                        break
+                    name = getattr(event, 'event', None)
+                    text = _event_text(event)
+                    if text:
+                        put(text)
+                    elif name == "thread.run.created":
+                        run_id = event.data.id
+                    elif name in _RUN_FINISHED_EVENTS:
+                        finished = True
+                        if name in _RUN_FAILED_EVENTS:
+                            logger.warning(f"⚠️ Assistant run neúspěšný: {name}")
+            if stop.is_set() and run_id and not finished:
+                client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+                logger.info(f"✋ Assistant run {run_id} zrušen")
+        except Exception as e:
+            put(e)
+        finally:
+            put(_END)
+
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+async def stream_run_sentences(client, thread_id: str, assistant_id: str,
+                               min_chars: int = 12) -> AsyncIterator[str]:
+    """Věty odpovědi asistenta tak, jak je model dopisuje (viz stream_run_text)"""
+    splitter = SentenceSplitter(min_chars)
+    started = time.perf_counter()
+    first_delta = first_sentence = True
+    deltas = stream_run_text(client, thread_id, assistant_id)
+    try:
+        async for delta in deltas:
+            if first_delta:
+                first_delta = False
+                voice_metrics.observe("assistant_first_delta", (time.perf_counter() - started) * 1000)
+            for sentence in splitter.feed(delta):
+                if first_sentence:
+                    first_sentence = False
+                    voice_metrics.observe("assistant_first_sentence", (time.perf_counter() - started) * 1000)
+                yield sentence
+    finally:
+        await deltas.aclose()
+    rest = splitter.flush()
+    if rest:
+        yield rest
+    voice_metrics.observe("assistant_run_total", (time.perf_counter() - started) * 1000)
@@ -0,0 +1,163 @@
+import struct
+import logging
+from functools import lru_cache
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TWILIO_SAMPLE_RATE = 8000
+
+# G.711 μ-law (referenční implementace Sun / CCITT, stejná jako audioop)
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+_ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+
+
+def _build_encode_table() -> np.ndarray:
+    """μ-law bajt pro všech 65536 hodnot int16 (index = hodnota jako uint16)"""
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2  # 14bitový vstup
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    segment = np.searchsorted(_ULAW_SEGMENT_ENDS, magnitude)
+    mantissa = (magnitude >> (segment + 1)) & 0x0F
+    ulaw = np.where(segment >= 8, 0x7F, (np.minimum(segment, 7) << 4) | mantissa)
+    return (ulaw ^ mask).astype(np.uint8)
+
+
+def _build_decode_table() -> np.ndarray:
+    """int16 hodnota pro všech 256 μ-law bajtů"""
+    ulaw = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((ulaw & 0x0F) << 3) + _ULAW_BIAS) << ((ulaw & 0x70) >> 4)
+    return np.where(ulaw & 0x80, _ULAW_BIAS - t, t - _ULAW_BIAS).astype(np.int16)
+
+
+ULAW_ENCODE_TABLE = _build_encode_table()
+ULAW_DECODE_TABLE = _build_decode_table()
+
+
+def ulaw_encode(pcm: np.ndarray) -> bytes:
+    """int16 PCM -> μ-law (jedno vyhledání v tabulce na vzorek)"""
+    samples = np.ascontiguousarray(pcm, dtype=np.int16)
+    return ULAW_ENCODE_TABLE[samples.view(np.uint16)].tobytes()
+
+
+def ulaw_decode(data) -> np.ndarray:
+    """μ-law -> int16 PCM"""
+    return ULAW_DECODE_TABLE[np.frombuffer(data, dtype=np.uint8)]
+
+
+def parse_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Načte WAV (PCM 8/16/32 bit, float32, μ-law) a vrátí (mono int16 vzorky, vzorkovací kmitočet).
+
+    Vícekanálové audio se průměruje do mona. Délka "data" chunku větší než
+    soubor (streamovaný WAV z TTS API má 0xFFFFFFFF) se ořízne na zbytek souboru.
+    """
+    view = memoryview(data)
+    if len(view) < 12 or bytes(view[0:4]) != b'RIFF' or bytes(view[8:12]) != b'WAVE':
+        raise ValueError("Neplatný WAV soubor (chybí RIFF/WAVE hlavička)")
+
+    offset = 12
+    audio_format = channels = sample_rate = bits_per_sample = None
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from('<I', view, offset + 4)[0]
+        body_start = offset + 8
+        if chunk_id == b'fmt ':
+            audio_format, channels, sample_rate, _, _, bits_per_sample = struct.unpack_from('<HHIIHH', view, body_start)
+            if audio_format == 0xFFFE and chunk_size >= 40:  # WAVE_FORMAT_EXTENSIBLE - formát je v GUID
+                audio_format = struct.unpack_from('<H', view, body_start + 24)[0]
+        elif chunk_id == b'data':
+            if audio_format is None:
+                raise ValueError("WAV: data chunk před fmt chunkem")
+            body = view[body_start:min(body_start + chunk_size, len(view))]
+            return _decode_samples(body, audio_format, channels, bits_per_sample), sample_rate
+        offset = body_start + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV: chybí data chunk")
+
+
+def _decode_samples(body, audio_format: int, channels: int, bits_per_sample: int) -> np.ndarray:
+    frame_bytes = channels * bits_per_sample // 8
+    body = body[:len(body) - len(body) % frame_bytes]
+    if audio_format == 1 and bits_per_sample == 16:
+        samples = np.frombuffer(body, dtype='<i2')
+    elif audio_format == 1 and bits_per_sample == 8:
+        samples = (np.frombuffer(body, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif audio_format == 1 and bits_per_sample == 32:
+        samples = (np.frombuffer(body, dtype='<i4') >> 16).astype(np.int16)
+    elif audio_format == 3 and bits_per_sample == 32:
+        samples = _float_to_int16(np.frombuffer(body, dtype='<f4'))
+    elif audio_format == 7 and bits_per_sample == 8:
+        samples = ulaw_decode(body)
+    else:
+        raise ValueError(f"WAV: nepodporovaný formát {audio_format} ({bits_per_sample} bit)")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).round().astype(np.int16)
+    return samples
+
+
+def _float_to_int16(samples: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(samples * 32768.0), -32768, 32767).astype(np.int16)
+
+
+@lru_cache(maxsize=16)
+def lowpass_filter(up: int, down: int, half_length: int = 16, rolloff: float = 0.92,
+                   kaiser_beta: float = 8.0) -> np.ndarray:
+    """
+    Antialiasingový FIR pro převod up/down (windowed sinc, Kaiserovo okno).
+
+    Délka 2 * down * half_length + 1, takže zpoždění filtru je přesně
+    half_length výstupních vzorků a dá se odříznout bez posunu signálu.
+    """
+    length = 2 * down * half_length + 1
+    cutoff = rolloff * 0.5 / max(up, down)  # normalizováno na kmitočet po převzorkování nahoru
+    n = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, kaiser_beta)
+    return taps * (up / taps.sum())
+
+
+def resample_poly(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """
+    Polyfázové převzorkování from_rate -> to_rate (např. 24 kHz -> 8 kHz).
+
+    Filtr se rozloží na `down` fází, každá fáze se konvoluje jen se vzorky,
+    ze kterých vzniká výstup - počítá se pouze každý down-tý výstup filtru.
+    """
+    if from_rate == to_rate:
+        return np.asarray(samples, dtype=np.int16)
+    divisor = gcd(from_rate, to_rate)
+    up, down = to_rate // divisor, from_rate // divisor
+    # Při převzorkování nahoru musí filtr pokrýt víc vstupních vzorků
+    half_length = 16 * -(-up // down)
+    taps = lowpass_filter(up, down, half_length)
+
+    x = np.asarray(samples, dtype=np.float64)
+    if up > 1:
+        stuffed = np.zeros(len(x) * up)
+        stuffed[::up] = x
+        x = stuffed
+
+    out_length = -(-len(x) // down)
+    # Doplnění nulami, aby poslední výstupy měly celé okno filtru
+    x = np.concatenate((x, np.zeros(half_length * down + down)))
+
+    output = np.zeros(out_length + half_length)
+    for phase in range(down):
+        phase_taps = taps[phase::down]
+        # x_p[n] = x[n * down - phase] (záporné indexy = 0)
+        phase_input = x[0::down] if phase == 0 else np.concatenate(([0.0], x[down - phase::down]))
+        convolved = np.convolve(phase_input[:out_length + half_length], phase_taps)[:out_length + half_length]
+        output[:len(convolved)] += convolved
+
+    result = output[half_length:half_length + out_length]
+    return np.clip(np.round(result), -32768, 32767).astype(np.int16)
+
+
+def wav_to_mulaw(wav_data: bytes, to_rate: int = TWILIO_SAMPLE_RATE) -> bytes:
+    """WAV -> μ-law 8 kHz mono (parsování, polyfázové převzorkování a G.711 v NumPy)"""
+    samples, sample_rate = parse_wav(wav_data)
+    return ulaw_encode(resample_poly(samples, sample_rate, to_rate))
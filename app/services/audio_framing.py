@@ -0,0 +1,61 @@
+import io
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Kódy formátu ve WAV "fmt " chunku
+PCM_FORMAT = 1
+MULAW_FORMAT = 7
+
+WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+WAV_HEADER_SIZE = WAV_HEADER.size  # 44 bajtů
+
+
+def pack_wav_header(buffer, data_size: int, audio_format: int = MULAW_FORMAT, channels: int = 1,
+                    sample_rate: int = 8000, bits_per_sample: int = 8, offset: int = 0) -> None:
+    """Zapíše 44bajtovou WAV hlavičku do bufferu na pozici offset"""
+    block_align = channels * bits_per_sample // 8
+    WAV_HEADER.pack_into(
+        buffer, offset,
+        b'RIFF', data_size + WAV_HEADER_SIZE - 8,  # Velikost souboru
+        b'WAVE',
+        b'fmt ', 16,  # Velikost fmt chunku
+        audio_format,
+        channels,
+        sample_rate,
+        sample_rate * block_align,  # Byte rate
+        block_align,
+        bits_per_sample,
+        b'data', data_size
+    )
+
+
+def build_wav(payload, audio_format: int = MULAW_FORMAT, channels: int = 1,
+              sample_rate: int = 8000, bits_per_sample: int = 8) -> bytearray:
+    """WAV (hlavička + data) v jednom předalokovaném bufferu"""
+    data = memoryview(payload)
+    buffer = bytearray(WAV_HEADER_SIZE + data.nbytes)
+    pack_wav_header(buffer, data.nbytes, audio_format, channels, sample_rate, bits_per_sample)
+    memoryview(buffer)[WAV_HEADER_SIZE:] = data.cast('B')
+    return buffer
+
+
+class InMemoryAudioFile(io.BytesIO):
+    """
+    Audio soubor v paměti pro upload do Whisper API.
+
+    OpenAI klient (httpx) bere název souboru z atributu name a podle přípony
+    pozná formát - stačí tedy místo otevřeného dočasného souboru.
+    """
+
+    def __init__(self, data, name: str = "audio.wav"):
+        super().__init__(data)
+        self.name = name
+
+
+def wav_file(payload, name: str = "audio.wav", audio_format: int = MULAW_FORMAT, channels: int = 1,
+             sample_rate: int = 8000, bits_per_sample: int = 8) -> InMemoryAudioFile:
+    """Zabalí surová audio data (výchozí: Twilio μ-law 8 kHz mono) do WAV souboru v paměti"""
+    return InMemoryAudioFile(build_wav(payload, audio_format, channels, sample_rate, bits_per_sample), name)
+
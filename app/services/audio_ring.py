@@ -0,0 +1,117 @@
+import logging
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Co dělat, když zápis překročí kapacitu
+OVERFLOW_OVERWRITE = "overwrite"  # přepsat nejstarší data (drží se posledních capacity bajtů)
+OVERFLOW_REJECT = "reject"        # nová data, která se nevejdou, zahodit
+OVERFLOW_ERROR = "error"          # vyhodit BufferError
+
+
+class AudioRingBuffer:
+    """
+    Kruhový buffer μ-law audia s pevnou kapacitou, alokovaný jednou.
+
+    Data se zapisují dvakrát - na pozici i a i + capacity ("zrcadlený"
+    buffer o dvojnásobné velikosti) - takže libovolný úsek do délky
+    capacity leží v paměti souvisle a view()/snapshot() vrací memoryview
+    bez kopírování, i když úsek přechází přes konec kruhu.
+
+    Pozice jsou absolutní od začátku streamu (written = celkem zapsáno),
+    view(start, end) tedy funguje pro libovolný úsek posledních capacity
+    bajtů. Memoryview ukazuje do bufferu: platí, dokud se úsek nepřepíše
+    dalším zápisem - kdo ho potřebuje déle, udělá si bytes().
+    """
+
+    def __init__(self, capacity: int, overflow: str = OVERFLOW_OVERWRITE):
+        if capacity <= 0:
+            raise ValueError("Kapacita musí být kladná")
+        if overflow not in (OVERFLOW_OVERWRITE, OVERFLOW_REJECT, OVERFLOW_ERROR):
+            raise ValueError(f"Neznámá overflow politika: {overflow}")
+        self.capacity = capacity
+        self.overflow = overflow
+        self._buffer = bytearray(2 * capacity)
+        self._view = memoryview(self._buffer)
+        self.written = 0   # absolutní pozice konce dat
+        self.start = 0     # absolutní pozice nejstaršího platného bajtu
+        self.overwritten = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return self.written - self.start
+
+    @property
+    def free(self) -> int:
+        return self.capacity - len(self)
+
+    def write(self, data) -> int:
+        """Zapíše data (bytes/bytearray/memoryview), vrací počet zapsaných bajtů"""
+        source = memoryview(data).cast('B')
+        size = len(source)
+        if size > self.free:
+            if self.overflow == OVERFLOW_ERROR:
+                raise BufferError(f"Audio buffer plný ({len(self)}/{self.capacity} B)")
+            if self.overflow == OVERFLOW_REJECT:
+                accepted = self.free
+                self.rejected += size - accepted
+                source = source[:accepted]
+                size = accepted
+            elif size > self.capacity:
+                # Větší než celý buffer - zůstane jen konec
+                skipped = size - self.capacity
+                self.overwritten += skipped
+                self.written += skipped
+                self.start = self.written
+                source = source[skipped:]
+                size = self.capacity
+
+        view = self._view
+        capacity = self.capacity
+        position = self.written % capacity
+        first = capacity - position
+        if size <= first:
+            # Běžný případ (rámec nepřechází přes konec kruhu): kopie + zrcadlo
+            view[position:position + size] = source
+            view[capacity + position:capacity + position + size] = source
+        else:
+            # Primární kopie přes konec kruhu ...
+            view[position:capacity] = source[:first]
+            view[0:size - first] = source[first:]
+            # ... a zrcadlo o capacity dál, aby byl každý úsek souvislý
+            view[capacity + position:] = source[:first]
+            view[capacity:capacity + size - first] = source[first:]
+
+        self.written += size
+        if self.written - self.start > capacity:
+            self.overwritten += self.written - capacity - self.start
+            self.start = self.written - capacity
+        return size
+
+    def view(self, start: int, end: int) -> memoryview:
+        """Úsek [start, end) v absolutních pozicích jako memoryview (bez kopie)"""
+        if start < self.start or end > self.written or start > end:
+            raise IndexError(f"Úsek {start}-{end} není v bufferu ({self.start}-{self.written})")
+        offset = start % self.capacity
+        return self._view[offset:offset + end - start]
+
+    def snapshot(self, last: Optional[int] = None) -> memoryview:
+        """Posledních `last` bajtů (výchozí: všechno v bufferu) bez kopie"""
+        length = len(self) if last is None else min(last, len(self))
+        return self.view(self.written - length, self.written)
+
+    def consume(self, size: int) -> None:
+        """Zahodí nejstarších size bajtů (posune začátek)"""
+        self.start = min(self.written, self.start + size)
+
+    def clear(self) -> None:
+        self.start = self.written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'capacity': self.capacity,
+            'buffered': len(self),
+            'written': self.written,
+            'overwritten': self.overwritten,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,240 @@
+import time
+import base64
+import asyncio
+import logging
+from collections import deque, OrderedDict
+from typing import Optional, Dict, Any, Awaitable, Callable, Deque, List
+
+from app.services.media_events import MediaEventEncoder
+
+logger = logging.getLogger(__name__)
+
+# Twilio Media Stream: μ-law 8 kHz -> 20 ms = 160 bajtů
+FRAME_MS = 20
+FRAME_BYTES = 160
+MULAW_SILENCE = b'\xff'
+
+# Kolik rámců posíláme před reálným časem (jitter buffer na straně Twilia)
+DEFAULT_LEAD_FRAMES = 3
+
+# Pro kolik posledních tahů držíme počet odeslaných rámců
+TURN_HISTORY = 20
+
+
+def frame_payloads(mulaw_audio: bytes, frame_bytes: int = FRAME_BYTES) -> List[str]:
+    """Rozdělí μ-law na rámce (poslední doplněn tichem) a každý jednou zakóduje do base64"""
+    view = memoryview(mulaw_audio)
+    payloads = []
+    for offset in range(0, len(view), frame_bytes):
+        frame = view[offset:offset + frame_bytes]
+        if len(frame) < frame_bytes:
+            frame = bytes(frame) + MULAW_SILENCE * (frame_bytes - len(frame))
+        payloads.append(base64.b64encode(frame).decode('ascii'))
+    return payloads
+
+
+class _Clip:
+    __slots__ = ('payloads', 'mark', 'done', 'turn_id')
+
+    def __init__(self, payloads: List[str], mark: Optional[str], done: asyncio.Future, turn_id: Optional[int] = None):
+        self.payloads = payloads
+        self.mark = mark
+        self.done = done
+        self.turn_id = turn_id
+
+
+class OutboundAudioSender:
+    """
+    Plánovač odchozího audia jednoho Media Streamu.
+
+    Rámce po 20 ms se odesílají podle monotónních hodin: rámec n má termín
+    start + (n - lead_frames) * 20 ms, takže zpoždění jednoho probuzení se
+    nesčítá a přehrávání neujíždí. lead_frames rámců jde hned na začátku
+    jako jitter buffer. Po každém klipu s názvem se pošle "mark" (Twilio ho
+    vrátí, až ho přehraje), clear() zahodí frontu i audio už bufferované
+    u Twilia (barge-in). Klip může nést turn_id tahu, ke kterému patří -
+    sender pak ví, z kterého tahu je právě odesílaný a přehraný rámec.
+    """
+
+    def __init__(self, send_text: Callable[[str], Awaitable[None]], stream_sid: str,
+                 frame_ms: int = FRAME_MS, lead_frames: int = DEFAULT_LEAD_FRAMES,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self._send_text = send_text
+        self.stream_sid = stream_sid
+        self.frame_seconds = frame_ms / 1000.0
+        self.lead_frames = lead_frames
+        self._clock = clock
+        self._sleep = sleep
+        self._encoder = MediaEventEncoder(stream_sid)
+        self._clips: Deque[_Clip] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._pending_marks: Dict[str, Optional[int]] = {}
+        self._mark_counter = 0
+        self.frames_by_turn: "OrderedDict[int, int]" = OrderedDict()
+        self.sending_turn_id: Optional[int] = None
+        self.played_turn_id: Optional[int] = None
+        self.frames_sent = 0
+        self.late_frames = 0
+        self.max_lateness_ms = 0.0
+
+    @property
+    def is_playing(self) -> bool:
+        """Ve frontě je audio, nebo ho Twilio ještě nepřehrál (nepotvrzený mark)"""
+        return bool(self._clips) or bool(self._pending_marks)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def play(self, mulaw_audio: bytes, mark: Optional[str] = None, turn_id: Optional[int] = None) -> bool:
+        """Zařadí klip a počká na odeslání všech rámců (False = přerušeno clear/stop)"""
+        if not mulaw_audio:
+            return True
+        if mark is None:
+            self._mark_counter += 1
+            mark = f"clip-{self._mark_counter}" if turn_id is None else f"turn-{turn_id}-{self._mark_counter}"
+        done = asyncio.get_running_loop().create_future()
+        self._clips.append(_Clip(frame_payloads(mulaw_audio), mark, done, turn_id))
+        self.start()
+        self._wakeup.set()
+        return await done
+
+    async def clear(self) -> None:
+        """Barge-in: zahodí neodeslané rámce a řekne Twiliu, ať zahodí svůj buffer"""
+        dropped = 0
+        while self._clips:
+            clip = self._clips.popleft()
+            dropped += len(clip.payloads)
+            if not clip.done.done():
+                clip.done.set_result(False)
+        self._pending_marks.clear()
+        await self._send_text(self._encoder.clear())
+        logger.info(f"✋ Barge-in: odchozí audio zrušeno ({dropped} rámců ve frontě)")
+
+    def on_mark(self, name: str) -> None:
+        """Twilio potvrdil přehrání klipu (event "mark")"""
+        if name in self._pending_marks:
+            turn_id = self._pending_marks.pop(name)
+            if turn_id is not None:
+                self.played_turn_id = turn_id
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                # Konec streamu nesmí shodit úklid volajícího (release threadu, unregister spojení)
+                logger.warning(f"⚠️ Odchozí audio {self.stream_sid} skončilo chybou: {e}")
+            self._task = None
+        self._abort_clips()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'frames_sent': self.frames_sent,
+            'late_frames': self.late_frames,
+            'max_lateness_ms': round(self.max_lateness_ms, 2),
+            'queued_clips': len(self._clips),
+            'pending_marks': len(self._pending_marks),
+            'sending_turn_id': self.sending_turn_id,
+            'played_turn_id': self.played_turn_id,
+            'frames_by_turn': dict(self.frames_by_turn)
+        }
+
+    async def _run(self) -> None:
+        try:
+            await self._send_queue()
+        except Exception as e:
+            # Odeslání selhalo (zavěšený hovor, zavřený socket) - čekající play() nesmí viset
+            logger.warning(f"⚠️ Odchozí audio {self.stream_sid} přerušeno: {e}")
+            self._abort_clips()
+
+    def _abort_clips(self) -> None:
+        while self._clips:
+            clip = self._clips.popleft()
+            if not clip.done.done():
+                clip.done.set_result(False)
+
+    async def _send_queue(self) -> None:
+        epoch = None
+        frame_index = 0
+        while True:
+            if not self._clips:
+                # Fronta je prázdná - další klip začne novou časovou osou
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                epoch = None
+                continue
+
+            clip = self._clips[0]
+            if epoch is None:
+                epoch = self._clock()
+                frame_index = 0
+
+            position = 0
+            while position < len(clip.payloads):
+                if not self._clips or self._clips[0] is not clip:
+                    break  # clear() během klipu
+                deadline = epoch + (frame_index - self.lead_frames) * self.frame_seconds
+                delay = deadline - self._clock()
+                if delay > 0:
+                    await self._sleep(delay)
+                    if not self._clips or self._clips[0] is not clip:
+                        break
+                elif delay < -self.frame_seconds:
+                    self.late_frames += 1
+                    self.max_lateness_ms = max(self.max_lateness_ms, -delay * 1000)
+                await self._send_text(self._encoder.media(clip.payloads[position]))
+                self.frames_sent += 1
+                if clip.turn_id is not None:
+                    self._count_turn_frame(clip.turn_id)
+                frame_index += 1
+                position += 1
+            else:
+                self._clips.popleft()
+                if clip.mark:
+                    self._pending_marks[clip.mark] = clip.turn_id
+                    await self._send_text(self._encoder.mark(clip.mark))
+                if not clip.done.done():
+                    clip.done.set_result(True)
+
+    def _count_turn_frame(self, turn_id: int) -> None:
+        self.sending_turn_id = turn_id
+        if turn_id in self.frames_by_turn:
+            self.frames_by_turn[turn_id] += 1
+            return
+        self.frames_by_turn[turn_id] = 1
+        while len(self.frames_by_turn) > TURN_HISTORY:
+            self.frames_by_turn.popitem(last=False)
+
+
+class AudioSenderRegistry:
+    """Jeden OutboundAudioSender na Media Stream (podle streamSid)"""
+
+    def __init__(self):
+        self._senders: Dict[str, OutboundAudioSender] = {}
+
+    def get(self, stream_sid: str) -> Optional[OutboundAudioSender]:
+        return self._senders.get(stream_sid)
+
+    def get_or_create(self, stream_sid: str, send_text: Callable[[str], Awaitable[None]]) -> OutboundAudioSender:
+        sender = self._senders.get(stream_sid)
+        if sender is None:
+            sender = self._senders[stream_sid] = OutboundAudioSender(send_text, stream_sid)
+        return sender
+
+    async def close(self, stream_sid: str) -> None:
+        sender = self._senders.pop(stream_sid, None)
+        if sender is not None:
+            await sender.stop()
+
+    def __len__(self) -> int:
+        return len(self._senders)
+
+
+# Globální registr (odchozí audio /audio streamů)
+audio_senders = AudioSenderRegistry()
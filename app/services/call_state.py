@@ -0,0 +1,246 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable
+
+from app.services.adaptive_planner import PASS_SCORE, NextQuestionPlan, adjust_difficulty, get_next_adaptive_question
+
+logger = logging.getLogger(__name__)
+
+
+class CallState:
+    """
+    Stav jednoho hovoru držený v paměti po dobu hovoru.
+
+    Obsahuje jen obyčejná data (žádné SQLAlchemy objekty), aby se dal
+    bezpečně sdílet mezi requesty bez otevřené DB session.
+    """
+
+    def __init__(self, user: Dict[str, Any], lesson: Optional[Dict[str, Any]] = None,
+                 enabled_questions: Optional[List[dict]] = None,
+                 test_session: Optional[Dict[str, Any]] = None):
+        self.user = user
+        self.lesson = lesson
+        self.enabled_questions = enabled_questions or []
+        self.test_session = test_session
+        self.keys = set()
+        self.expires_at = 0.0
+
+    @property
+    def user_id(self) -> int:
+        return self.user['id']
+
+    @property
+    def user_level(self) -> int:
+        return self.user.get('current_lesson_level') or 0
+
+
+class CallStateCache:
+    """
+    In-process cache stavu hovorů klíčovaný podle Twilio CallSid a/nebo attempt_id.
+
+    - TTL se obnovuje při každém přístupu (hovor je "živý", dokud přichází tahy)
+    - jeden stav může být dostupný pod více klíči (CallSid i attempt_id)
+    - zápisy jdou vždy nejdřív do DB a teprve potom do cache (write-through
+      zajišťuje volající, viz save_answer_and_advance v main.py)
+    """
+
+    def __init__(self, ttl_seconds: float = None, max_entries: int = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('CALL_STATE_TTL_SECONDS', '1800'))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('CALL_STATE_MAX_ENTRIES', '2000'))
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def keys_for(call_sid: Optional[str] = None, attempt_id: Optional[str] = None) -> List[str]:
+        """Sestaví klíče cache pro daný hovor (prázdné hodnoty se vynechají)."""
+        keys = []
+        if call_sid:
+            keys.append(f"call:{call_sid}")
+        if attempt_id:
+            keys.append(f"attempt:{attempt_id}")
+        return keys
+
+    def get(self, call_sid: Optional[str] = None, attempt_id: Optional[str] = None) -> Optional[CallState]:
+        """Vrátí stav hovoru nebo None. Počítá hit/miss."""
+        keys = self.keys_for(call_sid, attempt_id)
+        now = self._clock()
+        with self._lock:
+            for key in keys:
+                state = self._entries.get(key)
+                if state is None:
+                    continue
+                if state.expires_at <= now:
+                    self._drop(state)
+                    self.evictions += 1
+                    continue
+                # Obnovení TTL a doplnění chybějících klíčů (např. CallSid k attempt_id);
+                # jiný stav pod druhým klíčem je zastaralý a zahodí se celý
+                state.expires_at = now + self.ttl_seconds
+                for other in keys:
+                    previous = self._entries.get(other)
+                    if previous is not None and previous is not state:
+                        self._drop(previous)
+                    state.keys.add(other)
+                    self._entries[other] = state
+                    self._entries.move_to_end(other)
+                self.hits += 1
+                return state
+            self.misses += 1
+            return None
+
+    def put(self, state: CallState, call_sid: Optional[str] = None, attempt_id: Optional[str] = None) -> CallState:
+        """Uloží stav pod všemi dostupnými klíči."""
+        keys = self.keys_for(call_sid, attempt_id)
+        if not keys:
+            return state
+        with self._lock:
+            state.expires_at = self._clock() + self.ttl_seconds
+            for key in keys:
+                previous = self._entries.get(key)
+                if previous is not None and previous is not state:
+                    self._drop(previous)
+                state.keys.add(key)
+                self._entries[key] = state
+                self._entries.move_to_end(key)
+            self._evict_overflow()
+        return state
+
+    def invalidate(self, call_sid: Optional[str] = None, attempt_id: Optional[str] = None) -> None:
+        """Zahodí stav hovoru (např. po dokončení testu)."""
+        with self._lock:
+            for key in self.keys_for(call_sid, attempt_id):
+                state = self._entries.get(key)
+                if state is not None:
+                    self._drop(state)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Zahodí všechny stavy daného uživatele (admin změnil úroveň / resetoval test)."""
+        with self._lock:
+            for state in {id(s): s for s in self._entries.values() if s.user_id == user_id}.values():
+                self._drop(state)
+
+    def invalidate_lesson(self, lesson_id: int) -> None:
+        """Zahodí stavy hovorů, které drží danou lekci (admin upravil otázky)."""
+        with self._lock:
+            for state in {id(s): s for s in self._entries.values()
+                          if s.lesson and s.lesson.get('id') == lesson_id}.values():
+                self._drop(state)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss čítače pro admin endpoint."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'entries': len({id(s) for s in self._entries.values()}),
+                'keys': len(self._entries),
+                'ttl_seconds': self.ttl_seconds
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _drop(self, state: CallState) -> None:
+        for key in state.keys:
+            if self._entries.get(key) is state:
+                del self._entries[key]
+        state.keys.clear()
+
+    def _evict_overflow(self) -> None:
+        while len(self._entries) > self.max_entries:
+            _, oldest = next(iter(self._entries.items()))
+            self._drop(oldest)
+            self.evictions += 1
+
+
+# Sloupce test session, které přepisuje jeden UPDATE po odpovědi
+ANSWER_UPDATE_COLUMNS = (
+    'current_question_index', 'difficulty_score', 'failed_categories', 'answers',
+    'scores', 'current_score', 'is_completed', 'completed_at'
+)
+
+
+def apply_answer(test_session: dict, user_answer: str, score: float, feedback: str, question_index: int,
+                 scored_by: str = "llm", plan: NextQuestionPlan = None) -> dict:
+    """
+    Aplikuje odpověď na stav test session (bez DB) - aktualizuje skóre obtížnosti,
+    sleduje chyby, posune na další adaptivní otázku. Vstupní slovník nemění.
+    
+    Pokud je předán plan (viz plan_next_question), obtížnost a další otázka se
+    převezmou z předpočítané větve místo nového výpočtu.
+    """
+    updated = dict(test_session)
+    answers = list(test_session.get('answers') or [])
+    scores = list(test_session.get('scores') or [])
+    failed_categories = list(test_session.get('failed_categories') or [])
+    
+    # Získání otázky podle předaného indexu
+    current_question = test_session['questions_data'][question_index]
+    
+    # Aktualizace skóre obtížnosti (z předpočítané větve, pokud je k dispozici)
+    passed = score >= PASS_SCORE
+    branch = plan.for_score(score) if plan is not None and plan.question_index == question_index else None
+    if branch is not None:
+        new_difficulty, adjustment = branch.difficulty_score, branch.adjustment
+    else:
+        current_difficulty = test_session.get('difficulty_score', 50.0) or 50.0
+        new_difficulty, adjustment = adjust_difficulty(current_difficulty, current_question, passed)
+    
+    if not passed:
+        category = current_question.get("category", "Neznámá")
+        if category not in failed_categories:
+            failed_categories.append(category)
+    
+    updated['difficulty_score'] = new_difficulty
+    logger.info(f"🧠 Nové skóre obtížnosti: {updated['difficulty_score']:.2f} (změna: {adjustment:.2f})")
+    
+    answers.append({
+        "question": current_question.get("question", ""),
+        "correct_answer": current_question.get("correct_answer", ""),
+        "user_answer": user_answer,
+        "score": score,
+        "feedback": feedback,
+        "question_index": question_index,
+        "scored_by": scored_by
+    })
+    scores.append(score)
+    
+    updated['answers'] = answers
+    updated['scores'] = scores
+    updated['failed_categories'] = failed_categories
+    updated['current_score'] = sum(scores) / len(scores)
+    updated['next_question'] = None
+    
+    if len(answers) >= test_session['total_questions']:
+        updated['is_completed'] = True
+        updated['completed_at'] = datetime.utcnow()
+    else:
+        # Další otázka - adaptivní výběr podle nového skóre obtížnosti
+        next_question = branch.next_question if branch is not None else get_next_adaptive_question(updated)
+        if next_question:
+            updated['current_question_index'] = next_question['original_index']
+            updated['next_question'] = next_question
+    
+    return updated
+
+
+def answer_update_values(updated: Dict[str, Any]) -> Dict[str, Any]:
+    """Hodnoty pro jediný UPDATE test session po apply_answer (JSON sloupce se přepisují celé)"""
+    return {column: updated[column] for column in ANSWER_UPDATE_COLUMNS}
+
+
+# Globální instance cache
+call_state_cache = CallStateCache()
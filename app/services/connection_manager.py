@@ -0,0 +1,340 @@
+import os
+import time
+import asyncio
+import itertools
+import logging
+from typing import Optional, Dict, Any, Awaitable, Callable, Set
+
+from app.services.media_events import MediaEventEncoder
+from app.services.stream_recorder import StreamRecorder, recording_path
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close kódy
+CLOSE_GOING_AWAY = 1001        # server končí (drain při nasazení)
+CLOSE_TRY_AGAIN_LATER = 1013   # server nepřijímá nová spojení
+CLOSE_IDLE = 1011              # spojení bez příchozích dat
+
+
+class MediaConnection:
+    """
+    Jedno živé WebSocket spojení Twilio Media Streamu.
+
+    Endpoint čte a posílá přes receive_text()/send_text() spojení místo
+    přímo přes websocket - spojení tak počítá zprávy a bajty v obou směrech
+    a ví, kdy naposledy něco přišlo a odešlo. Heartbeat správce z toho
+    pozná nečinná spojení a spočítá byte rate za poslední interval.
+    Se zapnutou nahrávkou jde každá zpráva i do StreamRecorderu.
+    """
+
+    def __init__(self, connection_id: int, endpoint: str,
+                 receive_text: Callable[[], Awaitable[str]],
+                 send_text: Callable[[str], Awaitable[None]],
+                 close: Callable[..., Awaitable[None]],
+                 clock: Callable[[], float] = time.monotonic,
+                 manager: Optional["MediaConnectionManager"] = None, record: bool = False):
+        self.connection_id = connection_id
+        self.endpoint = endpoint
+        self._receive_text = receive_text
+        self._send_text = send_text
+        self._close = close
+        self._clock = clock
+        self._manager = manager
+        self.record_requested = record
+        self.recorder: Optional[StreamRecorder] = None
+        self._last_in: Optional[str] = None
+        self.stream_sid: Optional[str] = None
+        self.call_sid: Optional[str] = None
+        self.connected_at = self.last_in_at = self.last_out_at = clock()
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.heartbeats = 0
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.rate_in = 0.0
+        self.rate_out = 0.0
+        self._sampled_at = self.connected_at
+        self._sampled_in = 0
+        self._sampled_out = 0
+
+    def bind(self, stream_sid: Optional[str], call_sid: Optional[str] = None) -> None:
+        """Start event - spojení patří k tomuto streamu/hovoru"""
+        self.stream_sid = stream_sid
+        self.call_sid = call_sid
+        if self.recorder is None and self._manager is not None and self._manager.wants_recording(self):
+            self.start_recording(self._manager.record_dir)
+
+    def start_recording(self, directory: str) -> Optional[StreamRecorder]:
+        """Začne nahrávat zprávy streamu (včetně právě přijaté, typicky start eventu)"""
+        try:
+            self.recorder = StreamRecorder(
+                recording_path(directory, self.stream_sid, self.connection_id),
+                {'endpoint': self.endpoint, 'stream_sid': self.stream_sid, 'call_sid': self.call_sid},
+                self._clock
+            )
+        except OSError as e:
+            logger.error(f"❌ Nahrávku streamu {self.stream_sid} nejde založit: {e}")
+            return None
+        if self._last_in is not None:
+            self.recorder.record_inbound(self._last_in)
+        logger.info(f"⏺️ Nahrávám stream {self.stream_sid} do {self.recorder.path}")
+        return self.recorder
+
+    def stop_recording(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            logger.info(f"⏹️ Nahrávka streamu {self.stream_sid}: {self.recorder.stats()}")
+            self.recorder = None
+
+    async def receive_text(self) -> str:
+        text = await self._receive_text()
+        self.messages_in += 1
+        self.bytes_in += len(text)
+        self.last_in_at = self._clock()
+        self._last_in = text
+        if self.recorder is not None:
+            self.recorder.record_inbound(text)
+        return text
+
+    async def send_text(self, text: str) -> None:
+        await self._send_text(text)
+        if self.recorder is not None:
+            self.recorder.record_outbound(text)
+        self.messages_out += 1
+        self.bytes_out += len(text)
+        self.last_out_at = self._clock()
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        """Zavře spojení ze strany serveru (endpoint pak skončí na chybě čtení)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        try:
+            await self._close(code=code, reason=reason)
+        except Exception as e:
+            logger.debug(f"Zavření spojení {self.connection_id} selhalo: {e}")
+
+    def sample(self, now: float) -> None:
+        """Byte rate (B/s) od minulého vzorku - volá heartbeat jednou za interval"""
+        elapsed = now - self._sampled_at
+        if elapsed <= 0:
+            return
+        self.rate_in = (self.bytes_in - self._sampled_in) / elapsed
+        self.rate_out = (self.bytes_out - self._sampled_out) / elapsed
+        self._sampled_at = now
+        self._sampled_in = self.bytes_in
+        self._sampled_out = self.bytes_out
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        age = now - self.connected_at
+        return {
+            'endpoint': self.endpoint,
+            'stream_sid': self.stream_sid,
+            'call_sid': self.call_sid,
+            'age_s': round(age, 1),
+            'messages_in': self.messages_in,
+            'messages_out': self.messages_out,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'rate_in_bps': round(self.rate_in),
+            'rate_out_bps': round(self.rate_out),
+            'avg_rate_in_bps': round(self.bytes_in / age) if age > 0 else 0,
+            'avg_rate_out_bps': round(self.bytes_out / age) if age > 0 else 0,
+            'idle_in_ms': round((now - self.last_in_at) * 1000),
+            'idle_out_ms': round((now - self.last_out_at) * 1000),
+            'heartbeats': self.heartbeats,
+            'recording': self.recorder.path if self.recorder is not None else None
+        }
+
+
+class MediaConnectionManager:
+    """
+    Registr živých WebSocket spojení Media Streamů (/audio, /voice/media-stream, /audio-test).
+
+    Jeden heartbeat timer pro všechna spojení místo ping/keepalive tasku
+    v každém endpointu: jednou za interval spočítá byte rate, spojením
+    se streamem, kterým nic neodešlo celý interval, pošle prázdný media
+    rámec (keepalive přes proxy) a zavře spojení, ze kterých déle než
+    idle_timeout nic nepřišlo (Twilio posílá rámec každých 20 ms, ticho
+    znamená mrtvé spojení). drain() přestane přijímat nová spojení
+    a počká, až živé hovory doběhnou - nasazení tak hovory neuřízne.
+
+    Nahrávání (StreamRecorder) se zapíná pro jednotlivé streamy: parametrem
+    record=1 v URL WebSocketu, předem pro konkrétní CallSid (arm_recording)
+    nebo pro všechny přes MEDIA_RECORD_ALL=1.
+    """
+
+    def __init__(self, heartbeat_interval: float = None, idle_timeout: float = None,
+                 drain_timeout: float = None, record_dir: str = None, record_all: bool = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if heartbeat_interval is None:
+            heartbeat_interval = float(os.getenv('MEDIA_HEARTBEAT_INTERVAL', '10'))
+        if idle_timeout is None:
+            idle_timeout = float(os.getenv('MEDIA_IDLE_TIMEOUT', '60'))
+        if drain_timeout is None:
+            drain_timeout = float(os.getenv('MEDIA_DRAIN_TIMEOUT', '120'))
+        if record_dir is None:
+            record_dir = os.getenv('MEDIA_RECORD_DIR', os.path.join('instance', 'recordings'))
+        if record_all is None:
+            record_all = os.getenv('MEDIA_RECORD_ALL', '0') == '1'
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.drain_timeout = drain_timeout
+        self.record_dir = record_dir
+        self.record_all = record_all
+        self._armed_calls: Set[str] = set()
+        self._clock = clock
+        self._ids = itertools.count(1)
+        self._connections: Dict[int, MediaConnection] = {}
+        self._empty = asyncio.Event()
+        self._empty.set()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.draining = False
+        self.accepted = 0
+        self.rejected = 0
+        self.closed_idle = 0
+        self.closed_drain = 0
+        self.heartbeat_failures = 0
+
+    @property
+    def accepting(self) -> bool:
+        return not self.draining
+
+    def register(self, endpoint: str, receive_text: Callable[[], Awaitable[str]],
+                 send_text: Callable[[str], Awaitable[None]],
+                 close: Callable[..., Awaitable[None]], record: bool = False) -> Optional[MediaConnection]:
+        """Nové spojení (None = server se vypíná, endpoint má spojení odmítnout)"""
+        if self.draining:
+            self.rejected += 1
+            return None
+        connection = MediaConnection(next(self._ids), endpoint, receive_text, send_text, close, self._clock,
+                                     manager=self, record=record)
+        self._connections[connection.connection_id] = connection
+        self._empty.clear()
+        self.accepted += 1
+        self._ensure_heartbeat()
+        return connection
+
+    def unregister(self, connection: Optional[MediaConnection]) -> None:
+        if connection is None:
+            return
+        connection.stop_recording()
+        self._connections.pop(connection.connection_id, None)
+        if not self._connections:
+            self._empty.set()
+
+    def arm_recording(self, call_sid: str) -> None:
+        """Nahrát stream hovoru s tímto CallSid (až přijde jeho start event)"""
+        self._armed_calls.add(call_sid)
+
+    def wants_recording(self, connection: MediaConnection) -> bool:
+        if connection.record_requested or self.record_all:
+            return True
+        if connection.call_sid in self._armed_calls:
+            self._armed_calls.discard(connection.call_sid)
+            return True
+        return False
+
+    async def heartbeat_once(self) -> None:
+        """Jeden tik heartbeatu pro všechna spojení"""
+        now = self._clock()
+        sends = []
+        for connection in list(self._connections.values()):
+            connection.sample(now)
+            if connection.closed:
+                continue
+            if self.idle_timeout and now - connection.last_in_at > self.idle_timeout:
+                self.closed_idle += 1
+                logger.warning(f"💔 {connection.endpoint} {connection.stream_sid}: "
+                               f"{now - connection.last_in_at:.0f} s bez dat, zavírám")
+                sends.append(connection.close(CLOSE_IDLE, "Idle timeout"))
+            elif connection.stream_sid and now - connection.last_out_at >= self.heartbeat_interval:
+                sends.append(self._keepalive(connection))
+        if sends:
+            await asyncio.gather(*sends)
+
+    async def drain(self, timeout: float = None) -> Dict[str, Any]:
+        """Nová spojení odmítá, živá nechá doběhnout; po timeoutu zbylá zavře"""
+        if timeout is None:
+            timeout = self.drain_timeout
+        self.draining = True
+        live = len(self._connections)
+        if live:
+            logger.info(f"🚰 Drain: čekám na {live} živých streamů (max {timeout:.0f} s)")
+            try:
+                await asyncio.wait_for(self._empty.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        remaining = list(self._connections.values())
+        for connection in remaining:
+            self.closed_drain += 1
+            await connection.close(CLOSE_GOING_AWAY, "Server restarting")
+        if remaining:
+            logger.warning(f"⚠️ Drain: {len(remaining)} streamů nedoběhlo do {timeout:.0f} s, zavřeny")
+        return {'finished': live - len(remaining), 'closed': len(remaining)}
+
+    async def close(self) -> None:
+        """Zastaví heartbeat (konec aplikace)"""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+
+    def get(self, stream_sid: str) -> Optional[MediaConnection]:
+        for connection in self._connections.values():
+            if connection.stream_sid == stream_sid:
+                return connection
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        streams = [connection.stats(now) for connection in self._connections.values()]
+        by_endpoint: Dict[str, int] = {}
+        for stream in streams:
+            by_endpoint[stream['endpoint']] = by_endpoint.get(stream['endpoint'], 0) + 1
+        return {
+            'live': len(streams),
+            'by_endpoint': by_endpoint,
+            'draining': self.draining,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'closed_idle': self.closed_idle,
+            'closed_drain': self.closed_drain,
+            'heartbeat_failures': self.heartbeat_failures,
+            'recording': sum(1 for stream in streams if stream['recording']),
+            'armed_calls': sorted(self._armed_calls),
+            'rate_in_bps': sum(stream['rate_in_bps'] for stream in streams),
+            'rate_out_bps': sum(stream['rate_out_bps'] for stream in streams),
+            'streams': streams
+        }
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    async def _keepalive(self, connection: MediaConnection) -> None:
+        message = MediaEventEncoder(connection.stream_sid, track=None).media("")
+        try:
+            await connection.send_text(message)
+            connection.heartbeats += 1
+        except Exception as e:
+            self.heartbeat_failures += 1
+            logger.warning(f"💓 Keepalive na {connection.stream_sid} selhal: {e}")
+
+    def _ensure_heartbeat(self) -> None:
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat_once()
+            except Exception as e:
+                logger.error(f"❌ Heartbeat selhal: {e}")
+
+
+# Globální správce spojení (všechny Twilio WebSocket endpointy)
+connection_manager = MediaConnectionManager()
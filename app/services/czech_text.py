@@ -0,0 +1,106 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List
+
+# Koncovky českých pádů a odvozenin seřazené od nejdelší (lehký stemmer,
+# pracuje nad textem bez diakritiky). Cílem není lingvistická přesnost,
+# ale aby "separátorem", "separátoru" a "separátor" skončily na stejném kmeni.
+_CZECH_SUFFIXES = sorted([
+    'atech', 'etem', 'atum', 'ovych', 'ovym', 'ovymi', 'ovou',
+    'ech', 'ich', 'ych', 'emi', 'ami', 'imi', 'ymi', 'ove', 'ovi', 'ova', 'ovy', 'eho', 'emu', 'iho', 'imu',
+    'em', 'es', 'im', 'om', 'ou', 'ym', 'am', 'ho', 'mu',
+    'a', 'e', 'i', 'o', 'u', 'y'
+], key=len, reverse=True)
+
+# Koncovky podle délky - stemmer porovná jeden řez slova pro každou délku
+# místo procházení celého seznamu
+_SUFFIXES_BY_LENGTH = {}
+for _suffix in _CZECH_SUFFIXES:
+    _SUFFIXES_BY_LENGTH.setdefault(len(_suffix), set()).add(_suffix)
+_SUFFIX_LENGTHS = sorted(_SUFFIXES_BY_LENGTH, reverse=True)
+
+# Minimální délka kmene - kratší slova se nezkracují
+MIN_STEM_LENGTH = 3
+
+# Velikost cache normalizovaných textů (jedna replika se během tahu normalizuje
+# několikrát - signál dokončení, potvrzení, klíčová slova, cache hodnocení)
+NORMALIZE_CACHE_SIZE = 4096
+
+# Rychlá cesta pro českou diakritiku; ostatní znaky řeší NFKD rozklad
+_CZECH_FOLD_TABLE = str.maketrans(
+    'áčďéěíňóřšťúůýžÁČĎÉĚÍŇÓŘŠŤÚŮÝŽ',
+    'acdeeinorstuuyzACDEEINORSTUUYZ'
+)
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+", re.UNICODE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Kandidát na konec věty = interpunkce (případně s uvozovkou/závorkou) následovaná mezerou
+_SENTENCE_PUNCT_RE = re.compile(r'([.!?…]+)["“”»)]*(?=\s)')
+_WORD_BEFORE_RE = re.compile(r'(\w+)$')
+
+# Zkratky, za jejichž tečkou věta pokračuje ("např. skimmer", "tzv. tramp oil")
+CZECH_ABBREVIATIONS = frozenset({
+    'např', 'tzv', 'tj', 'tzn', 'resp', 'popř', 'příp', 'cca', 'mj', 'aj', 'č', 'čís', 'str', 'obr', 'viz'
+})
+
+
+def fold_diacritics(text: str) -> str:
+    """Odstraní diakritiku ("separátorem" -> "separatorem")"""
+    text = text.translate(_CZECH_FOLD_TABLE)
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def normalize_text(text: str) -> str:
+    """Malá písmena, bez diakritiky, bez interpunkce, jednoduché mezery"""
+    if not text:
+        return ""
+    folded = fold_diacritics(text.lower())
+    folded = _NON_WORD_RE.sub(' ', folded)
+    return _WHITESPACE_RE.sub(' ', folded).strip()
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def stem_word(word: str) -> str:
+    """Lehký stemmer pro normalizované české slovo (bez diakritiky)"""
+    for length in _SUFFIX_LENGTHS:
+        if len(word) - length >= MIN_STEM_LENGTH and word[-length:] in _SUFFIXES_BY_LENGTH[length]:
+            return word[:-length]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalizuje text a vrátí seznam kmenů slov"""
+    return [stem_word(word) for word in normalize_text(text).split()]
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_answer(text: str) -> str:
+    """Kanonická podoba odpovědi pro porovnávání / cache (kmeny oddělené mezerou)"""
+    return ' '.join(tokenize(text))
+
+
+def sentence_ends(text: str) -> List[int]:
+    """
+    Pozice konců vět v textu (index za interpunkcí, za kterou následuje mezera).
+
+    Tečka za zkratkou ("např.", "tzv.") větu neukončuje. Tečka za číslicí je
+    řadová číslovka ("ve 3. kroku"), pokud za ní nenásleduje velké písmeno
+    ("Je to číslo 5. Další") - dokud další slovo nepřišlo, konec věty to není.
+    """
+    ends = []
+    for match in _SENTENCE_PUNCT_RE.finditer(text):
+        if match.group(1) == '.':
+            word = _WORD_BEFORE_RE.search(text, 0, match.start())
+            if word and word.group(1).lower() in CZECH_ABBREVIATIONS:
+                continue
+            if word and word.group(1)[-1].isdigit():
+                following = text[match.end():].lstrip()
+                if not following or not following[0].isupper():
+                    continue
+        ends.append(match.end())
+    return ends
@@ -0,0 +1,251 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable
+
+from app.services.czech_text import normalize_answer
+from app.services.voice_metrics import voice_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def question_fingerprint(question: dict) -> str:
+    """Otisk otázky - změní se při úpravě textu, správné odpovědi nebo klíčových slov"""
+    payload = json.dumps({
+        'question': question.get('question', ''),
+        'correct_answer': question.get('correct_answer', ''),
+        'keywords': sorted(kw for kw in (question.get('keywords') or []) if isinstance(kw, str))
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def evaluation_cache_key(lesson_id: Optional[int], question: dict, user_answer: str) -> str:
+    """Obsahový klíč cache: lekce + otisk otázky + normalizovaná odpověď"""
+    raw = f"{lesson_id or 0}|{question_fingerprint(question)}|{normalize_answer(user_answer)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class EvaluationCache:
+    """
+    Cache LLM hodnocení odpovědí vstupního testu.
+
+    Dvě úrovně:
+    - LRU v paměti procesu (okamžitá odpověď pro opakované odpovědi)
+    - persistentní tabulka evaluation_cache (přežije restart, sdílená mezi workery)
+
+    Klíč je obsahový (viz evaluation_cache_key), takže "Separátorem!" a
+    "separátorem" sdílí jeden záznam. Úprava otázek lekce mění otisk otázky;
+    staré záznamy se navíc mažou přes invalidate_lesson.
+
+    Z async kódu se volá lookup/store: paměť se čte přímo, DB dotaz běží
+    ve vlákně (asyncio.to_thread) a zápisy do DB (nové hodnocení, počítadlo
+    zásahů) na pozadí mimo tah hovoru.
+    """
+
+    def __init__(self, max_entries: int = None, persistent: bool = None,
+                 session_factory: Optional[Callable] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('EVALUATION_CACHE_MAX_ENTRIES', '5000'))
+        if persistent is None:
+            persistent = os.getenv('EVALUATION_CACHE_PERSISTENT', 'true').lower() in ('1', 'true', 'yes')
+        self.persistent = persistent
+        self._session_factory = session_factory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._write_tasks = set()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def get(self, lesson_id: Optional[int], question: dict, user_answer: str) -> Optional[Dict[str, Any]]:
+        """Vrátí {'score', 'feedback'} z cache nebo None (synchronně - DB dotaz blokuje volajícího)"""
+        key = evaluation_cache_key(lesson_id, question, user_answer)
+        entry = self._get_memory(key)
+        if entry is not None or not self.persistent:
+            return self._count_lookup(key, entry, memory=entry is not None)
+        entry = self._load_persistent(key)
+        if entry is not None:
+            self._record_hit(key)
+        return self._count_lookup(key, entry, memory=False)
+
+    async def lookup(self, lesson_id: Optional[int], question: dict, user_answer: str) -> Optional[Dict[str, Any]]:
+        """Jako get, ale DB dotaz při miss v paměti běží ve vlákně - event loop neblokuje"""
+        key = evaluation_cache_key(lesson_id, question, user_answer)
+        entry = self._get_memory(key)
+        if entry is not None or not self.persistent:
+            return self._count_lookup(key, entry, memory=entry is not None)
+        entry = await asyncio.to_thread(self._load_persistent, key)
+        if entry is not None:
+            self._in_background(self._record_hit, key)
+        return self._count_lookup(key, entry, memory=False)
+
+    def put(self, lesson_id: Optional[int], question: dict, user_answer: str, score: float, feedback: str) -> None:
+        """Uloží hodnocení do obou úrovní cache (synchronně)"""
+        key = self._put_memory(lesson_id, question, user_answer, score, feedback)
+        if self.persistent:
+            self._save_persistent(key, lesson_id, question, user_answer, score, feedback)
+
+    def store(self, lesson_id: Optional[int], question: dict, user_answer: str, score: float, feedback: str) -> None:
+        """Uloží hodnocení do paměti hned a do DB na pozadí (ve vlákně, mimo tah hovoru)"""
+        key = self._put_memory(lesson_id, question, user_answer, score, feedback)
+        if self.persistent:
+            self._in_background(self._save_persistent, key, lesson_id, question, user_answer, score, feedback)
+
+    async def flush(self) -> None:
+        """Počká na rozpracované zápisy do DB (testy, ukončení aplikace)"""
+        if self._write_tasks:
+            await asyncio.gather(*list(self._write_tasks), return_exceptions=True)
+
+    def invalidate_lesson(self, lesson_id: int) -> int:
+        """Zahodí hodnocení dané lekce (admin upravil otázky). Vrací počet smazaných záznamů v DB."""
+        with self._lock:
+            for key in [k for k, v in self._entries.items() if v.get('lesson_id') == lesson_id]:
+                del self._entries[key]
+
+        if not self.persistent:
+            return 0
+        from app.models import EvaluationCacheEntry
+        session = self._session()
+        try:
+            deleted = session.query(EvaluationCacheEntry).filter(
+                EvaluationCacheEntry.lesson_id == lesson_id
+            ).delete(synchronize_session=False)
+            session.commit()
+            logger.info(f"🧹 Cache hodnocení lekce {lesson_id} zneplatněna ({deleted} záznamů)")
+            return deleted
+        except Exception as e:
+            session.rollback()
+            logger.error(f"❌ Chyba při mazání cache hodnocení lekce {lesson_id}: {e}")
+            return 0
+        finally:
+            session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss čítače pro admin endpoint"""
+        with self._lock:
+            hits = self.memory_hits + self.persistent_hits
+            total = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / total, 3) if total else 0.0,
+                'memory_entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'persistent': self.persistent
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _in_background(self, func: Callable, *args) -> None:
+        task = asyncio.create_task(asyncio.to_thread(func, *args))
+        self._write_tasks.add(task)
+        task.add_done_callback(self._write_tasks.discard)
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _count_lookup(self, key: str, entry: Optional[Dict[str, Any]], memory: bool) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if memory:
+                self.memory_hits += 1
+            else:
+                self.persistent_hits += 1
+                self._store_memory(key, entry)
+        return dict(entry)
+
+    def _put_memory(self, lesson_id: Optional[int], question: dict, user_answer: str,
+                    score: float, feedback: str) -> str:
+        key = evaluation_cache_key(lesson_id, question, user_answer)
+        with self._lock:
+            self._store_memory(key, {'score': score, 'feedback': feedback, 'lesson_id': lesson_id})
+        return key
+
+    def _store_memory(self, key: str, entry: Dict[str, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_persistent(self, key: str) -> Optional[Dict[str, Any]]:
+        # Jen čtení - počítadlo zásahů zvyšuje _record_hit mimo cestu tahu hovoru
+        from app.models import EvaluationCacheEntry
+        session = self._session()
+        try:
+            with voice_metrics.span("evaluation_cache_db"):
+                row = session.query(
+                    EvaluationCacheEntry.score, EvaluationCacheEntry.feedback, EvaluationCacheEntry.lesson_id
+                ).filter(EvaluationCacheEntry.cache_key == key).first()
+            if row is None:
+                return None
+            return {'score': row.score, 'feedback': row.feedback, 'lesson_id': row.lesson_id}
+        except Exception as e:
+            logger.warning(f"⚠️ Cache hodnocení (DB) nedostupná: {e}")
+            return None
+        finally:
+            session.close()
+
+    def _record_hit(self, key: str) -> None:
+        # Počítadlo zásahů jedním UPDATE bez čtení řádku
+        from app.models import EvaluationCacheEntry
+        session = self._session()
+        try:
+            session.query(EvaluationCacheEntry).filter(EvaluationCacheEntry.cache_key == key).update(
+                {EvaluationCacheEntry.hits: EvaluationCacheEntry.hits + 1}, synchronize_session=False
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"⚠️ Počítadlo zásahů cache hodnocení se nepodařilo zvýšit: {e}")
+        finally:
+            session.close()
+
+    def _save_persistent(self, key: str, lesson_id: Optional[int], question: dict,
+                         user_answer: str, score: float, feedback: str) -> None:
+        from app.models import EvaluationCacheEntry
+        session = self._session()
+        try:
+            with voice_metrics.span("evaluation_cache_write"):
+                row = session.query(EvaluationCacheEntry).filter(EvaluationCacheEntry.cache_key == key).first()
+                if row is None:
+                    session.add(EvaluationCacheEntry(
+                        cache_key=key,
+                        lesson_id=lesson_id,
+                        question_text=question.get('question', ''),
+                        normalized_answer=normalize_answer(user_answer),
+                        score=score,
+                        feedback=feedback
+                    ))
+                else:
+                    row.score = score
+                    row.feedback = feedback
+                session.commit()
+        except Exception as e:
+            # Souběžný zápis stejného klíče z jiného workeru nebo chybějící tabulka - cache je jen optimalizace
+            session.rollback()
+            logger.warning(f"⚠️ Uložení do cache hodnocení selhalo: {e}")
+        finally:
+            session.close()
+
+
+# Globální instance cache
+evaluation_cache = EvaluationCache()
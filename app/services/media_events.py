@@ -0,0 +1,102 @@
+import json
+import binascii
+import logging
+from typing import Optional, Tuple, Any
+
+try:
+    import orjson
+except ImportError:  # Volitelné - bez orjson se použije standardní json
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+TRACK_INBOUND = "inbound"
+TRACK_OUTBOUND = "outbound"
+
+# Twilio posílá media eventy vždy ve stejném tvaru:
+# {"event":"media","sequenceNumber":"..","media":{"track":"inbound","chunk":"..","timestamp":"..","payload":".."},"streamSid":".."}
+_MEDIA_PREFIX = '{"event":"media"'
+_MEDIA_PREFIX_LEN = len(_MEDIA_PREFIX)
+_PAYLOAD_KEY = '"payload":"'
+_TRACK_KEY = '"track":"'
+
+# base64 -> bytes bez validace navíc (Twilio posílá korektní base64)
+decode_payload = binascii.a2b_base64
+
+
+def loads(text) -> Any:
+    """json.loads přes orjson, pokud je nainstalovaný"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def dumps(value: Any) -> str:
+    """Kompaktní JSON (orjson, pokud je nainstalovaný)"""
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+def parse_media(text: str) -> Optional[Tuple[str, str]]:
+    """
+    (track, payload) z Twilio "media" eventu, None pro ostatní eventy.
+
+    Zpráva v obvyklém tvaru Twilia se neparsuje celá - payload a track se
+    vyříznou podle klíčů (jeden řez řetězce na rámec, track je konstanta).
+    Jiné pořadí klíčů, mezery nebo escapované znaky v payloadu spadnou
+    na plné parsování JSON, ostatní eventy se jen rozpoznají a vrátí None
+    (volající je parsuje přes loads()).
+    """
+    if text.startswith(_MEDIA_PREFIX):
+        track_at = text.find(_TRACK_KEY, _MEDIA_PREFIX_LEN)
+        start = text.find(_PAYLOAD_KEY, _MEDIA_PREFIX_LEN)
+        if track_at != -1 and start != -1:
+            start += len(_PAYLOAD_KEY)
+            end = text.find('"', start)
+            if end != -1 and text.find('\\', start, end) == -1:
+                track_at += len(_TRACK_KEY)
+                if text.startswith('inbound"', track_at):
+                    track = TRACK_INBOUND
+                elif text.startswith('outbound"', track_at):
+                    track = TRACK_OUTBOUND
+                else:
+                    track = text[track_at:text.find('"', track_at)]
+                return track, text[start:end]
+    elif '"media"' not in text:
+        return None
+
+    message = loads(text)
+    if message.get("event") != "media":
+        return None
+    media = message.get("media") or {}
+    return media.get("track", TRACK_INBOUND), media.get("payload", "")
+
+
+class MediaEventEncoder:
+    """
+    Odchozí zprávy Twilio Media Streamu jednoho streamu.
+
+    Obal media zprávy (prefix se streamSid a suffix) se sestaví jednou
+    při vytvoření, rámec je pak jen spojení tří řetězců - žádný dict ani
+    json.dumps na každých 20 ms audia. track=None vynechá "track" (most
+    do Realtime API ho neposílá).
+    """
+
+    def __init__(self, stream_sid: Optional[str], track: Optional[str] = TRACK_OUTBOUND):
+        sid = json.dumps(stream_sid)
+        self.stream_sid = stream_sid
+        self.prefix = '{"event":"media","streamSid":' + sid + ',"media":{"payload":"'
+        self.suffix = '","track":' + json.dumps(track) + '}}' if track else '"}}'
+        self.clear_message = '{"event":"clear","streamSid":' + sid + '}'
+        self._mark_prefix = '{"event":"mark","streamSid":' + sid + ',"mark":{"name":'
+
+    def media(self, payload: str) -> str:
+        """Media zpráva s base64 payloadem"""
+        return self.prefix + payload + self.suffix
+
+    def mark(self, name: str) -> str:
+        return self._mark_prefix + json.dumps(name) + '}}'
+
+    def clear(self) -> str:
+        return self.clear_message
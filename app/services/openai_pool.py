@@ -0,0 +1,83 @@
+import os
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAIClientPool:
+    """
+    Jeden sdílený AsyncOpenAI klient pro celou aplikaci.
+
+    Klient drží keep-alive HTTP spojení (httpx pool), takže hlasové tahy
+    neplatí TLS handshake při každém webhooku a čekání na LLM neblokuje
+    event loop ostatních hovorů.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.http_client = None
+        self.max_connections = int(os.getenv('OPENAI_POOL_MAX_CONNECTIONS', '100'))
+        self.max_keepalive_connections = int(os.getenv('OPENAI_POOL_MAX_KEEPALIVE', '20'))
+        self.keepalive_expiry = float(os.getenv('OPENAI_POOL_KEEPALIVE_EXPIRY', '30'))
+        self.timeout = float(os.getenv('OPENAI_POOL_TIMEOUT', '20'))
+
+    def start(self):
+        """Vytvoří klienta (volá se při startu aplikace). Opakované volání nic nedělá."""
+        if self.client is not None:
+            return self.client
+
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            logger.warning("OPENAI_API_KEY není nastaven - sdílený OpenAI klient nebude vytvořen")
+            return None
+
+        try:
+            import httpx
+            from openai import AsyncOpenAI
+        except ImportError:
+            logger.error("OpenAI nebo httpx knihovna není nainstalována")
+            return None
+
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            timeout=self.timeout
+        )
+        self.client = AsyncOpenAI(api_key=api_key, http_client=self.http_client)
+        logger.info(
+            f"✅ Sdílený AsyncOpenAI klient vytvořen "
+            f"(max_connections={self.max_connections}, keepalive={self.max_keepalive_connections})"
+        )
+        return self.client
+
+    def get_client(self):
+        """Vrátí sdílený klient; pokud ještě neexistuje, vytvoří ho."""
+        if self.client is None:
+            return self.start()
+        return self.client
+
+    async def close(self):
+        """Uzavře HTTP pool (volá se při vypínání aplikace)."""
+        if self.client is None:
+            return
+        try:
+            await self.client.close()
+            logger.info("Sdílený AsyncOpenAI klient uzavřen")
+        except Exception as e:
+            logger.error(f"Chyba při uzavírání OpenAI klienta: {e}")
+        finally:
+            self.client = None
+            self.http_client = None
+
+
+# Globální instance poolu
+openai_pool = OpenAIClientPool()
+
+
+def get_async_openai_client() -> Optional[object]:
+    """Zkratka pro získání sdíleného AsyncOpenAI klienta."""
+    return openai_pool.get_client()
@@ -2,6 +2,8 @@ import os
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 
+from app.services.audio_framing import InMemoryAudioFile
+
 logger = logging.getLogger(__name__)
 
 class OpenAIService:
@@ -193,32 +195,20 @@ Vrať odpověď ve formátu JSON pole objektů s klíči:
                 except:
                     pass
             
-            # Vytvoříme dočasný soubor pro audio data
-            import tempfile
-            import os
+            # Audio soubor v paměti (bez dočasného souboru na disku)
+            audio_file = InMemoryAudioFile(audio_data, name="audio.wav")
             
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
+            # Volání Whisper API
+            response = self.client.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file,
+                language=language,
+                response_format="text"
+            )
             
-            try:
-                # Volání Whisper API
-                with open(temp_file_path, "rb") as audio_file:
-                    response = self.client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language=language,
-                        response_format="text"
-                    )
-                
-                text = response.strip()
-                logger.info(f"Přepsaný text: {text}")
-                return text
-                
-            finally:
-                # Smazání dočasného souboru
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+            text = response.strip()
+            logger.info(f"Přepsaný text: {text}")
+            return text
                     
         except Exception as e:
             logger.error(f"Chyba při převodu audia na text: {str(e)}")
@@ -1,52 +1,22 @@
 import os
 import json
-import base64
+import time
 import asyncio
-import websockets
 import logging
-from typing import Dict, Any, Optional, Callable
-import threading
-from queue import Queue
-import time
-import traceback
-from flask import current_app
-from flask_socketio import emit
-from app.models import Attempt
+from typing import Optional, Dict, Any, Awaitable, Callable
+
+import websockets
+
+from app.services.voice_metrics import voice_metrics
+from app.services.media_events import MediaEventEncoder, loads, parse_media
 
 logger = logging.getLogger(__name__)
 
-class OpenAIRealtimeService:
-    """Služba pro OpenAI Realtime API s WebSocket podporou."""
-    
-    def __init__(self):
-        self.api_key = os.getenv('OPENAI_API_KEY')
-        self.ws_url = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"  # Správná URL pro OpenAI Realtime API
-        self.openai_ws = None
-        self.twilio_ws = None
-        self.audio_queue = Queue()
-        self.is_connected = False
-        self.session_id = None
-        
-    async def connect_to_openai(self, lesson_context: str = ""):
-        """Připojí se k OpenAI Realtime API."""
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "OpenAI-Beta": "realtime=v1"
-            }
-            
-            logger.info("Připojuji se k OpenAI Realtime API...")
-            self.openai_ws = await websockets.connect(
-                self.ws_url,
-                extra_headers=headers
-            )
-            
-            # Konfigurace session
-            session_config = {
-                "type": "session.update",
-                "session": {
-                    "modalities": ["text", "audio"],
-                    "instructions": f"""Jsi užitečný AI asistent pro výuku jazyků. Komunikuješ v češtině.
+REALTIME_MODEL = os.getenv('OPENAI_REALTIME_MODEL', 'gpt-4o-realtime-preview-2024-10-01')
+# Přepsatelné kvůli lokální náhradě OpenAI (benchmarks/openai_standin.py)
+REALTIME_URL = os.getenv('OPENAI_REALTIME_URL', "wss://api.openai.com/v1/realtime?model=")
+
+DEFAULT_INSTRUCTIONS = """Jsi užitečný AI asistent pro výuku jazyků. Komunikuješ v češtině.
 
 {lesson_context}
 
@@ -58,362 +28,290 @@ Tvoje úkoly:
 - Pokud student odpoví na otázku, vyhodnoť ji a poskytni zpětnou vazbu
 - Můžeš klást otázky k lekci pro ověření porozumění
 
-Vždy zůstávaj v kontextu výuky a buď konstruktivní.""",
-                    "voice": "alloy",
-                    "input_audio_format": "g711_ulaw",
-                    "output_audio_format": "g711_ulaw",
-                    "input_audio_transcription": {
-                        "model": "whisper-1"
-                    },
-                    "turn_detection": {
-                        "type": "server_vad",
-                        "threshold": 0.5,
-                        "prefix_padding_ms": 300,
-                        "silence_duration_ms": 800
-                    },
-                    "tools": [],
-                    "tool_choice": "auto",
-                    "temperature": 0.8,
-                    "max_response_output_tokens": 4096
-                }
-            }
-            
-            await self.openai_ws.send(json.dumps(session_config))
-            self.is_connected = True
-            logger.info("Úspěšně připojeno k OpenAI Realtime API")
-            
+Vždy zůstávaj v kontextu výuky a buď konstruktivní."""
+
+
+def build_session_config(lesson_context: str = "", voice: str = "alloy") -> Dict[str, Any]:
+    """session.update: μ-law 8 kHz dovnitř i ven (Twilio formát), detekce řeči na straně serveru"""
+    return {
+        "type": "session.update",
+        "session": {
+            "modalities": ["text", "audio"],
+            "instructions": DEFAULT_INSTRUCTIONS.format(lesson_context=lesson_context),
+            "voice": voice,
+            "input_audio_format": "g711_ulaw",
+            "output_audio_format": "g711_ulaw",
+            "input_audio_transcription": {
+                "model": "whisper-1"
+            },
+            "turn_detection": {
+                "type": "server_vad",
+                "threshold": 0.5,
+                "prefix_padding_ms": 300,
+                "silence_duration_ms": 800
+            },
+            "tools": [],
+            "tool_choice": "auto",
+            "temperature": 0.8,
+            "max_response_output_tokens": 4096
+        }
+    }
+
+
+def build_instructions_update(lesson_context: str) -> Dict[str, Any]:
+    """session.update jen s instrukcemi - kontext lekce známý až ze "start" eventu Twilia"""
+    return {
+        "type": "session.update",
+        "session": {
+            "instructions": DEFAULT_INSTRUCTIONS.format(lesson_context=lesson_context)
+        }
+    }
+
+
+async def _default_connect(url: str, headers: Dict[str, str]):
+    try:
+        return await websockets.connect(url, additional_headers=headers, max_size=None)
+    except TypeError:
+        # websockets < 14 (legacy API)
+        return await websockets.connect(url, extra_headers=headers, max_size=None)
+
+
+class OpenAIRealtimeService:
+    """
+    Asynchronní připojení k OpenAI Realtime API.
+
+    Audio jde v base64 G.711 μ-law přímo tak, jak ho posílá Twilio
+    (input_audio_buffer.append), odpověď chodí jako response.audio.delta
+    ve stejném formátu - nic se nepřekódovává.
+    """
+
+    def __init__(self, api_key: str = None, url: str = None,
+                 connect: Callable[[str, Dict[str, str]], Awaitable[Any]] = None):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.ws_url = url or REALTIME_URL + REALTIME_MODEL
+        self._connect = connect or _default_connect
+        self.openai_ws = None
+        self.is_connected = False
+        self.session_id = None
+
+    async def connect_to_openai(self, lesson_context: str = "") -> None:
+        """Připojí se k OpenAI Realtime API a nastaví session."""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "OpenAI-Beta": "realtime=v1"
+        }
+        logger.info("Připojuji se k OpenAI Realtime API...")
+        try:
+            self.openai_ws = await self._connect(self.ws_url, headers)
+            await self.send_event(build_session_config(lesson_context))
         except Exception as e:
             logger.error(f"Chyba při připojování k OpenAI: {str(e)}")
             self.is_connected = False
             raise
-    
-    async def handle_openai_messages(self, audio_callback: Callable[[bytes], None]):
-        """Zpracovává zprávy z OpenAI Realtime API."""
-        try:
-            async for message in self.openai_ws:
-                data = json.loads(message)
-                message_type = data.get('type', 'unknown')
-                
-                logger.debug(f"Zpráva z OpenAI: {message_type}")
-                
-                if message_type == 'speech.chunk':
-                    # Audio data z OpenAI
-                    audio_data = data.get('chunk', '')
-                    if audio_data:
-                        # Dekódování base64 audio dat
-                        audio_bytes = base64.b64decode(audio_data)
-                        # Odeslání audio dat zpět do Twilio ve správném formátu
-                        if audio_callback:
-                            # Twilio očekává event: "media" s media.payload
-                            twilio_message = {
-                                "event": "media",
-                                "media": {
-                                    "payload": audio_data  # Použijeme původní base64 data
-                                }
-                            }
-                            audio_callback(json.dumps(twilio_message).encode())
-                            logger.info("Audio chunk odeslán do Twilio")
-                            
-                elif message_type == 'speech.done':
-                    logger.info("OpenAI dokončilo generování řeči")
-                    
-                elif message_type == 'transcription.chunk':
-                    text = data.get('text', '')
-                    if text:
-                        logger.info(f"Transkripce: {text}")
-                        
-                elif message_type == 'transcription.done':
-                    text = data.get('text', '')
-                    logger.info(f"Kompletní transkripce: {text}")
-                    
-                    # Generování odpovědi
-                    try:
-                        response_message = {
-                            "type": "speech.create",
-                            "model": "tts-1",
-                            "voice": "alloy",
-                            "input": {
-                                "text": f"Rozumím, že říkáte: {text}. Moment prosím, zpracovávám odpověď.",
-                                "format": "g711_ulaw",
-                                "sample_rate": 8000,
-                                "channels": 1
-                            }
-                        }
-                        await self.openai_ws.send(json.dumps(response_message))
-                        logger.info("Odpověď odeslána k syntéze")
-                    except Exception as e:
-                        logger.error(f"Chyba při generování odpovědi: {e}")
-                    
-                elif message_type == 'error':
-                    error_info = data.get('error', {})
-                    logger.error(f"Chyba z OpenAI: {error_info}")
-                    
-        except Exception as e:
-            logger.error(f"Chyba při zpracování zpráv z OpenAI: {str(e)}")
-    
-    async def send_audio_to_openai(self, audio_data: bytes):
-        """Odešle audio data do OpenAI."""
-        try:
-            if not self.is_connected or not self.openai_ws:
-                logger.warning("Není připojeno k OpenAI - audio data nebudou odeslána")
-                return
-                
-            # Kódování audio dat do base64
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            
-            # Vytvoření zprávy pro OpenAI ve správném formátu
-            audio_message = {
-                "type": "speech.create",
-                "model": "tts-1",
-                "voice": "alloy",
-                "input": {
-                    "audio": audio_base64,
-                    "format": "g711_ulaw",
-                    "sample_rate": 8000,
-                    "channels": 1
-                }
-            }
-            
-            await self.openai_ws.send(json.dumps(audio_message))
-            logger.debug("Audio data odeslána do OpenAI")
-            
-        except Exception as e:
-            logger.error(f"Chyba při odesílání audio dat do OpenAI: {str(e)}")
-    
-    async def commit_audio_buffer(self):
-        """Potvrdí audio buffer v OpenAI (ukončí vstup uživatele)."""
-        try:
-            if not self.is_connected or not self.openai_ws:
-                return
-                
-            commit_message = {
-                "type": "speech.done"
-            }
-            
-            await self.openai_ws.send(json.dumps(commit_message))
-            logger.debug("Audio buffer potvrzen v OpenAI")
-            
-        except Exception as e:
-            logger.error(f"Chyba při potvrzování audio bufferu: {str(e)}")
-    
-    async def create_response(self):
-        """Požádá OpenAI o vytvoření odpovědi."""
-        try:
-            if not self.is_connected or not self.openai_ws:
-                return
-                
-            response_message = {
-                "type": "response.create",
-                "response": {
-                    "modalities": ["text", "audio"],
-                    "instructions": "Odpověz na to, co uživatel řekl. Buď užitečný a přátelský."
-                }
-            }
-            
-            await self.openai_ws.send(json.dumps(response_message))
-            logger.debug("Požádáno o vytvoření odpovědi z OpenAI")
-            
-        except Exception as e:
-            logger.error(f"Chyba při žádosti o odpověď: {str(e)}")
-    
-    async def disconnect(self):
+        self.is_connected = True
+        logger.info("Úspěšně připojeno k OpenAI Realtime API")
+
+    async def send_event(self, event: Dict[str, Any]) -> None:
+        await self.openai_ws.send(json.dumps(event))
+
+    async def send_audio_to_openai(self, payload: str) -> None:
+        """Přidá μ-law audio (base64, jak přišlo od Twilia) do vstupního bufferu."""
+        await self.openai_ws.send('{"type":"input_audio_buffer.append","audio":"' + payload + '"}')
+
+    async def commit_audio_buffer(self) -> None:
+        """Ukončí vstup uživatele (jen bez server VAD)."""
+        await self.send_event({"type": "input_audio_buffer.commit"})
+
+    async def create_response(self) -> None:
+        await self.send_event({"type": "response.create"})
+
+    async def cancel_response(self) -> None:
+        await self.send_event({"type": "response.cancel"})
+
+    async def events(self):
+        """Události z Realtime API (rozparsovaný JSON)"""
+        async for message in self.openai_ws:
+            yield loads(message)
+
+    async def disconnect(self) -> None:
         """Odpojí se od OpenAI."""
+        if self.openai_ws is None:
+            return
         try:
-            if self.openai_ws:
-                await self.openai_ws.close()
-                self.is_connected = False
-                logger.info("Odpojeno od OpenAI Realtime API")
+            await self.openai_ws.close()
+            logger.info("Odpojeno od OpenAI Realtime API")
         except Exception as e:
             logger.error(f"Chyba při odpojování od OpenAI: {str(e)}")
+        finally:
+            self.is_connected = False
+
+
+class RealtimeMediaBridge:
+    """
+    Full-duplex most Twilio Media Stream <-> OpenAI Realtime API.
+
+    Čtyři korutiny a dvě fronty, žádná vlákna: čtení z Twilia plní
+    vstupní frontu, ze které se audio posílá do OpenAI, a čtení z OpenAI
+    plní výstupní frontu, ze které se posílají "media" zprávy Twiliu.
+    Vstupní fronta je omezená - když OpenAI nestíhá, zahazují se nejstarší
+    rámce (staré audio už nemá cenu posílat). Výstupní fronta při zaplnění
+    zpomalí čtení z OpenAI. Když server VAD zachytí řeč uživatele během
+    odpovědi, most zahodí nepřehrané audio, pošle Twiliu "clear" a zruší
+    odpověď (barge-in).
 
-class TwilioMediaStreamHandler:
-    """Handler pro Twilio Media Stream WebSocket."""
-    
-    def __init__(self, openai_service: OpenAIRealtimeService):
-        self.openai_service = openai_service
-        self.stream_sid = None
-        self.call_sid = None
-        
-    async def handle_twilio_message(self, message: str):
-        """Zpracuje zprávu z Twilio Media Stream."""
+    Twilio <Stream> nepřenáší query string URL - parametry hovoru (attempt_id)
+    chodí v start.customParameters. Když je zadán lesson_context, most ho
+    po "start" zavolá s těmito parametry a instrukce session doplní o kontext
+    lekce dřív, než do OpenAI pošle první audio.
+    """
+
+    def __init__(self, receive_text: Callable[[], Awaitable[str]], send_text: Callable[[str], Awaitable[None]],
+                 openai_service: OpenAIRealtimeService, inbound_max_frames: int = 250,
+                 outbound_max_chunks: int = 500,
+                 on_start: Optional[Callable[[Optional[str], Optional[str]], None]] = None,
+                 lesson_context: Optional[Callable[[Dict[str, Any]], Awaitable[str]]] = None):
+        self._receive_text = receive_text
+        self._send_text = send_text
+        self.openai = openai_service
+        self._on_start = on_start
+        self._lesson_context = lesson_context
+        self.inbound: asyncio.Queue = asyncio.Queue(maxsize=inbound_max_frames)
+        self.outbound: asyncio.Queue = asyncio.Queue(maxsize=outbound_max_chunks)
+        self.stream_sid: Optional[str] = None
+        self.call_sid: Optional[str] = None
+        self.custom_parameters: Dict[str, Any] = {}
+        self.started = asyncio.Event()
+        self._response_id: Optional[str] = None
+        self._cancelled_response_id: Optional[str] = None
+        self._speech_stopped_at: Optional[float] = None
+        self.frames_in = 0
+        self.frames_dropped = 0
+        self.chunks_out = 0
+        self.bytes_out = 0
+        self.barge_ins = 0
+
+    async def run(self) -> None:
+        """Běží, dokud jedna strana neskončí (Twilio stop/odpojení, OpenAI close)"""
+        tasks = [
+            asyncio.create_task(self._twilio_reader(), name="twilio_reader"),
+            asyncio.create_task(self._openai_writer(), name="openai_writer"),
+            asyncio.create_task(self._openai_reader(), name="openai_reader"),
+            asyncio.create_task(self._twilio_writer(), name="twilio_writer"),
+        ]
         try:
-            data = json.loads(message)
-            event_type = data.get('event', 'unknown')
-            
-            logger.debug(f"Zpráva z Twilio: {event_type}")
-            
-            if event_type == 'connected':
-                logger.info("Twilio Media Stream připojen")
-                
-            elif event_type == 'start':
-                self.stream_sid = data.get('streamSid')
-                self.call_sid = data.get('start', {}).get('callSid')
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error(f"❌ Realtime most: {task.get_name()} selhal: {task.exception()}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.openai.disconnect()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'stream_sid': self.stream_sid,
+            'frames_in': self.frames_in,
+            'frames_dropped': self.frames_dropped,
+            'inbound_queue': self.inbound.qsize(),
+            'outbound_queue': self.outbound.qsize(),
+            'chunks_out': self.chunks_out,
+            'bytes_out': self.bytes_out,
+            'barge_ins': self.barge_ins
+        }
+
+    async def _twilio_reader(self) -> None:
+        while True:
+            text = await self._receive_text()
+            media = parse_media(text)
+            if media is not None:
+                if self.inbound.full():
+                    self.inbound.get_nowait()
+                    self.frames_dropped += 1
+                self.inbound.put_nowait(media[1])
+                self.frames_in += 1
+                continue
+            msg = loads(text)
+            event = msg.get("event")
+            if event == "start":
+                start = msg.get("start", {})
+                self.stream_sid = msg.get("streamSid") or start.get("streamSid")
+                self.call_sid = start.get("callSid")
+                self.custom_parameters = start.get("customParameters") or {}
+                if self._on_start is not None:
+                    self._on_start(self.stream_sid, self.call_sid)
+                self.started.set()
                 logger.info(f"Media Stream začal: {self.stream_sid}")
-                
-            elif event_type == 'media':
-                # Audio data z Twilio
-                payload = data.get('media', {}).get('payload', '')
-                if payload:
-                    # Dekódování audio dat z base64
-                    audio_data = base64.b64decode(payload)
-                    # Odeslání do OpenAI
-                    await self.openai_service.send_audio_to_openai(audio_data)
-                    
-            elif event_type == 'stop':
+                if self._lesson_context is not None:
+                    await self._update_instructions()
+            elif event == "stop":
                 logger.info("Media Stream ukončen")
-                await self.openai_service.disconnect()
-                
-            else:
-                logger.debug(f"Neznámý event z Twilio: {event_type}")
-                
-        except Exception as e:
-            logger.error(f"Chyba při zpracování zprávy z Twilio: {str(e)}")
-    
-    def send_audio_to_twilio(self, audio_data: bytes, websocket):
-        """Odešle audio data zpět do Twilio."""
-        try:
-            # Kódování audio dat do base64
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            
-            # Vytvoření zprávy pro Twilio
-            media_message = {
-                "event": "media",
-                "streamSid": self.stream_sid,
-                "media": {
-                    "payload": audio_base64
-                }
-            }
-            
-            # Odeslání přes WebSocket
-            asyncio.create_task(websocket.send(json.dumps(media_message)))
-            logger.debug("Audio data odeslána do Twilio")
-            
-        except Exception as e:
-            logger.error(f"Chyba při odesílání audio dat do Twilio: {str(e)}")
-
-def handle_media_stream_websocket(request, attempt_id: str = None):
-    import websocket
-    import threading
-    import sys
-    from queue import Queue
-        logger.info(f"=== ZAČÁTEK MEDIA STREAM WEBSOCKET ===")
-    logger.info(f"Request headers: {dict(request.headers)}")
-    logger.info(f"Request method: {request.method}")
-    logger.info(f"Request path: {request.path}")
-    logger.info(f"Request args: {request.args}")
-        logger.info(f"Attempt ID: {attempt_id}")
-    try:
-        # Získání kontextu lekce
-        lesson_context = ""
-        if attempt_id:
-            try:
-                attempt = Attempt.query.get(attempt_id)
-                if attempt and attempt.lesson:
-                    lesson = attempt.lesson
-                    lesson_context = f"""
-Aktuální lekce: {lesson.title}
-Obsah lekce: {lesson.script}
-
-Instrukce pro AI asistenta:
-- Pomáhej studentovi s touto konkrétní lekcí
-- Odpovídej na otázky týkající se obsahu lekce
-- Můžeš klást otázky pro ověření porozumění
-- Poskytuj zpětnou vazbu na odpovědi studenta
-- Buď trpělivý a povzbuzující
-"""
-                    logger.info(f"Načten kontext lekce: {lesson.title}")
-                else:
-                    logger.warning(f"Attempt nebo lesson nenalezen pro attempt_id: {attempt_id}")
-            except Exception as e:
-                logger.error(f"Chyba při načítání lekce: {str(e)}")
-        else:
-            logger.warning("Chybí attempt_id v requestu")
-        # Kontrola OpenAI API klíče
-        openai_api_key = os.getenv('OPENAI_API_KEY')
-        if not openai_api_key:
-            logger.error("OPENAI_API_KEY není nastavena")
-            return "Missing OpenAI API Key", 500
-        logger.info("OPENAI_API_KEY je nastavena")
-        # WebSocket URL a headers pro OpenAI
-        openai_ws_url = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"
-        headers = [
-            f"Authorization: Bearer {openai_api_key}",
-            "OpenAI-Beta: realtime=v1"
-        ]
-        logger.info(f"Připravuji WebSocket připojení k OpenAI: {openai_ws_url}")
-        # Globální proměnné pro WebSocket
-        openai_ws = None
-        twilio_ws_queue = Queue()
-        def on_openai_message(ws, message):
-            logger.info(f"[OpenAI WS] Zpráva přijata: {message[:200]}")
-            try:
-                data = json.loads(message)
-                message_type = data.get('type', 'unknown')
-                logger.info(f"[OpenAI WS] Typ zprávy: {message_type}")
-                if message_type == 'session.created':
-                    session_id = data.get('session', {}).get('id')
-                    logger.info(f"OpenAI session vytvořena: {session_id}")
-                elif message_type == 'response.audio.delta':
-                    audio_data = data.get('delta', '')
-                    if audio_data:
-                        twilio_message = {
-                            "event": "media",
-                            "streamSid": "stream_sid_placeholder",
-                            "media": {"payload": audio_data}
-                        }
-                        twilio_ws_queue.put(json.dumps(twilio_message))
-                        logger.info("Audio delta přeposlána do Twilio fronty")
-                elif message_type == 'error':
-                    error_info = data.get('error', {})
-                    logger.error(f"Chyba z OpenAI: {error_info}")
-            except Exception as e:
-                logger.error(f"Chyba při zpracování zprávy z OpenAI: {str(e)}")
-        def on_openai_error(ws, error):
-            logger.error(f"WebSocket chyba s OpenAI: {error}")
-        def on_openai_close(ws, close_status_code, close_msg):
-            logger.info(f"WebSocket připojení k OpenAI bylo ukončeno: {close_status_code} {close_msg}")
-        def on_openai_open(ws):
-            logger.info("WebSocket připojení k OpenAI bylo navázáno")
-            ws.send(json.dumps({
-                "type": "session.update",
-                "session": {
-                    "modalities": ["text", "audio"],
-                    "instructions": lesson_context,
-                    "voice": "alloy",
-                    "input_audio_format": "g711_ulaw",
-                    "output_audio_format": "g711_ulaw",
-                    "input_audio_transcription": {"model": "whisper-1"},
-                    "turn_detection": {"type": "server_vad", "threshold": 0.5, "prefix_padding_ms": 300, "silence_duration_ms": 800},
-                    "tools": [],
-                    "tool_choice": "auto",
-                    "temperature": 0.8,
-                    "max_response_output_tokens": 4096
-                }
-            }))
+                return
+
+    async def _update_instructions(self) -> None:
+        """Kontext lekce podle customParameters ze "start" eventu (bez něj zůstanou výchozí instrukce)"""
         try:
-            openai_ws = websocket.WebSocketApp(
-                openai_ws_url,
-                header=headers,
-                on_open=on_openai_open,
-                on_message=on_openai_message,
-                on_error=on_openai_error,
-                on_close=on_openai_close
-            )
-            def run_openai_ws():
-                logger.info("Spouštím OpenAI WebSocket thread...")
-                openai_ws.run_forever()
-            openai_thread = threading.Thread(target=run_openai_ws)
-            openai_thread.daemon = True
-            openai_thread.start()
-            logger.info("OpenAI WebSocket byl spuštěn ve vlákně")
+            context = await self._lesson_context(self.custom_parameters)
         except Exception as e:
-            logger.error(f"Chyba při vytváření OpenAI WebSocket: {str(e)}")
-            return "Error creating OpenAI WebSocket", 500
-        logger.info("handle_media_stream_websocket byl úspěšně inicializován až po spuštění OpenAI WS threadu")
-        # Poznámka: Zde by měl být kód pro navázání Twilio WebSocketu, který zde chybí (proto není žádný log z Twilia)
-        logger.warning("POZOR: V této implementaci není navázán WebSocket server pro Twilio Media Stream!")
-        return f"Media Stream WebSocket nastaven pro attempt_id: {attempt_id} (ale Twilio WS není implementován)", 200
-    except Exception as e:
-        logger.error(f"Chyba při nastavení Media Stream WebSocket: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        return "Error setting up Media Stream WebSocket", 500 
\ No newline at end of file
+            logger.error(f"❌ Kontext lekce pro Realtime session se nepodařilo načíst: {e}")
+            return
+        if context:
+            await self.openai.send_event(build_instructions_update(context))
+            logger.info(f"📚 Instrukce Realtime session doplněny o kontext lekce ({self.stream_sid})")
+
+    async def _openai_writer(self) -> None:
+        while True:
+            payload = await self.inbound.get()
+            await self.openai.send_audio_to_openai(payload)
+
+    async def _openai_reader(self) -> None:
+        async for data in self.openai.events():
+            message_type = data.get("type")
+            if message_type == "response.audio.delta":
+                if data.get("response_id") == self._cancelled_response_id:
+                    continue  # Zbytek zrušené odpovědi, který už byl na cestě
+                if self._speech_stopped_at is not None:
+                    voice_metrics.observe(
+                        "realtime_first_audio", (time.perf_counter() - self._speech_stopped_at) * 1000
+                    )
+                    self._speech_stopped_at = None
+                await self.outbound.put(data["delta"])
+            elif message_type == "response.created":
+                self._response_id = data.get("response", {}).get("id") or ""
+            elif message_type == "response.done":
+                self._response_id = None
+            elif message_type == "input_audio_buffer.speech_started":
+                await self._barge_in()
+            elif message_type == "input_audio_buffer.speech_stopped":
+                self._speech_stopped_at = time.perf_counter()
+            elif message_type == "session.created":
+                self.openai.session_id = data.get("session", {}).get("id")
+                logger.info(f"OpenAI session vytvořena: {self.openai.session_id}")
+            elif message_type == "conversation.item.input_audio_transcription.completed":
+                logger.info(f"Přepis uživatele: {data.get('transcript', '')}")
+            elif message_type == "error":
+                logger.error(f"Chyba z OpenAI: {data.get('error', {})}")
+
+    async def _twilio_writer(self) -> None:
+        await self.started.wait()
+        encoder = MediaEventEncoder(self.stream_sid, track=None)
+        while True:
+            payload = await self.outbound.get()
+            await self._send_text(encoder.media(payload))
+            self.chunks_out += 1
+            self.bytes_out += len(payload) * 3 // 4 - (payload[-2:].count('=') if payload else 0)
+
+    async def _barge_in(self) -> None:
+        dropped = 0
+        while not self.outbound.empty():
+            self.outbound.get_nowait()
+            dropped += 1
+        if self.stream_sid:
+            await self._send_text(MediaEventEncoder(self.stream_sid).clear())
+        if self._response_id is not None:
+            await self.openai.cancel_response()
+            self._cancelled_response_id = self._response_id
+            self._response_id = None
+            self.barge_ins += 1
+            logger.info(f"✋ Barge-in: odpověď zrušena ({dropped} nepřehraných chunků)")
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import struct
+import binascii
+import logging
+from typing import Optional, Dict, Any, Callable, Iterator, List, Tuple
+
+from app.services.media_events import TRACK_INBOUND, decode_payload, parse_media
+
+logger = logging.getLogger(__name__)
+
+# Formát souboru:
+#   MAGIC, <I délka metadat> + metadata (JSON, UTF-8)
+#   záznamy: <B druh|směr> <Q čas od začátku v µs> <I délka dat> + data
+# Media rámce se ukládají jako surové μ-law bajty (160 B na 20 ms místo
+# ~300 B base64 JSON), ostatní zprávy (start, mark, stop, clear...) jako text.
+MAGIC = b"TWREC1\n"
+_LENGTH = struct.Struct('<I')
+_RECORD = struct.Struct('<BQI')
+
+DIRECTION_IN = 0x00   # Twilio -> server
+DIRECTION_OUT = 0x80  # server -> Twilio
+KIND_MEDIA = 0x01
+KIND_TEXT = 0x02
+
+RECORDING_SUFFIX = ".twrec"
+
+
+class RecordedMessage:
+    __slots__ = ('offset', 'direction', 'kind', 'data')
+
+    def __init__(self, offset: float, direction: int, kind: int, data: bytes):
+        self.offset = offset  # sekundy od začátku nahrávky
+        self.direction = direction
+        self.kind = kind
+        self.data = data
+
+    @property
+    def inbound(self) -> bool:
+        return self.direction == DIRECTION_IN
+
+    @property
+    def is_media(self) -> bool:
+        return self.kind == KIND_MEDIA
+
+    def text(self) -> str:
+        return self.data.decode('utf-8')
+
+    def __repr__(self) -> str:
+        direction = "in" if self.inbound else "out"
+        kind = "media" if self.is_media else "text"
+        return f"RecordedMessage({self.offset:.3f}s {direction} {kind} {len(self.data)}B)"
+
+
+class StreamRecorder:
+    """
+    Nahrávka WebSocket zpráv jednoho Media Streamu do kompaktního souboru.
+
+    Zapisuje obě strany komunikace s časem od začátku nahrávky, media
+    rámce v surových μ-law bajtech. Soubor jde přehrát proti lokální
+    aplikaci (benchmarks/replay_media_stream.py) - problém s audio cestou
+    se tak dá zopakovat bez živého hovoru. Zápis jde přes buffer souboru,
+    na disk se dostane po zaplnění bufferu a při close().
+    """
+
+    def __init__(self, path: str, metadata: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.metadata = dict(metadata or {})
+        self.metadata.setdefault('recorded_at', time.strftime('%Y-%m-%dT%H:%M:%S'))
+        self._clock = clock
+        self._started = clock()
+        header = json.dumps(self.metadata, ensure_ascii=False).encode('utf-8')
+        self._file = open(path, 'wb', buffering=64 * 1024)
+        self._file.write(MAGIC + _LENGTH.pack(len(header)) + header)
+        self.messages = 0
+        self.media_frames = 0
+        self.bytes_written = len(MAGIC) + _LENGTH.size + len(header)
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def record_inbound(self, text: str) -> None:
+        self._record(DIRECTION_IN, text)
+
+    def record_outbound(self, text: str) -> None:
+        self._record(DIRECTION_OUT, text)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'messages': self.messages,
+            'media_frames': self.media_frames,
+            'bytes': self.bytes_written,
+            'seconds': round(self._clock() - self._started, 1)
+        }
+
+    def _record(self, direction: int, text: str) -> None:
+        if self._file.closed:
+            return
+        kind = KIND_TEXT
+        data = None
+        media = parse_media(text)
+        # Příchozí rámce s inbound trackem a odchozí media se dají přesně složit zpět
+        if media is not None and (direction == DIRECTION_OUT or media[0] == TRACK_INBOUND):
+            try:
+                data = decode_payload(media[1])
+                kind = KIND_MEDIA
+            except (binascii.Error, ValueError):
+                data = None
+        if data is None:
+            data = text.encode('utf-8')
+        offset_us = int((self._clock() - self._started) * 1_000_000)
+        self._file.write(_RECORD.pack(kind | direction, offset_us, len(data)))
+        self._file.write(data)
+        self.messages += 1
+        if kind == KIND_MEDIA:
+            self.media_frames += 1
+        self.bytes_written += _RECORD.size + len(data)
+
+
+def read_recording(path: str) -> Tuple[Dict[str, Any], List[RecordedMessage]]:
+    """Metadata a zprávy nahrávky (celý soubor do paměti - nahrávka hovoru má jednotky MB)"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    return parse_recording(content)
+
+
+def parse_recording(content: bytes) -> Tuple[Dict[str, Any], List[RecordedMessage]]:
+    if not content.startswith(MAGIC):
+        raise ValueError("Není to nahrávka Media Streamu (chybí hlavička)")
+    position = len(MAGIC)
+    (header_length,) = _LENGTH.unpack_from(content, position)
+    position += _LENGTH.size
+    metadata = json.loads(content[position:position + header_length].decode('utf-8'))
+    position += header_length
+    return metadata, list(_iter_records(content, position))
+
+
+def _iter_records(content: bytes, position: int) -> Iterator[RecordedMessage]:
+    view = memoryview(content)
+    end = len(content)
+    while position + _RECORD.size <= end:
+        flags, offset_us, length = _RECORD.unpack_from(content, position)
+        position += _RECORD.size
+        if position + length > end:
+            logger.warning("⚠️ Nahrávka je useknutá (poslední záznam neúplný)")
+            return
+        yield RecordedMessage(offset_us / 1_000_000, flags & DIRECTION_OUT, flags & 0x7f,
+                              bytes(view[position:position + length]))
+        position += length
+
+
+def recording_path(directory: str, stream_sid: Optional[str], connection_id: int) -> str:
+    """Cesta k nové nahrávce streamu (adresář se případně vytvoří)"""
+    os.makedirs(directory, exist_ok=True)
+    name = stream_sid or f"connection-{connection_id}"
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}{RECORDING_SUFFIX}")
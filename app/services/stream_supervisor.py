@@ -0,0 +1,219 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Optional, Dict, Any, Awaitable, Callable, Deque, List, Set
+
+logger = logging.getLogger(__name__)
+
+# Co dělat s novým úsekem, když je fronta plná
+OVERFLOW_MERGE = "merge"              # spojit s posledním čekajícím úsekem
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # zahodit nejstarší čekající úsek
+OVERFLOW_DROP_NEWEST = "drop_newest"  # zahodit nový úsek
+OVERFLOW_POLICIES = (OVERFLOW_MERGE, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST)
+
+
+class _Item:
+    __slots__ = ('payload', 'queued_at')
+
+    def __init__(self, payload: Any, queued_at: float):
+        self.payload = payload
+        self.queued_at = queued_at
+
+
+class StreamSupervisor:
+    """
+    Omezené zpracování úseků audia jednoho Media Streamu.
+
+    Úseky (promluvy) čekají v omezené frontě a zpracovává je nejvýš
+    max_in_flight workerů, takže ani dlouhá souvislá řeč nespustí desítky
+    souběžných volání Whisperu a Assistanta. Plná fronta se řeší podle
+    overflow (spojení úseků, zahození nejstaršího nebo nového), úsek čekající
+    déle než max_age_seconds se zahodí jako neaktuální. Chyby handleru se
+    logují a počítají, close() zruší rozpracované úseky a počká na workery.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[Any]], name: str = "",
+                 max_in_flight: int = None, max_queue: int = None, overflow: str = None,
+                 merge: Optional[Callable[[Any, Any], Any]] = None, max_age_seconds: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_in_flight is None:
+            max_in_flight = int(os.getenv('STREAM_MAX_IN_FLIGHT', '1'))
+        if max_queue is None:
+            max_queue = int(os.getenv('STREAM_MAX_QUEUE', '3'))
+        if overflow is None:
+            overflow = os.getenv('STREAM_OVERFLOW_POLICY', OVERFLOW_MERGE)
+        if max_age_seconds is None:
+            max_age_seconds = float(os.getenv('STREAM_SEGMENT_MAX_AGE', '30'))
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Neznámá overflow politika: {overflow}")
+        if overflow == OVERFLOW_MERGE and merge is None:
+            overflow = OVERFLOW_DROP_OLDEST
+        self.handler = handler
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(1, max_queue)
+        self.overflow = overflow
+        self.merge = merge
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._queue: Deque[_Item] = deque()
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self._running: Set[asyncio.Task] = set()
+        self._closed = False
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.merged = 0
+        self.dropped = 0
+        self.stale = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def submit(self, payload: Any) -> bool:
+        """Zařadí úsek ke zpracování (False = zahozen nebo je supervisor uzavřený)"""
+        if self._closed:
+            return False
+        self.submitted += 1
+        now = self._clock()
+        if len(self._queue) >= self.max_queue:
+            if self.overflow == OVERFLOW_MERGE:
+                newest = self._queue[-1]
+                newest.payload = self.merge(newest.payload, payload)
+                self.merged += 1
+                logger.info(f"🧩 {self.name}: plná fronta, úsek spojen s předchozím")
+                return True
+            if self.overflow == OVERFLOW_DROP_NEWEST:
+                self.dropped += 1
+                logger.warning(f"⚠️ {self.name}: plná fronta, nový úsek zahozen")
+                return False
+            self._queue.popleft()
+            self.dropped += 1
+            logger.warning(f"⚠️ {self.name}: plná fronta, nejstarší úsek zahozen")
+        self._queue.append(_Item(payload, now))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        self._ensure_workers()
+        self._wakeup.set()
+        return True
+
+    def cancel_in_flight(self) -> int:
+        """Zruší právě zpracovávané úseky (fronta zůstává)"""
+        cancelled = 0
+        for task in list(self._running):
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+        return cancelled
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Konec streamu: zahodí frontu, zruší rozpracované úseky a počká na workery"""
+        self._closed = True
+        if self._queue:
+            logger.info(f"🛑 {self.name}: zahazuji {len(self._queue)} nezpracovaných úseků")
+            self.dropped += len(self._queue)
+            self._queue.clear()
+        self.cancel_in_flight()
+        for worker in self._workers:
+            worker.cancel()
+        if self._workers:
+            done, pending = await asyncio.wait(self._workers, timeout=timeout)
+            if pending:
+                logger.warning(f"⚠️ {self.name}: {len(pending)} workerů neskončilo do {timeout} s")
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        oldest = self._queue[0].queued_at if self._queue else None
+        return {
+            'queue_depth': len(self._queue),
+            'max_queue_depth': self.max_queue_depth,
+            'oldest_queued_ms': round((self._clock() - oldest) * 1000) if oldest is not None else None,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'merged': self.merged,
+            'dropped': self.dropped,
+            'stale': self.stale,
+            'last_error': self.last_error
+        }
+
+    def _ensure_workers(self) -> None:
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_in_flight:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        while not self._closed:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            item = self._queue.popleft()
+            if self._clock() - item.queued_at > self.max_age_seconds:
+                self.stale += 1
+                logger.info(f"⌛ {self.name}: úsek čekal příliš dlouho, zahazuji")
+                continue
+            task = asyncio.create_task(self.handler(item.payload))
+            self._running.add(task)
+            self.in_flight += 1
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                # Worker sám byl zrušen (close) - úsek zrušíme s ním
+                task.cancel()
+                raise
+            finally:
+                self.in_flight -= 1
+                self._running.discard(task)
+            if task.cancelled():
+                self.cancelled += 1
+            elif task.exception() is not None:
+                self.failed += 1
+                self.last_error = repr(task.exception())
+                logger.error(f"❌ {self.name}: zpracování úseku selhalo: {task.exception()}")
+            else:
+                self.completed += 1
+
+
+class StreamSupervisorRegistry:
+    """Supervisory živých streamů (pro metriky hloubky front)"""
+
+    def __init__(self):
+        self._supervisors: Dict[str, StreamSupervisor] = {}
+
+    def register(self, stream_sid: str, supervisor: StreamSupervisor) -> None:
+        self._supervisors[stream_sid] = supervisor
+
+    def get(self, stream_sid: str) -> Optional[StreamSupervisor]:
+        return self._supervisors.get(stream_sid)
+
+    async def close(self, stream_sid: str) -> None:
+        supervisor = self._supervisors.pop(stream_sid, None)
+        if supervisor is not None:
+            await supervisor.close()
+
+    def stats(self) -> Dict[str, Any]:
+        streams = {stream_sid: supervisor.stats() for stream_sid, supervisor in self._supervisors.items()}
+        return {
+            'streams': len(streams),
+            'queued_total': sum(s['queue_depth'] for s in streams.values()),
+            'in_flight_total': sum(s['in_flight'] for s in streams.values()),
+            'per_stream': streams
+        }
+
+    def __len__(self) -> int:
+        return len(self._supervisors)
+
+
+# Globální registr (supervisory /audio streamů)
+stream_supervisors = StreamSupervisorRegistry()
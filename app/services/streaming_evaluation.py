@@ -0,0 +1,186 @@
+import re
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Callable
+
+from app.services.czech_text import sentence_ends
+from app.services.voice_metrics import voice_metrics
+
+logger = logging.getLogger(__name__)
+
+SCORE_TAG_RE = re.compile(r'\[SKÓRE:\s*(\d+)\s*%?\]', re.IGNORECASE)
+
+# Reference na běžící dočítání streamů (jinak by je garbage collector mohl zrušit)
+_drain_tasks = set()
+
+
+class StreamingScoreParser:
+    """
+    Inkrementální parser odpovědi LLM ve formátu vstupního testu.
+
+    Podporuje oba formáty:
+    - score-first: "[SKÓRE: 80%] Chybí: skimmer." - skóre je známé po několika
+      tokenech a odpověď je připravená, jakmile skončí první věta feedbacku
+    - feedback-first (původní): "Chybí: skimmer. [SKÓRE: 80%]" - připravená
+      až s tagem skóre na konci
+    """
+
+    def __init__(self, score_first: bool = True):
+        self.score_first = score_first
+        self.raw = ""
+        self.score: Optional[int] = None
+        self.completed = False
+
+    def feed(self, delta: str) -> None:
+        """Přidá další kus textu ze streamu"""
+        if not delta:
+            return
+        self.raw += delta
+        if self.score is None:
+            match = SCORE_TAG_RE.search(self.raw)
+            if match:
+                self.score = int(match.group(1))
+
+    def finish(self) -> None:
+        """Stream skončil - feedback je kompletní"""
+        self.completed = True
+
+    @property
+    def feedback(self) -> str:
+        """Feedback bez tagu skóre (zatím přijatá část)"""
+        return SCORE_TAG_RE.sub('', self.raw).strip()
+
+    @property
+    def is_ready(self) -> bool:
+        """Je známé skóre i feedback, který lze přečíst volajícímu?"""
+        if self.score is None:
+            return False
+        if self.completed or not self.score_first:
+            return True
+        # Tečka na konci ještě může pokračovat ("3." v "3.5") - věta končí až mezerou za ní;
+        # zkratky a řadové číslovky ("např.", "1.") větu neukončují (viz sentence_ends)
+        return bool(sentence_ends(SCORE_TAG_RE.sub('', self.raw).lstrip()))
+
+    def ready_feedback(self) -> str:
+        """Feedback pro TwiML - u score-first formátu jen dokončené věty"""
+        feedback = self.feedback
+        if self.completed or not self.score_first:
+            return feedback
+        ends = sentence_ends(feedback + ' ')
+        return feedback[:ends[-1]].strip() if ends else feedback
+
+
+async def _drain_stream(stream, parser: StreamingScoreParser, started: float, timings: Dict[str, Any],
+                        on_complete: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+    """Dočte zbytek streamu na pozadí (celý feedback, log celé odpovědi a celková latence)"""
+    try:
+        async for chunk in stream:
+            parser.feed(_chunk_text(chunk))
+        parser.finish()
+        timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        voice_metrics.observe("llm_total", timings['total_ms'])
+        logger.info(
+            f"🌊 Stream dokončen: celkem {timings['total_ms']} ms "
+            f"(odpověď připravena v {timings.get('ready_ms')} ms), raw: '{parser.raw}'"
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Chyba při dočítání streamu: {e}")
+        return
+    _complete(parser, timings, on_complete)
+
+
+def _result(parser: StreamingScoreParser, feedback: str, timings: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'score': parser.score if parser.score is not None else 0,
+        'feedback': feedback,
+        'raw': parser.raw,
+        'score_parsed': parser.score is not None,
+        'timings': timings
+    }
+
+
+def _complete(parser: StreamingScoreParser, timings: Dict[str, Any],
+              on_complete: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+    if on_complete is None:
+        return
+    try:
+        on_complete(_result(parser, parser.feedback, timings))
+    except Exception as e:
+        logger.warning(f"⚠️ Chyba v on_complete streamovaného hodnocení: {e}")
+
+
+def _chunk_text(chunk) -> str:
+    try:
+        return chunk.choices[0].delta.content or ""
+    except (AttributeError, IndexError):
+        return ""
+
+
+async def stream_evaluation(client, messages: List[dict], score_first: bool = True,
+                            model: str = "gpt-4o-mini", max_tokens: int = 150,
+                            temperature: float = 0.3,
+                            on_complete: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Vyhodnotí odpověď streamovaným voláním LLM.
+
+    Vrátí výsledek, jakmile je parser připravený (skóre + první věta feedbacku
+    u score-first formátu); zbytek streamu se dočte na pozadí.
+    Vrací {'score', 'feedback', 'raw', 'score_parsed', 'timings'}.
+
+    on_complete dostane stejný slovník s celým feedbackem, až stream skončí
+    (např. pro cache - vrácený feedback může být jen první věta).
+    """
+    started = time.perf_counter()
+    timings: Dict[str, Any] = {'first_token_ms': None, 'score_ms': None, 'ready_ms': None, 'total_ms': None}
+    parser = StreamingScoreParser(score_first=score_first)
+
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True
+    )
+
+    iterator = stream.__aiter__()
+    early = False
+    while True:
+        try:
+            chunk = await iterator.__anext__()
+        except StopAsyncIteration:
+            break
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        text = _chunk_text(chunk)
+        if text and timings['first_token_ms'] is None:
+            timings['first_token_ms'] = elapsed_ms
+        parser.feed(text)
+        if parser.score is not None and timings['score_ms'] is None:
+            timings['score_ms'] = elapsed_ms
+        if parser.is_ready:
+            early = True
+            break
+
+    if early:
+        timings['ready_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        result_feedback = parser.ready_feedback()
+        task = asyncio.create_task(_drain_stream(iterator, parser, started, timings, on_complete))
+        _drain_tasks.add(task)
+        task.add_done_callback(_drain_tasks.discard)
+    else:
+        parser.finish()
+        timings['ready_ms'] = timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        result_feedback = parser.feedback
+        voice_metrics.observe("llm_total", timings['total_ms'])
+
+    if timings['first_token_ms'] is not None:
+        voice_metrics.observe("llm_first_token", timings['first_token_ms'])
+    voice_metrics.observe("llm_ready", timings['ready_ms'])
+    logger.info(
+        f"🌊 Streamované hodnocení: první token {timings['first_token_ms']} ms, "
+        f"skóre {timings['score_ms']} ms, připraveno {timings['ready_ms']} ms"
+    )
+    result = _result(parser, result_feedback, timings)
+    if not early:
+        _complete(parser, timings, on_complete)
+    return result
@@ -0,0 +1,192 @@
+import logging
+from collections import deque
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from app.services.czech_text import normalize_answer, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Typy shody seřazené podle priority (nižší index = silnější shoda)
+MATCH_EXACT = "přesná"
+MATCH_SUBSTRING = "substring"
+MATCH_SYNONYM = "synonymum"
+_MATCH_PRIORITY = {MATCH_EXACT: 0, MATCH_SUBSTRING: 1, MATCH_SYNONYM: 2}
+
+# Minimální délka fragmentu (zkrácené slovo z ASR, "koncentr"), který se smí
+# shodovat se začátkem klíčového slova; kratší vzory se hledají jen jako celá slova
+MIN_FRAGMENT_LENGTH = 4
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automat nad posloupnostmi symbolů.
+
+    Symbolem může být znak (vzor = řetězec) nebo celé slovo (vzor = tuple slov).
+    Vzory se přidají přes add(), build() dopočítá failure odkazy a potom
+    iter_matches() najde všechny výskyty všech vzorů jedním průchodem textem.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[Hashable, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: Sequence[Hashable], payload: Any) -> None:
+        """Přidá vzor; payload se vrátí u každého jeho výskytu"""
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), payload))
+        self._built = False
+
+    def build(self) -> "AhoCorasick":
+        """Dopočítá failure odkazy (BFS) a sloučí výstupy přes failure řetězec"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        self._built = True
+        return self
+
+    def iter_matches(self, text: Sequence[Hashable]) -> Iterator[Tuple[int, int, Any]]:
+        """Vrací (start, end, payload) pro každý výskyt vzoru v textu (indexy symbolů)"""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for index, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, payload in out[node]:
+                yield index - length + 1, index + 1, payload
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+
+def _is_token_boundary(text: str, start: int, end: int) -> bool:
+    """Leží výskyt [start, end) na hranicích slov?"""
+    return (start == 0 or text[start - 1] == ' ') and (end == len(text) or text[end] == ' ')
+
+
+class PhraseMatcher:
+    """
+    Sada frází (povely, signály) zkompilovaná do jednoho automatu nad slovy.
+
+    Fráze i text se normalizují stejně (malá písmena, bez diakritiky a
+    interpunkce), takže "to je všechno" zachytí i "To je všechno." a "stačí"
+    i "Stačí!". Shoda je na celá slova bez stemmingu - povel musí zaznít
+    v tomto tvaru: "končím" nezachytí "na konci", "nevím" ne "neví".
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = list(phrases)
+        self._automaton = AhoCorasick()
+        for phrase in self.phrases:
+            self._automaton.add(tuple(normalize_text(phrase).split()), phrase)
+        self._automaton.build()
+
+    def find_normalized(self, normalized_text: str) -> Set[str]:
+        """Nalezené fráze v již normalizovaném textu (viz normalize_text)"""
+        return {phrase for _, _, phrase in self._automaton.iter_matches(normalized_text.split())}
+
+    def find(self, text: str) -> Set[str]:
+        """Nalezené fráze v textu"""
+        return self.find_normalized(normalize_text(text)) if text else set()
+
+    def contains_any(self, text: str) -> bool:
+        return bool(self.find(text))
+
+
+class KeywordMatcher:
+    """
+    Klíčová slova otázky + jejich synonyma a ASR varianty v jednom automatu.
+
+    Pro každé klíčové slovo se do automatu vloží:
+    - normalizované klíčové slovo (přesná shoda na hranicích slov, jinak substring)
+    - jeho prefixy od MIN_FRAGMENT_LENGTH jako celá slova (useknuté slovo z ASR)
+    - normalizovaná synonyma a varianty ("operátorem" -> separátor)
+
+    match() pak jedním průchodem normalizovanou odpovědí vrátí stejnou
+    strukturu jako dřívější vnořené smyčky v match_keywords.
+    """
+
+    def __init__(self, keywords: Iterable[str], synonyms: Optional[Dict[str, Iterable[str]]] = None):
+        self.keywords = [kw for kw in keywords if isinstance(kw, str) and kw.strip()]
+        synonyms_by_norm = {}
+        for key, values in (synonyms or {}).items():
+            synonyms_by_norm.setdefault(normalize_answer(key), []).extend(values)
+
+        self._automaton = AhoCorasick()
+        for index, keyword in enumerate(self.keywords):
+            normalized = normalize_answer(keyword)
+            self._automaton.add(normalized, (index, MATCH_EXACT))
+            for length in range(MIN_FRAGMENT_LENGTH, len(normalized)):
+                if normalized[length - 1] != ' ':
+                    self._automaton.add(normalized[:length], (index, MATCH_SUBSTRING))
+            for synonym in synonyms_by_norm.get(normalized, []):
+                normalized_synonym = normalize_answer(synonym)
+                if normalized_synonym and normalized_synonym != normalized:
+                    self._automaton.add(normalized_synonym, (index, MATCH_SYNONYM))
+        self._automaton.build()
+
+    def match(self, user_answer: str) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict s klíči found, missing, matches [(keyword, match_type, matched_text)], coverage (0-100)
+        """
+        text = normalize_answer(user_answer)
+        best: Dict[int, Tuple[str, str]] = {}
+
+        for start, end, (index, match_type) in self._automaton.iter_matches(text):
+            on_boundary = _is_token_boundary(text, start, end)
+            if match_type == MATCH_EXACT and not on_boundary:
+                # Klíčové slovo uvnitř delšího slova ("emulz" v "emulzn")
+                if end - start < MIN_FRAGMENT_LENGTH:
+                    continue
+                match_type = MATCH_SUBSTRING
+            elif match_type == MATCH_SUBSTRING and not on_boundary:
+                continue
+            elif match_type == MATCH_SYNONYM and not on_boundary and end - start < MIN_FRAGMENT_LENGTH:
+                continue
+
+            current = best.get(index)
+            if current is None or _MATCH_PRIORITY[match_type] < _MATCH_PRIORITY[current[0]]:
+                best[index] = (match_type, text[start:end])
+
+        found, missing, matches = [], [], []
+        for index, keyword in enumerate(self.keywords):
+            if index not in best:
+                missing.append(keyword)
+                continue
+            match_type, matched = best[index]
+            found.append(keyword if match_type == MATCH_EXACT else f"{keyword}({matched})")
+            matches.append((keyword, match_type, matched))
+
+        coverage = len(found) / len(self.keywords) * 100 if self.keywords else 0
+        return {
+            "found": found,
+            "missing": missing,
+            "matches": matches,
+            "coverage": coverage
+        }
@@ -0,0 +1,305 @@
+import os
+import json
+import mmap
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Awaitable, Callable, Iterable, Tuple
+
+from app.services.audio_codec import wav_to_mulaw
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTS_MODEL = "tts-1"
+DEFAULT_TTS_VOICE = "nova"
+
+# Formáty uložených dat: μ-law 8 kHz připravený k odeslání do Media Streamu, nebo WAV z API
+FORMAT_MULAW = "mulaw"
+FORMAT_WAV = "wav"
+
+# Hlášky, které zazní na začátku každého hovoru na /audio. Jen ty (a odpovědi
+# asistenta) jdou přes OpenAI TTS - úvody lekcí a otázky čte Twilio <Say>,
+# takže warm-up předsyntetizuje právě tyto hlášky.
+WELCOME_MESSAGE = "Připojuji se k AI asistentovi. Moment prosím."
+INITIAL_MESSAGE = "Ahoj! Jsem AI asistent pro výuku jazyků. Jak vám mohu pomoci?"
+CALL_START_PROMPTS = (WELCOME_MESSAGE, INITIAL_MESSAGE)
+
+
+def tts_cache_key(text: str, voice: str = DEFAULT_TTS_VOICE, model: str = DEFAULT_TTS_MODEL,
+                  audio_format: str = FORMAT_MULAW) -> str:
+    payload = "\n".join((model, voice, audio_format, text.strip()))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MmapAudioStore:
+    """
+    Audio na disku: jeden datový soubor (data se jen připisují na konec)
+    a JSON index klíč -> (offset, délka). Čte se přes mmap, takže opakované
+    čtení stejné hlášky nejde přes read() a page cache sdílí všechny procesy.
+    """
+
+    DATA_FILE = "tts_audio.bin"
+    INDEX_FILE = "tts_index.json"
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self._data_path = os.path.join(directory, self.DATA_FILE)
+        self._index_path = os.path.join(directory, self.INDEX_FILE)
+        self._file = open(self._data_path, 'a+b')
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        self._index: Dict[str, Tuple[int, int]] = self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def get(self, key: str) -> Optional[bytes]:
+        location = self._index.get(key)
+        if location is None:
+            return None
+        offset, length = location
+        if offset + length > self._mapped_size:
+            self._remap()
+        return self._mmap[offset:offset + length]
+
+    def put(self, key: str, data: bytes) -> None:
+        if key in self._index:
+            return
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(data)
+        self._file.flush()
+        self._index[key] = (offset, len(data))
+        self._save_index()
+
+    def size_bytes(self) -> int:
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def _remap(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        size = self.size_bytes()
+        self._mmap = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) if size else None
+        self._mapped_size = size
+
+    def _load_index(self) -> Dict[str, Tuple[int, int]]:
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as index_file:
+                raw = json.load(index_file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Index TTS cache nelze načíst, začínám znovu: {e}")
+            return {}
+        # Záznamy za koncem datového souboru (nedokončený zápis) zahodíme
+        size = self.size_bytes()
+        return {key: (offset, length) for key, (offset, length) in raw.items() if offset + length <= size}
+
+    def _save_index(self) -> None:
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as index_file:
+            json.dump(self._index, index_file)
+        os.replace(tmp_path, self._index_path)
+
+
+class TTSCache:
+    """
+    Dvouúrovňová cache syntetizované řeči.
+
+    Klíč je (text, hlas, model, formát), hodnota hotová audio data (pro Media
+    Stream μ-law 8 kHz, bez další konverze). Paměťová LRU úroveň je omezená
+    velikostí v bajtech, pod ní je MmapAudioStore na disku, který přežije
+    restart procesu. Na disk jdou jen texty z warm-upu (úvodní hlášky) -
+    jednorázové odpovědi asistenta zůstávají jen v paměťové LRU, jinak by
+    disk i index rostly s každou větou. Souběžné požadavky na stejný text
+    (uvítání na začátku každého hovoru) se syntetizují jen jednou.
+    """
+
+    def __init__(self, max_memory_bytes: int = None, directory: str = None, persistent: bool = None):
+        if max_memory_bytes is None:
+            max_memory_bytes = int(float(os.getenv('TTS_CACHE_MEMORY_MB', '32')) * 1024 * 1024)
+        if persistent is None:
+            persistent = os.getenv('TTS_CACHE_PERSISTENT', 'true').lower() in ('1', 'true', 'yes')
+        self.max_memory_bytes = max_memory_bytes
+        self.directory = directory or os.getenv('TTS_CACHE_DIR', os.path.join('instance', 'tts_cache'))
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._store: Optional[MmapAudioStore] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.synthesized = 0
+
+    def get(self, text: str, voice: str = DEFAULT_TTS_VOICE, model: str = DEFAULT_TTS_MODEL,
+            audio_format: str = FORMAT_MULAW) -> Optional[bytes]:
+        key = tts_cache_key(text, voice, model, audio_format)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            store = self._disk_store()
+            data = store.get(key) if store is not None else None
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store_memory(key, data)
+            return data
+
+    def put(self, text: str, data: bytes, voice: str = DEFAULT_TTS_VOICE, model: str = DEFAULT_TTS_MODEL,
+            audio_format: str = FORMAT_MULAW, persist: bool = True) -> None:
+        if not data:
+            return
+        key = tts_cache_key(text, voice, model, audio_format)
+        with self._lock:
+            self._store_memory(key, data)
+        if persist:
+            self._persist(key, data)
+
+    async def get_or_synthesize(self, text: str, synthesize: Callable[[], Awaitable[bytes]],
+                                voice: str = DEFAULT_TTS_VOICE, model: str = DEFAULT_TTS_MODEL,
+                                audio_format: str = FORMAT_MULAW, persist: bool = False) -> bytes:
+        """
+        Audio z cache, jinak zavolá synthesize() a výsledek uloží do paměti.
+        S persist=True (warm-up) jde i na disk - zápis běží ve vlákně.
+        """
+        data = self.get(text, voice, model, audio_format)
+        if data is not None:
+            return data
+
+        key = tts_cache_key(text, voice, model, audio_format)
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            data = await synthesize()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Převezmou čekající požadavky, jinak by se logovala jako nevyzvednutá
+            raise
+        else:
+            self.synthesized += 1
+            self.put(text, data, voice, model, audio_format, persist=False)
+            future.set_result(data)
+            if persist:
+                await asyncio.to_thread(self._persist, key, data)
+            return data
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def warm_up(self, texts: Iterable[str], synthesize_text: Callable[[str], Awaitable[bytes]],
+                      voice: str = DEFAULT_TTS_VOICE, model: str = DEFAULT_TTS_MODEL,
+                      audio_format: str = FORMAT_MULAW, concurrency: int = 4) -> Dict[str, int]:
+        """Předsyntetizuje texty, které v cache chybí (souběžně nejvýše concurrency)"""
+        semaphore = asyncio.Semaphore(concurrency)
+        result = {'cached': 0, 'synthesized': 0, 'failed': 0}
+
+        async def warm(text: str) -> None:
+            if self.get(text, voice, model, audio_format) is not None:
+                result['cached'] += 1
+                return
+            async with semaphore:
+                try:
+                    await self.get_or_synthesize(text, lambda: synthesize_text(text), voice, model, audio_format,
+                                                 persist=True)
+                    result['synthesized'] += 1
+                except Exception as e:
+                    result['failed'] += 1
+                    logger.warning(f"⚠️ TTS warm-up selhal pro '{text[:40]}': {e}")
+
+        await asyncio.gather(*(warm(text) for text in dict.fromkeys(t.strip() for t in texts if t and t.strip())))
+        logger.info(f"🔊 TTS cache warm-up: {result}")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiky pro admin endpoint"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            store = self._store
+            return {
+                'memory_entries': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'disk_entries': len(store) if store is not None else 0,
+                'disk_bytes': store.size_bytes() if store is not None else 0,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'synthesized': self.synthesized,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+                'persistent': self.persistent,
+                'directory': self.directory
+            }
+
+    def clear(self) -> None:
+        """Vyprázdní paměťovou úroveň (disk zůstává)"""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def _persist(self, key: str, data: bytes) -> None:
+        with self._lock:
+            store = self._disk_store()
+            if store is None:
+                return
+            try:
+                store.put(key, data)
+            except Exception as e:
+                logger.warning(f"⚠️ Zápis do TTS cache na disku selhal: {e}")
+
+    def _disk_store(self) -> Optional[MmapAudioStore]:
+        # Volá se pod zámkem; adresář se vytváří až při prvním použití
+        if not self.persistent:
+            return None
+        if self._store is None:
+            try:
+                self._store = MmapAudioStore(self.directory)
+            except Exception as e:
+                logger.warning(f"⚠️ TTS cache na disku není dostupná ({self.directory}): {e}")
+                self.persistent = False
+                return None
+        return self._store
+
+    def _store_memory(self, key: str, data: bytes) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        if len(data) > self.max_memory_bytes:
+            return
+        self._entries[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+
+def synthesize_mulaw(client, text: str, voice: str = DEFAULT_TTS_VOICE, model: str = DEFAULT_TTS_MODEL) -> bytes:
+    """OpenAI TTS (WAV) převedené na μ-law 8 kHz pro Twilio Media Stream (blokující volání)"""
+    response = client.audio.speech.create(model=model, voice=voice, input=text, response_format="wav")
+    return wav_to_mulaw(response.content)
+
+
+# Globální instance (Media Stream handlery a /tts endpoint)
+tts_cache = TTSCache()
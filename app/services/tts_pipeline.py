@@ -0,0 +1,131 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, Awaitable, Callable, AsyncIterable, AsyncIterator, Iterable, List
+
+from app.services.assistant_stream import SentenceSplitter
+from app.services.voice_metrics import voice_metrics
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+def split_sentences(text: str, min_chars: int = 12) -> List[str]:
+    """Celý text na věty pro TTS (stejná pravidla jako u streamované odpovědi asistenta)"""
+    splitter = SentenceSplitter(min_chars)
+    sentences = splitter.feed(text)
+    rest = splitter.flush()
+    if rest:
+        sentences.append(rest)
+    return sentences
+
+
+async def _iterate(items: Iterable[str]) -> AsyncIterator[str]:
+    for item in items:
+        yield item
+
+
+class TTSPipeline:
+    """
+    Syntéza a přehrávání odpovědi po větách.
+
+    Věty (z hotového textu nebo ze streamu asistenta) se syntetizují
+    souběžně - nejvýš max_concurrency najednou a nejvýš tolik vět dopředu
+    před právě přehrávanou - a přehrávají se v původním pořadí, každá
+    hned, jak je hotová ona i všechny před ní. První věta tak zazní po
+    syntéze jedné věty, ne celé odpovědi. Když play() vrátí False
+    (barge-in, odpojení), rozpracované syntézy se zruší a zbytek odpovědi
+    se zahodí. Latence prvního audia jde do metriky tts_first_audio.
+    """
+
+    def __init__(self, synthesize: Callable[[str], Awaitable[bytes]], play: Callable[[bytes], Awaitable[bool]],
+                 max_concurrency: int = None, min_chars: int = 12, name: str = ""):
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv('TTS_PIPELINE_CONCURRENCY', '3'))
+        self.synthesize = synthesize
+        self.play = play
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_chars = min_chars
+        self.name = name
+        self.sentences = 0
+        self.played = 0
+        self.failed = 0
+        self.interrupted = False
+        self.first_audio_ms: Optional[float] = None
+
+    async def speak(self, text: str) -> bool:
+        """Rozdělí text na věty a přehraje ho (True = celý přehrán)"""
+        return await self.speak_stream(_iterate(split_sentences(text, self.min_chars)))
+
+    async def speak_stream(self, sentences: AsyncIterable[str]) -> bool:
+        """Přehraje věty tak, jak přicházejí (True = všechny přehrány)"""
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        ready: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrency)
+        tasks: List[asyncio.Task] = []
+
+        async def synthesize(sentence: str) -> bytes:
+            async with semaphore:
+                synth_started = time.perf_counter()
+                audio = await self.synthesize(sentence)
+                voice_metrics.observe("tts_sentence_synthesis", (time.perf_counter() - synth_started) * 1000)
+                return audio
+
+        async def produce() -> None:
+            try:
+                async for sentence in sentences:
+                    self.sentences += 1
+                    logger.info(f"🔊 {self.name} věta {self.sentences}: '{sentence[:50]}'")
+                    task = asyncio.create_task(synthesize(sentence))
+                    tasks.append(task)
+                    await ready.put(task)
+            except Exception as e:
+                await ready.put(e)
+            finally:
+                aclose = getattr(sentences, 'aclose', None)
+                if aclose is not None:
+                    await aclose()
+            await ready.put(_END)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await ready.get()
+                if item is _END:
+                    return True
+                if isinstance(item, Exception):
+                    raise item
+                # asyncio.wait - zrušení pipeline se nepropíše do syntézy sdílené přes TTS cache a naopak
+                await asyncio.wait({item})
+                if item.cancelled() or item.exception() is not None:
+                    self.failed += 1
+                    logger.error(f"❌ {self.name} syntéza věty selhala: "
+                                 f"{'zrušena' if item.cancelled() else item.exception()}")
+                    continue
+                audio = item.result()
+                if not audio:
+                    self.failed += 1
+                    continue
+                if self.first_audio_ms is None:
+                    self.first_audio_ms = (time.perf_counter() - started) * 1000
+                    voice_metrics.observe("tts_first_audio", self.first_audio_ms)
+                if not await self.play(audio):
+                    self.interrupted = True
+                    return False
+                self.played += 1
+        finally:
+            producer.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(producer, *tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sentences': self.sentences,
+            'played': self.played,
+            'failed': self.failed,
+            'interrupted': self.interrupted,
+            'first_audio_ms': round(self.first_audio_ms, 1) if self.first_audio_ms is not None else None
+        }
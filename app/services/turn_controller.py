@@ -0,0 +1,111 @@
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, Awaitable, Callable
+
+from app.services.audio_sender import OutboundAudioSender
+
+logger = logging.getLogger(__name__)
+
+
+class TurnController:
+    """
+    Tahy konverzace jednoho Media Streamu.
+
+    Každá promluva uživatele je tah s rostoucím turn_id a vlastním taskem
+    (STT -> Assistant -> TTS). Jakmile detektor řeči zachytí novou řeč,
+    barge_in() zruší všechny rozpracované tahy - zrušení projde přes čekání
+    na Whisper, stream Assistant runu i syntézu - a pokud se přehrává audio,
+    pošle Twiliu "clear". Audio se do senderu posílá s turn_id, takže je
+    vidět, ke kterému tahu patří odesílané a přehrané rámce.
+    """
+
+    def __init__(self, stream_sid: str = ""):
+        self.stream_sid = stream_sid
+        self._last_turn_id = 0
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._started_at: Dict[int, float] = {}
+        self.turns_started = 0
+        self.turns_completed = 0
+        self.turns_cancelled = 0
+        self.turns_failed = 0
+        self.barge_ins = 0
+
+    @property
+    def current_turn_id(self) -> int:
+        return self._last_turn_id
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def is_current(self, turn_id: int) -> bool:
+        """Je tah pořád nejnovější (odpověď má smysl přehrát)?"""
+        return turn_id == self._last_turn_id and turn_id in self._tasks
+
+    def start_turn(self, handler: Callable[[int], Awaitable[Any]]) -> int:
+        """Spustí nový tah: handler(turn_id) běží jako task, dokud neskončí nebo ho nezruší barge-in"""
+        self._last_turn_id += 1
+        turn_id = self._last_turn_id
+        self._started_at[turn_id] = time.perf_counter()
+        task = asyncio.create_task(handler(turn_id))
+        task.add_done_callback(lambda finished, turn_id=turn_id: self._on_done(turn_id, finished))
+        self._tasks[turn_id] = task
+        self.turns_started += 1
+        return turn_id
+
+    async def run_turn(self, handler: Callable[[int], Awaitable[Any]]) -> bool:
+        """Spustí tah a počká na jeho konec (True = dokončen, False = zrušen nebo selhal)"""
+        task = self._tasks[self.start_turn(handler)]
+        await asyncio.wait({task})
+        return not task.cancelled() and task.exception() is None
+
+    async def barge_in(self, sender: Optional[OutboundAudioSender] = None) -> int:
+        """Uživatel začal mluvit - zruší rozpracované tahy a zastaví přehrávání. Vrací počet zrušených tahů."""
+        cancelled = self.cancel_all()
+        playing = sender is not None and sender.is_playing
+        if playing:
+            await sender.clear()
+        if cancelled or playing:
+            self.barge_ins += 1
+            logger.info(f"✋ Barge-in na {self.stream_sid}: zrušeno {cancelled} tahů")
+        return cancelled
+
+    def cancel_all(self) -> int:
+        cancelled = 0
+        for task in list(self._tasks.values()):
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+        return cancelled
+
+    async def close(self) -> None:
+        """Konec streamu - zruší tahy a počká, až doběhnou"""
+        self.cancel_all()
+        tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        return {
+            'current_turn_id': self._last_turn_id,
+            'in_flight': {turn_id: round((now - self._started_at[turn_id]) * 1000) for turn_id in self._tasks},
+            'turns_started': self.turns_started,
+            'turns_completed': self.turns_completed,
+            'turns_cancelled': self.turns_cancelled,
+            'turns_failed': self.turns_failed,
+            'barge_ins': self.barge_ins
+        }
+
+    def _on_done(self, turn_id: int, task: asyncio.Task) -> None:
+        self._tasks.pop(turn_id, None)
+        self._started_at.pop(turn_id, None)
+        if task.cancelled():
+            self.turns_cancelled += 1
+            logger.info(f"✋ Tah {turn_id} na {self.stream_sid} zrušen")
+        elif task.exception() is not None:
+            self.turns_failed += 1
+            logger.error(f"❌ Tah {turn_id} na {self.stream_sid} selhal: {task.exception()}")
+        else:
+            self.turns_completed += 1
@@ -10,7 +10,7 @@ import re
 import html
 import xml.etree.ElementTree as ET
 import sys
-from twilio.twiml.voice_response import Connect, Stream
+from app.services.twiml_fragments import TwiMLResponse
 
 logger = logging.getLogger(__name__)
 
@@ -307,7 +307,7 @@ class TwilioService:
             language, voice = 'cs-CZ', 'Google.cs-CZ-Standard-A'
             logger.info(f"Používám výchozí jazyk: {language}, hlas: {voice}")
             
-        response = VoiceResponse()
+        response = TwiMLResponse()
         response.say(
             "Děkujeme za volání. Hovor byl ukončen.",
             language=language,
@@ -320,7 +320,7 @@ class TwilioService:
 
     def create_introduction_response(self, lesson=None) -> str:
         """Vytvoří úvodní TwiML odpověď."""
-        response = VoiceResponse()
+        response = TwiMLResponse()
         
         # Přivítání
         response.say(
@@ -352,20 +352,14 @@ class TwilioService:
                 rate="0.9"
             )
         
-        # Připojení na Media Stream
-        connect = Connect()
-        stream = Stream(
-            url="wss://lecture-app-production.up.railway.app/audio",
-            track="both"
-        )
-        connect.append(stream)
-        response.append(connect)
+        # Připojení na Media Stream (předrenderovaný fragment)
+        response.fragment("media_stream_connect")
         
         return str(response)
     
     def create_teaching_response(self, lesson) -> str:
         """Vytvoří TwiML odpověď pro fázi výuky."""
-        response = VoiceResponse()
+        response = TwiMLResponse()
         
         if lesson:
             # Přečtení části skriptu lekce
@@ -384,20 +378,14 @@ class TwilioService:
                 rate="0.9"
             )
         
-        # Připojení na Media Stream
-        connect = Connect()
-        stream = Stream(
-            url="wss://lecture-app-production.up.railway.app/audio",
-            track="both"
-        )
-        connect.append(stream)
-        response.append(connect)
+        # Připojení na Media Stream (předrenderovaný fragment)
+        response.fragment("media_stream_connect")
         
         return str(response)
     
     def create_questioning_start_response(self) -> str:
         """Vytvoří TwiML odpověď pro začátek zkoušení."""
-        response = VoiceResponse()
+        response = TwiMLResponse()
         
         response.say(
             "Výborně! Nyní začneme se zkoušením. Budu vám klást otázky a vy mi odpovíte. Řekněte mi, když jste připraveni.",
@@ -406,20 +394,14 @@ class TwilioService:
             rate="0.9"
         )
         
-        # Připojení na Media Stream
-        connect = Connect()
-        stream = Stream(
-            url="wss://lecture-app-production.up.railway.app/audio",
-            track="both"
-        )
-        connect.append(stream)
-        response.append(connect)
+        # Připojení na Media Stream (předrenderovaný fragment)
+        response.fragment("media_stream_connect")
         
         return str(response)
     
     def create_question_response(self, question: str, language: str = "cs-CZ", include_beep: bool = True) -> str:
         """Vytvoří TwiML odpověď s otázkou."""
-        response = VoiceResponse()
+        response = TwiMLResponse()
         
         response.say(
             f"Otázka: {question}",
@@ -437,20 +419,14 @@ class TwilioService:
                 rate="0.8"
             )
         
-        # Připojení na Media Stream
-        connect = Connect()
-        stream = Stream(
-            url="wss://lecture-app-production.up.railway.app/audio",
-            track="both"
-        )
-        connect.append(stream)
-        response.append(connect)
+        # Připojení na Media Stream (předrenderovaný fragment)
+        response.fragment("media_stream_connect")
         
         return str(response)
     
     def create_feedback_response(self, feedback: str, language: str = "cs-CZ") -> str:
         """Vytvoří TwiML odpověď s feedbackem."""
-        response = VoiceResponse()
+        response = TwiMLResponse()
         
         response.say(
             feedback,
@@ -460,14 +436,8 @@ class TwilioService:
         )
         response.pause(length=1)
         
-        # Připojení na Media Stream
-        connect = Connect()
-        stream = Stream(
-            url="wss://lecture-app-production.up.railway.app/audio",
-            track="both"
-        )
-        connect.append(stream)
-        response.append(connect)
+        # Připojení na Media Stream (předrenderovaný fragment)
+        response.fragment("media_stream_connect")
         
         return str(response)
     
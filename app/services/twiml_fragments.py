@@ -0,0 +1,233 @@
+import logging
+import secrets
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from twilio.twiml.voice_response import VoiceResponse
+
+logger = logging.getLogger(__name__)
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+DEFAULT_LANGUAGE = "cs-CZ"
+DEFAULT_VOICE = "Google.cs-CZ-Standard-A"
+
+# Zástupný text, který se ve vyrenderované šabloně nahradí skutečným textem
+_PLACEHOLDER = "__TWIML_PLACEHOLDER__"
+_RESPONSE_OPEN = "<Response>"
+_RESPONSE_CLOSE = "</Response>"
+
+# Token tahu v URL webhooků /voice/process. Fragmenty a šablony se renderují
+# se zástupným tokenem, TwiMLResponse ho nahradí vlastní hodnotou - webhook
+# z každého gatheru/redirectu je tak jednoznačný i bez idempotency hlavičky
+# Twilia, zatímco opakování téhož webhooku nese stejný token.
+TURN_PLACEHOLDER = "__TWIML_TURN__"
+VOICE_PROCESS_URL = "/voice/process?turn=" + TURN_PLACEHOLDER
+
+
+def _render_children(build: Callable[[VoiceResponse], None]) -> str:
+    """Vyrenderuje elementy přes VoiceResponse a vrátí je bez XML hlavičky a <Response>"""
+    response = VoiceResponse()
+    build(response)
+    xml = str(response)
+    body = xml[len(XML_DECLARATION):]
+    if not body.startswith(_RESPONSE_OPEN):
+        return ""  # <Response /> - žádné elementy
+    return body[len(_RESPONSE_OPEN):-len(_RESPONSE_CLOSE)]
+
+
+# Statické části odpovědí /voice/ a /voice/process (stejné pro každý request)
+STATIC_FRAGMENTS: Dict[str, Callable[[VoiceResponse, str, str], None]] = {
+    # Nízká confidence - omluva (redirect s parametry pokusu se přidává zvlášť)
+    "low_confidence_apology": lambda r, language, voice: r.say(
+        "Omlouvám se, nerozuměl jsem vám dobře. Můžete zopakovat svou odpověď pomaleji a jasněji?",
+        language=language, rate="0.9", voice=voice
+    ),
+    # Připomenutí, když uživatel neodpověděl
+    "reminder": lambda r, language, voice: r.say(
+        "Připomínám - pokud mi nerozumíte nebo potřebujete čas na zamyšlení, řekněte to prosím nahlas.",
+        language=language, rate="0.9", voice=voice
+    ),
+    # Gather s "Píp." po vyhodnocené odpovědi ve vstupním testu
+    "beep_gather": lambda r, language, voice: r.gather(
+        input='speech', timeout=15, speech_timeout=4, action=VOICE_PROCESS_URL, method='POST',
+        language=language, speech_model='phone_call', enhanced='true'
+    ).say("Píp.", language=language, rate="0.8", voice=voice),
+    # Fallback po gatheru + návrat s připomenutím
+    "fallback_redirect": lambda r, language, voice: (
+        r.say(
+            "Nerozuměl jsem vaší odpovědi. Zkuste mluvit jasně nebo řekněte 'konec' pro ukončení.",
+            language=language, rate="0.8", voice=voice
+        ),
+        r.redirect(VOICE_PROCESS_URL + '&reminder=true')
+    ),
+    # Rozloučení a zavěšení
+    "goodbye_hangup": lambda r, language, voice: (
+        r.say("Děkuji za rozhovor. Na shledanou!", language=language, rate="0.9", voice=voice),
+        r.hangup()
+    ),
+    # Připojení hovoru na Media Stream (/audio, obě stopy)
+    "media_stream_connect": lambda r, language, voice: r.connect().stream(
+        url="wss://lecture-app-production.up.railway.app/audio", track="both"
+    ),
+    # Konec úvodu z /voice/: pauza, gather s "Píp.", fallback a návrat s připomenutím
+    "intro_gather": lambda r, language, voice: (
+        r.pause(length=1),
+        r.gather(
+            input='speech', timeout=8, speech_timeout=3, action=VOICE_PROCESS_URL, method='POST',
+            language=language, speech_model='phone_call', partial_result_callback='', enhanced='true'
+        ).say("Píp.", language=language, rate="0.8", voice=voice),
+        r.say(
+            "Nerozuměl jsem vám nebo jste neodpověděl. Zkuste mluvit jasně a výrazně.",
+            language=language, rate="0.8", voice=voice
+        ),
+        r.redirect(VOICE_PROCESS_URL + '&reminder=true')
+    ),
+}
+
+
+class TwiMLFragmentRegistry:
+    """
+    Předrenderované TwiML fragmenty a šablony elementů.
+
+    Statické fragmenty (STATIC_FRAGMENTS) se renderují jednou pro každou
+    dvojici jazyk + hlas, šablony elementů (<Say>, <Gather>, <Redirect>...)
+    jednou pro každou kombinaci atributů. Renderuje je přímo VoiceResponse,
+    takže výstup je stejný jako při sestavování stromu v každém requestu.
+    """
+
+    def __init__(self):
+        self._fragments: Dict[Tuple[str, str, str], str] = {}
+        self._templates: Dict[tuple, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def fragment(self, name: str, language: str = DEFAULT_LANGUAGE, voice: str = DEFAULT_VOICE) -> str:
+        key = (name, language, voice)
+        cached = self._fragments.get(key)
+        if cached is None:
+            build = STATIC_FRAGMENTS[name]
+            cached = _render_children(lambda r: build(r, language, voice))
+            with self._lock:
+                self._fragments[key] = cached
+        return cached
+
+    def template(self, tag: str, attrs: Dict[str, object]) -> Tuple[str, str]:
+        """(prefix, suffix) elementu s danými atributy; obsah se vkládá mezi ně (escapovaný)"""
+        key = (tag, tuple(sorted(attrs.items())))
+        cached = self._templates.get(key)
+        if cached is None:
+            cached = self._render_template(tag, attrs)
+            with self._lock:
+                self._templates[key] = cached
+        return cached
+
+    def warm_up(self, voices: Iterable[Tuple[str, str]] = ((DEFAULT_LANGUAGE, DEFAULT_VOICE),)) -> int:
+        """Předrenderuje všechny statické fragmenty (volá se při startu aplikace)"""
+        count = 0
+        for language, voice in voices:
+            for name in STATIC_FRAGMENTS:
+                self.fragment(name, language, voice)
+                count += 1
+        logger.info(f"✅ TwiML fragmenty předrenderovány: {count}")
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        return {'fragments': len(self._fragments), 'templates': len(self._templates)}
+
+    @staticmethod
+    def _render_template(tag: str, attrs: Dict[str, object]) -> Tuple[str, str]:
+        if tag == 'Say':
+            xml = _render_children(lambda r: r.say(_PLACEHOLDER, **attrs))
+        elif tag == 'Redirect':
+            xml = _render_children(lambda r: r.redirect(_PLACEHOLDER, **attrs))
+        elif tag == 'Gather':
+            xml = _render_children(lambda r: r.gather(**attrs).say(_PLACEHOLDER))
+            inner = '<Say>' + _PLACEHOLDER + '</Say>'
+            prefix, suffix = xml.split(inner)
+            return prefix, suffix
+        elif tag == 'Pause':
+            return _render_children(lambda r: r.pause(**attrs)), ""
+        elif tag == 'Hangup':
+            return _render_children(lambda r: r.hangup()), ""
+        else:
+            raise ValueError(f"Nepodporovaný TwiML element: {tag}")
+        prefix, suffix = xml.split(_PLACEHOLDER)
+        return prefix, suffix
+
+
+class _GatherNode:
+    """<Gather> s vnořenými elementy, renderuje se až při sestavení odpovědi"""
+
+    def __init__(self, registry: TwiMLFragmentRegistry, attrs: Dict[str, object]):
+        self._registry = registry
+        self._attrs = attrs
+        self._parts: List[str] = []
+
+    def say(self, message: str = None, **attrs) -> "_GatherNode":
+        prefix, suffix = self._registry.template('Say', attrs)
+        self._parts.append(prefix + escape(message or "") + suffix)
+        return self
+
+    def render(self) -> str:
+        if not self._parts:
+            return _render_children(lambda r: r.gather(**self._attrs))
+        prefix, suffix = self._registry.template('Gather', self._attrs)
+        return prefix + ''.join(self._parts) + suffix
+
+
+class TwiMLResponse:
+    """
+    Náhrada VoiceResponse skládaná z řetězců.
+
+    Podporuje metody, které používají hlasové webhooky (say, gather, redirect,
+    pause, hangup), a navíc fragment() pro vložení předrenderovaného bloku.
+    str() vrací stejné TwiML jako VoiceResponse, jen TURN_PLACEHOLDER v URL
+    nahradí tokenem této odpovědi (turn).
+    """
+
+    def __init__(self, registry: Optional[TwiMLFragmentRegistry] = None,
+                 language: str = DEFAULT_LANGUAGE, voice: str = DEFAULT_VOICE, turn: Optional[str] = None):
+        self._registry = registry or twiml_fragments
+        self.language = language
+        self.voice = voice
+        self.turn = turn or secrets.token_hex(6)
+        self._parts: list = []
+
+    def fragment(self, name: str) -> "TwiMLResponse":
+        self._parts.append(self._registry.fragment(name, self.language, self.voice))
+        return self
+
+    def say(self, message: str = None, **attrs) -> "TwiMLResponse":
+        prefix, suffix = self._registry.template('Say', attrs)
+        self._parts.append(prefix + escape(message or "") + suffix)
+        return self
+
+    def gather(self, **attrs) -> _GatherNode:
+        node = _GatherNode(self._registry, attrs)
+        self._parts.append(node)
+        return node
+
+    def redirect(self, url: str, **attrs) -> "TwiMLResponse":
+        prefix, suffix = self._registry.template('Redirect', attrs)
+        self._parts.append(prefix + escape(url) + suffix)
+        return self
+
+    def pause(self, **attrs) -> "TwiMLResponse":
+        self._parts.append(self._registry.template('Pause', attrs)[0])
+        return self
+
+    def hangup(self) -> "TwiMLResponse":
+        self._parts.append(self._registry.template('Hangup', {})[0])
+        return self
+
+    def __str__(self) -> str:
+        if not self._parts:
+            return XML_DECLARATION + '<Response />'
+        body = ''.join(part if isinstance(part, str) else part.render() for part in self._parts)
+        if TURN_PLACEHOLDER in body:
+            body = body.replace(TURN_PLACEHOLDER, self.turn)
+        return XML_DECLARATION + _RESPONSE_OPEN + body + _RESPONSE_CLOSE
+
+
+# Globální registr (warm_up při startu aplikace)
+twiml_fragments = TwiMLFragmentRegistry()
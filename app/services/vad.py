@@ -0,0 +1,222 @@
+import os
+import logging
+from typing import Optional, List
+
+import numpy as np
+
+from app.services.audio_codec import ulaw_decode
+from app.services.audio_ring import AudioRingBuffer
+
+logger = logging.getLogger(__name__)
+
+# Twilio Media Stream: μ-law, 8 kHz, mono -> 1 bajt = 1 vzorek
+SAMPLE_RATE = 8000
+BYTES_PER_MS = SAMPLE_RATE // 1000
+
+
+class Utterance:
+    """Jeden úsek řeči (μ-law) vydaný detektorem pro STT"""
+
+    __slots__ = ('audio', 'start_ms', 'end_ms', 'forced')
+
+    def __init__(self, audio: bytes, start_ms: int, end_ms: int, forced: bool = False):
+        self.audio = audio
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        # True = ukončeno limitem max_utterance_ms nebo koncem streamu, ne tichem
+        self.forced = forced
+
+    @property
+    def duration_ms(self) -> int:
+        return self.end_ms - self.start_ms
+
+    def __repr__(self) -> str:
+        return f"Utterance({self.start_ms}-{self.end_ms} ms, {len(self.audio)} B)"
+
+
+class VoiceActivityDetector:
+    """
+    Detekce řeči v μ-law streamu podle energie a průchodů nulou.
+
+    Audio se dělí na rámce frame_ms. Rámec je řeč, pokud jeho RMS energie
+    překročí práh (násobek adaptivního odhadu šumu, nejméně min_energy), nebo
+    pokud má alespoň polovinu prahu a vysoký podíl průchodů nulou (neznělé
+    souhlásky s, š, f...). Odhad šumu se nastaví z prvních calibration_ms
+    streamu a dál sleduje rámce bez řeči. Promluva začne po start_frames
+    řečových rámcích za sebou a skončí po hangover_ms ticha - krátké pauzy
+    mezi slovy ji tedy nerozdělí. Ke každé promluvě se přidá pre_roll_ms audia před začátkem,
+    ticho na konci se ořízne na stejnou délku. Promluvy kratší než
+    min_utterance_ms (klapnutí, šum) se zahodí, delší než max_utterance_ms
+    se vydají po částech.
+
+    Stream se drží v jednom kruhovém bufferu (AudioRingBuffer) dimenzovaném
+    na nejdelší promluvu s pre-rollem: rámce pro analýzu i pre-roll jsou
+    jen pohledy do něj a audio promluvy se kopíruje jednou, při vydání.
+    """
+
+    def __init__(self, frame_ms: int = 20, hangover_ms: int = 700, min_utterance_ms: int = 300,
+                 max_utterance_ms: int = 15000, pre_roll_ms: int = 200, start_frames: int = 3,
+                 energy_ratio: float = 3.0, min_energy: int = 300, zcr_threshold: float = 0.25,
+                 noise_adapt: float = 0.05, calibration_ms: int = 200):
+        self.frame_ms = frame_ms
+        self.frame_bytes = frame_ms * BYTES_PER_MS
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.min_utterance_frames = max(1, min_utterance_ms // frame_ms)
+        self.max_utterance_frames = max(1, max_utterance_ms // frame_ms)
+        self.pre_roll_frames = pre_roll_ms // frame_ms
+        self.start_frames = start_frames
+        self.energy_ratio = energy_ratio
+        self.min_energy = min_energy
+        self.zcr_threshold = zcr_threshold
+        self.noise_adapt = noise_adapt
+        self.calibration_frames = calibration_ms // frame_ms
+
+        self.noise_level = 0.0
+        self._keep_frames = max(self.pre_roll_frames, start_frames)
+        self._ring = AudioRingBuffer((self.max_utterance_frames + self._keep_frames + 2) * self.frame_bytes)
+        self._processed = 0  # absolutní pozice konce posledního analyzovaného rámce
+        self._utterance_start = 0
+        self._in_speech = False
+        self._onset = 0
+        self._silence_run = 0
+        self._voiced = 0
+        self._confirmed = False
+        self._frame_index = 0
+        self._start_frame = 0
+        self._pre_roll_floor = 0
+
+    @classmethod
+    def from_env(cls) -> "VoiceActivityDetector":
+        """Detektor s parametry z prostředí (VAD_HANGOVER_MS, VAD_MIN_UTTERANCE_MS...)"""
+        return cls(
+            hangover_ms=int(os.getenv('VAD_HANGOVER_MS', '700')),
+            min_utterance_ms=int(os.getenv('VAD_MIN_UTTERANCE_MS', '300')),
+            max_utterance_ms=int(os.getenv('VAD_MAX_UTTERANCE_MS', '15000')),
+            energy_ratio=float(os.getenv('VAD_ENERGY_RATIO', '3.0')),
+            min_energy=int(os.getenv('VAD_MIN_ENERGY', '300'))
+        )
+
+    @property
+    def in_speech(self) -> bool:
+        return self._in_speech
+
+    @property
+    def speech_confirmed(self) -> bool:
+        """
+        Rozpracovaná promluva už má min_utterance_ms řeči - nezahodí se jako šum.
+
+        Nástup (in_speech) stačí start_frames rámců; barge-in čeká na potvrzení,
+        aby krátké "hm", kašel nebo klapnutí nepřerušily odpověď, ze které pak
+        žádná promluva nevznikne. Platí pro celou promluvu včetně jejích dalších
+        částí po max_utterance_ms.
+        """
+        return self._in_speech and self._confirmed
+
+    def feed(self, audio: bytes) -> List[Utterance]:
+        """Přidá μ-law audio (libovolná délka) a vrátí dokončené promluvy"""
+        source = memoryview(audio)
+        ring = self._ring
+        frame_bytes = self.frame_bytes
+        utterances = []
+        # Po rámcích, aby zápis nepřepsal data, která ještě nikdo neanalyzoval
+        for offset in range(0, len(source), frame_bytes):
+            ring.write(source[offset:offset + frame_bytes])
+            while ring.written - self._processed >= frame_bytes:
+                frame = ring.view(self._processed, self._processed + frame_bytes)
+                self._processed += frame_bytes
+                utterance = self._process_frame(frame)
+                if utterance is not None:
+                    utterances.append(utterance)
+        return utterances
+
+    def flush(self) -> Optional[Utterance]:
+        """Konec streamu - vrátí rozpracovanou promluvu, pokud je dost dlouhá"""
+        # Neúplný rámec na konci se zahodí (další audio začne novým rámcem)
+        self._processed = self._ring.written
+        if not self._in_speech:
+            return None
+        return self._finish(forced=True)
+
+    def is_speech_frame(self, frame: bytes) -> bool:
+        pcm = ulaw_decode(frame).astype(np.float64)
+        energy = float(np.sqrt(np.dot(pcm, pcm) / len(pcm)))
+        if self._frame_index < self.calibration_frames:
+            # Začátek streamu (před první promluvou) - průměrná energie = výchozí odhad šumu
+            self.noise_level += (energy - self.noise_level) / (self._frame_index + 1)
+            return False
+        threshold = max(self.min_energy, self.noise_level * self.energy_ratio)
+        if energy >= threshold:
+            return True
+        if energy >= threshold / 2:
+            negative = pcm < 0
+            zcr = np.count_nonzero(negative[1:] != negative[:-1]) / len(frame)
+            if zcr >= self.zcr_threshold:
+                return True
+        # Mimo promluvu se odhad šumu přizpůsobuje pozadí hovoru, uvnitř jen směrem dolů
+        # (doznívání slabik by ho jinak postupně vytáhlo až k úrovni řeči)
+        if not self._in_speech or energy < self.noise_level:
+            self.noise_level += (energy - self.noise_level) * self.noise_adapt
+        return False
+
+    def _process_frame(self, frame) -> Optional[Utterance]:
+        speech = self.is_speech_frame(frame)
+        self._frame_index += 1
+
+        if not self._in_speech:
+            self._onset = self._onset + 1 if speech else 0
+            if self._onset >= self.start_frames:
+                # Promluva začíná pre-rollem - rámce před nástupem jsou pořád v bufferu
+                keep = min(self._keep_frames, self._frame_index - self._pre_roll_floor)
+                self._start_frame = self._frame_index - keep
+                self._utterance_start = self._processed - keep * self.frame_bytes
+                self._in_speech = True
+                self._voiced = self._onset
+                self._confirmed = self._voiced >= self.min_utterance_frames
+                self._silence_run = 0
+                self._onset = 0
+            return None
+
+        if speech:
+            self._voiced += 1
+            self._silence_run = 0
+            if self._voiced >= self.min_utterance_frames:
+                self._confirmed = True
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.hangover_frames:
+            return self._finish(forced=False)
+        if self._frame_index - self._start_frame >= self.max_utterance_frames:
+            utterance = self._finish(forced=True)
+            # Dlouhá řeč pokračuje další částí bez čekání na nový nástup
+            self._in_speech = True
+            self._start_frame = self._frame_index
+            self._utterance_start = self._processed
+            return utterance
+        return None
+
+    def _finish(self, forced: bool) -> Optional[Utterance]:
+        frames = self._frame_index - self._start_frame
+        # Ticho na konci (hangover) ořízneme na délku pre-rollu
+        trailing = self._silence_run - self.pre_roll_frames
+        if trailing > 0:
+            frames -= trailing
+        voiced = self._voiced
+        start_frame = self._start_frame
+        start = self._utterance_start
+
+        self._in_speech = False
+        self._voiced = 0
+        self._silence_run = 0
+        # Další pre-roll nesmí sahat do už vydané promluvy
+        self._pre_roll_floor = self._frame_index
+
+        if voiced < self.min_utterance_frames:
+            logger.debug(f"🔇 VAD: zahazuji krátký úsek ({voiced * self.frame_ms} ms řeči)")
+            return None
+        return Utterance(
+            bytes(self._ring.view(start, start + frames * self.frame_bytes)),
+            start_ms=start_frame * self.frame_ms,
+            end_ms=(start_frame + frames) * self.frame_ms,
+            forced=forced
+        )
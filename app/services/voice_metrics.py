@@ -0,0 +1,286 @@
+import os
+import time
+import asyncio
+import bisect
+import logging
+import functools
+import threading
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Hranice bucketů histogramu v ms (poslední bucket +Inf se přidává automaticky)
+DEFAULT_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+PROMETHEUS_METRIC = "voice_stage_duration_seconds"
+
+# Právě zpracovávaný tah (asyncio tasky ho dědí při vytvoření)
+_current_turn: ContextVar[Optional["TurnTimings"]] = ContextVar("voice_turn", default=None)
+
+
+class Histogram:
+    """Histogram doby trvání s pevnými buckety (ms)"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum_ms', 'max_ms')
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Odhad kvantilu (horní hranice bucketu, v posledním bucketu maximum)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.bounds[index] if index < len(self.bounds) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'avg_ms': round(self.sum_ms / self.count, 2) if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': round(self.max_ms, 2)
+        }
+
+
+class TurnTimings:
+    """Doby jednotlivých fází jednoho hlasového tahu"""
+
+    __slots__ = ('endpoint', 'call_sid', 'lesson', 'started', 'stages', 'total_ms')
+
+    def __init__(self, endpoint: str, call_sid: str = "", lesson: str = ""):
+        self.endpoint = endpoint
+        self.call_sid = call_sid
+        self.lesson = lesson
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.total_ms: Optional[float] = None
+
+    def add(self, stage: str, elapsed_ms: float) -> None:
+        # Fáze se může v jednom tahu opakovat - časy se sčítají
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'endpoint': self.endpoint,
+            'call_sid': self.call_sid,
+            'lesson': self.lesson,
+            'total_ms': round(self.total_ms, 2) if self.total_ms is not None else None,
+            'stages': {stage: round(ms, 2) for stage, ms in self.stages.items()}
+        }
+
+
+class _Span:
+    """Měření jedné fáze (context manager, funguje i kolem await)"""
+
+    __slots__ = ('_metrics', '_stage', '_started')
+
+    def __init__(self, metrics: "VoiceMetrics", stage: str):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self) -> "_Span":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._metrics.observe(self._stage, (time.perf_counter() - self._started) * 1000)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Turn:
+    """Context manager jednoho tahu - nastaví aktuální tah a při konci ho uloží"""
+
+    __slots__ = ('_metrics', '_timings', '_token')
+
+    def __init__(self, metrics: "VoiceMetrics", timings: Optional[TurnTimings]):
+        self._metrics = metrics
+        self._timings = timings
+
+    def __enter__(self) -> Optional[TurnTimings]:
+        self._token = _current_turn.set(self._timings)
+        return self._timings
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current_turn.reset(self._token)
+        if self._timings is not None:
+            self._metrics.finish_turn(self._timings)
+        return False
+
+
+class VoiceMetrics:
+    """
+    Lehké měření latence hlasových tahů.
+
+    - span(stage) měří jednu fázi tahu (parsování formuláře, stav hovoru, LLM,
+      zápis odpovědi, render TwiML...), timed(stage) totéž jako dekorátor
+    - v rámci turn() se doby fází sbírají do TurnTimings a do histogramů se
+      zapíší až na konci tahu, kdy je známá lekce (štítky endpoint, stage, lesson)
+    - CallSid je jen u posledních tahů v recent_turns - jako štítek histogramu
+      by měl neomezenou kardinalitu
+    - mimo tah (např. dočítání streamu na pozadí) jde měření rovnou do histogramu
+
+    Na tah je to pár volání perf_counter a jeden zámek, tedy jednotky µs
+    (benchmarks/bench_voice_metrics.py).
+    """
+
+    def __init__(self, enabled: bool = None, max_calls: int = None, turns_per_call: int = 20):
+        if enabled is None:
+            enabled = os.getenv('VOICE_METRICS', 'true').lower() in ('1', 'true', 'yes')
+        self.enabled = enabled
+        self.max_calls = max_calls if max_calls is not None else int(os.getenv('VOICE_METRICS_MAX_CALLS', '200'))
+        self.turns_per_call = turns_per_call
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._recent: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def turn(self, endpoint: str, call_sid: str = "", lesson: Any = "") -> _Turn:
+        """with voice_metrics.turn("voice_process", call_sid): ..."""
+        timings = TurnTimings(endpoint, call_sid, str(lesson)) if self.enabled else None
+        return _Turn(self, timings)
+
+    def tag_turn(self, call_sid: str = None, lesson: Any = None) -> None:
+        """Doplní štítky aktuálního tahu (lekce je známá až po načtení stavu hovoru)"""
+        timings = _current_turn.get()
+        if timings is None:
+            return
+        if call_sid is not None:
+            timings.call_sid = call_sid
+        if lesson is not None:
+            timings.lesson = str(lesson)
+
+    def span(self, stage: str):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, stage)
+
+    def timed(self, stage: str):
+        """Dekorátor měřící celé volání funkce (sync i async)"""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(stage):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, stage: str, elapsed_ms: float) -> None:
+        """Zaznamená dobu fáze změřenou jinde (např. první token ze streamu)"""
+        if not self.enabled:
+            return
+        timings = _current_turn.get()
+        if timings is not None and timings.total_ms is None:
+            timings.add(stage, elapsed_ms)
+            return
+        endpoint = timings.endpoint if timings is not None else ""
+        lesson = timings.lesson if timings is not None else ""
+        with self._lock:
+            self._histogram(endpoint, stage, lesson).observe(elapsed_ms)
+
+    def finish_turn(self, timings: TurnTimings) -> None:
+        timings.total_ms = (time.perf_counter() - timings.started) * 1000
+        with self._lock:
+            self._histogram(timings.endpoint, 'turn', timings.lesson).observe(timings.total_ms)
+            for stage, elapsed_ms in timings.stages.items():
+                self._histogram(timings.endpoint, stage, timings.lesson).observe(elapsed_ms)
+            if timings.call_sid:
+                turns = self._recent.get(timings.call_sid)
+                if turns is None:
+                    turns = self._recent[timings.call_sid] = deque(maxlen=self.turns_per_call)
+                    while len(self._recent) > self.max_calls:
+                        self._recent.popitem(last=False)
+                else:
+                    self._recent.move_to_end(timings.call_sid)
+                turns.append(timings)
+
+    def recent_turns(self, call_sid: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [t.to_dict() for t in self._recent.get(call_sid, ())]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Souhrn histogramů pro admin endpoint (JSON)"""
+        with self._lock:
+            stages = [
+                {'endpoint': endpoint, 'stage': stage, 'lesson': lesson, **histogram.to_dict()}
+                for (endpoint, stage, lesson), histogram in sorted(self._histograms.items())
+            ]
+            recent_calls = list(self._recent)[-10:]
+        return {
+            'enabled': self.enabled,
+            'stages': stages,
+            'recent_calls': {call_sid: self.recent_turns(call_sid) for call_sid in reversed(recent_calls)}
+        }
+
+    def prometheus(self) -> str:
+        """Histogramy v textovém formátu Prometheus (sekundy, kumulativní buckety)"""
+        lines = [
+            f"# HELP {PROMETHEUS_METRIC} Doba trvání fází hlasového tahu",
+            f"# TYPE {PROMETHEUS_METRIC} histogram"
+        ]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for (endpoint, stage, lesson), histogram in items:
+                labels = f'endpoint="{endpoint}",stage="{stage}",lesson="{lesson}"'
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{PROMETHEUS_METRIC}_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+                lines.append(f'{PROMETHEUS_METRIC}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{PROMETHEUS_METRIC}_sum{{{labels}}} {histogram.sum_ms / 1000:.6f}')
+                lines.append(f'{PROMETHEUS_METRIC}_count{{{labels}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._recent.clear()
+
+    def _histogram(self, endpoint: str, stage: str, lesson: str) -> Histogram:
+        key = (endpoint, stage, lesson)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        return histogram
+
+
+# Globální instance (hlasové handlery v main.py a služby v app/services)
+voice_metrics = VoiceMetrics()
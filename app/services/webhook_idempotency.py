@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Awaitable, Callable, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Hlavička, kterou Twilio posílá se stejnou hodnotou u všech opakování jednoho webhooku
+TWILIO_IDEMPOTENCY_HEADER = "I-Twilio-Idempotency-Token"
+
+
+class CachedResponse:
+    """Vyrenderovaná odpověď webhooku (TwiML) připravená k přehrání duplicitám"""
+
+    def __init__(self, body: bytes, media_type: str = "text/xml", status_code: int = 200):
+        self.body = body
+        self.media_type = media_type
+        self.status_code = status_code
+        self.expires_at = 0.0
+
+
+def webhook_idempotency_key(call_sid: str, path: str, form_items: Iterable[Tuple[str, Any]],
+                            query: str = "", token: Optional[str] = None) -> str:
+    """
+    Klíč pro deduplikaci webhooku.
+
+    Preferuje Twilio idempotency token (shodný pro všechna opakování), jinak
+    CallSid + SequenceNumber, jinak CallSid + hash cesty, query a formuláře.
+    Gather callbacky SequenceNumber nemají - stejnou odpověď na dvě různé
+    otázky odliší token tahu v query (viz twiml_fragments.VOICE_PROCESS_URL).
+    """
+    if token:
+        return f"{call_sid}:token:{token}"
+    form = {key: str(value) for key, value in form_items}
+    sequence = form.get('SequenceNumber')
+    if sequence:
+        return f"{call_sid}:{path}:seq:{sequence}"
+    payload = path + "?" + query + "\n" + "\n".join(f"{k}={v}" for k, v in sorted(form.items()))
+    return f"{call_sid}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class WebhookIdempotencyStore:
+    """
+    Deduplikace opakovaných Twilio webhooků.
+
+    - první request s daným klíčem se zpracuje, vyrenderovaná odpověď se uloží
+      na ttl_seconds (krátce - Twilio opakuje během svého 15s timeoutu a
+      hashový klíč nesmí spojit stejnou odpověď na dvě různé otázky)
+    - duplicita, která přijde během zpracování, počká na výsledek prvního
+      requestu (žádné druhé volání LLM, žádná duplicitní odpověď v TestSession)
+    - duplicita po dokončení dostane uloženou odpověď
+    - chyba zpracování se neukládá, další opakování se zpracuje znovu
+    """
+
+    def __init__(self, ttl_seconds: float = None, max_entries: int = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('WEBHOOK_IDEMPOTENCY_TTL_SECONDS', '30'))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('WEBHOOK_IDEMPOTENCY_MAX_ENTRIES', '5000'))
+        self._responses: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.processed = 0
+        self.replayed = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, handler: Callable[[], Awaitable[CachedResponse]]) -> CachedResponse:
+        """Zpracuje webhook nejvýše jednou pro daný klíč a vrátí (případně přehranou) odpověď"""
+        cached = self._get(key)
+        if cached is not None:
+            self.replayed += 1
+            logger.info(f"🔁 Duplicitní webhook {key} - přehrávám uloženou odpověď")
+            return cached
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            logger.info(f"🔁 Duplicitní webhook {key} během zpracování - čekám na první request")
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await handler()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Výjimku si převezmou čekající duplicity; bez nich by se logovala jako nevyzvednutá
+            future.exception()
+            raise
+        else:
+            self.processed += 1
+            if result.status_code == 200:
+                self._put(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Čítače pro admin endpoint"""
+        return {
+            'processed': self.processed,
+            'replayed': self.replayed,
+            'coalesced': self.coalesced,
+            'stored': len(self._responses),
+            'in_flight': len(self._in_flight),
+            'ttl_seconds': self.ttl_seconds
+        }
+
+    def clear(self) -> None:
+        self._responses.clear()
+
+    def _get(self, key: str) -> Optional[CachedResponse]:
+        cached = self._responses.get(key)
+        if cached is None:
+            return None
+        if cached.expires_at <= time.monotonic():
+            del self._responses[key]
+            return None
+        return cached
+
+    def _put(self, key: str, response: CachedResponse) -> None:
+        response.expires_at = time.monotonic() + self.ttl_seconds
+        self._responses[key] = response
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+
+
+# Globální instance (webhooky jednoho hovoru chodí na stejnou instanci aplikace)
+webhook_idempotency = WebhookIdempotencyStore()
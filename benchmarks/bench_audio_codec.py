@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark převodu TTS WAV (24 kHz, 16 bit) na μ-law 8 kHz pro Media Stream.
+
+Porovnává původní postup z wav_to_mulaw (pydub AudioSegment + audioop,
+případně audioop.ratecv, když pydub chybí) s NumPy implementací
+v app/services/audio_codec.py. Propustnost je v sekundách audia na
+sekundu procesorového času (time.process_time), takže nezávisí na zátěži
+ostatních procesů.
+
+Spuštění:
+    python benchmarks/bench_audio_codec.py --seconds 10 --repeat 20
+"""
+
+import argparse
+import io
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.audio_codec import ulaw_decode, ulaw_encode, wav_to_mulaw  # noqa: E402
+from app.services.audio_framing import PCM_FORMAT, build_wav  # noqa: E402
+
+try:
+    import audioop
+except ImportError:  # Python 3.13+
+    audioop = None
+
+try:
+    from pydub import AudioSegment
+except ImportError:
+    AudioSegment = None
+
+
+def legacy_wav_to_mulaw(wav_data):
+    """Původní varianta - pydub převzorkování + audioop.lin2ulaw"""
+    if AudioSegment is not None:
+        audio = AudioSegment.from_file(io.BytesIO(wav_data), format="wav")
+        audio = audio.set_frame_rate(8000).set_channels(1).set_sample_width(2)
+        return audioop.lin2ulaw(audio.raw_data, 2)
+    pcm, _ = audioop.ratecv(wav_data[44:], 2, 1, 24000, 8000, None)
+    return audioop.lin2ulaw(pcm, 2)
+
+
+def tts_wav(seconds):
+    """Syntetická "řeč": směs tónů s obálkou a šumem, 24 kHz 16 bit mono"""
+    rate = 24000
+    t = np.arange(int(seconds * rate)) / rate
+    signal = sum(np.sin(2 * math.pi * f * t) / (i + 1) for i, f in enumerate((180, 720, 1400, 2900, 5200)))
+    signal *= 0.5 + 0.5 * np.sin(2 * math.pi * 3 * t) ** 2
+    signal += np.random.default_rng(0).normal(0, 0.05, len(t))
+    pcm = np.clip(signal / np.max(np.abs(signal)) * 20000, -32768, 32767).astype('<i2')
+    return bytes(build_wav(pcm.tobytes(), PCM_FORMAT, sample_rate=rate, bits_per_sample=16))
+
+
+def _bench(label, func, data, seconds, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        func(data)
+    cpu = time.process_time() - started
+    print(f"{label:28s} {seconds * repeat / cpu:10.0f} s audia / s CPU  ({cpu / repeat * 1000:7.2f} ms na převod)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0, help="délka hlášky (24 kHz)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    wav_data = tts_wav(args.seconds)
+    mulaw_8k = wav_to_mulaw(wav_data)
+    pcm_8k = ulaw_decode(mulaw_8k)
+    print(f"Hláška: {args.seconds} s, WAV {len(wav_data)} bajtů, opakování: {args.repeat}")
+
+    if audioop is not None:
+        _bench("před (pydub + audioop)" if AudioSegment else "před (audioop.ratecv)",
+               legacy_wav_to_mulaw, wav_data, args.seconds, args.repeat)
+    else:
+        print("před: audioop není k dispozici (Python 3.13+), přeskakuji")
+    _bench("po (NumPy WAV -> μ-law 8k)", wav_to_mulaw, wav_data, args.seconds, args.repeat)
+
+    # Samotný G.711 kodek na 8 kHz signálu
+    _bench("po: jen ulaw_encode", ulaw_encode, pcm_8k, args.seconds, args.repeat * 10)
+    _bench("po: jen ulaw_decode", ulaw_decode, mulaw_8k, args.seconds, args.repeat * 10)
+    if audioop is not None:
+        pcm_bytes = pcm_8k.tobytes()
+        _bench("před: audioop.lin2ulaw", lambda data: audioop.lin2ulaw(data, 2), pcm_bytes, args.seconds, args.repeat * 10)
+        _bench("před: audioop.ulaw2lin", lambda data: audioop.ulaw2lin(data, 2), mulaw_8k, args.seconds, args.repeat * 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark přípravy WAV souboru pro upload do Whisper API.
+
+Porovnává původní postup z process_audio_chunk (struct.pack hlavičky,
+NamedTemporaryFile, zápis, znovuotevření, přečtení klientem, unlink)
+se sestavením WAV v paměti (app/services/audio_framing.py). Upload samotný
+není součástí měření - obě varianty končí přečtením souboru, jak to dělá
+HTTP klient.
+
+Spuštění:
+    python benchmarks/bench_audio_framing.py --seconds 3 --chunks 2000
+"""
+
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.audio_framing import wav_file  # noqa: E402
+
+
+def tempfile_chunk(audio_data):
+    """Původní varianta - dočasný soubor na disku"""
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
+        wav_header = struct.pack('<4sI4s4sIHHIIHH4sI',
+            b'RIFF', len(audio_data) + 44 - 8, b'WAVE', b'fmt ', 16,
+            7, 1, 8000, 8000, 1, 8, b'data', len(audio_data)
+        )
+        tmp_file.write(wav_header)
+        tmp_file.write(audio_data)
+        tmp_file_path = tmp_file.name
+    try:
+        with open(tmp_file_path, "rb") as audio_file:
+            return len(audio_file.read())
+    finally:
+        os.unlink(tmp_file_path)
+
+
+def in_memory_chunk(audio_data):
+    """Nová varianta - WAV v jednom bufferu v paměti"""
+    return len(wav_file(audio_data).read())
+
+
+def _bench(label, func, audio_data, chunks):
+    started = time.perf_counter()
+    for _ in range(chunks):
+        func(audio_data)
+    elapsed = time.perf_counter() - started
+    print(f"{label:26s} {chunks / elapsed:10.0f} chunků/s  ({elapsed / chunks * 1e6:7.1f} µs/chunk)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="délka promluvy (μ-law 8 kHz)")
+    parser.add_argument("--chunks", type=int, default=2000)
+    args = parser.parse_args()
+
+    audio_data = os.urandom(int(args.seconds * 8000))
+    assert tempfile_chunk(audio_data) == in_memory_chunk(audio_data)
+
+    print(f"Promluva: {args.seconds} s ({len(audio_data)} bajtů), chunků: {args.chunks}, tmp: {tempfile.gettempdir()}")
+    _bench("před (tempfile)", tempfile_chunk, audio_data, args.chunks)
+    _bench("po (WAV v paměti)", in_memory_chunk, audio_data, args.chunks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark akumulace μ-law audia z Twilio Media Streamu (8 kHz, rámce 20 ms).
+
+N souběžných streamů posílá prokládaně rámce po 160 bajtech, každý stream
+nasbírá odpověď dlouhou --answer sekund a předá ji do STT. Porovnává:
+- bytes += rámec (původní audio_buffer v media_stream) - kvadratické kopírování
+- bytearray + řez rámce + del (původní VAD) - kopie rámce a posun zbytku
+- AudioRingBuffer (app/services/audio_ring.py) - jeden zápis, pohledy bez kopie
+
+Výsledek je CPU čas na sekundu audia jednoho streamu a kolik streamů
+v reálném čase zvládne jedno jádro.
+
+Spuštění:
+    python benchmarks/bench_audio_ring.py --streams 200 --answer 30
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.audio_ring import AudioRingBuffer  # noqa: E402
+
+FRAME = 160
+
+
+def bytes_concat(streams, frames, frame):
+    buffers = [b""] * streams
+    for _ in range(frames):
+        for index in range(streams):
+            buffers[index] += frame
+    return sum(len(bytes(buffer)) for buffer in buffers)
+
+
+def bytearray_frames(streams, frames, frame):
+    pending = [bytearray() for _ in range(streams)]
+    collected = [[] for _ in range(streams)]
+    for _ in range(frames):
+        for index in range(streams):
+            buffer = pending[index]
+            buffer.extend(frame)
+            while len(buffer) >= FRAME:
+                collected[index].append(bytes(buffer[:FRAME]))
+                del buffer[:FRAME]
+    return sum(len(b''.join(frames_)) for frames_ in collected)
+
+
+def ring_buffer(streams, frames, frame):
+    rings = [AudioRingBuffer(frames * FRAME + FRAME) for _ in range(streams)]
+    for _ in range(frames):
+        for ring in rings:
+            ring.write(frame)
+    return sum(len(bytes(ring.snapshot())) for ring in rings)
+
+
+def _bench(label, func, streams, frames, seconds):
+    frame = bytes(range(FRAME))
+    started = time.process_time()
+    total = func(streams, frames, frame)
+    cpu = time.process_time() - started
+    assert total == streams * frames * FRAME
+    per_stream_second = cpu / (streams * seconds)
+    print(f"{label:24s} {cpu:8.3f} s CPU  {per_stream_second * 1e6:9.1f} µs/s audia  "
+          f"~{1 / per_stream_second:10.0f} streamů/jádro")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--answer", type=float, default=30.0, help="délka odpovědi v sekundách")
+    args = parser.parse_args()
+
+    frames = int(args.answer * 1000 / 20)
+    print(f"Streamů: {args.streams}, odpověď {args.answer} s ({frames} rámců po {FRAME} B)")
+    _bench("bytes += rámec", bytes_concat, args.streams, frames, args.answer)
+    _bench("bytearray + del", bytearray_frames, args.streams, frames, args.answer)
+    _bench("AudioRingBuffer", ring_buffer, args.streams, frames, args.answer)
+
+
+if __name__ == "__main__":
+    main()
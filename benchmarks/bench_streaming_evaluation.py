@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark time-to-first-TwiML při vyhodnocení odpovědi ve vstupním testu.
+
+Porovnává:
+- původní variantu (čeká se na celou odpověď "[FEEDBACK] [SKÓRE: XX%]")
+- stream s původním formátem (skóre až na konci - zisk jen z parsování za letu)
+- stream se skóre na začátku (TwiML po tagu skóre a první větě feedbacku)
+
+LLM je simulováno: latence prvního tokenu + konstantní čas na token, takže
+benchmark nepotřebuje API klíč ani síť. Vypisuje time-to-first-TwiML
+i celkovou latenci dokončení odpovědi LLM.
+
+Spuštění:
+    python benchmarks/bench_streaming_evaluation.py --turns 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.streaming_evaluation import SCORE_TAG_RE, stream_evaluation  # noqa: E402
+
+FEEDBACK = "Chybí: skimmer. Separátor je správně, zkuste ale zmínit i druhý způsob odstranění oleje."
+SCORE_TAG = "[SKÓRE: 60%]"
+
+
+def _tokens(text):
+    # Hrubé dělení na tokeny po slovech (stačí pro poměr časů)
+    words = text.split(' ')
+    return [w if i == 0 else ' ' + w for i, w in enumerate(words)]
+
+
+class _Chunk:
+    def __init__(self, content):
+        delta = type("Delta", (), {"content": content})()
+        self.choices = [type("Choice", (), {"delta": delta, "message": delta})()]
+
+
+class FakeStreamingClient:
+    """Simuluje AsyncOpenAI: první token po first_token_ms, další po token_ms."""
+
+    def __init__(self, text, first_token_ms, token_ms):
+        self.tokens = _tokens(text)
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.chat = self
+        self.completions = self
+
+    async def create(self, stream=False, **kwargs):
+        if not stream:
+            await asyncio.sleep((self.first_token_ms + self.token_ms * (len(self.tokens) - 1)) / 1000.0)
+            return _Chunk("".join(self.tokens))
+        return self._stream()
+
+    async def _stream(self):
+        await asyncio.sleep(self.first_token_ms / 1000.0)
+        for index, token in enumerate(self.tokens):
+            if index:
+                await asyncio.sleep(self.token_ms / 1000.0)
+            yield _Chunk(token)
+
+
+async def _turn_blocking(client):
+    started = time.perf_counter()
+    response = await client.create(model="gpt-4o-mini", messages=[])
+    text = response.choices[0].message.content
+    SCORE_TAG_RE.search(text)
+    ready = (time.perf_counter() - started) * 1000
+    return ready, ready
+
+
+async def _turn_streaming(client, score_first):
+    started = time.perf_counter()
+    result = await stream_evaluation(client, [], score_first=score_first)
+    ready = (time.perf_counter() - started) * 1000
+    # Počkej na dočtení streamu na pozadí kvůli celkové latenci
+    while result['timings']['total_ms'] is None:
+        await asyncio.sleep(0.001)
+    return ready, result['timings']['total_ms']
+
+
+async def run(turns, first_token_ms, token_ms):
+    scenarios = (
+        ("před (bez streamu)", lambda: _turn_blocking(FakeStreamingClient(f"{FEEDBACK} {SCORE_TAG}", first_token_ms, token_ms))),
+        ("stream, skóre na konci", lambda: _turn_streaming(FakeStreamingClient(f"{FEEDBACK} {SCORE_TAG}", first_token_ms, token_ms), False)),
+        ("stream, skóre na začátku", lambda: _turn_streaming(FakeStreamingClient(f"{SCORE_TAG} {FEEDBACK}", first_token_ms, token_ms), True)),
+    )
+    for label, turn in scenarios:
+        ready, total = [], []
+        for _ in range(turns):
+            r, t = await turn()
+            ready.append(r)
+            total.append(t)
+        print(
+            f"{label:26s} time-to-first-TwiML={statistics.mean(ready):7.1f} ms  "
+            f"celkem LLM={statistics.mean(total):7.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=350.0, help="latence prvního tokenu")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="čas na každý další token")
+    args = parser.parse_args()
+
+    print(f"Tahy: {args.turns}, první token: {args.first_token_ms} ms, token: {args.token_ms} ms")
+    asyncio.run(run(args.turns, args.first_token_ms, args.token_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mikro-benchmark porovnávání klíčových slov a povelů v odpovědích.
+
+Porovnává původní implementace z main.py (vnořené smyčky klíčové slovo x slovo
+x synonymum, slovník synonym sestavovaný při každém volání, opakované
+`in` přes seznamy povelů) s Aho-Corasick automaty z app/services/text_matching.py,
+které se kompilují jednou a každou odpověď projdou jedním průchodem.
+
+Spuštění:
+    python benchmarks/bench_text_matching.py --iterations 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.answer_scoring import ANSWER_SYNONYMS, match_keywords  # noqa: E402
+from app.services.text_matching import PhraseMatcher  # noqa: E402
+
+# Klíčová slova jedné otázky a všech otázek lekce (automat se kompiluje pro každou sadu jednou)
+QUESTION_KEYWORDS = ["separátor", "skimmer"]
+LESSON_KEYWORDS = list(ANSWER_SYNONYMS) + ["filtr", "nádrž", "čerpadlo", "olej", "voda", "teplota"]
+
+ANSWERS = [
+    "separátorem",
+    "operátorem oleje a skimmerem",
+    "refraktometrem se měří koncentrace emulze",
+    "nevím",
+    "chlazením a mazáním, to je vše",
+    "olej se odsaje nějakým zařízením z povrchu nádrže a pak se to vyhodí",
+    "koncentr se měří refraktometrický",
+    "hotovo",
+]
+
+COMPLETION_PHRASES = [
+    'hotovo', 'konec', 'dokončeno', 'to je vše', 'to je všechno',
+    'stačí', 'už ne', 'už nechci', 'končím', 'finish', 'done'
+]
+
+
+def legacy_match_keywords(keywords, user_answer):
+    """Původní matching z log_answer_analysis (před zavedením automatu)."""
+    found_keywords = []
+    missing_keywords = []
+    for kw in keywords:
+        kw_lower = kw.lower()
+        answer_lower = user_answer.lower()
+        found_match = False
+        if kw_lower in answer_lower:
+            found_keywords.append(kw)
+            found_match = True
+        elif not found_match:
+            for word in answer_lower.split():
+                if kw_lower in word or word in kw_lower:
+                    found_keywords.append(f"{kw}({word})")
+                    found_match = True
+                    break
+        if not found_match:
+            synonyms = {
+                'chlazení': ['hlazení', 'chladění', 'ochlazování', 'chlazen', 'ochlazován'],
+                'mazání': ['mazaní', 'lubrication', 'lubrikace', 'mazan', 'mazán'],
+                'odvod': ['odvedení', 'odvádění', 'odváděn', 'odváděný'],
+                'refraktometr': ['refraktometric', 'refraktometrický', 'refraktometrů'],
+                'koncentrace': ['koncentrac', 'koncentraci', 'koncentrovat'],
+                'bakterie': ['bakterií', 'bakteriálního', 'mikroorganismy'],
+                'pH': ['ph', 'kyselost', 'kyselá', 'zásaditá'],
+                'emulze': ['emulzní', 'emulgovat', 'emulgovaný'],
+                'separátor': ['separátor oleje', 'separátorem', 'operátorem', 'operátor', 'reparátor', 'reparátorem'],
+                'odstranění': ['odstranit', 'odstraňuje', 'odstraněno', 'odstraňování'],
+                'skimmer': ['skimmerem', 'skimmeru', 'skimmer']
+            }
+            if kw_lower in synonyms:
+                for syn in synonyms[kw_lower]:
+                    if syn in answer_lower:
+                        found_keywords.append(f"{kw}({syn})")
+                        found_match = True
+                        break
+        if not found_match:
+            missing_keywords.append(kw)
+    return found_keywords, missing_keywords
+
+
+def legacy_is_completion_signal(speech_text):
+    """Původní is_completion_signal."""
+    if not speech_text:
+        return False
+    completion_signals = [
+        'hotovo', 'konec', 'dokončeno', 'to je vše', 'to je všechno',
+        'stačí', 'už ne', 'už nechci', 'končím', 'finish', 'done'
+    ]
+    speech_lower = speech_text.lower().strip()
+    return any(signal in speech_lower for signal in completion_signals)
+
+
+def _bench(label, func, answers, iterations, unique):
+    # unique=True: každá odpověď je jiná (bez přínosu cache normalizace)
+    inputs = [f"{answers[i % len(answers)]} {i}" if unique else answers[i % len(answers)] for i in range(iterations)]
+    started = time.perf_counter()
+    for text in inputs:
+        func(text)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:44s} {elapsed / iterations * 1e6:8.2f} µs/odpověď")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    answers = list(ANSWERS)
+    random.Random(args.seed).shuffle(answers)
+    completion = PhraseMatcher(COMPLETION_PHRASES)
+
+    print(f"Odpovědi: {len(answers)}, iterace: {args.iterations}")
+    for unique in (False, True):
+        print("Unikátní odpovědi:" if unique else "Opakované odpovědi:")
+        for name, keywords in (("otázka", QUESTION_KEYWORDS), ("lekce", LESSON_KEYWORDS)):
+            _bench(f"{name} ({len(keywords)} kl. slov) - před",
+                   lambda a, kw=keywords: legacy_match_keywords(kw, a), answers, args.iterations, unique)
+            _bench(f"{name} ({len(keywords)} kl. slov) - po (Aho-Corasick)",
+                   lambda a, kw=keywords: match_keywords(kw, a), answers, args.iterations, unique)
+        _bench("signál dokončení - před (seznam + in)", legacy_is_completion_signal, answers, args.iterations, unique)
+        _bench("signál dokončení - po (Aho-Corasick)", completion.contains_any, answers, args.iterations, unique)
+
+
+if __name__ == "__main__":
+    main()
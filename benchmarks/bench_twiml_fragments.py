@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mikro-benchmark sestavení TwiML odpovědi hlasového tahu.
+
+Porovnává sestavení stromu VoiceResponse v každém requestu (původní stav
+v process_speech) se skládáním řetězců z předrenderovaných fragmentů
+(app/services/twiml_fragments.py). Oba způsoby musí dát identické TwiML.
+
+Spuštění:
+    python benchmarks/bench_twiml_fragments.py --iterations 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from twilio.twiml.voice_response import VoiceResponse  # noqa: E402
+
+from app.services.twiml_fragments import (  # noqa: E402
+    TURN_PLACEHOLDER, VOICE_PROCESS_URL, TwiMLResponse, twiml_fragments
+)
+
+TURN = "a1b2c3d4e5f6"
+FEEDBACK = "Chybí: skimmer. Další otázka ⭐⭐: Jak se měří koncentrace emulze?"
+
+
+def build_voice_response():
+    """Původní sestavení (pokračování vstupního testu) - strom VoiceResponse."""
+    response = VoiceResponse()
+    response.say(FEEDBACK, language="cs-CZ", rate="0.8")
+    gather = response.gather(
+        input='speech', timeout=15, speech_timeout=4, action=VOICE_PROCESS_URL.replace(TURN_PLACEHOLDER, TURN), method='POST',
+        language='cs-CZ', speech_model='phone_call', enhanced='true'
+    )
+    gather.say("Píp.", language="cs-CZ", rate="0.8", voice="Google.cs-CZ-Standard-A")
+    response.say(
+        "Nerozuměl jsem vaší odpovědi. Zkuste mluvit jasně nebo řekněte 'konec' pro ukončení.",
+        language="cs-CZ", rate="0.8", voice="Google.cs-CZ-Standard-A"
+    )
+    response.redirect(VOICE_PROCESS_URL.replace(TURN_PLACEHOLDER, TURN) + '&reminder=true')
+    return str(response)
+
+
+def build_fragments():
+    """Nové sestavení - dynamický text + předrenderované fragmenty."""
+    response = TwiMLResponse(turn=TURN)
+    response.say(FEEDBACK, language="cs-CZ", rate="0.8")
+    response.fragment("beep_gather")
+    response.fragment("fallback_redirect")
+    return str(response)
+
+
+def _bench(label, func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:32s} {elapsed / iterations * 1e6:8.2f} µs/odpověď")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    twiml_fragments.warm_up()
+    assert build_voice_response() == build_fragments(), "TwiML se liší"
+
+    print(f"Iterace: {args.iterations}")
+    _bench("před (VoiceResponse strom)", build_voice_response, args.iterations)
+    _bench("po (předrenderované fragmenty)", build_fragments, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark režie měření latence hlasového tahu (app/services/voice_metrics.py).
+
+Simuluje instrumentaci jednoho tahu /voice/process (turn + fáze form_parse,
+call_state, local_scoring, plan, evaluation_wait, llm_first_token, llm_ready,
+save_answer, twiml_render) bez vlastní práce a porovná čas s typickou
+délkou tahu. Cíl: režie pod 1 % doby tahu.
+
+Spuštění:
+    python benchmarks/bench_voice_metrics.py --turns 50000 --turn-ms 300
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.voice_metrics import VoiceMetrics  # noqa: E402
+
+SPANS = ("form_parse", "call_state", "local_scoring", "plan", "evaluation_wait", "save_answer", "twiml_render")
+
+
+def _instrumented_turn(metrics, call_sid):
+    with metrics.turn("voice_process"):
+        metrics.tag_turn(call_sid=call_sid)
+        for stage in SPANS[:2]:
+            with metrics.span(stage):
+                pass
+        metrics.tag_turn(lesson=0)
+        for stage in SPANS[2:]:
+            with metrics.span(stage):
+                pass
+        metrics.observe("llm_first_token", 350.0)
+        metrics.observe("llm_ready", 420.0)
+
+
+def _bench(metrics, turns):
+    started = time.perf_counter()
+    for index in range(turns):
+        _instrumented_turn(metrics, f"CA{index % 500}")
+    return (time.perf_counter() - started) / turns * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50000)
+    parser.add_argument("--turn-ms", type=float, default=300.0, help="typická doba tahu (LLM + DB)")
+    args = parser.parse_args()
+
+    enabled_us = _bench(VoiceMetrics(enabled=True), args.turns)
+    disabled_us = _bench(VoiceMetrics(enabled=False), args.turns)
+    overhead_us = enabled_us - disabled_us
+
+    print(f"Tahy: {args.turns}, fáze na tah: {len(SPANS) + 3}")
+    print(f"měření vypnuto   {disabled_us:7.2f} µs/tah")
+    print(f"měření zapnuto   {enabled_us:7.2f} µs/tah")
+    print(f"režie            {overhead_us:7.2f} µs/tah = {overhead_us / (args.turn_ms * 1000) * 100:.4f} % tahu {args.turn_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark latence hlasového tahu (/voice/process) při souběžných volajících.
+
+Porovnává původní variantu (synchronní `client.chat.completions.create`
+volaný uvnitř async handleru - blokuje event loop) se sdíleným
+AsyncOpenAI klientem (await). LLM je simulováno s náhodnou latencí,
+takže benchmark nepotřebuje API klíč ani síť.
+
+Spuštění:
+    python benchmarks/bench_voice_turn_latency.py --callers 50 --turns 4
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+
+class _FakeCompletion:
+    def __init__(self, content):
+        self.choices = [type("Choice", (), {"message": type("Msg", (), {"content": content})()})()]
+
+
+def _llm_latency(rng, base_ms, slow_ratio):
+    """Latence LLM - většina tahů rychlých, malá část pomalých (ocas rozdělení)."""
+    latency = rng.lognormvariate(0, 0.35) * base_ms
+    if rng.random() < slow_ratio:
+        latency *= 5
+    return latency / 1000.0
+
+
+class SyncFakeClient:
+    """Chová se jako openai.OpenAI - volání blokuje vlákno (a tedy event loop)."""
+
+    def __init__(self, rng, base_ms, slow_ratio):
+        self.rng = rng
+        self.base_ms = base_ms
+        self.slow_ratio = slow_ratio
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        time.sleep(_llm_latency(self.rng, self.base_ms, self.slow_ratio))
+        return _FakeCompletion("Výborně, úplná odpověď! [SKÓRE: 100%]")
+
+
+class AsyncFakeClient(SyncFakeClient):
+    """Chová se jako sdílený AsyncOpenAI - volání se awaituje."""
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(_llm_latency(self.rng, self.base_ms, self.slow_ratio))
+        return _FakeCompletion("Výborně, úplná odpověď! [SKÓRE: 100%]")
+
+
+async def _turn(client, is_async):
+    # Zjednodušený tah: parsování formuláře + volání LLM + sestavení TwiML
+    if is_async:
+        response = await client.chat.completions.create(model="gpt-4o-mini", messages=[])
+    else:
+        response = client.chat.completions.create(model="gpt-4o-mini", messages=[])
+    return response.choices[0].message.content
+
+
+async def _caller(client, is_async, turns, think_ms, latencies, rng):
+    for _ in range(turns):
+        # Latence se měří od okamžiku, kdy webhook "dorazil" (konec pauzy),
+        # takže zahrnuje i čekání na zablokovaný event loop.
+        think = rng.uniform(0, think_ms) / 1000.0
+        arrival = time.perf_counter() + think
+        await asyncio.sleep(think)
+        await _turn(client, is_async)
+        latencies.append((time.perf_counter() - arrival) * 1000.0)
+
+
+async def run_scenario(is_async, callers, turns, base_ms, slow_ratio, think_ms, seed):
+    rng = random.Random(seed)
+    client = AsyncFakeClient(rng, base_ms, slow_ratio) if is_async else SyncFakeClient(rng, base_ms, slow_ratio)
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _caller(client, is_async, turns, think_ms, latencies, random.Random(seed + i))
+        for i in range(callers)
+    ])
+    wall = time.perf_counter() - started
+    return latencies, wall
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--llm-ms", type=float, default=40.0, help="medián simulované latence LLM")
+    parser.add_argument("--slow-ratio", type=float, default=0.05, help="podíl pomalých odpovědí (5x)")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="max. pauza volajícího mezi tahy")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"Volající: {args.callers}, tahy: {args.turns}, LLM medián: {args.llm_ms} ms")
+    for label, is_async in (("před (sync klient)", False), ("po (AsyncOpenAI pool)", True)):
+        latencies, wall = asyncio.run(run_scenario(
+            is_async, args.callers, args.turns, args.llm_ms, args.slow_ratio, args.think_ms, args.seed
+        ))
+        print(
+            f"{label:24s} p50={_percentile(latencies, 50):8.1f} ms  "
+            f"p99={_percentile(latencies, 99):8.1f} ms  "
+            f"mean={statistics.mean(latencies):8.1f} ms  wall={wall:6.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lokální náhrada OpenAI API pro přehrávání Media Streamů (deterministická, bez sítě).
+
+Obsluhuje to, co volá hlasová cesta aplikace:
+- /audio: Whisper (audio/transcriptions), Assistants (assistants, threads,
+  messages, runs se streamováním přes SSE, cancel) a TTS (audio/speech, WAV)
+- /voice/media-stream: Realtime API přes WebSocket (/v1/realtime) - řeč
+  v příchozím audiu hledá stejný VoiceActivityDetector jako /audio a po
+  konci promluvy pošle odpověď jako response.audio.delta (μ-law 8 kHz)
+
+Latence jsou pevné (parametry), takže opakované běhy dávají srovnatelná čísla.
+Aplikaci stačí pustit s proměnnými prostředí, které skript vypíše po startu.
+
+Spuštění:
+    python benchmarks/openai_standin.py --port 9100 --stt-ms 300 --llm-ms 400 --tts-ms 200
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from aiohttp import web, WSMsgType
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.audio_codec import ulaw_encode  # noqa: E402
+from app.services.audio_framing import PCM_FORMAT, build_wav  # noqa: E402
+from app.services.media_events import decode_payload, loads  # noqa: E402
+from app.services.vad import VoiceActivityDetector  # noqa: E402
+
+TRANSCRIPT = "Můžete mi prosím vysvětlit tu poslední část lekce?"
+ANSWER = ("Jistě, rád vám to vysvětlím. Poslední část lekce se týká bezpečnosti práce. "
+          "Vždy si nejdřív zkontrolujte ochranné pomůcky. Máte k tomu ještě nějakou otázku?")
+
+
+def tone_pcm(seconds: float, sample_rate: int, frequency: float = 220.0) -> np.ndarray:
+    """Tichý tón místo řeči (16 bit)"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (np.sin(2 * math.pi * frequency * t) * 3000).astype('<i2')
+
+
+class OpenAIStandIn:
+    def __init__(self, stt_ms: float = 300, llm_ms: float = 400, token_ms: float = 30,
+                 tts_ms: float = 200, tts_ms_per_char: float = 60, realtime_first_ms: float = 300,
+                 answer_ms: float = 3000, realtime_speed: float = 4.0):
+        self.stt_ms = stt_ms
+        self.llm_ms = llm_ms
+        self.token_ms = token_ms
+        self.tts_ms = tts_ms
+        self.tts_ms_per_char = tts_ms_per_char
+        self.realtime_first_ms = realtime_first_ms
+        self.answer_ms = answer_ms
+        self.realtime_speed = realtime_speed
+        self._ids = itertools.count(1)
+        self.assistants = []
+        self.requests = {}
+        self.realtime_sessions = 0
+        self.realtime_responses = 0
+        self.realtime_cancelled = 0
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/v1/realtime", self.realtime)
+        app.router.add_post("/v1/audio/transcriptions", self.transcriptions)
+        app.router.add_post("/v1/audio/speech", self.speech)
+        app.router.add_get("/v1/assistants", self.list_assistants)
+        app.router.add_post("/v1/assistants", self.create_assistant)
+        app.router.add_get("/v1/assistants/{assistant_id}", self.get_assistant)
+        app.router.add_post("/v1/threads", self.create_thread)
+        app.router.add_delete("/v1/threads/{thread_id}", self.delete_thread)
+        app.router.add_post("/v1/threads/{thread_id}/messages", self.create_message)
+        app.router.add_post("/v1/threads/{thread_id}/runs", self.create_run)
+        app.router.add_post("/v1/threads/{thread_id}/runs/{run_id}/cancel", self.cancel_run)
+        app.router.add_get("/standin/stats", self.stats)
+        return app
+
+    def _id(self, prefix: str) -> str:
+        return f"{prefix}_standin{next(self._ids)}"
+
+    def _count(self, name: str) -> None:
+        self.requests[name] = self.requests.get(name, 0) + 1
+
+    async def stats(self, request):
+        return web.json_response({
+            'requests': self.requests,
+            'realtime_sessions': self.realtime_sessions,
+            'realtime_responses': self.realtime_responses,
+            'realtime_cancelled': self.realtime_cancelled
+        })
+
+    # --- Whisper a TTS ---
+
+    async def transcriptions(self, request):
+        self._count("transcriptions")
+        await request.read()
+        await asyncio.sleep(self.stt_ms / 1000)
+        return web.json_response({"text": TRANSCRIPT})
+
+    async def speech(self, request):
+        self._count("speech")
+        body = await request.json()
+        await asyncio.sleep(self.tts_ms / 1000)
+        seconds = len(body.get("input", "")) * self.tts_ms_per_char / 1000
+        wav = build_wav(tone_pcm(seconds, 24000).tobytes(), PCM_FORMAT, 1, 24000, 16)
+        return web.Response(body=bytes(wav), content_type="audio/wav")
+
+    # --- Assistants ---
+
+    async def list_assistants(self, request):
+        self._count("assistants.list")
+        return web.json_response({"object": "list", "data": self.assistants, "has_more": False,
+                                  "first_id": None, "last_id": None})
+
+    async def create_assistant(self, request):
+        self._count("assistants.create")
+        body = await request.json()
+        assistant = {"id": self._id("asst"), "object": "assistant", "created_at": int(time.time()),
+                     "name": body.get("name"), "model": body.get("model"), "instructions": body.get("instructions"),
+                     "tools": [], "metadata": body.get("metadata") or {}}
+        self.assistants.insert(0, assistant)
+        return web.json_response(assistant)
+
+    async def get_assistant(self, request):
+        for assistant in self.assistants:
+            if assistant["id"] == request.match_info["assistant_id"]:
+                return web.json_response(assistant)
+        return web.json_response({"error": {"message": "No assistant found"}}, status=404)
+
+    async def create_thread(self, request):
+        self._count("threads.create")
+        return web.json_response({"id": self._id("thread"), "object": "thread",
+                                  "created_at": int(time.time()), "metadata": {}})
+
+    async def delete_thread(self, request):
+        self._count("threads.delete")
+        return web.json_response({"id": request.match_info["thread_id"], "object": "thread.deleted", "deleted": True})
+
+    async def create_message(self, request):
+        self._count("messages.create")
+        body = await request.json()
+        return web.json_response(self._message(request.match_info["thread_id"], "user", body.get("content", "")))
+
+    def _message(self, thread_id: str, role: str, text: str, run_id: str = None, message_id: str = None):
+        content = [{"type": "text", "text": {"value": text, "annotations": []}}] if text else []
+        return {"id": message_id or self._id("msg"), "object": "thread.message", "created_at": int(time.time()),
+                "thread_id": thread_id, "role": role, "content": content, "run_id": run_id,
+                "assistant_id": None, "attachments": [], "metadata": {},
+                "status": "completed" if text else "in_progress"}
+
+    def _run(self, thread_id: str, assistant_id: str, run_id: str, status: str):
+        return {"id": run_id, "object": "thread.run", "created_at": int(time.time()), "thread_id": thread_id,
+                "assistant_id": assistant_id, "status": status, "model": "standin", "instructions": "",
+                "tools": [], "metadata": {}}
+
+    async def create_run(self, request):
+        self._count("runs.stream")
+        thread_id = request.match_info["thread_id"]
+        body = await request.json()
+        run_id = self._id("run")
+        message_id = self._id("msg")
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def event(name, data):
+            await response.write(f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+        try:
+            run = self._run(thread_id, body.get("assistant_id"), run_id, "queued")
+            await event("thread.run.created", run)
+            await asyncio.sleep(self.llm_ms / 1000)
+            await event("thread.message.created", self._message(thread_id, "assistant", "", run_id, message_id))
+            for word in ANSWER.split(" "):
+                await event("thread.message.delta", {
+                    "id": message_id, "object": "thread.message.delta",
+                    "delta": {"content": [{"index": 0, "type": "text", "text": {"value": word + " "}}]}
+                })
+                await asyncio.sleep(self.token_ms / 1000)
+            await event("thread.message.completed", self._message(thread_id, "assistant", ANSWER, run_id, message_id))
+            await event("thread.run.completed", {**run, "status": "completed"})
+            await response.write(b"event: done\ndata: [DONE]\n\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass  # Klient stream zavřel (barge-in)
+        return response
+
+    async def cancel_run(self, request):
+        self._count("runs.cancel")
+        return web.json_response(self._run(request.match_info["thread_id"], None,
+                                           request.match_info["run_id"], "cancelling"))
+
+    # --- Realtime API ---
+
+    async def realtime(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self.realtime_sessions += 1
+        vad = VoiceActivityDetector()
+        responding = None
+
+        async def send(event):
+            await ws.send_str(json.dumps(event))
+
+        async def respond():
+            response_id = self._id("resp")
+            await asyncio.sleep(self.realtime_first_ms / 1000)
+            await send({"type": "response.created", "response": {"id": response_id}})
+            self.realtime_responses += 1
+            audio = ulaw_encode(tone_pcm(self.answer_ms / 1000, 8000))
+            chunk = 1600  # 200 ms
+            for offset in range(0, len(audio), chunk):
+                payload = audio[offset:offset + chunk]
+                await send({"type": "response.audio.delta", "response_id": response_id,
+                            "delta": base64.b64encode(payload).decode('ascii')})
+                await asyncio.sleep(len(payload) / 8000 / self.realtime_speed)
+            await send({"type": "response.done", "response": {"id": response_id, "status": "completed"}})
+
+        def cancel_response() -> None:
+            nonlocal responding
+            if responding is not None and not responding.done():
+                responding.cancel()
+                self.realtime_cancelled += 1
+            responding = None
+
+        await send({"type": "session.created", "session": {"id": self._id("sess")}})
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                event = loads(message.data)
+                event_type = event.get("type")
+                if event_type == "input_audio_buffer.append":
+                    was_speaking = vad.in_speech
+                    utterances = vad.feed(decode_payload(event["audio"]))
+                    if vad.in_speech and not was_speaking:
+                        await send({"type": "input_audio_buffer.speech_started"})
+                    for _ in utterances:
+                        await send({"type": "input_audio_buffer.speech_stopped"})
+                        cancel_response()
+                        responding = asyncio.create_task(respond())
+                elif event_type == "response.cancel":
+                    cancel_response()
+                elif event_type == "response.create":
+                    cancel_response()
+                    responding = asyncio.create_task(respond())
+        finally:
+            cancel_response()
+        return ws
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--stt-ms", type=float, default=300, help="latence Whisperu")
+    parser.add_argument("--llm-ms", type=float, default=400, help="latence prvního tokenu Assistanta")
+    parser.add_argument("--token-ms", type=float, default=30, help="odstup dalších slov odpovědi")
+    parser.add_argument("--tts-ms", type=float, default=200, help="latence TTS")
+    parser.add_argument("--realtime-first-ms", type=float, default=300, help="Realtime: konec řeči -> první audio")
+    parser.add_argument("--answer-ms", type=float, default=3000, help="Realtime: délka odpovědi")
+    args = parser.parse_args()
+
+    standin = OpenAIStandIn(stt_ms=args.stt_ms, llm_ms=args.llm_ms, token_ms=args.token_ms, tts_ms=args.tts_ms,
+                            realtime_first_ms=args.realtime_first_ms, answer_ms=args.answer_ms)
+    base = f"{args.host}:{args.port}"
+    print("Aplikaci spusťte s:")
+    print(f"  OPENAI_API_KEY=standin OPENAI_BASE_URL=http://{base}/v1 "
+          f"OPENAI_REALTIME_URL='ws://{base}/v1/realtime?model=' uvicorn main:app --port 8000")
+    web.run_app(standin.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Přehrání nahraného Media Streamu (.twrec) proti lokálně běžící aplikaci.
+
+Klient se chová jako Twilio: pošle příchozí zprávy z nahrávky (start,
+media rámce, stop) ve stejném časování zrychleném --speed krát (0 = co
+nejrychleji), na "mark" od serveru odpoví, až by Twilio odchozí audio
+přehrálo, a "clear" zahodí nepřehrané značky. --streams pustí několik
+kopií nahrávky najednou (každá s vlastním streamSid) jako zátěžový test.
+
+Latence odpovědi se měří od okamžiku, kdy VoiceActivityDetector (stejný
+jako v /audio) v odeslaném audiu uzavře promluvu, do prvního odchozího
+media rámce ze serveru. Zpoždění odesílání ukazuje, jestli klient nebo
+server nestíhá tempo nahrávky.
+
+Nahrávka vznikne v aplikaci parametrem record=1 v URL streamu, přes
+POST /admin/media-streams/record?call_sid=... nebo MEDIA_RECORD_ALL=1
+(soubory v MEDIA_RECORD_DIR, výchozí instance/recordings). OpenAI
+nahrazuje benchmarks/openai_standin.py.
+
+Spuštění:
+    python benchmarks/openai_standin.py --port 9100 &
+    python benchmarks/replay_media_stream.py nahravka.twrec --url ws://127.0.0.1:8000/audio --speed 10 --streams 20
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+
+import websockets
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.media_events import loads, parse_media  # noqa: E402
+from app.services.stream_recorder import read_recording  # noqa: E402
+from app.services.vad import VoiceActivityDetector  # noqa: E402
+
+FRAME_SECONDS = 0.02
+
+
+def inbound_messages(messages, stream_sid: str):
+    """(čas v nahrávce, text) příchozích zpráv s novým streamSid; echo značek se vynechá - ty posílá klient sám"""
+    sid = json.dumps(stream_sid)
+    sequence = chunk = 0
+    result = []
+    has_stop = False
+    for message in messages:
+        if not message.inbound:
+            continue
+        sequence += 1
+        if message.is_media:
+            chunk += 1
+            text = ('{"event":"media","sequenceNumber":"' + str(sequence) + '","media":{"track":"inbound","chunk":"'
+                    + str(chunk) + '","timestamp":"' + str(round(message.offset * 1000)) + '","payload":"'
+                    + base64.b64encode(message.data).decode('ascii') + '"},"streamSid":' + sid + '}')
+            result.append((message.offset, text, message.data))
+            continue
+        event = loads(message.data)
+        if event.get("event") == "mark":
+            continue
+        if "streamSid" in event:
+            event["streamSid"] = stream_sid
+        if isinstance(event.get("start"), dict) and "streamSid" in event["start"]:
+            event["start"]["streamSid"] = stream_sid
+        if "sequenceNumber" in event:
+            event["sequenceNumber"] = str(sequence)
+        has_stop = has_stop or event.get("event") == "stop"
+        result.append((message.offset, json.dumps(event), None))
+    if not has_stop:
+        last = result[-1][0] if result else 0.0
+        result.append((last, json.dumps({"event": "stop", "streamSid": stream_sid}), None))
+    return result
+
+
+class ReplayStream:
+    def __init__(self, index: int, url: str, messages, speed: float, tail: float):
+        self.stream_sid = f"MZreplay{index:06d}"
+        self.url = url
+        self.speed = speed
+        self.tail = tail
+        self.inbound = inbound_messages(messages, self.stream_sid)
+        self.vad = VoiceActivityDetector()
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.marks_echoed = 0
+        self.clears = 0
+        self.latencies = []
+        self.send_lags = []
+        self.error = None
+        self._utterance_end = None
+        self._play_until = 0.0
+        self._marks = {}
+
+    async def run(self) -> None:
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                reader = asyncio.create_task(self._read(ws))
+                try:
+                    await self._send(ws)
+                    # Server může po stop ještě dopřehrávat odpověď
+                    await asyncio.wait({reader}, timeout=self.tail)
+                finally:
+                    reader.cancel()
+                    for task in self._marks.values():
+                        task.cancel()
+        except Exception as e:
+            self.error = repr(e)
+
+    async def _send(self, ws) -> None:
+        started = time.perf_counter()
+        for offset, text, audio in self.inbound:
+            if self.speed > 0:
+                delay = started + offset / self.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.send_lags.append(-delay)
+            await ws.send(text)
+            if audio is not None:
+                self.frames_sent += 1
+                if self.vad.feed(audio):
+                    self._utterance_end = time.perf_counter()
+
+    async def _read(self, ws) -> None:
+        async for text in ws:
+            now = time.perf_counter()
+            media = parse_media(text)
+            if media is not None:
+                if not media[1]:
+                    continue  # Keepalive
+                self.frames_received += 1
+                if self._utterance_end is not None:
+                    self.latencies.append(now - self._utterance_end)
+                    self._utterance_end = None
+                if self.speed > 0:
+                    self._play_until = max(self._play_until, now) + FRAME_SECONDS / self.speed
+                continue
+            event = loads(text)
+            if event.get("event") == "mark":
+                name = event.get("mark", {}).get("name", "")
+                self._marks[name] = asyncio.create_task(self._echo_mark(ws, name, max(0.0, self._play_until - now)))
+            elif event.get("event") == "clear":
+                self.clears += 1
+                self._play_until = now
+                for name, task in list(self._marks.items()):
+                    task.cancel()
+                    await self._send_mark(ws, name)
+
+    async def _echo_mark(self, ws, name: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._send_mark(ws, name)
+
+    async def _send_mark(self, ws, name: str) -> None:
+        self._marks.pop(name, None)
+        try:
+            await ws.send(json.dumps({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}}))
+            self.marks_echoed += 1
+        except websockets.ConnectionClosed:
+            pass
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _ms(value):
+    return "-" if value is None else f"{value * 1000:.0f} ms"
+
+
+async def replay(path: str, url: str, speed: float, streams: int, stagger: float, tail: float) -> None:
+    metadata, messages = read_recording(path)
+    recorded_in = sum(1 for message in messages if message.inbound and message.is_media)
+    recorded_out = sum(1 for message in messages if not message.inbound and message.is_media)
+    duration = messages[-1].offset if messages else 0.0
+    print(f"Nahrávka: {metadata.get('endpoint')} {metadata.get('stream_sid')} ({duration:.1f} s, "
+          f"{recorded_in} rámců dovnitř, {recorded_out} ven)")
+    print(f"Přehrávám na {url}: {streams}× souběžně, rychlost {'max' if speed <= 0 else f'{speed:g}×'}")
+
+    replays = [ReplayStream(index, url, messages, speed, tail) for index in range(streams)]
+
+    async def start(replay_stream, delay):
+        await asyncio.sleep(delay)
+        await replay_stream.run()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(start(stream, index * stagger) for index, stream in enumerate(replays)))
+    elapsed = time.perf_counter() - started
+
+    failed = [stream for stream in replays if stream.error]
+    latencies = [latency for stream in replays for latency in stream.latencies]
+    lags = [lag for stream in replays for lag in stream.send_lags]
+    print(f"Hotovo za {elapsed:.1f} s, chyby: {len(failed)}")
+    for stream in failed[:5]:
+        print(f"  {stream.stream_sid}: {stream.error}")
+    print(f"Rámců odesláno: {sum(s.frames_sent for s in replays)}, přijato: {sum(s.frames_received for s in replays)}, "
+          f"značek: {sum(s.marks_echoed for s in replays)}, clear: {sum(s.clears for s in replays)}")
+    print(f"Latence odpovědi ({len(latencies)} promluv): p50 {_ms(_percentile(latencies, 0.5))}, "
+          f"p95 {_ms(_percentile(latencies, 0.95))}, max {_ms(max(latencies) if latencies else None)}")
+    if speed > 0:
+        print(f"Zpoždění odesílání: p95 {_ms(_percentile(lags, 0.95) if lags else 0.0)}, "
+              f"max {_ms(max(lags) if lags else 0.0)}, "
+              f"průměr {_ms(statistics.mean(lags) if lags else 0.0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="soubor .twrec")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/audio", help="/audio nebo /voice/media-stream")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = reálný čas, 10 = 10× rychleji, 0 = max")
+    parser.add_argument("--streams", type=int, default=1, help="souběžných kopií nahrávky")
+    parser.add_argument("--stagger", type=float, default=0.05, help="odstup startů streamů (s)")
+    parser.add_argument("--tail", type=float, default=5.0, help="jak dlouho po stop čekat na odpověď serveru (s)")
+    args = parser.parse_args()
+    asyncio.run(replay(args.recording, args.url, args.speed, args.streams, args.stagger, args.tail))
+
+
+if __name__ == "__main__":
+    main()
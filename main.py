@@ -15,6 +15,7 @@ from fastapi import Query
 from fastapi.templating import Jinja2Templates
 from fastapi import APIRouter, Form, status, Depends
 from starlette.requests import Request
+from starlette.websockets import WebSocketState
 from typing import Optional
 from fastapi import Path
 # EARLY DEBUG: Test endpoint at the very beginning
@@ -31,9 +32,9 @@ import json
 import io
 import openai
 # Audio zpracování
-import audioop
 import wave
 import asyncio
+import operator
 import time
 import tempfile
 from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, Float, ForeignKey, text
@@ -41,6 +42,35 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.orm.attributes import flag_modified
 from fastapi.staticfiles import StaticFiles
 from admin_dashboard import DashboardStats
+from app.services.openai_pool import openai_pool, get_async_openai_client
+from app.services.call_state import CallState, call_state_cache, apply_answer, answer_update_values
+from app.services.answer_scoring import LocalAnswerScorer, match_keywords, build_agreement_report
+from app.services.evaluation_cache import evaluation_cache
+from app.services.text_matching import PhraseMatcher
+from app.services.streaming_evaluation import stream_evaluation
+from app.services.twiml_fragments import TwiMLResponse, twiml_fragments, VOICE_PROCESS_URL
+from app.services.voice_metrics import voice_metrics
+from app.services.vad import VoiceActivityDetector
+from app.services.audio_framing import wav_file
+from app.services.audio_codec import wav_to_mulaw as wav_bytes_to_mulaw
+from app.services.tts_cache import (
+    tts_cache, synthesize_mulaw, CALL_START_PROMPTS, FORMAT_WAV
+)
+from app.services.audio_sender import audio_senders
+from app.services.assistant_registry import assistant_registry
+from app.services.assistant_stream import stream_run_sentences
+from app.services.tts_pipeline import TTSPipeline
+from app.services.turn_controller import TurnController
+from app.services.stream_supervisor import StreamSupervisor, stream_supervisors
+from app.services.realtime_service import OpenAIRealtimeService, RealtimeMediaBridge
+from app.services.connection_manager import connection_manager, CLOSE_TRY_AGAIN_LATER
+from app.services.media_events import parse_media, decode_payload, loads as loads_event, TRACK_INBOUND
+from app.services.webhook_idempotency import (
+    TWILIO_IDEMPOTENCY_HEADER, CachedResponse, webhook_idempotency, webhook_idempotency_key
+)
+from app.services.adaptive_planner import (
+    NextQuestionPlan, next_question_prompt, plan_next_question
+)
 
 load_dotenv()
 
@@ -97,8 +127,58 @@ async def startup_event():
     except Exception as e:
         print(f"❌ Database initialization failed: {e}")
     
+    # Sdílený AsyncOpenAI klient s keep-alive spojeními pro hlasové tahy
+    try:
+        openai_pool.start()
+    except Exception as e:
+        print(f"⚠️  OpenAI client pool init failed: {e}")
+    
+    # Předrenderované TwiML fragmenty pro hlasové webhooky
+    try:
+        twiml_fragments.warm_up()
+    except Exception as e:
+        print(f"⚠️  TwiML fragments warm-up failed: {e}")
+    
+    # Úvodní hlášky Media Streamu v TTS cache (na pozadí - z disku hned, jinak syntéza)
+    try:
+        asyncio.create_task(warm_up_call_start_tts())
+    except Exception as e:
+        print(f"⚠️  TTS cache warm-up failed: {e}")
+    
+    # Sdílený Assistant a zásoba threadů pro /audio (na pozadí)
+    try:
+        asyncio.create_task(warm_up_assistant_registry())
+    except Exception as e:
+        print(f"⚠️  Assistant registry warm-up failed: {e}")
+    
     print("=== STARTUP COMPLETE ===")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Živé hovory nechat doběhnout (nasazení je neuřízne), pak zastavit heartbeat
+    await connection_manager.drain()
+    await connection_manager.close()
+    await openai_pool.close()
+    await assistant_registry.close()
+    await evaluation_cache.flush()
+
+async def warm_up_call_start_tts():
+    """Předsyntetizuje hlášky ze začátku hovoru na /audio"""
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+    if not openai_api_key:
+        return
+    client = openai.OpenAI(api_key=openai_api_key)
+    await tts_cache.warm_up(CALL_START_PROMPTS, lambda text: asyncio.to_thread(synthesize_mulaw, client, text))
+
+async def warm_up_assistant_registry():
+    """Dohledá sdíleného asistenta a předvytvoří thready pro první hovory na /audio"""
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+    if not openai_api_key:
+        return
+    client = openai.OpenAI(api_key=openai_api_key)
+    result = await assistant_registry.warm_up(client)
+    logger.info(f"✅ Assistant registry připraven: {result}")
+
 async def test_connections_async():
     """Asynchronní test připojení - nesmí blokovat startup"""
     await asyncio.sleep(1)  # Dej čas na startup
@@ -448,6 +528,7 @@ def admin_advance_user(user_id: int = Path(...)):
                 # Pokračuj bez progress záznamu
             
             session.commit()
+            call_state_cache.invalidate_user(user.id)
             logger.info(f"Uživatel {user.name} manuálně posunut na lekci {user.current_lesson_level}")
         
     except Exception as e:
@@ -476,6 +557,7 @@ def admin_reset_test(user_id: int = Path(...)):
             test_session.completed_at = datetime.utcnow()
         
         session.commit()
+        call_state_cache.invalidate_user(user_id)
         logger.info(f"🔄 Admin resetoval test sessions pro uživatele {user_id}")
         return RedirectResponse(url="/admin/users", status_code=302)
     finally:
@@ -952,6 +1034,18 @@ async def admin_edit_lesson_post(request: Request, id: int = Path(...)):
             lesson.description = description
             lesson.level = level
             
+            # Prahy lokálního hodnocení (prázdné pole = výchozí hodnota)
+            scoring_thresholds = {}
+            for field, cast in (("full_coverage", float), ("zero_coverage", float), ("zero_max_words", int)):
+                raw_value = form_data.get(f"scoring_{field}", "").strip()
+                if raw_value:
+                    try:
+                        scoring_thresholds[field] = cast(raw_value)
+                    except ValueError:
+                        logger.warning(f"Neplatná hodnota prahu {field}: {raw_value}")
+            scoring_thresholds["enabled"] = form_data.get("scoring_enabled") == "on"
+            lesson.scoring_thresholds = scoring_thresholds
+            
             # Aktualizuj enabled stav otázek
             if lesson.questions and isinstance(lesson.questions, list):
                 logger.info(f"🔍 DEBUG: Aktualizuji {len(lesson.questions)} otázek")
@@ -969,6 +1063,8 @@ async def admin_edit_lesson_post(request: Request, id: int = Path(...)):
             
             session.commit()
             logger.info(f"✅ Lekce {lesson.id} aktualizována: {len(enabled_questions)} aktivních otázek")
+            call_state_cache.invalidate_lesson(lesson.id)
+            evaluation_cache.invalidate_lesson(lesson.id)
             session.close()
             return RedirectResponse(url="/admin/lessons", status_code=status.HTTP_302_FOUND)
         
@@ -1040,6 +1136,8 @@ async def admin_edit_lesson_post(request: Request, id: int = Path(...)):
         
         session.commit()
         logger.info(f"✅ Lekce {lesson.id} aktualizována: číslo={lesson_number_int}, typ={lesson_type}")
+        call_state_cache.invalidate_lesson(lesson.id)
+        evaluation_cache.invalidate_lesson(lesson.id)
         
     except Exception as e:
         session.rollback()
@@ -1244,6 +1342,100 @@ def admin_debug_env():
     }
     return debug_info
 
+@admin_router.get("/debug/call-state", response_class=JSONResponse)
+def admin_debug_call_state():
+    """Hit/miss statistiky cache stavu hovorů"""
+    return call_state_cache.stats()
+
+@admin_router.get("/debug/webhook-idempotency", response_class=JSONResponse)
+def admin_debug_webhook_idempotency():
+    """Počty zpracovaných a přehraných (duplicitních) Twilio webhooků"""
+    return webhook_idempotency.stats()
+
+@admin_router.get("/debug/evaluation-cache", response_class=JSONResponse)
+def admin_debug_evaluation_cache():
+    """Hit/miss statistiky cache hodnocení odpovědí"""
+    return evaluation_cache.stats()
+
+@admin_router.get("/debug/voice-metrics", response_class=JSONResponse)
+def admin_debug_voice_metrics(call_sid: Optional[str] = Query(None)):
+    """Histogramy latence fází hlasových tahů (případně poslední tahy jednoho hovoru)"""
+    if call_sid:
+        return {'call_sid': call_sid, 'turns': voice_metrics.recent_turns(call_sid)}
+    return voice_metrics.snapshot()
+
+@admin_router.get("/debug/voice-metrics/prometheus", response_class=PlainTextResponse)
+def admin_debug_voice_metrics_prometheus():
+    """Histogramy latence fází hlasových tahů v textovém formátu Prometheus"""
+    return PlainTextResponse(voice_metrics.prometheus(), media_type="text/plain; version=0.0.4")
+
+@admin_router.get("/debug/tts-cache", response_class=JSONResponse)
+def admin_debug_tts_cache():
+    """Statistiky TTS cache (paměť + disk)"""
+    return tts_cache.stats()
+
+@admin_router.get("/debug/stream-supervisors", response_class=JSONResponse)
+def admin_debug_stream_supervisors():
+    """Hloubka front a rozpracované promluvy živých /audio streamů"""
+    return stream_supervisors.stats()
+
+@admin_router.get("/debug/assistant-registry", response_class=JSONResponse)
+def admin_debug_assistant_registry():
+    """Sdílený asistent a zásoba předvytvořených threadů pro /audio"""
+    return assistant_registry.stats()
+
+@admin_router.get("/debug/media-streams", response_class=JSONResponse)
+def admin_debug_media_streams():
+    """Živá WebSocket spojení Media Streamů - počty a byte rate jednotlivých streamů"""
+    return connection_manager.stats()
+
+@admin_router.post("/media-streams/drain", response_class=JSONResponse)
+async def admin_media_streams_drain(timeout: Optional[float] = Query(None)):
+    """Přestane přijímat nové Media Streamy a počká na doběhnutí živých (před vypnutím instance)"""
+    result = await connection_manager.drain(timeout)
+    return {**result, 'connections': connection_manager.stats()}
+
+@admin_router.post("/media-streams/record", response_class=JSONResponse)
+def admin_media_streams_record(call_sid: str = Query(...)):
+    """Nahraje Media Stream hovoru (zprávy + μ-law) pro offline přehrání - zapíná se před startem streamu"""
+    connection_manager.arm_recording(call_sid)
+    return {'armed': call_sid, 'record_dir': connection_manager.record_dir}
+
+@admin_router.post("/tts-cache/warm-up", response_class=JSONResponse)
+async def admin_tts_cache_warm_up():
+    """Předsyntetizuje úvodní hlášky hovoru do TTS cache (i na disk)"""
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+    if not openai_api_key:
+        return JSONResponse(status_code=400, content={"error": "OPENAI_API_KEY není nastaven"})
+    texts = list(CALL_START_PROMPTS)
+    client = openai.OpenAI(api_key=openai_api_key)
+    result = await tts_cache.warm_up(texts, lambda text: asyncio.to_thread(synthesize_mulaw, client, text))
+    return {'texts': len(texts), **result, 'cache': tts_cache.stats()}
+
+@admin_router.get("/debug/scoring-agreement", response_class=JSONResponse)
+def admin_debug_scoring_agreement(lesson_id: Optional[int] = Query(None)):
+    """Report shody lokálního scoreru s historickým LLM hodnocením (TestSession.answers)"""
+    session = SessionLocal()
+    try:
+        query = session.query(TestSession)
+        if lesson_id is not None:
+            query = query.filter(TestSession.lesson_id == lesson_id)
+        
+        test_sessions = [
+            {'lesson_id': ts.lesson_id, 'questions_data': ts.questions_data, 'answers': ts.answers}
+            for ts in query.all()
+        ]
+        thresholds_by_lesson = {
+            lesson.id: getattr(lesson, 'scoring_thresholds', None)
+            for lesson in session.query(Lesson).all()
+        }
+        return build_agreement_report(test_sessions, thresholds_by_lesson)
+    except Exception as e:
+        logger.error(f"❌ Chyba při výpočtu reportu shody: {e}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    finally:
+        session.close()
+
 @admin_router.get("/migrate-db", response_class=JSONResponse)
 def admin_migrate_db():
     """Provede databázové migrace pro nové funkce"""
@@ -1293,6 +1485,20 @@ def admin_migrate_db():
                 results["migrations"].append(f"trainingId: ❌ {str(e)}")
                 session.rollback()
         
+        # 2c. Přidej scoring_thresholds do lessons (prahy lokálního hodnocení)
+        try:
+            session.execute(text("SELECT scoring_thresholds FROM lessons LIMIT 1"))
+            results["migrations"].append("scoring_thresholds: již existuje")
+        except Exception:
+            session.rollback()
+            try:
+                session.execute(text("ALTER TABLE lessons ADD COLUMN scoring_thresholds JSON"))
+                session.commit()
+                results["migrations"].append("scoring_thresholds: ✅ přidán")
+            except Exception as e:
+                results["migrations"].append(f"scoring_thresholds: ❌ {str(e)}")
+                session.rollback()
+        
         # 3. Vytvoř user_progress tabulku
         try:
             session.execute(text("SELECT id FROM user_progress LIMIT 1"))
@@ -1673,6 +1879,8 @@ async def admin_lesson_0_questions_post(request: Request):
         # Ulož změny
         lesson_0.questions = updated_questions
         session.commit()
+        call_state_cache.invalidate_lesson(lesson_0.id)
+        evaluation_cache.invalidate_lesson(lesson_0.id)
         
         return HTMLResponse(content=f"""
         <div class="alert alert-success">
@@ -2852,83 +3060,66 @@ async def voice_call_handler(request: Request):
 
 @app.post("/voice/")
 async def voice_handler(request: Request):
+    with voice_metrics.turn("voice"):
+        return await _voice_handler(request)
+
+
+async def _voice_handler(request: Request):
     logger.info("Přijat Twilio webhook na /voice/")
     attempt_id = request.query_params.get('attempt_id')
     logger.info(f"Attempt ID: {attempt_id}")
     
     # Získání parametrů hovoru
-    form = await request.form()
+    with voice_metrics.span("form_parse"):
+        form = await request.form()
     caller_country = form.get("CallerCountry", "")
     to_country = form.get("ToCountry", "")
+    call_sid = form.get("CallSid", "")
+    voice_metrics.tag_turn(call_sid=call_sid)
     logger.info(f"Volající: {caller_country} -> {to_country}")
     
-    response = VoiceResponse()
+    response = TwiMLResponse()
     
     # Inteligentní uvítání podle aktuální lekce uživatele
-    session = SessionLocal()
+    # Stav hovoru (uživatel, lekce, otázky, test session) se načte jednou a zůstane v cache pro /voice/process
+    state = None
+    user_level = 0
+    target_lesson = None
+    lesson_info = ""
     try:
-        current_user = None
-        current_lesson = None
-        lesson_info = ""
-        
-        # Pokusíme se najít uživatele podle attempt_id
-        if attempt_id:
-            try:
-                attempt = session.query(Attempt).get(int(attempt_id))
-                if attempt:
-                    current_user = attempt.user
-                    current_lesson = attempt.lesson
-            except:
-                pass
-        
-        # Pokud není attempt, najdi posledního uživatele
-        if not current_user:
-            current_user = session.query(User).order_by(User.id.desc()).first()
+        with voice_metrics.span("call_state"):
+            state = resolve_call_state(call_sid, attempt_id)
         
-        if current_user:
+        if state:
             # Získej aktuální úroveň uživatele
-            user_level = getattr(current_user, 'current_lesson_level', 0)
+            user_level = state.user_level
+            voice_metrics.tag_turn(lesson=user_level)
+            
+            # Správná lekce podle úrovně
+            if state.lesson and state.lesson['lesson_number'] == user_level:
+                target_lesson = state.lesson
             
-            # Najdi správnou lekci podle úrovně
             if user_level == 0:
-                target_lesson = session.query(Lesson).filter(
-                    Lesson.lesson_number == 0
-                ).first()
                 if target_lesson:
-                    lesson_info = f"Lekce {target_lesson.lesson_number}: Vstupní test z obráběcích kapalin. Hned začneme s testem!"
+                    lesson_info = f"Lekce {target_lesson['lesson_number']}: Vstupní test z obráběcích kapalin. Hned začneme s testem!"
                 else:
                     lesson_info = "Lekce 0: Vstupní test. Hned začneme!"
             else:
-                target_lesson = session.query(Lesson).filter(
-                    Lesson.lesson_number == user_level
-                ).first()
                 if target_lesson:
-                    lesson_info = f"Lekce {target_lesson.lesson_number}: {target_lesson.title.replace(f'Lekce {target_lesson.lesson_number}:', '').strip()}. Začínáme s výukou!"
+                    lesson_number = target_lesson['lesson_number']
+                    lesson_info = f"Lekce {lesson_number}: {target_lesson['title'].replace(f'Lekce {lesson_number}:', '').strip()}. Začínáme s výukou!"
                 else:
                     lesson_info = f"Lekce {user_level}. Začínáme s výukou!"
     except Exception as e:
         logger.error(f"Chyba při načítání lekce: {e}")
         lesson_info = "Lekce 0: Vstupní test. Hned začneme!"
-    finally:
-        session.close()
     
     # Nové, lepší uvítání s první otázkou (pokud je to nová session)
-    if current_user and user_level == 0:
-        # Pro vstupní test zkontroluj, jestli už existuje aktivní session
-        test_session_check = session.query(TestSession).filter(
-            TestSession.user_id == current_user.id,
-            TestSession.lesson_id == target_lesson.id if target_lesson else None,
-            TestSession.is_completed == False
-        ).first()
-        
-        if not test_session_check and target_lesson:
+    if state and user_level == 0:
+        # Pro vstupní test zkontroluj, jestli už existuje aktivní session (je součástí stavu hovoru)
+        if state.test_session is None and target_lesson:
             # NOVÁ SESSION - řekni uvítání + první otázku
-            enabled_questions = []
-            if isinstance(target_lesson.questions, list):
-                enabled_questions = [
-                    q for q in target_lesson.questions 
-                    if isinstance(q, dict) and q.get('enabled', True)
-                ]
+            enabled_questions = state.enabled_questions
             
             if enabled_questions:
                 first_question = enabled_questions[0].get('question', '')
@@ -2952,51 +3143,58 @@ async def voice_handler(request: Request):
         lesson_intro_with_pauses = create_natural_speech_response(lesson_intro)
         response.say(lesson_intro_with_pauses, language="cs-CZ", rate="0.8", voice="Google.cs-CZ-Standard-A")
     
-    # Kratší pauza a přechod do action
-    response.pause(length=1)
+    # Kratší pauza, gather s "Píp." (timeout 8 s, speech_timeout 3 s), fallback a nabídka opakování
+    # - předrenderovaný fragment, viz STATIC_FRAGMENTS v twiml_fragments.py
+    response.fragment("intro_gather")
     
-    # Gather s vylepšenými parametry pro lepší detekci konce odpovědi
-    gather = response.gather(
-        input='speech',
-        timeout=8,  # Kratší základní timeout
-        speech_timeout=3,  # Konkrétní hodnota místo 'auto' pro lepší detekci konce
-        action='/voice/process',
-        method='POST',
-        language='cs-CZ',
-        speech_model='phone_call',
-        partial_result_callback='',  # Zakážeme partial results pro čistší zpracování
-        enhanced='true'  # Vylepšené rozpoznávání
-    )
-    
-    gather.say(
-        "Píp.",
-        language="cs-CZ",
-        rate="0.8",
-        voice="Google.cs-CZ-Standard-A"
-    )
+    with voice_metrics.span("twiml_render"):
+        twiml = str(response)
+    logger.info(f"TwiML odpověď s inteligentním uvítáním: {twiml}")
+    return Response(content=twiml, media_type="text/xml")
+
+@app.post("/voice/process")
+async def process_speech(request: Request):
+    """
+    Twilio webhook hlasového tahu.
     
-    # Vylepšený fallback s možností připomenutí
-    response.say(
-        "Nerozuměl jsem vám nebo jste neodpověděl. Zkuste mluvit jasně a výrazně.",
-        language="cs-CZ",
-        rate="0.8",
-        voice="Google.cs-CZ-Standard-A"
+    Twilio při pomalé odpovědi webhook opakuje - duplicity se nezpracují znovu
+    (žádné další volání LLM ani duplicitní odpověď v TestSession), dostanou
+    stejné TwiML jako původní request.
+    """
+    with voice_metrics.turn("voice_process"):
+        with voice_metrics.span("form_parse"):
+            form = await request.form()
+        call_sid = form.get('CallSid', '')
+        voice_metrics.tag_turn(call_sid=call_sid)
+        if not call_sid:
+            return await _process_speech_turn(request)
+        return await _process_speech_idempotent(request, form, call_sid)
+
+
+async def _process_speech_idempotent(request: Request, form, call_sid: str):
+    """Zpracuje tah nejvýše jednou pro daný webhook, duplicitám přehraje uložené TwiML"""
+    key = webhook_idempotency_key(
+        call_sid, request.url.path, form.multi_items(), request.url.query,
+        token=request.headers.get(TWILIO_IDEMPOTENCY_HEADER)
     )
     
-    # Nabídka opakování
-    response.redirect('/voice/process?reminder=true')
+    async def handle_turn():
+        turn_response = await _process_speech_turn(request)
+        return CachedResponse(turn_response.body, turn_response.media_type, turn_response.status_code)
     
-    logger.info(f"TwiML odpověď s inteligentním uvítáním: {response}")
-    return Response(content=str(response), media_type="text/xml")
+    cached = await webhook_idempotency.run(key, handle_turn)
+    return Response(content=cached.body, media_type=cached.media_type, status_code=cached.status_code)
 
-@app.post("/voice/process")
-async def process_speech(request: Request):
+
+async def _process_speech_turn(request: Request):
     """Vylepšené zpracování hlasového vstupu s inteligentním flow"""
     logger.info("🎙️ === PROCESS_SPEECH START ===")
+    turn_started = time.perf_counter()
     
     form = await request.form()
     speech_result = form.get('SpeechResult', '').strip()
     confidence = form.get('Confidence', '0')
+    call_sid = form.get('CallSid', '')
     attempt_id = request.query_params.get('attempt_id')
     is_reminder = request.query_params.get('reminder') == 'true'
     is_confirmation = request.query_params.get('confirmation') == 'true'
@@ -3010,7 +3208,7 @@ async def process_speech(request: Request):
     logger.info(f"📝 Rozpoznaná řeč: '{speech_result}' (confidence: {confidence})")
     logger.info(f"🔗 attempt_id: {attempt_id}, reminder: {is_reminder}, confirmation: {is_confirmation}")
     
-    response = VoiceResponse()
+    response = TwiMLResponse()
     
     # Zpracování confirmation workflow
     if is_confirmation and original_text:
@@ -3045,15 +3243,10 @@ async def process_speech(request: Request):
     # DŮLEŽITÉ: Přímé řešení pro nízkou confidence < 0.5
     if confidence_float < LOW_CONFIDENCE_THRESHOLD and speech_result:
         logger.info(f"❌ Nízká confidence ({confidence_float:.2f} < {LOW_CONFIDENCE_THRESHOLD}) - vyžaduji zopakování")
-        response.say(
-            "Omlouvám se, nerozuměl jsem vám dobře. Můžete zopakovat svou odpověď pomaleji a jasněji?",
-            language="cs-CZ",
-            rate="0.9",
-            voice="Google.cs-CZ-Standard-A"
-        )
+        response.fragment("low_confidence_apology")
         
         # Zachováváme původní parametry pro opakovaný pokus
-        response.redirect(f"/voice/process?attempt_id={attempt_id}&original_text={original_text}&is_reminder={is_reminder}&confidence_retry=true")
+        response.redirect(f"{VOICE_PROCESS_URL}&attempt_id={attempt_id}&original_text={original_text}&is_reminder={is_reminder}&confidence_retry=true")
         return Response(content=str(response), media_type="text/xml")
 
     # Pokud máme speech_result ale confidence je 0, pravděpodobně je to false positive
@@ -3064,12 +3257,7 @@ async def process_speech(request: Request):
 
     # Zpracování připomenutí když uživatel neodpověděl
     if is_reminder:
-        response.say(
-            "Připomínám - pokud mi nerozumíte nebo potřebujete čas na zamyšlení, řekněte to prosím nahlas.",
-            language="cs-CZ",
-            rate="0.9",
-            voice="Google.cs-CZ-Standard-A"
-        )
+        response.fragment("reminder")
         # Pokračuj do normálního flow
     
     # Použij chytřejší logiku rozpoznávání
@@ -3103,7 +3291,7 @@ async def process_speech(request: Request):
                     input='speech',
                     timeout=12,  # Více času na rozmyšlení
                     speech_timeout=4,
-                    action=f'/voice/process?confirmation=true&original_text={encoded_text}',
+                    action=f'{VOICE_PROCESS_URL}&confirmation=true&original_text={encoded_text}',
                     method='POST',
                     language='cs-CZ',
                     speech_model='phone_call',
@@ -3123,7 +3311,7 @@ async def process_speech(request: Request):
                     input='speech',
                     timeout=15,  # Více času na rozmyšlení delší odpovědi
                     speech_timeout=5,
-                    action='/voice/process',
+                    action=VOICE_PROCESS_URL,
                     method='POST',
                     language='cs-CZ',
                     speech_model='phone_call',
@@ -3142,7 +3330,7 @@ async def process_speech(request: Request):
                     input='speech',
                     timeout=12,
                     speech_timeout=4,
-                    action='/voice/process',
+                    action=VOICE_PROCESS_URL,
                     method='POST',
                     language='cs-CZ',
                     speech_model='phone_call',
@@ -3155,7 +3343,7 @@ async def process_speech(request: Request):
                 rate="0.8",
                 voice="Google.cs-CZ-Standard-A"
             )
-            response.redirect('/voice/process?reminder=true')
+            response.redirect(VOICE_PROCESS_URL + '&reminder=true')
             
             return Response(content=str(response), media_type="text/xml")
     
@@ -3173,7 +3361,7 @@ async def process_speech(request: Request):
             input='speech',
             timeout=10,
             speech_timeout=4,  # Delší speech_timeout pro lepší detekci konce
-            action='/voice/process',
+            action=VOICE_PROCESS_URL,
             method='POST',
             language='cs-CZ',
             speech_model='phone_call',
@@ -3199,55 +3387,44 @@ async def process_speech(request: Request):
     
     # Hlavní zpracování s OpenAI
     try:
-        openai_api_key = os.getenv('OPENAI_API_KEY')
-        if not openai_api_key:
+        # Sdílený AsyncOpenAI klient (vytvořen při startu aplikace)
+        client = get_async_openai_client()
+        if not client:
             response.say("AI služba není dostupná.", language="cs-CZ")
             response.hangup()
             return Response(content=str(response), media_type="text/xml")
         
-        import openai
-        client = openai.OpenAI(api_key=openai_api_key)
-        
-        session = SessionLocal()
-        current_user = None
         user_level = 0
         should_continue = False
         
         try:
-            # Načtení uživatele
-            if attempt_id:
-                try:
-                    attempt = session.query(Attempt).get(int(attempt_id))
-                    if attempt:
-                        current_user = attempt.user
-                except:
-                    pass
-            
-            if not current_user:
-                current_user = session.query(User).order_by(User.id.desc()).first()
+            # Stav hovoru z cache (uživatel, lekce, otázky, test session) - DB se čte jen při prvním tahu
+            with voice_metrics.span("call_state"):
+                state = resolve_call_state(call_sid, attempt_id)
             
-            if not current_user:
+            if not state:
                 response.say("Technická chyba - uživatel nenalezen.", language="cs-CZ")
                 response.hangup()
                 return Response(content=str(response), media_type="text/xml")
             
-            user_level = getattr(current_user, 'current_lesson_level', 0)
-            logger.info(f"👤 Uživatel: {current_user.name}, Úroveň: {user_level}")
+            user_level = state.user_level
+            voice_metrics.tag_turn(lesson=user_level)
+            logger.info(f"👤 Uživatel: {state.user['name']}, Úroveň: {user_level}")
             
             if user_level == 0:
                 # === VSTUPNÍ TEST (LEKCE 0) ===
-                should_continue = await handle_entry_test(session, current_user, speech_result, response, client, attempt_id, confidence_float)
+                should_continue = await handle_entry_test(state, speech_result, response, client, attempt_id, confidence_float, call_sid)
             else:
                 # === BĚŽNÉ LEKCE (1+) ===
-                should_continue = await handle_regular_lesson(session, current_user, user_level, speech_result, response, client)
+                should_continue = await handle_regular_lesson(state, user_level, speech_result, response, client)
                 
         except Exception as db_error:
             logger.error(f"❌ DB chyba: {db_error}")
+            # Stav mohl zůstat nekonzistentní s DB - příští tah ho načte znovu
+            call_state_cache.invalidate(call_sid, attempt_id)
             response.say("Došlo k technické chybě. Zkuste to prosím později.", language="cs-CZ")
             response.hangup()
             return Response(content=str(response), media_type="text/xml")
-        finally:
-            session.close()
     
     except Exception as e:
         logger.error(f"❌ Celková chyba: {e}")
@@ -3257,25 +3434,20 @@ async def process_speech(request: Request):
     
     # === POKRAČOVÁNÍ KONVERZACE ===
     if should_continue:
-        gather = response.gather(
-            input='speech',
-            timeout=15,  # Delší timeout pro úvahu
-            speech_timeout=4,  # Lepší detekce konce odpovědi
-            action='/voice/process',
-            method='POST',
-            language='cs-CZ',
-            speech_model='phone_call',
-            enhanced='true'
-        )
-        
         if user_level == 0:
-            gather.say(
-                "Píp.",
-                language="cs-CZ",
-                rate="0.8",
-                voice="Google.cs-CZ-Standard-A"
-            )
+            # Gather s "Píp." (timeout 15 s pro úvahu, speech_timeout 4 s)
+            response.fragment("beep_gather")
         else:
+            gather = response.gather(
+                input='speech',
+                timeout=15,  # Delší timeout pro úvahu
+                speech_timeout=4,  # Lepší detekce konce odpovědi
+                action=VOICE_PROCESS_URL,
+                method='POST',
+                language='cs-CZ',
+                speech_model='phone_call',
+                enhanced='true'
+            )
             question_prompt = "Máte další otázku?"
             question_prompt_with_pauses = create_natural_speech_response(question_prompt)
             gather.say(
@@ -3286,65 +3458,41 @@ async def process_speech(request: Request):
             )
         
         # Vylepšený fallback
-        response.say(
-            "Nerozuměl jsem vaší odpovědi. Zkuste mluvit jasně nebo řekněte 'konec' pro ukončení.",
-            language="cs-CZ",
-            rate="0.8",
-            voice="Google.cs-CZ-Standard-A"
-        )
-        response.redirect('/voice/process?reminder=true')
+        response.fragment("fallback_redirect")
     else:
-        response.say(
-            "Děkuji za rozhovor. Na shledanou!",
-            language="cs-CZ",
-            rate="0.9",
-            voice="Google.cs-CZ-Standard-A"
-        )
-        response.hangup()
+        response.fragment("goodbye_hangup")
     
-    return Response(content=str(response), media_type="text/xml")
+    with voice_metrics.span("twiml_render"):
+        twiml = str(response)
+    logger.info(f"⏱️ Time-to-first-TwiML: {(time.perf_counter() - turn_started) * 1000:.1f} ms")
+    return Response(content=twiml, media_type="text/xml")
 
 
-async def handle_entry_test(session, current_user, speech_result, response, client, attempt_id, confidence_float):
+async def handle_entry_test(state: CallState, speech_result, response, client, attempt_id, confidence_float, call_sid: str = ""):
     """Zpracování vstupního testu (Lekce 0)"""
     logger.info("🎯 Zpracovávám vstupní test...")
     
-    # Najdi Lekci 0
-    target_lesson = session.query(Lesson).filter(
-        Lesson.lesson_number == 0
-    ).first()
-    
-    if not target_lesson:
-        target_lesson = session.query(Lesson).filter(
-            Lesson.title.contains("Lekce 0")
-        ).first()
+    # Lekce 0 je součástí stavu hovoru
+    target_lesson = state.lesson
     
     if not target_lesson:
         response.say("Vstupní test nebyl nalezen. Kontaktujte administrátora.", language="cs-CZ")
         return False
     
-    # Zkontroluj, jestli už existuje aktivní session PŘED jejím získáním
-    session_db = SessionLocal()
-    existing_active_session = session_db.query(TestSession).filter(
-        TestSession.user_id == current_user.id,
-        TestSession.lesson_id == target_lesson.id,
-        TestSession.is_completed == False
-    ).first()
-    session_db.close()
-    
-    # Získej nebo vytvoř test session
-    test_session = get_or_create_test_session(
-        user_id=current_user.id,
-        lesson_id=target_lesson.id,
-        attempt_id=int(attempt_id) if attempt_id else None
-    )
-    
     # Rozlišení: NOVÁ session (první otázka) vs EXISTUJÍCÍ session (odpověď)
-    if not existing_active_session:
+    if state.test_session is None:
         # NOVÁ SESSION - první otázka už byla řečena v voice_handler
+        state.test_session = create_test_session_state(
+            user_id=state.user_id,
+            lesson_id=target_lesson['id'],
+            enabled_questions=state.enabled_questions,
+            attempt_id=int(attempt_id) if attempt_id else None
+        )
         logger.info(f"🎯 Nová session vytvořena, první otázka už byla řečena")
         return True
     else:
+        test_session = state.test_session
+        
         # EXISTUJÍCÍ SESSION - vyhodnotit odpověď
         logger.info(f"💬 Vyhodnocuji odpověď: '{speech_result}'")
         
@@ -3353,9 +3501,102 @@ async def handle_entry_test(session, current_user, speech_result, response, clie
             response.say("Nerozuměl jsem vaší odpovědi. Zkuste to prosím znovu.", language="cs-CZ")
             return True
         
-        # AI vyhodnocení podle nových instrukcí s vylepšeným matching algoritmem
-        keywords = current_question.get('keywords', [])
-        system_prompt = f"""ÚKOL:
+        try:
+            # Lokální předhodnocení podle klíčových slov, LLM jen pro nejednoznačné odpovědi
+            evaluation_task = asyncio.create_task(
+                evaluate_entry_answer(client, target_lesson, current_question, speech_result)
+            )
+            # Spekulativní plán obou větví (zvládnuto / nezvládnuto) během čekání na skóre
+            await asyncio.sleep(0)  # ať task stihne odeslat požadavek na LLM
+            try:
+                with voice_metrics.span("plan"):
+                    plan = plan_next_question(test_session, test_session['current_question_index'])
+            except Exception as plan_error:
+                logger.warning(f"⚠️ Spekulativní plán další otázky selhal: {plan_error}")
+                plan = None
+            
+            with voice_metrics.span("evaluation_wait"):
+                evaluation = await evaluation_task
+            current_score = evaluation['score']
+            clean_feedback = evaluation['feedback']
+            scored_by = evaluation['scored_by']
+            
+            # Vylepšené logování před uložením odpovědi
+            log_answer_analysis(
+                user_id=state.user_id,
+                question=current_question,
+                user_answer=speech_result,
+                ai_score=current_score,
+                ai_feedback=clean_feedback,
+                confidence=confidence_float
+            )
+            
+            # Uložení odpovědi a posun (jeden zápis do DB, stav v cache se aktualizuje až po commitu)
+            with voice_metrics.span("save_answer"):
+                updated_session = save_answer_and_advance(
+                    test_session['id'], 
+                    speech_result, 
+                    float(current_score), 
+                    clean_feedback,
+                    test_session['current_question_index'],
+                    cached_session=test_session,
+                    scored_by=scored_by,
+                    plan=plan
+                )
+            state.test_session = updated_session
+            
+            if updated_session and updated_session.get('is_completed'):
+                # Test dokončen
+                final_score = updated_session.get('current_score', 0)
+                total_questions = len(updated_session.get('answers', []))
+                
+                if final_score >= 90:
+                    set_user_lesson_level(state.user_id, 1)
+                    final_message = f"{clean_feedback} Test dokončen! Skóre: {final_score:.1f}% z {total_questions} otázek. Gratulujeme, postoupili jste do Lekce 1!"
+                else:
+                    final_message = f"{clean_feedback} Test dokončen. Skóre: {final_score:.1f}% z {total_questions} otázek. Pro postup potřebujete 90%. Můžete zkusit znovu!"
+                
+                # Hovor končí - stav už nebude potřeba
+                call_state_cache.invalidate(call_sid, attempt_id)
+                
+                # Použij přirozenější pauzy pro finální zprávu
+                final_message_with_pauses = create_natural_speech_response(final_message)
+                response.say(final_message_with_pauses, language="cs-CZ", rate="0.8")
+                return False  # Ukončit konverzaci
+            else:
+                # Další otázka - adaptivní výběr proběhl už v save_answer_and_advance (stejný zápis)
+                next_question = updated_session.get('next_question') if updated_session else None
+                if next_question:
+                    # Text další otázky je u spekulativního plánu připravený předem
+                    branch = plan.for_score(current_score) if plan else None
+                    prompt = branch.prompt if branch and branch.next_question is next_question else next_question_prompt(next_question)
+                    
+                    next_text = f"{clean_feedback} {prompt}"
+                    # Použij přirozenější pauzy
+                    next_text_with_pauses = create_natural_speech_response(next_text)
+                    response.say(next_text_with_pauses, language="cs-CZ", rate="0.8")
+                    return True  # Pokračovat
+                else:
+                    response.say("Všechny otázky zodpovězeny. Test končí.", language="cs-CZ", rate="0.8")
+                    return False
+                    
+        except Exception as e:
+            logger.error(f"❌ AI chyba: {e}")
+            response.say("Chyba při vyhodnocování odpovědi.", language="cs-CZ")
+            return False
+
+
+# Streamované LLM hodnocení se skóre na začátku odpovědi (TwiML se sestaví po první větě feedbacku)
+STREAMING_EVALUATION = os.getenv('STREAMING_EVALUATION', 'true').lower() in ('1', 'true', 'yes')
+
+
+def _build_entry_test_prompt(current_question: dict, speech_result: str, score_first: bool = False) -> str:
+    """Systémový prompt pro LLM vyhodnocení odpovědi ve vstupním testu"""
+    if score_first:
+        output_format = "Formát odpovědi: [SKÓRE: XX%] [FEEDBACK]\nSkóre uveď jako první, feedback je jedna krátká věta zakončená tečkou."
+    else:
+        output_format = "Formát odpovědi: [FEEDBACK] [SKÓRE: XX%]"
+    return f"""ÚKOL:
 Vyhodnoť studentskou odpověď na zadanou otázku a porovnej ji s ideální správnou odpovědí.
 
 OTÁZKA: {current_question.get('question', '')}
@@ -3416,105 +3657,102 @@ VÝSTUP:
    - Pokud chybí klíčové koncepty, vyjmenuj je stručně: „Chybí: …"  
    - Pokud odpověď obsahuje všechny klíčové koncepty: „Výborně, úplná odpověď!"
 
-Formát odpovědi: [FEEDBACK] [SKÓRE: XX%]"""
-        
-        try:
-            gpt_response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "system", "content": system_prompt}],
-                max_tokens=150,
-                temperature=0.3
-            )
-            
-            ai_answer = gpt_response.choices[0].message.content
-            
-            # Extrakce skóre - robustní regex pro různé formáty
-            import re
-            score_match = re.search(r'\[SKÓRE:\s*(\d+)%?\]', ai_answer, re.IGNORECASE)
-            current_score = int(score_match.group(1)) if score_match else 0
-            
-            # Vyčistění feedback od skóre tagu
-            clean_feedback = re.sub(r'\[SKÓRE:\s*\d+%?\]', '', ai_answer, flags=re.IGNORECASE).strip()
-            
-            # Log pro debug AI odpovědi
-            logger.info(f"🤖 AI raw odpověď: '{ai_answer}'")
-            logger.info(f"🎯 Extrahované skóre: {current_score}%")
-            logger.info(f"💬 Čistý feedback: '{clean_feedback}'")
-            
-            # Vylepšené logování před uložením odpovědi
-            log_answer_analysis(
-                user_id=current_user.id,
-                question=current_question,
-                user_answer=speech_result,
-                ai_score=current_score,
-                ai_feedback=clean_feedback,
-                confidence=confidence_float
-            )
-            
-            # Uložení odpovědi a posun
-            updated_session = save_answer_and_advance(
-                test_session.id, 
-                speech_result, 
-                float(current_score), 
-                clean_feedback,
-                test_session.current_question_index  # Přidán chybějící parametr
-            )
-            
-            if updated_session and updated_session.get('is_completed'):
-                # Test dokončen
-                final_score = updated_session.get('current_score', 0)
-                total_questions = len(updated_session.get('answers', []))
-                
-                if final_score >= 90:
-                    current_user.current_lesson_level = 1
-                    session.commit()
-                    final_message = f"{clean_feedback} Test dokončen! Skóre: {final_score:.1f}% z {total_questions} otázek. Gratulujeme, postoupili jste do Lekce 1!"
-                else:
-                    final_message = f"{clean_feedback} Test dokončen. Skóre: {final_score:.1f}% z {total_questions} otázek. Pro postup potřebujete 90%. Můžete zkusit znovu!"
-                
-                # Použij přirozenější pauzy pro finální zprávu
-                final_message_with_pauses = create_natural_speech_response(final_message)
-                response.say(final_message_with_pauses, language="cs-CZ", rate="0.8")
-                return False  # Ukončit konverzaci
-            else:
-                # Další otázka - použij adaptivní výběr
-                next_question = get_next_adaptive_question(updated_session)
-                if next_question:
-                    # Aktualizace indexu v databázi
-                    test_session = session.query(TestSession).get(updated_session['id'])
-                    test_session.current_question_index = next_question['original_index']
-                    session.commit()
-                    
-                    difficulty_indicator = {"easy": "⭐", "medium": "⭐⭐", "hard": "⭐⭐⭐"}.get(
-                        next_question.get('difficulty', 'medium'), "⭐⭐"
-                    )
-                    
-                    next_text = f"{clean_feedback} Další otázka {difficulty_indicator}: {next_question.get('question', '')}"
-                    # Použij přirozenější pauzy
-                    next_text_with_pauses = create_natural_speech_response(next_text)
-                    response.say(next_text_with_pauses, language="cs-CZ", rate="0.8")
-                    return True  # Pokračovat
-                else:
-                    response.say("Všechny otázky zodpovězeny. Test končí.", language="cs-CZ", rate="0.8")
-                    return False
-                    
-        except Exception as e:
-            logger.error(f"❌ AI chyba: {e}")
-            response.say("Chyba při vyhodnocování odpovědi.", language="cs-CZ")
-            return False
+{output_format}"""
 
 
-def log_answer_analysis(user_id: int, question: dict, user_answer: str, ai_score: int, ai_feedback: str, confidence: float):
-    """Detailní logování odpovědi pro analýzu typických chyb"""
-    try:
-        question_text = question.get('question', 'N/A')
-        correct_answer = question.get('correct_answer', 'N/A')
-        keywords = question.get('keywords', [])
-        
-        logger.info(f"""
-📊 === ANALÝZA ODPOVĚDI ===
-👤 User ID: {user_id}
-❓ Otázka: {question_text}
+async def evaluate_answer_with_llm(client, current_question: dict, speech_result: str) -> dict:
+    """Vyhodnotí odpověď pomocí LLM, vrací {'score', 'feedback', 'raw', 'score_parsed'}"""
+    with voice_metrics.span("llm"):
+        gpt_response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "system", "content": _build_entry_test_prompt(current_question, speech_result)}],
+            max_tokens=150,
+            temperature=0.3
+        )
+    
+    ai_answer = gpt_response.choices[0].message.content
+    
+    # Extrakce skóre - robustní regex pro různé formáty
+    import re
+    score_match = re.search(r'\[SKÓRE:\s*(\d+)%?\]', ai_answer, re.IGNORECASE)
+    current_score = int(score_match.group(1)) if score_match else 0
+    
+    # Vyčistění feedback od skóre tagu
+    clean_feedback = re.sub(r'\[SKÓRE:\s*\d+%?\]', '', ai_answer, flags=re.IGNORECASE).strip()
+    
+    # Log pro debug AI odpovědi
+    logger.info(f"🤖 AI raw odpověď: '{ai_answer}'")
+    logger.info(f"🎯 Extrahované skóre: {current_score}%")
+    logger.info(f"💬 Čistý feedback: '{clean_feedback}'")
+    
+    return {'score': current_score, 'feedback': clean_feedback, 'raw': ai_answer, 'score_parsed': bool(score_match)}
+
+
+async def evaluate_answer_with_llm_streaming(client, current_question: dict, speech_result: str,
+                                             on_complete=None) -> dict:
+    """
+    Streamovaná varianta evaluate_answer_with_llm (formát se skóre na začátku).
+
+    Vrací se hned po tagu skóre a první větě feedbacku, zbytek streamu se dočte na pozadí.
+    Vrací {'score', 'feedback', 'raw', 'score_parsed', 'timings'}; on_complete
+    dostane výsledek s celým feedbackem po dočtení streamu.
+    """
+    result = await stream_evaluation(
+        client,
+        [{"role": "system", "content": _build_entry_test_prompt(current_question, speech_result, score_first=True)}],
+        on_complete=on_complete
+    )
+    logger.info(f"🎯 Extrahované skóre (stream): {result['score']}%")
+    logger.info(f"💬 Feedback (stream): '{result['feedback']}'")
+    return result
+
+
+async def evaluate_entry_answer(client, lesson: dict, current_question: dict, speech_result: str) -> dict:
+    """
+    Vyhodnotí odpověď ve vstupním testu.
+    
+    Jednoznačné odpovědi (plné / nulové pokrytí klíčových slov) ohodnotí lokální
+    scorer s prahy lekce. Ostatní se hledají v cache hodnocení (stejná otázka +
+    normalizovaná odpověď) a teprve pak jdou do LLM. Vrací {'score', 'feedback', 'scored_by'}.
+    """
+    with voice_metrics.span("local_scoring"):
+        local_result = LocalAnswerScorer.for_lesson(lesson).score(current_question, speech_result)
+    if local_result:
+        logger.info(f"⚡ Lokální hodnocení: {local_result.score}% (pokrytí {local_result.coverage:.0f}%) - LLM přeskočeno")
+        return {'score': local_result.score, 'feedback': local_result.feedback, 'scored_by': 'local'}
+    
+    lesson_id = (lesson or {}).get('id')
+    cached = await evaluation_cache.lookup(lesson_id, current_question, speech_result)
+    if cached:
+        logger.info(f"💾 Hodnocení z cache: {cached['score']}% - LLM přeskočeno")
+        return {'score': cached['score'], 'feedback': cached['feedback'], 'scored_by': 'cache'}
+    
+    def cache_result(result: dict) -> None:
+        # Odpověď bez [SKÓRE: X%] je fallback na 0 - do cache nepatří
+        if result['score_parsed']:
+            evaluation_cache.store(lesson_id, current_question, speech_result, result['score'], result['feedback'])
+    
+    if STREAMING_EVALUATION:
+        # Do cache jde celý feedback až po dočtení streamu, ne první věta vrácená hned
+        llm_result = await evaluate_answer_with_llm_streaming(client, current_question, speech_result,
+                                                              on_complete=cache_result)
+    else:
+        llm_result = await evaluate_answer_with_llm(client, current_question, speech_result)
+        cache_result(llm_result)
+    return {'score': llm_result['score'], 'feedback': llm_result['feedback'], 'scored_by': 'llm'}
+
+
+def log_answer_analysis(user_id: int, question: dict, user_answer: str, ai_score: int, ai_feedback: str, confidence: float):
+    """Detailní logování odpovědi pro analýzu typických chyb"""
+    try:
+        question_text = question.get('question', 'N/A')
+        correct_answer = question.get('correct_answer', 'N/A')
+        keywords = question.get('keywords', [])
+        
+        logger.info(f"""
+📊 === ANALÝZA ODPOVĚDI ===
+👤 User ID: {user_id}
+❓ Otázka: {question_text}
 ✅ Správná odpověď: {correct_answer}
 🔑 Klíčová slova: {', '.join(keywords) if keywords else 'žádná'}
 💬 Odpověď uživatele: '{user_answer}'
@@ -3545,66 +3783,16 @@ def log_answer_analysis(user_id: int, question: dict, user_answer: str, ai_score
         
         # Detailní analýza klíčových slov
         if keywords:
-            found_keywords = []
-            missing_keywords = []
+            # Stejný matching jako lokální scorer (přesná shoda, substring, synonyma)
+            keyword_match = match_keywords(keywords, user_answer)
+            found_keywords = keyword_match["found"]
+            missing_keywords = keyword_match["missing"]
             
-            for kw in keywords:
-                kw_lower = kw.lower()
-                answer_lower = user_answer.lower()
-                found_match = False
-                match_type = ""
-                
-                # 1. PŘESNÁ SHODA
-                if kw_lower in answer_lower:
-                    found_keywords.append(kw)
-                    found_match = True
-                    match_type = "přesná"
-                
-                # 2. SUBSTRING MATCHING (hotfix) - klíčové slovo jako součást delšího slova
-                elif not found_match:
-                    # Hledej klíčové slovo jako substring v libovolném slově odpovědi
-                    words_in_answer = answer_lower.split()
-                    for word in words_in_answer:
-                        if kw_lower in word or word in kw_lower:
-                            found_keywords.append(f"{kw}({word})")
-                            found_match = True
-                            match_type = "substring"
-                            break
-                
-                # 3. SYNONYMA A VARIANTY (rozšířený seznam)
-                if not found_match:
-                    synonyms = {
-                        'chlazení': ['hlazení', 'chladění', 'ochlazování', 'chlazen', 'ochlazován'],
-                        'mazání': ['mazaní', 'lubrication', 'lubrikace', 'mazan', 'mazán'],
-                        'odvod': ['odvedení', 'odvádění', 'odváděn', 'odváděný'],
-                        'refraktometr': ['refraktometric', 'refraktometrický', 'refraktometrů'],
-                        'koncentrace': ['koncentrac', 'koncentraci', 'koncentrovat'],
-                        'bakterie': ['bakterií', 'bakteriálního', 'mikroorganismy'],
-                        'pH': ['ph', 'kyselost', 'kyselá', 'zásaditá'],
-                        'emulze': ['emulzní', 'emulgovat', 'emulgovaný'],
-                        'separátor': ['separátor oleje', 'separátorem', 'operátorem', 'operátor', 'reparátor', 'reparátorem'],
-                        'odstranění': ['odstranit', 'odstraňuje', 'odstraněno', 'odstraňování'],
-                        'skimmer': ['skimmerem', 'skimmeru', 'skimmer']
-                    }
-                    
-                    if kw_lower in synonyms:
-                        for syn in synonyms[kw_lower]:
-                            if syn in answer_lower:
-                                found_keywords.append(f"{kw}({syn})")
-                                found_match = True
-                                match_type = "synonymum"
-                                break
-                
-                # 4. POKUD NEBYLO NALEZENO
-                if not found_match:
-                    missing_keywords.append(kw)
-                    
-                # Log pro debug
-                if found_match:
-                    logger.debug(f"✓ '{kw}' nalezeno jako {match_type}: {found_keywords[-1]}")
+            for kw, match_type, matched in keyword_match["matches"]:
+                logger.debug(f"✓ '{kw}' nalezeno jako {match_type}: {matched}")
             
             # Výpočet pokrytí klíčových slov
-            keyword_coverage = len(found_keywords) / len(keywords) * 100 if keywords else 0
+            keyword_coverage = keyword_match["coverage"]
             
             if not found_keywords:
                 issues.append("ŽÁDNÁ_KLÍČOVÁ_SLOVA")
@@ -3630,32 +3818,24 @@ def log_answer_analysis(user_id: int, question: dict, user_answer: str, ai_score
         logger.error(f"❌ Chyba při logování analýzy: {e}")
 
 
-async def handle_regular_lesson(session, current_user, user_level, speech_result, response, client):
+async def handle_regular_lesson(state: CallState, user_level, speech_result, response, client):
     """Zpracování běžných lekcí (1+)"""
     logger.info(f"📚 Zpracovávám lekci úrovně {user_level}")
     
-    # Najdi lekci podle čísla
-    target_lesson = session.query(Lesson).filter(
-        Lesson.lesson_number == user_level
-    ).first()
-    
-    if not target_lesson:
-        # Fallback - najdi podle úrovně
-        target_lesson = session.query(Lesson).filter(
-            Lesson.level == "beginner"
-        ).first()
+    # Lekce podle čísla (případně fallback na "beginner") je součástí stavu hovoru
+    target_lesson = state.lesson
     
     if not target_lesson:
         response.say(f"Lekce {user_level} nebyla nalezena. Kontaktujte administrátora.", language="cs-CZ")
         return False
     
-    logger.info(f"✅ Nalezena lekce: {target_lesson.title}")
+    logger.info(f"✅ Nalezena lekce: {target_lesson['title']}")
     
     # Obecná konverzace nebo testování
-    lesson_content = target_lesson.script or target_lesson.description or ""
+    lesson_content = target_lesson['script'] or target_lesson['description'] or ""
     
     # Jednoduchý AI chat o lekci
-    system_prompt = f"""Jsi AI lektor pro lekci: {target_lesson.title}
+    system_prompt = f"""Jsi AI lektor pro lekci: {target_lesson['title']}
 
 OBSAH LEKCE:
 {lesson_content[:800]}
@@ -3670,12 +3850,13 @@ Student řekl: "{speech_result}"
 Odpověz mu v češtině (max 2 věty)."""
     
     try:
-        gpt_response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "system", "content": system_prompt}],
-            max_tokens=200,
-            temperature=0.6
-        )
+        with voice_metrics.span("llm"):
+            gpt_response = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "system", "content": system_prompt}],
+                max_tokens=200,
+                temperature=0.6
+            )
         
         ai_answer = gpt_response.choices[0].message.content
         response.say(ai_answer, language="cs-CZ", rate="0.9")
@@ -3716,86 +3897,65 @@ async def get_assistant_info(client, assistant_id: str):
 async def wav_to_mulaw(audio_data: bytes) -> bytes:
     """Převede WAV audio na μ-law formát pro Twilio"""
     try:
-        from pydub import AudioSegment
-        
-        # Načteme WAV audio
-        audio_segment = AudioSegment.from_wav(io.BytesIO(audio_data))
-        
-        # Převedeme na 8kHz mono
-        audio_segment = audio_segment.set_frame_rate(8000).set_channels(1)
-        
-        # Převedeme na μ-law
-        raw_audio = audio_segment.raw_data
-        mulaw_audio = audioop.lin2ulaw(raw_audio, 2)  # 2 bytes per sample
-        
-        return mulaw_audio
+        return wav_bytes_to_mulaw(audio_data)
     except Exception as e:
         logger.error(f"Chyba při převodu WAV na μ-law: {e}")
         return b""
 
-async def send_tts_to_twilio(websocket: WebSocket, text: str, stream_sid: str, client):
-    """Odešle TTS audio do Twilio WebSocket streamu ve správném μ-law formátu"""
+def twilio_tts_pipeline(websocket: WebSocket, stream_sid: str, client,
+                        turn_id: Optional[int] = None) -> TTSPipeline:
+    """Věty -> μ-law (TTS cache, jinak OpenAI TTS) -> plánovač odchozího audia streamu"""
+    # Rámce po 20 ms odesílané v reálném čase (plánovač streamu, track="outbound")
+    sender = audio_senders.get_or_create(stream_sid, websocket.send_text)
+    
+    def synthesize(sentence: str):
+        # μ-law z TTS cache (paměť, pak disk); jinak OpenAI TTS ve WAV a převod na G.711 μ-law
+        return tts_cache.get_or_synthesize(sentence, lambda: asyncio.to_thread(synthesize_mulaw, client, sentence))
+    
+    return TTSPipeline(synthesize, lambda audio: sender.play(audio, turn_id=turn_id), name=stream_sid)
+
+async def send_tts_to_twilio(websocket: WebSocket, text: str, stream_sid: str, client,
+                             turn_id: Optional[int] = None) -> bool:
+    """Odešle TTS audio do Twilio WebSocket streamu ve správném μ-law formátu (True = celé přehráno)"""
     try:
-        # Kontrola jestli je WebSocket stále připojen
-        try:
-            # Ping test pro ověření připojení
-            await websocket.ping()
-            logger.debug("TTS: WebSocket ping OK")
-        except Exception as ping_error:
-            logger.warning(f"TTS: WebSocket ping failed: {ping_error}")
+        # Kontrola jestli je WebSocket stále připojen (stav spojení, bez round-tripu)
+        if websocket.client_state != WebSocketState.CONNECTED:
             logger.warning("WebSocket není připojen, přeskakujem TTS")
-            return
+            return False
             
-        logger.info(f"🔊 Generuji TTS pro text: '{text[:50]}...'")
-        
-        # Generace TTS pomocí OpenAI - používáme WAV pro lepší kvalitu převodu
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="nova",
-            input=text,
-            response_format="wav"
-        )
-        
-        # Převod WAV na G.711 μ-law pro Twilio
-        audio_data = response.content
-        mulaw_audio = await wav_to_mulaw(audio_data)
-        
-        if not mulaw_audio:
-            logger.error("❌ Nepodařilo se převést audio na μ-law formát")
-            return
+        if not stream_sid:  # Pouze pokud máme stream_sid
+            return False
         
-        # Enkódování do base64
-        import base64
-        audio_b64 = base64.b64encode(mulaw_audio).decode()
+        logger.info(f"🔊 TTS pro text: '{text[:50]}...'")
         
-        # Rozdělíme na chunky a pošleme s správným track="outbound"
-        chunk_size = 1000  # Base64 chunky pro optimální přenos
-        for i in range(0, len(audio_b64), chunk_size):
-            chunk = audio_b64[i:i+chunk_size]
-            
-            media_message = {
-                "event": "media",
-                "streamSid": stream_sid,
-                "media": {
-                    "payload": chunk,
-                    "track": "outbound"  # DŮLEŽITÉ: Správný track pro odpovědi do Twilia
-                }
-            }
-            
-            if stream_sid:  # Pouze pokud máme stream_sid
-                await websocket.send_text(json.dumps(media_message))
-                await asyncio.sleep(0.05)  # 50ms mezi chunky pro stabilní přenos
-        
-        logger.info("✅ TTS audio odesláno ve správném μ-law formátu s track=outbound")
+        # Celý text předem v cache (úvodní hlášky) jde hned; jinak po větách - první věta
+        # hraje, zatímco se syntetizují další
+        cached = tts_cache.get(text)
+        if cached is not None:
+            sender = audio_senders.get_or_create(stream_sid, websocket.send_text)
+            played = await sender.play(cached, turn_id=turn_id)
+        else:
+            pipeline = twilio_tts_pipeline(websocket, stream_sid, client, turn_id)
+            played = await pipeline.speak(text)
+            if pipeline.failed:
+                logger.error(f"❌ Nepodařilo se převést audio na μ-law formát: {pipeline.stats()}")
+                return False
+        if played:
+            logger.info("✅ TTS audio odesláno ve správném μ-law formátu s track=outbound")
+        else:
+            logger.info("✋ TTS audio přerušeno (barge-in)")
+        return played
         
     except Exception as e:
         logger.error(f"Chyba při TTS: {e}")
         import traceback
         logger.error(f"TTS Error traceback: {traceback.format_exc()}")
+        return False
 
 async def process_audio_chunk(websocket: WebSocket, audio_data: bytes, 
-                             stream_sid: str, client, assistant_id: str, thread_id: str):
-    """Zpracuje audio chunk pomocí OpenAI Assistant API v real-time"""
+                             stream_sid: str, client, assistant_id: str, thread_id: str,
+                             turn_id: Optional[int] = None):
+    """Zpracuje audio chunk pomocí OpenAI Assistant API v real-time (jeden tah TurnControlleru)"""
     try:
         logger.info(f"🎧 === PROCESS_AUDIO_CHUNK SPUŠTĚN === ({len(audio_data)} bajtů)")
         
@@ -3805,105 +3965,45 @@ async def process_audio_chunk(websocket: WebSocket, audio_data: bytes,
             
         logger.info(f"🎧 Zpracovávám audio chunk ({len(audio_data)} bajtů)")
         
-        # Uložíme audio do dočasného souboru
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-            logger.info("📁 Vytvářím dočasný WAV soubor")
-            # Vytvoříme jednoduchý WAV header pro μ-law audio
-            import struct
-            
-            # WAV header pro μ-law, 8kHz, mono
-            wav_header = struct.pack('<4sI4s4sIHHIIHH4sI',
-                b'RIFF', len(audio_data) + 44 - 8,  # File size
-                b'WAVE',
-                b'fmt ', 16,  # Format chunk size
-                7,  # μ-law format
-                1,  # Mono
-                8000,  # Sample rate
-                8000,  # Byte rate
-                1,  # Block align
-                8,  # Bits per sample
-                b'data', len(audio_data)
-            )
-            
-            tmp_file.write(wav_header)
-            tmp_file.write(audio_data)
-            tmp_file_path = tmp_file.name
-            logger.info(f"📁 WAV soubor vytvořen: {tmp_file_path}")
+        # WAV (μ-law, 8 kHz, mono) sestavený v paměti - žádný dočasný soubor na disku
+        audio_file = wav_file(audio_data)
         
-        try:
-            logger.info("🎤 Spouštím Whisper STT...")
-            # OpenAI Whisper pro STT
-            with open(tmp_file_path, "rb") as audio_file:
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="cs"
-                )
-            
-            user_text = transcript.text.strip()
-            logger.info(f"📝 Transkripce DOKONČENA: '{user_text}'")
-            
-            if not user_text or len(user_text) < 3:
-                logger.info("⚠️ Příliš krátká transkripce, ignoruji")
-                return
-            
-            logger.info("🤖 Přidávám zprávu do Assistant threadu...")
-            # Přidáme zprávu do threadu
-            client.beta.threads.messages.create(
-                thread_id=thread_id,
-                role="user",
-                content=user_text
-            )
-            
-            logger.info("🚀 Spouštím Assistant run...")
-            # Spustíme asistenta
-            run = client.beta.threads.runs.create(
-                thread_id=thread_id,
-                assistant_id=assistant_id
-            )
-            
-            logger.info(f"⏳ Čekám na dokončení Assistant run (ID: {run.id})...")
-            # Čekáme na dokončení (s timeout)
-            import time
-            max_wait = 15  # 15 sekund timeout pro rychlejší odpověď
-            start_time = time.time()
-            
-            while run.status in ["queued", "in_progress"] and (time.time() - start_time) < max_wait:
-                await asyncio.sleep(0.5)  # Kratší interval pro rychlejší odpověď
-                run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
-                logger.info(f"⏳ Run status: {run.status}")
-            
-            if run.status == "completed":
-                logger.info("✅ Assistant run DOKONČEN! Získávám odpověď...")
-                # Získáme nejnovější odpověď
-                messages = client.beta.threads.messages.list(thread_id=thread_id, limit=1)
-                
-                for message in messages.data:
-                    if message.role == "assistant":
-                        for content in message.content:
-                            if content.type == "text":
-                                assistant_response = content.text.value
-                                logger.info(f"🤖 Assistant odpověď ZÍSKÁNA: '{assistant_response}'")
-                                
-                                # Pošleme jako TTS
-                                logger.info("🔊 Odesílám TTS odpověď...")
-                                await send_tts_to_twilio(websocket, assistant_response, stream_sid, client)
-                                logger.info("✅ TTS odpověď ODESLÁNA!")
-                                return
-                
-                logger.warning("⚠️ Žádná assistant odpověď nenalezena")
-            else:
-                logger.warning(f"⚠️ Assistant run neúspěšný: {run.status}")
-                
-        finally:
-            # Vyčistíme dočasný soubor
-            import os
-            try:
-                os.unlink(tmp_file_path)
-                logger.info("🗑️ Dočasný soubor vymazán")
-            except:
-                pass
+        logger.info("🎤 Spouštím Whisper STT...")
+        # OpenAI Whisper pro STT
+        transcript = await asyncio.to_thread(
+            client.audio.transcriptions.create,
+            model="whisper-1",
+            file=audio_file,
+            language="cs"
+        )
+        
+        user_text = transcript.text.strip()
+        logger.info(f"📝 Transkripce DOKONČENA: '{user_text}'")
+        
+        if not user_text or len(user_text) < 3:
+            logger.info("⚠️ Příliš krátká transkripce, ignoruji")
+            return
+        
+        logger.info("🤖 Přidávám zprávu do Assistant threadu...")
+        # Přidáme zprávu do threadu
+        await asyncio.to_thread(
+            client.beta.threads.messages.create,
+            thread_id=thread_id,
+            role="user",
+            content=user_text
+        )
+        
+        logger.info("🚀 Spouštím Assistant run (stream)...")
+        # Odpověď přichází po větách - první věta hraje, zatímco model dopisuje a TTS syntetizuje další
+        pipeline = twilio_tts_pipeline(websocket, stream_sid, client, turn_id)
+        completed = await pipeline.speak_stream(stream_run_sentences(client, thread_id, assistant_id))
+        
+        if not completed:
+            logger.info(f"✋ Odpověď asistenta přerušena (barge-in): {pipeline.stats()}")
+        elif pipeline.sentences:
+            logger.info(f"✅ Odpověď asistenta přehrána: {pipeline.stats()}")
+        else:
+            logger.warning("⚠️ Žádná assistant odpověď nenalezena")
                 
     except Exception as e:
         logger.error(f"❌ CHYBA při zpracování audio: {e}")
@@ -3914,19 +4014,22 @@ async def process_audio_chunk(websocket: WebSocket, audio_data: bytes,
 async def audio_stream_test(websocket: WebSocket):
     """Jednoduchý test WebSocket handler bez OpenAI připojení"""
     await websocket.accept()
+    connection = connection_manager.register("/audio-test", websocket.receive_text, websocket.send_text, websocket.close)
+    if connection is None:
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER, reason="Server se vypíná")
+        return
     logger.info("=== AUDIO TEST WEBSOCKET HANDLER SPUŠTĚN ===")
     
     try:
         while True:
             # Čekáme na zprávu od klienta
-            data = await websocket.receive_text()
-            logger.info(f"Přijata zpráva: {data[:100]}...")
+            data = await connection.receive_text()
+            logger.debug(f"Přijata zpráva: {data[:100]}...")
             
             # Parsujeme JSON
             try:
                 message = json.loads(data)
                 event_type = message.get("event", "unknown")
-                logger.info(f"Event type: {event_type}")
                 
                 if event_type == "start":
                     logger.info("Start event - odesílám odpověď")
@@ -3934,10 +4037,10 @@ async def audio_stream_test(websocket: WebSocket):
                         "event": "test_response",
                         "message": "Test WebSocket funguje!"
                     }
-                    await websocket.send_text(json.dumps(response))
+                    await connection.send_text(json.dumps(response))
                     
                 elif event_type == "media":
-                    logger.info("Media event - ignoruji")
+                    pass  # Audio se v testu nezpracovává
                     
                 elif event_type == "stop":
                     logger.info("Stop event - ukončuji")
@@ -3953,6 +4056,7 @@ async def audio_stream_test(websocket: WebSocket):
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
     finally:
+        connection_manager.unregister(connection)
         logger.info("=== AUDIO TEST WEBSOCKET HANDLER UKONČEN ===")
 
 @app.websocket("/audio")
@@ -3990,125 +4094,69 @@ async def audio_stream(websocket: WebSocket):
     client = openai.OpenAI(api_key=openai_api_key)
     logger.info("✅ OpenAI klient inicializován")
     
-    # Vytvoříme nového assistanta s českými instrukcemi pro výuku jazyků
-    logger.info("🎯 Vytvářím nového Assistant...")
-    try:
-        assistant = client.beta.assistants.create(
-            name="AI Asistent pro výuku jazyků",
-            instructions="""Jsi AI asistent pro výuku jazyků. Komunikuješ POUZE v češtině.
-
-TVOJE ROLE:
-- Pomáháš studentům s výukou jazyků
-- Mluvíš pouze česky, přirozeně a srozumitelně
-- Jsi trpělivý, povzbuzující a přátelský
-- Odpovídáš stručně a jasně
-
-TVOJE ÚKOLY:
-- Odpovídej na otázky studentů
-- Vysvětluj jazykové koncepty
-- Poskytuj zpětnou vazbu na odpovědi
-- Kladeš jednoduché otázky pro ověření porozumění
-- Buď konstruktivní a motivující
-
-STYL KOMUNIKACE:
-- Používej přirozený konverzační styl
-- Krátké, srozumitelné věty
-- Pozitivní přístup
-- Pokud student něco neví, vysvětli to jednoduše
-
-Vždy zůstávaj v roli učitele jazyků a komunikuj pouze v češtině.""",
-            model="gpt-4-1106-preview",
-            tools=[]
-        )
-        assistant_id = assistant.id
-        logger.info(f"✅ Vytvořen nový Assistant: {assistant_id}")
-    except Exception as e:
-        logger.error(f"❌ Chyba při vytváření Assistanta: {e}")
-        # Fallback na existující Assistant
-        assistant_id = "asst_W6120kPP1lLBzU5OQLYvH6W1"
-        logger.info(f"🔄 Používám existující Assistant: {assistant_id}")
+    # Sdílený asistent (vytvoří se jednou pro dané instrukce, pak se jen používá)
+    assistant_id = await assistant_registry.get_assistant_id(client)
+    logger.info(f"🎯 Assistant: {assistant_id}")
     
-    thread = None
+    # Registr živých streamů - heartbeat, byte rate, drain při nasazení
+    connection = connection_manager.register("/audio", websocket.receive_text, websocket.send_text, websocket.close,
+                                             record=websocket.query_params.get("record") == "1")
+    if connection is None:
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER, reason="Server se vypíná")
+        return
+    
+    thread_id = None
     
     try:
         logger.info("=== AUDIO WEBSOCKET HANDLER SPUŠTĚN ===")
         
-        # Vytvoříme nový thread pro konverzaci
-        thread = client.beta.threads.create()
-        logger.info(f"✅ Thread vytvořen: {thread.id}")
+        # Thread pro konverzaci ze zásoby předvytvořených threadů
+        thread_id = await assistant_registry.acquire_thread(client)
+        logger.info(f"✅ Thread připraven: {thread_id}")
         
         # Inicializace proměnných
         stream_sid = None
-        audio_buffer = bytearray()
+        # Detekce řeči - do STT jde celá promluva, ne každých 100 ms audia
+        vad = VoiceActivityDetector.from_env()
+        # Tahy konverzace - nová řeč ruší rozpracované STT/Assistant/TTS starého tahu
+        turns = TurnController()
+        
+        async def handle_utterance(audio: bytes):
+            await turns.run_turn(
+                lambda turn_id: process_audio_chunk(
+                    websocket, audio, stream_sid,
+                    client, assistant_id, thread_id, turn_id
+                )
+            )
         
-        # Úvodní zpráva - počkáme na stream_sid
-        initial_message = "Ahoj! Jsem AI asistent pro výuku jazyků. Jak vám mohu pomoci?"
-        initial_message_sent = False
+        # Omezená fronta promluv - souvislá řeč nespustí desítky souběžných STT/Assistant volání
+        supervisor = StreamSupervisor(handle_utterance, name="audio", merge=operator.add)
         
-        # Okamžitá úvodní zpráva (bez čekání na stream_sid)
-        welcome_message = "Připojuji se k AI asistentovi. Moment prosím."
-        welcome_sent = False
+        async def play_call_start_prompts(turn_id: int):
+            # Welcome a úvodní zpráva za sebou - přehrávání běží v reálném čase, pauza mezi nimi není potřeba
+            for prompt in CALL_START_PROMPTS:
+                logger.info(f"🔊 Odesílám úvodní hlášku: '{prompt}'")
+                if not await send_tts_to_twilio(websocket, prompt, stream_sid, client, turn_id):
+                    break
         
-        # Keepalive task pro udržení WebSocket připojení
-        keepalive_task = None
-        websocket_active = True  # Flag pro sledování stavu připojení
+        prompts_started = False
         
-        async def keepalive_sender():
-            """Periodicky odesílá keepalive zprávy"""
-            nonlocal websocket_active
-            try:
-                while websocket_active:
-                    await asyncio.sleep(10)  # Každých 10 sekund
-                    
-                    if not websocket_active:
-                        logger.info("💓 WebSocket neaktivní, ukončujem keepalive")
-                        break
-                        
-                    if stream_sid:
-                        try:
-                            # Pošleme prázdný media chunk jako keepalive
-                            keepalive_msg = {
-                                "event": "media",
-                                "streamSid": stream_sid,
-                                "media": {
-                                    "payload": ""  # Prázdný payload
-                                }
-                            }
-                            await websocket.send_text(json.dumps(keepalive_msg))
-                            logger.info("💓 Keepalive odesláno")
-                        except Exception as send_error:
-                            logger.error(f"💓 Keepalive send error: {send_error}")
-                            websocket_active = False
-                            break
-            except Exception as e:
-                logger.error(f"Keepalive chyba: {e}")
+        websocket_active = True  # Flag pro sledování stavu připojení
         
-        # Hlavní smyčka pro zpracování WebSocket zpráv
+        # Hlavní smyčka pro zpracování WebSocket zpráv (heartbeat obstarává connection_manager)
         while websocket_active:
             try:
-                logger.info("🔄 DEBUG: Čekám na WebSocket data...")
+                data = await connection.receive_text()
                 
-                # Kontrola stavu WebSocket před čtením
                 try:
-                    # Pokusíme se o rychlý ping test
-                    await websocket.ping()
-                    logger.info("✅ DEBUG: WebSocket ping OK")
-                except Exception as ping_error:
-                    logger.info(f"❌ DEBUG: WebSocket ping failed: {ping_error}")
-                    logger.info("DEBUG: WebSocket je pravděpodobně zavřen, ukončujem smyčku")
-                    websocket_active = False
-                    break
-                
-                logger.info("📥 DEBUG: Volám websocket.receive_text()...")
-                data = await websocket.receive_text()
-                logger.info(f"📨 DEBUG: Přijata data ({len(data)} znaků): {data[:200]}...")
-                
-                try:
-                    msg = json.loads(data)
-                    logger.info(f"✅ DEBUG: JSON parsování OK")
-                    event = msg.get("event", "unknown")
-                    logger.info(f"🎯 DEBUG: Event typ: '{event}'")
-                except json.JSONDecodeError as json_error:
+                    # Media eventy (50 za sekundu) bez parsování celé zprávy, ostatní přes JSON
+                    media = parse_media(data)
+                    if media is not None:
+                        event = "media"
+                    else:
+                        msg = loads_event(data)
+                        event = msg.get("event", "unknown")
+                except ValueError as json_error:
                     logger.error(f"❌ DEBUG: JSON parsing CHYBA: {json_error}")
                     logger.error(f"❌ DEBUG: Problematická data: {data}")
                     continue
@@ -4116,68 +4164,56 @@ Vždy zůstávaj v roli učitele jazyků a komunikuj pouze v češtině.""",
                 if event == "start":
                     logger.info("=== MEDIA STREAM START EVENT PŘIJAT! ===")
                     stream_sid = msg.get("streamSid")
+                    turns.stream_sid = stream_sid
+                    supervisor.name = f"audio {stream_sid}"
+                    stream_supervisors.register(stream_sid, supervisor)
+                    connection.bind(stream_sid, msg.get("start", {}).get("callSid"))
+                    # Odchozí audio jde přes spojení (počítání bajtů, poslední odeslání pro heartbeat)
+                    audio_senders.get_or_create(stream_sid, connection.send_text)
                     logger.info(f"Stream SID: {stream_sid}")
                     
-                    # Spustíme keepalive task
-                    if not keepalive_task:
-                        keepalive_task = asyncio.create_task(keepalive_sender())
-                        logger.info("💓 Keepalive task spuštěn")
-                    
-                    # Pošleme okamžitou welcome zprávu
-                    if not welcome_sent:
-                        logger.info("🔊 Odesílám welcome zprávu")
-                        await send_tts_to_twilio(websocket, welcome_message, stream_sid, client)
-                        welcome_sent = True
-                    
-                    # Pošleme úvodní zprávu po krátké pauze
-                    if not initial_message_sent:
-                        await asyncio.sleep(3)  # Krátká pauza po welcome zprávě
-                        logger.info("🔊 Odesílám úvodní zprávu")
-                        await send_tts_to_twilio(websocket, initial_message, stream_sid, client)
-                        initial_message_sent = True
+                    # Úvodní hlášky jako první tah na pozadí - smyčka mezitím přijímá audio a značky
+                    # a barge-in je přeruší stejně jako odpověď asistenta
+                    if not prompts_started:
+                        prompts_started = True
+                        turns.start_turn(play_call_start_prompts)
                     
                 elif event == "media":
-                    logger.info(f"🎵 MEDIA EVENT PŘIJAT! Track: {msg['media'].get('track', 'unknown')}")
-                    payload = msg["media"]["payload"]
-                    track = msg["media"]["track"]
+                    track, payload = media
                     
-                    if track == "inbound":
-                        logger.info("📥 INBOUND TRACK - zpracovávám audio data")
-                        # Real-time zpracování - zpracujeme audio ihned
-                        audio_data = base64.b64decode(payload)
-                        audio_buffer.extend(audio_data)
+                    if track == TRACK_INBOUND:
+                        audio_data = decode_payload(payload)
                         
-                        logger.info(f"📊 Audio buffer: {len(audio_buffer)} bajtů")
+                        # Jedna promluva (řeč + hangover ticha) = jedno volání STT
+                        was_confirmed = vad.speech_confirmed
+                        utterances = vad.feed(audio_data)
                         
-                        # Zpracujeme audio každých 800 bajtů (~1 sekunda audio při 8kHz)
-                        if len(audio_buffer) >= 800:  # ~1 sekunda audio při 8kHz
-                            logger.info(f"🎧 Zpracovávám audio chunk ({len(audio_buffer)} bajtů) - PRÁH DOSAŽEN!")
-                            
-                            # Zkopírujeme buffer před vymazáním
-                            audio_to_process = bytes(audio_buffer)
-                            audio_buffer.clear()
+                        # Uživatel mluví (potvrzená řeč, ne krátký šum) - starý tah (STT, Assistant run, TTS)
+                        # je neaktuální (barge-in)
+                        if vad.speech_confirmed and not was_confirmed:
+                            await turns.barge_in(audio_senders.get(stream_sid))
+                        
+                        for utterance in utterances:
+                            logger.info(f"🎧 Promluva dokončena: {utterance.duration_ms} ms ({len(utterance.audio)} bajtů)")
                             
-                            # Zpracujeme audio v background tasku
-                            asyncio.create_task(
-                                process_audio_chunk(
-                                    websocket, audio_to_process, stream_sid, 
-                                    client, assistant_id, thread.id
-                                )
-                            )
-                    else:
-                        logger.info(f"📤 OUTBOUND TRACK - ignoruji (track: {track})")
+                            # Každá promluva je nový tah; čeká ve frontě supervisoru streamu
+                            supervisor.submit(utterance.audio)
+                
+                elif event == "mark":
+                    # Twilio přehrál odchozí audio až po značku
+                    sender = audio_senders.get(stream_sid)
+                    if sender:
+                        sender.on_mark(msg.get("mark", {}).get("name", ""))
                     
                 elif event == "stop":
                     logger.info("🛑 Media Stream ukončen - Twilio poslal stop event")
                     websocket_active = False
                     
-                    # Zpracujeme zbývající audio i když je malé
-                    if audio_buffer and len(audio_buffer) > 100:  # Alespoň 100 bajtů
-                        logger.info(f"🎧 Zpracovávám zbývající audio ({len(audio_buffer)} bajtů)")
-                        await process_audio_chunk(
-                            websocket, bytes(audio_buffer), stream_sid, 
-                            client, assistant_id, thread.id
-                        )
+                    # Rozpracovaná promluva se zahodí - odpověď už by neměl kdo slyšet
+                    # (rozběhnuté tahy a frontu promluv zruší finally)
+                    utterance = vad.flush()
+                    if utterance:
+                        logger.info(f"🗑️ Zbývající promluva po stop zahozena ({utterance.duration_ms} ms)")
                     
                     # DŮLEŽITÉ: Explicitní uzavření WebSocket po stop eventu
                     try:
@@ -4190,6 +4226,10 @@ Vždy zůstávaj v roli učitele jazyků a komunikuj pouze v češtině.""",
                     
             except json.JSONDecodeError as e:
                 logger.error(f"DEBUG: Neplatný JSON z Twilia: {e}")
+            except WebSocketDisconnect:
+                logger.info("WebSocket odpojen")
+                websocket_active = False
+                break
             except RuntimeError as e:
                 if "Need to call \"accept\" first" in str(e):
                     logger.error(f"DEBUG: WebSocket nebyl přijat nebo byl zavřen: {e}")
@@ -4217,203 +4257,92 @@ Vždy zůstávaj v roli učitele jazyků a komunikuj pouze v češtině.""",
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
     finally:
-        # Označíme WebSocket jako neaktivní
-        if 'websocket_active' in locals():
-            websocket_active = False
-        
-        # Vyčistíme keepalive task
-        if 'keepalive_task' in locals() and keepalive_task and not keepalive_task.done():
-            keepalive_task.cancel()
-            logger.info("💓 Keepalive task ukončen")
+        # Zrušíme frontu promluv a rozpracované tahy
+        if 'supervisor' in locals():
+            if stream_sid:
+                await stream_supervisors.close(stream_sid)
+            await supervisor.close()
+        if 'turns' in locals():
+            await turns.close()
+        
+        # Ukončíme plánovač odchozího audia
+        if 'stream_sid' in locals() and stream_sid:
+            await audio_senders.close(stream_sid)
         
         # Vyčistíme thread
-        if thread:
-            try:
-                client.beta.threads.delete(thread.id)
-                logger.info(f"Thread {thread.id} smazán")
-            except:
-                pass
+        if thread_id:
+            await assistant_registry.release_thread(client, thread_id)
         
+        connection_manager.unregister(connection)
         logger.info("=== AUDIO WEBSOCKET HANDLER UKONČEN ===")
 
+def realtime_lesson_context(attempt_id) -> str:
+    """Kontext lekce pokusu pro instrukce Realtime session (prázdný, když pokus neexistuje)"""
+    if not attempt_id:
+        return ""
+    session = SessionLocal()
+    try:
+        attempt = session.query(Attempt).get(int(attempt_id))
+        if not attempt or not attempt.lesson:
+            logger.warning(f"Attempt nebo lesson nenalezen pro attempt_id: {attempt_id}")
+            return ""
+        lesson = attempt.lesson
+        logger.info(f"Načten kontext lekce: {lesson.title}")
+        return f"""
+Aktuální lekce: {lesson.title}
+Obsah lekce: {lesson.script}
+
+Instrukce pro AI asistenta:
+- Pomáhej studentovi s touto konkrétní lekcí
+- Odpovídej na otázky týkající se obsahu lekce
+- Můžeš klást otázky pro ověření porozumění
+- Poskytuj zpětnou vazbu na odpovědi studenta
+- Buď trpělivý a povzbuzující
+"""
+    except Exception as e:
+        logger.error(f"Chyba při načítání lekce: {str(e)}")
+        return ""
+    finally:
+        session.close()
+
 @app.websocket("/voice/media-stream")
 async def media_stream(websocket: WebSocket):
+    """Twilio Media Stream <-> OpenAI Realtime API (μ-law v obou směrech bez překódování)"""
     logger.info("=== MEDIA STREAM WEBSOCKET HANDLER SPUŠTĚN ===")
-    logger.info(f"WebSocket client: {websocket.client}")
-    logger.info(f"WebSocket headers: {websocket.headers}")
-    logger.info(f"WebSocket query params: {websocket.query_params}")
-    
     await websocket.accept()
-    logger.info("=== WEBSOCKET ACCEPTED - ČEKÁM NA TWILIO DATA ===")
     
-    # Inicializace služeb
-    from app.services.openai_service import OpenAIService
-    from app.services.twilio_service import TwilioService
-    openai_service = OpenAIService()
-    twilio_service = TwilioService()
+    if not os.getenv('OPENAI_API_KEY'):
+        logger.error("OPENAI_API_KEY není nastavena")
+        await websocket.close()
+        return
     
-    # Stav konverzace
-    conversation_state = {
-        "phase": "introduction",  # introduction, teaching, questioning, evaluation
-        "current_question_index": 0,
-        "questions": [],
-        "user_answers": [],
-        "attempt_id": None,
-        "user_id": None,
-        "lesson_id": None,
-        "lesson": None,
-        "audio_buffer": b"",
-        "last_audio_time": None
-    }
+    connection = connection_manager.register("/voice/media-stream", websocket.receive_text,
+                                             websocket.send_text, websocket.close,
+                                             record=websocket.query_params.get("record") == "1")
+    if connection is None:
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER, reason="Server se vypíná")
+        return
     
-    async def safe_send_text(msg):
-        try:
-            await websocket.send_text(msg)
-        except Exception as e:
-            logger.error(f"[safe_send_text] WebSocket není připojen: {e}")
-
-    async def process_audio_and_respond(websocket, conversation_state, openai_service, twilio_service):
-        """Zpracuje audio buffer a odpoví podle fáze konverzace."""
-        try:
-            # Převod audia na text
-            audio_text = openai_service.speech_to_text(
-                conversation_state["audio_buffer"], 
-                language=conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
-            )
-            
-            if not audio_text.strip():
-                logger.info("Prázdný audio - ignoruji")
-                conversation_state["audio_buffer"] = b""
-                return
-            
-            logger.info(f"Přepsaný text: {audio_text}")
-            
-            # Zpracování podle fáze konverzace
-            if conversation_state["phase"] == "introduction":
-                # Přechod do fáze výuky
-                conversation_state["phase"] = "teaching"
-                await send_twiml_response(websocket, twilio_service.create_teaching_response(
-                    conversation_state["lesson"]
-                ))
-                
-            elif conversation_state["phase"] == "teaching":
-                # Kontrola, zda uživatel chce přejít k otázkám
-                if any(keyword in audio_text.lower() for keyword in ["otázky", "zkoušení", "test", "hotovo", "konec"]):
-                    conversation_state["phase"] = "questioning"
-                    await send_twiml_response(websocket, twilio_service.create_questioning_start_response())
-                else:
-                    # Odpověď na otázku o lekci
-                    response = openai_service.answer_user_question(
-                        audio_text,
-                        current_lesson=conversation_state["lesson"].__dict__ if conversation_state["lesson"] else None,
-                        language=conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
-                    )
-                    await send_twiml_response(websocket, twilio_service.create_chat_response(
-                        response["answer"],
-                        conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
-                    ))
-                    
-            elif conversation_state["phase"] == "questioning":
-                # Zpracování odpovědi na otázku
-                if conversation_state["current_question_index"] < len(conversation_state["questions"]):
-                    current_question = conversation_state["questions"][conversation_state["current_question_index"]]
-                    
-                    # Vyhodnocení odpovědi
-                    evaluation = openai_service.evaluate_voice_answer(
-                        current_question["question"],
-                        current_question["correct_answer"],
-                        audio_text,
-                        conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
-                    )
-                    
-                    # Uložení odpovědi
-                    conversation_state["user_answers"].append({
-                        "question": current_question["question"],
-                        "correct_answer": current_question["correct_answer"],
-                        "user_answer": audio_text,
-                        "score": evaluation["score"],
-                        "feedback": evaluation["feedback"],
-                        "is_correct": evaluation["is_correct"]
-                    })
-                    
-                    # Odpověď s feedbackem
-                    feedback_text = f"Vaše odpověď: {evaluation['feedback']}. Skóre: {evaluation['score']}%."
-                    await send_twiml_response(websocket, twilio_service.create_feedback_response(
-                        feedback_text,
-                        conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
-                    ))
-                    
-                    conversation_state["current_question_index"] += 1
-                    
-                    # Další otázka nebo konec
-                    if conversation_state["current_question_index"] < len(conversation_state["questions"]):
-                        next_question = conversation_state["questions"][conversation_state["current_question_index"]]
-                        await send_twiml_response(websocket, twilio_service.create_question_response(
-                            next_question["question"],
-                            conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
-                        ))
-                    else:
-                        # Konec zkoušení
-                        conversation_state["phase"] = "evaluation"
-                        await send_twiml_response(websocket, twilio_service.create_evaluation_response(
-                            conversation_state["user_answers"],
-                            conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
-                        ))
-            
-            # Vyčištění bufferu
-            conversation_state["audio_buffer"] = b""
-            
-        except Exception as e:
-            logger.error(f"Chyba při zpracování audia: {e}")
-            conversation_state["audio_buffer"] = b""
-
-    async def send_twiml_response(websocket, twiml_content):
-        """Pošle TwiML odpověď zpět do Twilio."""
+    try:
+        openai_service = OpenAIRealtimeService()
         try:
-            await websocket.send_text(json.dumps({
-                "event": "media",
-                "streamSid": "placeholder",
-                "media": {
-                    "payload": twiml_content
-                }
-            }))
-        except Exception as e:
-            logger.error(f"Chyba při odesílání TwiML: {e}")
-
-    async def save_conversation_results(conversation_state):
-        """Uloží výsledky konverzace do databáze."""
-        if not conversation_state["attempt_id"]:
+            await openai_service.connect_to_openai()
+        except Exception:
+            await websocket.close()
             return
         
-        session = SessionLocal()
+        async def lesson_context(parameters):
+            # Twilio <Stream> nepodporuje query string - attempt_id chodí jako <Parameter> ve "start" eventu
+            return await asyncio.to_thread(realtime_lesson_context, parameters.get("attempt_id"))
+        
+        bridge = RealtimeMediaBridge(connection.receive_text, connection.send_text, openai_service,
+                                     on_start=connection.bind, lesson_context=lesson_context)
         try:
-            attempt = session.query(Attempt).get(conversation_state["attempt_id"])
-            if attempt and conversation_state["user_answers"]:
-                total_score = sum(answer["score"] for answer in conversation_state["user_answers"])
-                average_score = total_score / len(conversation_state["user_answers"])
-                attempt.score = average_score
-                attempt.status = "completed"
-                attempt.completed_at = datetime.now()
-                attempt.calculate_next_due()
-                for i, answer_data in enumerate(conversation_state["user_answers"]):
-                    answer = Answer(
-                        attempt_id=attempt.id,
-                        question_index=i,
-                        question_text=answer_data["question"],
-                        correct_answer=answer_data["correct_answer"],
-                        user_answer=answer_data["user_answer"],
-                        score=answer_data["score"],
-                        is_correct=answer_data["is_correct"],
-                        feedback=answer_data["feedback"]
-                    )
-                    session.add(answer)
-                session.commit()
-                logger.info(f"Uloženy výsledky pro pokus {attempt.id}, průměrné skóre: {average_score:.1f}%")
-        except Exception as e:
-            session.rollback()
-            logger.error(f"Chyba při ukládání výsledků: {e}")
+            await bridge.run()
         finally:
-            session.close() 
+            logger.info(f"=== MEDIA STREAM UKONČEN === {bridge.stats()}")
+    finally:
+        connection_manager.unregister(connection)
 
 # Konfigurace pro produkci s delšími WebSocket timeouty
 if __name__ == "__main__":
@@ -4487,16 +4416,23 @@ async def generate_tts(request: Request):
         import openai
         client = openai.OpenAI(api_key=openai_api_key)
         
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="nova",
-            input=text,
-            response_format="wav"
+        def synthesize_wav():
+            response = client.audio.speech.create(
+                model="tts-1",
+                voice="nova",
+                input=text,
+                response_format="wav"
+            )
+            return response.content
+        
+        # Opakované texty jdou z TTS cache
+        audio_data = await tts_cache.get_or_synthesize(
+            text, lambda: asyncio.to_thread(synthesize_wav), audio_format=FORMAT_WAV
         )
         
         # Převod na base64 pro Twilio
         import base64
-        audio_b64 = base64.b64encode(response.content).decode()
+        audio_b64 = base64.b64encode(audio_data).decode()
         
         logger.info("✅ TTS audio vygenerováno")
         
@@ -4735,6 +4671,155 @@ def get_or_create_test_session(user_id: int, lesson_id: int, attempt_id: int = N
     finally:
         session.close()
 
+def _enabled_lesson_questions(lesson) -> list:
+    """Vrátí aktivní otázky lekce"""
+    if not isinstance(lesson.questions, list):
+        return []
+    return [
+        q for q in lesson.questions 
+        if isinstance(q, dict) and q.get('enabled', True)
+    ]
+
+def _test_session_to_dict(test_session) -> dict:
+    """Převede TestSession na slovník (stejný tvar vrací save_answer_and_advance)"""
+    return {
+        'id': test_session.id,
+        'current_question_index': test_session.current_question_index,
+        'total_questions': test_session.total_questions,
+        'questions_data': test_session.questions_data,
+        'answers': list(test_session.answers or []),
+        'scores': list(test_session.scores or []),
+        'current_score': test_session.current_score,
+        'is_completed': test_session.is_completed,
+        'completed_at': test_session.completed_at,
+        'failed_categories': list(test_session.failed_categories or []),
+        'difficulty_score': getattr(test_session, 'difficulty_score', 50.0) or 50.0
+    }
+
+def resolve_call_state(call_sid: str = None, attempt_id: str = None) -> Optional[CallState]:
+    """
+    Vrátí stav hovoru z cache, nebo ho jednou načte z DB a uloží do cache
+    (klíč CallSid a/nebo attempt_id). Test session se zde pouze vyhledá, nevytváří.
+    """
+    state = call_state_cache.get(call_sid, attempt_id)
+    if state:
+        return state
+    
+    session = SessionLocal()
+    try:
+        current_user = None
+        
+        # Načtení uživatele podle attempt_id
+        if attempt_id:
+            try:
+                attempt = session.query(Attempt).get(int(attempt_id))
+                if attempt:
+                    current_user = attempt.user
+            except:
+                pass
+        
+        # Pokud není attempt, najdi posledního uživatele
+        if not current_user:
+            current_user = session.query(User).order_by(User.id.desc()).first()
+        
+        if not current_user:
+            return None
+        
+        user_level = getattr(current_user, 'current_lesson_level', 0) or 0
+        
+        # Najdi lekci podle úrovně
+        target_lesson = session.query(Lesson).filter(
+            Lesson.lesson_number == user_level
+        ).first()
+        
+        if not target_lesson:
+            if user_level == 0:
+                target_lesson = session.query(Lesson).filter(
+                    Lesson.title.contains("Lekce 0")
+                ).first()
+            else:
+                # Fallback - najdi podle úrovně
+                target_lesson = session.query(Lesson).filter(
+                    Lesson.level == "beginner"
+                ).first()
+        
+        lesson_data = None
+        enabled_questions = []
+        test_session_data = None
+        if target_lesson:
+            lesson_data = {
+                'id': target_lesson.id,
+                'lesson_number': target_lesson.lesson_number,
+                'title': target_lesson.title,
+                'script': target_lesson.script,
+                'description': target_lesson.description,
+                'language': target_lesson.language,
+                'scoring_thresholds': getattr(target_lesson, 'scoring_thresholds', None)
+            }
+            enabled_questions = _enabled_lesson_questions(target_lesson)
+            
+            # Existující aktivní test session
+            active_session = session.query(TestSession).filter(
+                TestSession.user_id == current_user.id,
+                TestSession.lesson_id == target_lesson.id,
+                TestSession.is_completed == False
+            ).first()
+            if active_session:
+                test_session_data = _test_session_to_dict(active_session)
+        
+        state = CallState(
+            user={
+                'id': current_user.id,
+                'name': current_user.name,
+                'language': current_user.language,
+                'current_lesson_level': user_level
+            },
+            lesson=lesson_data,
+            enabled_questions=enabled_questions,
+            test_session=test_session_data
+        )
+    finally:
+        session.close()
+    
+    return call_state_cache.put(state, call_sid, attempt_id)
+
+def create_test_session_state(user_id: int, lesson_id: int, enabled_questions: list, attempt_id: int = None) -> dict:
+    """Vytvoří novou test session (jeden INSERT) a vrátí ji jako slovník pro cache"""
+    if not enabled_questions:
+        raise ValueError("Žádné aktivní otázky v lekci")
+    
+    session = SessionLocal()
+    try:
+        test_session = TestSession(
+            user_id=user_id,
+            lesson_id=lesson_id,
+            attempt_id=attempt_id,
+            current_question_index=0,
+            total_questions=len(enabled_questions),
+            questions_data=enabled_questions,
+            answers=[],
+            scores=[]
+        )
+        session.add(test_session)
+        session.commit()
+        
+        logger.info(f"🆕 Vytvořena nová test session: {test_session.id} s {len(enabled_questions)} otázkami")
+        return _test_session_to_dict(test_session)
+    finally:
+        session.close()
+
+def set_user_lesson_level(user_id: int, level: int) -> None:
+    """Nastaví úroveň uživatele (jeden UPDATE) a zahodí jeho stavy hovorů v cache"""
+    session = SessionLocal()
+    try:
+        session.query(User).filter(User.id == user_id).update(
+            {User.current_lesson_level: level}, synchronize_session=False
+        )
+        session.commit()
+    finally:
+        session.close()
+    call_state_cache.invalidate_user(user_id)
+
 def get_current_question(test_session) -> dict:
     """Získá aktuální otázku pro test session (přijímá TestSession objekt nebo dict)"""
     if isinstance(test_session, dict):
@@ -4749,140 +4834,54 @@ def get_current_question(test_session) -> dict:
     
     return questions_data[current_index]
 
-def get_next_adaptive_question(test_session) -> Optional[dict]:
-    """
-    Vybere další otázku na základě adaptivní obtížnosti.
-    """
-    if isinstance(test_session, dict):
-        answered_indices = {a['question_index'] for a in test_session.get('answers', [])}
-        all_questions = test_session.get('questions_data', [])
-        difficulty_score = test_session.get('difficulty_score', 50.0)
-    else: # Je to TestSession objekt
-        # Bezpečnější přístup k potentially None 'answers'
-        answered_indices = {a['question_index'] for a in (test_session.answers or [])}
-        all_questions = test_session.questions_data
-        difficulty_score = getattr(test_session, 'difficulty_score', 50.0) or 50.0
-
-    unanswered_questions = [
-        (idx, q) for idx, q in enumerate(all_questions) if idx not in answered_indices
-    ]
-
-    if not unanswered_questions:
-        return None
-
-    difficulty_map = {"easy": 25, "medium": 50, "hard": 75}
-    
-    best_question = None
-    min_diff = float('inf')
-
-    for idx, q_data in unanswered_questions:
-        q_difficulty = difficulty_map.get(q_data.get("difficulty", "medium"), 50)
-        diff = abs(q_difficulty - difficulty_score)
-        
-        if diff < min_diff:
-            min_diff = diff
-            best_question = q_data.copy() # Vytvoříme kopii
-            best_question['original_index'] = idx 
-            
-    return best_question
-
-def save_answer_and_advance(test_session_id: int, user_answer: str, score: float, feedback: str, question_index: int):
+def save_answer_and_advance(test_session_id: int, user_answer: str, score: float, feedback: str, question_index: int, cached_session: dict = None, scored_by: str = "llm", plan: NextQuestionPlan = None):
     """
     Uloží odpověď, aktualizuje skóre obtížnosti, sleduje chyby a posune na další otázku.
+    
+    Pokud je předán cached_session (stav hovoru z cache), nic se nečte -
+    nový stav se spočítá v paměti a zapíše jedním UPDATE (write-through).
+    Vrací nový stav jako slovník včetně 'next_question'.
     """
     session = SessionLocal()
     try:
-        test_session = session.query(TestSession).get(test_session_id)
-        if not test_session:
-            return None
-        
-        # Získání otázky podle předaného indexu
-        current_question = test_session.questions_data[question_index]
-        
-        # Aktualizace skóre obtížnosti
-        difficulty_map = {"easy": 25, "medium": 50, "hard": 75}
-        q_difficulty_val = difficulty_map.get(current_question.get("difficulty", "medium"), 50)
+        if cached_session is None:
+            test_session = session.query(TestSession).get(test_session_id)
+            if not test_session:
+                return None
+            cached_session = _test_session_to_dict(test_session)
         
-        if score >= 80:
-            adjustment = (100 - q_difficulty_val) / 10
-            current_difficulty = getattr(test_session, 'difficulty_score', 50.0) or 50.0
-            test_session.difficulty_score = current_difficulty + adjustment
-        else:
-            adjustment = q_difficulty_val / 10
-            current_difficulty = getattr(test_session, 'difficulty_score', 50.0) or 50.0
-            test_session.difficulty_score = current_difficulty - adjustment
-            
-            category = current_question.get("category", "Neznámá")
-            if not test_session.failed_categories:
-                test_session.failed_categories = []
-            if category not in test_session.failed_categories:
-                test_session.failed_categories.append(category)
-                flag_modified(test_session, "failed_categories")
-
-        current_difficulty = getattr(test_session, 'difficulty_score', 50.0) or 50.0
-        test_session.difficulty_score = max(0, min(100, current_difficulty))
-        final_difficulty = getattr(test_session, 'difficulty_score', 50.0) or 50.0
-        logger.info(f"🧠 Nové skóre obtížnosti: {final_difficulty:.2f} (změna: {adjustment:.2f})")
-
-        answer_data = {
-            "question": current_question.get("question", ""),
-            "correct_answer": current_question.get("correct_answer", ""),
-            "user_answer": user_answer,
-            "score": score,
-            "feedback": feedback,
-            "question_index": question_index
-        }
-        
-        if not test_session.answers:
-            test_session.answers = []
-        if not test_session.scores:
-            test_session.scores = []
-            
-        test_session.answers.append(answer_data)
-        test_session.scores.append(score)
+        updated = apply_answer(cached_session, user_answer, score, feedback, question_index, scored_by, plan)
         
-        test_session.current_score = sum(test_session.scores) / len(test_session.scores)
-        
-        question_num = len(test_session.answers)
+        question_num = len(updated['answers'])
         logger.info(f"""
 💾 === ODPOVĚĎ ULOŽENA ===
-🔢 Otázka: {question_num}/{test_session.total_questions}
+🔢 Otázka: {question_num}/{updated['total_questions']}
 📝 Uživatel: "{user_answer}"
 🎯 Skóre: {score}%
 💬 Feedback: "{feedback}"
-📊 Průměr: {test_session.current_score:.1f}%
+📊 Průměr: {updated['current_score']:.1f}%
 =========================""")
         
-        if len(test_session.answers) >= test_session.total_questions:
-            test_session.is_completed = True
-            test_session.completed_at = datetime.utcnow()
-        
-        # KRITICKÉ: Oznámení SQLAlchemy o změnách JSON sloupců
-        flag_modified(test_session, 'answers')
-        flag_modified(test_session, 'scores')
-        flag_modified(test_session, 'failed_categories')
-        
-        # KRITICKÉ: Commit změn do databáze
+        # KRITICKÉ: Jeden zápis do databáze (JSON sloupce se přepisují celé)
+        session.query(TestSession).filter(TestSession.id == test_session_id).update(
+            answer_update_values(updated), synchronize_session=False
+        )
         session.commit()
         
-        return {
-            'id': test_session.id,
-            'current_question_index': test_session.current_question_index,
-            'total_questions': test_session.total_questions,
-            'questions_data': test_session.questions_data,
-            'answers': test_session.answers,
-            'scores': test_session.scores,
-            'current_score': test_session.current_score,
-            'is_completed': test_session.is_completed,
-            'completed_at': test_session.completed_at,
-            'failed_categories': test_session.failed_categories,
-            'difficulty_score': getattr(test_session, 'difficulty_score', 50.0)
-        }
+        return updated
             
     finally:
         session.close()
-    
-    return None
+
+# Jednoznačná slova, podle kterých je odpověď se střední confidence srozumitelná
+# (zkompilováno jednou, hledá se na celá slova - "ne" se nenajde v "není")
+CLEAR_ANSWER_INDICATORS = PhraseMatcher(['ano', 'ne', 'nevím', 'není', 'je', 'má', 'nemá'])
+
+# Signály, že uživatel chce ukončit odpověď / test
+COMPLETION_SIGNALS = PhraseMatcher([
+    'hotovo', 'konec', 'dokončeno', 'to je vše', 'to je všechno',
+    'stačí', 'už ne', 'už nechci', 'končím', 'finish', 'done'
+])
 
 # === NOVÁ FUNKCE: Inteligentní rozhodování o kvalitě rozpoznání ===
 def should_ask_for_confirmation(speech_result: str, confidence_float: float, context: str = "") -> dict:
@@ -4895,7 +4894,6 @@ def should_ask_for_confirmation(speech_result: str, confidence_float: float, con
     if not speech_result:
         return {"action": "ask_repeat", "reason": "empty_response", "message": "Nerozuměl jsem vám. Můžete zopakovat svou odpověď?"}
     
-    speech_lower = speech_result.lower().strip()
     word_count = len(speech_result.split())
     
     # 1. VYSOKÁ KVALITA - pokračovat bez ptaní
@@ -4913,8 +4911,7 @@ def should_ask_for_confirmation(speech_result: str, confidence_float: float, con
     # 3. STŘEDNÍ KVALITA - rozhoduj podle obsahu
     if 0.4 <= confidence_float < 0.8:
         # Pokud obsahuje jasná slova, pravděpodobně je OK
-        clear_indicators = ['ano', 'ne', 'nevím', 'není', 'je', 'má', 'nemá']
-        has_clear_word = any(word in speech_lower for word in clear_indicators)
+        has_clear_word = CLEAR_ANSWER_INDICATORS.contains_any(speech_result)
         
         if has_clear_word and word_count >= 2:
             return {"action": "continue", "reason": "clear_content", "message": ""}
@@ -4955,13 +4952,7 @@ def is_completion_signal(speech_text: str) -> bool:
     if not speech_text:
         return False
     
-    completion_signals = [
-        'hotovo', 'konec', 'dokončeno', 'to je vše', 'to je všechno',
-        'stačí', 'už ne', 'už nechci', 'končím', 'finish', 'done'
-    ]
-    
-    speech_lower = speech_text.lower().strip()
-    return any(signal in speech_lower for signal in completion_signals)
+    return COMPLETION_SIGNALS.contains_any(speech_text)
 
 # --- NOVÉ SYSTÉMOVÉ ENDPOINTY ---
 @system_router.get("/run-migrations", response_class=HTMLResponse, name="admin_run_migrations")
@@ -0,0 +1,41 @@
+import pytest
+
+from app.services.adaptive_planner import (
+    adjust_difficulty, get_next_adaptive_question, next_question_prompt, plan_next_question
+)
+
+QUESTIONS = [
+    {"question": "Q0", "difficulty": "medium"},
+    {"question": "Q1", "difficulty": "easy"},
+    {"question": "Q2", "difficulty": "hard"},
+    {"question": "Q3", "difficulty": "medium"},
+]
+
+
+def _session(answers=(), difficulty=50.0):
+    return {
+        "questions_data": QUESTIONS,
+        "total_questions": len(QUESTIONS),
+        "answers": [{"question_index": i} for i in answers],
+        "difficulty_score": difficulty,
+    }
+
+
+@pytest.mark.parametrize("score", [0, 79, 80, 100])
+def test_plan_matches_sequential_selection(score):
+    session = _session(answers=[3], difficulty=55.0)
+    branch = plan_next_question(session, 0).for_score(score)
+
+    # Referenční (sekvenční) výpočet: nová obtížnost -> výběr z nezodpovězených
+    difficulty, _ = adjust_difficulty(55.0, QUESTIONS[0], score >= 80)
+    expected = get_next_adaptive_question(_session(answers=[3, 0], difficulty=difficulty))
+
+    assert branch.difficulty_score == difficulty
+    assert branch.next_question == expected
+    assert branch.prompt == next_question_prompt(expected)
+
+
+def test_last_question_has_no_next_question():
+    plan = plan_next_question(_session(answers=[1, 2, 3]), 0)
+    assert plan.passed.is_last and plan.failed.is_last
+    assert plan.passed.next_question is None and plan.failed.next_question is None
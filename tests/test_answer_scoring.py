@@ -0,0 +1,71 @@
+import pytest
+
+from app.services.answer_scoring import LocalAnswerScorer, match_keywords, build_agreement_report
+
+QUESTION = {
+    "question": "Jak se odstraňuje tramp oil?",
+    "correct_answer": "Separátorem oleje nebo skimmerem",
+    "keywords": ["separátor", "skimmer"]
+}
+
+
+def test_match_keywords_exact_substring_and_synonym():
+    result = match_keywords(["separátor", "chlazení", "koncentrace"], "operátorem, chlazením a koncentr")
+    assert result["missing"] == []
+    types = {kw: match_type for kw, match_type, _ in result["matches"]}
+    assert types["separátor"] == "synonymum"
+    assert types["chlazení"] == "přesná"
+    assert types["koncentrace"] == "substring"
+    assert result["coverage"] == 100
+
+
+def test_short_words_do_not_match_inside_keywords():
+    result = match_keywords(["separátor"], "a to je")
+    assert result["coverage"] == 0
+
+
+def test_full_coverage_is_scored_locally():
+    local = LocalAnswerScorer().score(QUESTION, "separátorem a skimmerem")
+    assert local.score == 100
+    assert local.feedback == "Výborně, úplná odpověď!"
+
+
+def test_zero_coverage_short_answer_is_scored_locally():
+    local = LocalAnswerScorer().score(QUESTION, "nevím")
+    assert local.score == 0
+    assert "separátor" in local.feedback
+
+
+@pytest.mark.parametrize("answer", [
+    "skimmerem",  # částečné pokrytí
+    "olej se odsaje nějakým zařízením z povrchu nádrže",  # dlouhá parafráze bez klíčových slov
+])
+def test_ambiguous_answers_go_to_llm(answer):
+    assert LocalAnswerScorer().score(QUESTION, answer) is None
+
+
+def test_lesson_thresholds_override_defaults():
+    scorer = LocalAnswerScorer.for_lesson({"scoring_thresholds": {"full_coverage": 50}})
+    assert scorer.score(QUESTION, "skimmerem").score == 100
+    assert LocalAnswerScorer({"enabled": False}).score(QUESTION, "separátorem a skimmerem") is None
+
+
+def test_agreement_report_counts_only_llm_scored_answers():
+    sessions = [{
+        "lesson_id": 1,
+        "questions_data": [QUESTION],
+        "answers": [
+            {"question_index": 0, "user_answer": "separátorem a skimmerem", "score": 95},
+            {"question_index": 0, "user_answer": "nevím", "score": 85},
+            {"question_index": 0, "user_answer": "skimmerem", "score": 60},
+            {"question_index": 0, "user_answer": "nevím", "score": 0, "scored_by": "local"},
+            {"question_index": 0, "user_answer": "nevím", "score": 0, "scored_by": "cache"},
+            {"question_index": 0, "user_answer": "skimmerem", "score": 70, "scored_by": "llm"}
+        ]
+    }]
+    report = build_agreement_report(sessions)
+    assert report["answers_skipped"] == 2
+    assert report["decided_locally"] == 2
+    assert report["agreements"] == 1
+    assert report["disagreements"] == 1
+    assert report["agreement_rate"] == 0.5
@@ -0,0 +1,108 @@
+import asyncio
+
+from app.services.assistant_registry import (
+    ASSISTANT_INSTRUCTIONS, FALLBACK_ASSISTANT_ID, METADATA_HASH_KEY, AssistantRegistry
+)
+
+
+class _Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _Assistants:
+    def __init__(self):
+        self.items = []
+
+    def list(self, limit=100, order="desc"):
+        return list(reversed(self.items))
+
+    def create(self, name, instructions, model, tools, metadata):
+        assistant = _Obj(id=f"asst_{len(self.items)}", metadata=metadata)
+        self.items.append(assistant)
+        return assistant
+
+
+class _Threads:
+    def __init__(self):
+        self.created = 0
+        self.deleted = []
+
+    def create(self):
+        self.created += 1
+        return _Obj(id=f"thread_{self.created}")
+
+    def delete(self, thread_id):
+        self.deleted.append(thread_id)
+
+
+class FakeClient:
+    def __init__(self):
+        self.beta = _Obj(assistants=_Assistants(), threads=_Threads())
+
+
+def _registry(**kwargs):
+    registry = AssistantRegistry(**kwargs)
+    registry.configured_assistant_id = None
+    return registry
+
+
+def test_assistant_created_once_and_found_after_restart():
+    client = FakeClient()
+
+    async def first_calls():
+        registry = _registry(pool_size=0)
+        return await asyncio.gather(*(registry.get_assistant_id(client) for _ in range(5)))
+
+    assert asyncio.run(first_calls()) == ["asst_0"] * 5
+    assert len(client.beta.assistants.items) == 1
+
+    restarted = _registry(pool_size=0)
+    assert asyncio.run(restarted.get_assistant_id(client)) == "asst_0"
+    assert restarted.stats()['assistants_found'] == 1
+
+    # Jiné instrukce = jiný asistent
+    assert asyncio.run(restarted.get_assistant_id(client, ASSISTANT_INSTRUCTIONS + " Buď stručný.")) == "asst_1"
+    assert METADATA_HASH_KEY in client.beta.assistants.items[1].metadata
+
+
+def test_fallback_assistant_on_api_error():
+    class Broken:
+        beta = _Obj(assistants=None, threads=None)
+
+    assert asyncio.run(_registry(pool_size=0).get_assistant_id(Broken())) == FALLBACK_ASSISTANT_ID
+
+
+def test_thread_pool_serves_prewarmed_threads_and_refills():
+    client = FakeClient()
+    registry = _registry(pool_size=2)
+
+    async def scenario():
+        await registry.warm_up(client)
+        assert client.beta.threads.created == 2
+        thread_id = await registry.acquire_thread(client)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        await registry.release_thread(client, thread_id)
+        return thread_id
+
+    assert asyncio.run(scenario()) == "thread_1"
+    stats = registry.stats()
+    assert (stats['pool_hits'], stats['pool_misses'], stats['pooled_threads']) == (1, 0, 2)
+    assert client.beta.threads.deleted == ["thread_1"]
+
+
+def test_stale_pooled_threads_are_replaced():
+    client = FakeClient()
+    registry = _registry(pool_size=1, max_thread_age=0)
+
+    async def scenario():
+        await registry.warm_up(client)
+        await asyncio.sleep(0.01)
+        thread_id = await registry.acquire_thread(client)
+        await asyncio.sleep(0.05)
+        return thread_id
+
+    assert asyncio.run(scenario()) == "thread_2"
+    assert registry.stats()['pool_misses'] == 1
+    assert "thread_1" in client.beta.threads.deleted
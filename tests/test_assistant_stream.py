@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+from app.services.assistant_stream import SentenceSplitter, stream_run_sentences
+
+
+class _Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def _delta(text):
+    block = _Obj(type="text", text=_Obj(value=text))
+    return _Obj(event="thread.message.delta", data=_Obj(delta=_Obj(content=[block])))
+
+
+class _Stream:
+    def __init__(self, events, delay, closed):
+        self.events = events
+        self.delay = delay
+        self.closed = closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed.set()
+        return False
+
+    def __iter__(self):
+        for event in self.events:
+            time.sleep(self.delay)
+            yield event
+
+
+class FakeClient:
+    def __init__(self, events, delay=0.0):
+        self.closed = threading.Event()
+        self.cancelled = []
+        runs = _Obj(
+            stream=lambda thread_id, assistant_id: _Stream(events, delay, self.closed),
+            cancel=lambda thread_id, run_id: self.cancelled.append(run_id)
+        )
+        self.beta = _Obj(threads=_Obj(runs=runs))
+
+
+def test_splitter_emits_sentences_as_they_complete():
+    splitter = SentenceSplitter(min_chars=12)
+    assert splitter.feed("Ano. Přítomný čas se tvoří") == []
+    assert splitter.feed(" pomocí slovesa být. Zkuste") == ["Ano. Přítomný čas se tvoří pomocí slovesa být."]
+    assert splitter.feed(" to znovu!\nDobře") == ["Zkuste to znovu!"]
+    assert splitter.flush() == "Dobře"
+    assert splitter.flush() is None
+
+
+def test_splitter_keeps_abbreviations_and_ordinals_in_sentence():
+    splitter = SentenceSplitter(min_chars=12)
+    assert splitter.feed("Používá se např. skimmer, tzv. ") == []
+    assert splitter.feed("separátor oleje. Ve 3. kroku") == ["Používá se např. skimmer, tzv. separátor oleje."]
+    assert splitter.feed(" vyměňte filtr… Řekl „Hotovo.“ Dál") == ["Ve 3. kroku vyměňte filtr…", "Řekl „Hotovo.“"]
+
+
+def test_first_sentence_arrives_before_run_completes():
+    events = [_Obj(event="thread.run.created", data=_Obj(id="run_1"))] + [
+        _delta(text) for text in ("Výborně, to je ", "správná odpověď. ", "Teď další ", "otázka.")
+    ]
+    client = FakeClient(events, delay=0.05)
+
+    async def consume():
+        started = time.perf_counter()
+        received = []
+        async for sentence in stream_run_sentences(client, "thread_1", "asst_1"):
+            received.append((sentence, time.perf_counter() - started))
+        return received
+
+    received = asyncio.run(consume())
+    assert [sentence for sentence, _ in received] == ["Výborně, to je správná odpověď.", "Teď další otázka."]
+    assert received[0][1] < received[1][1] - 0.05
+    assert client.cancelled == []
+
+
+def test_stopping_iteration_closes_and_cancels_run():
+    events = [_Obj(event="thread.run.created", data=_Obj(id="run_7"))]
+    client = FakeClient(events + [_delta(f"Věta číslo {index}. ") for index in range(50)], delay=0.01)
+
+    async def consume_first():
+        sentences = stream_run_sentences(client, "thread_1", "asst_1")
+        async for sentence in sentences:
+            await sentences.aclose()
+            return sentence
+
+    assert asyncio.run(consume_first()) == "Věta číslo 0."
+    assert client.closed.wait(1.0)
+    deadline = time.monotonic() + 1.0
+    while not client.cancelled and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.cancelled == ["run_7"]
@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.services.audio_codec import (
+    ULAW_DECODE_TABLE, parse_wav, resample_poly, ulaw_decode, ulaw_encode, wav_to_mulaw
+)
+from app.services.audio_framing import PCM_FORMAT, build_wav
+
+
+def _sine(freq, rate, seconds=0.5, amplitude=8000):
+    t = np.arange(int(rate * seconds)) / rate
+    return np.round(amplitude * np.sin(2 * math.pi * freq * t)).astype(np.int16)
+
+
+def test_ulaw_known_g711_values():
+    assert ulaw_encode(np.array([0, -1, 32767, -32768, 1000], dtype=np.int16)) == b'\xff\x7e\x80\x00\xce'
+    assert ULAW_DECODE_TABLE[0xFF] == 0 and ULAW_DECODE_TABLE[0x80] == 32124 and ULAW_DECODE_TABLE[0x00] == -32124
+
+
+def test_ulaw_matches_audioop_bit_for_bit():
+    audioop = pytest.importorskip("audioop")
+    pcm = np.arange(-32768, 32768, dtype=np.int16)
+    assert ulaw_encode(pcm) == audioop.lin2ulaw(pcm.tobytes(), 2)
+    all_bytes = bytes(range(256))
+    assert ulaw_decode(all_bytes).tobytes() == audioop.ulaw2lin(all_bytes, 2)
+
+
+def test_ulaw_roundtrip_is_stable():
+    codes = bytes(range(256))
+    assert ulaw_encode(ulaw_decode(codes)) == codes.replace(b'\x7f', b'\xff')
+
+
+def test_parse_wav_pcm_stereo_and_mulaw():
+    stereo = np.array([[100, 300], [-200, -400]], dtype='<i2')
+    samples, rate = parse_wav(bytes(build_wav(stereo.tobytes(), PCM_FORMAT, channels=2,
+                                              sample_rate=24000, bits_per_sample=16)))
+    assert rate == 24000 and samples.tolist() == [200, -300]
+
+    samples, rate = parse_wav(bytes(build_wav(b'\xff\x80')))
+    assert rate == 8000 and samples.tolist() == [0, 32124]
+
+    with pytest.raises(ValueError):
+        parse_wav(b'not a wav file')
+
+
+def test_parse_wav_streamed_data_size():
+    wav = build_wav(np.arange(10, dtype='<i2').tobytes(), PCM_FORMAT, sample_rate=24000, bits_per_sample=16)
+    wav[40:44] = b'\xff\xff\xff\xff'  # TTS API posílá WAV s neznámou délkou dat
+    samples, _ = parse_wav(bytes(wav))
+    assert samples.tolist() == list(range(10))
+
+
+def test_resample_24k_to_8k_keeps_speech_band():
+    out = resample_poly(_sine(1000, 24000), 24000, 8000)
+    assert len(out) == 4000
+    expected = _sine(1000, 8000)
+    assert np.max(np.abs(out[100:-100].astype(int) - expected[100:-100])) < 0.01 * 8000
+
+
+def test_resample_attenuates_aliasing_tones():
+    out = resample_poly(_sine(6000, 24000), 24000, 8000)
+    assert np.max(np.abs(out[100:-100])) < 0.01 * 8000
+
+
+def test_wav_to_mulaw_from_tts_wav():
+    pcm = _sine(440, 24000, seconds=1.0)
+    mulaw = wav_to_mulaw(bytes(build_wav(pcm.tobytes(), PCM_FORMAT, sample_rate=24000, bits_per_sample=16)))
+    assert len(mulaw) == 8000
+    decoded = ulaw_decode(mulaw).astype(int)
+    assert abs(np.max(np.abs(decoded[100:-100])) - 8000) < 400
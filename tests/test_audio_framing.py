@@ -0,0 +1,24 @@
+import struct
+import wave
+
+from app.services.audio_framing import PCM_FORMAT, WAV_HEADER_SIZE, build_wav, wav_file
+
+
+def test_mulaw_header_matches_previous_tempfile_header():
+    audio_data = bytes(range(256)) * 10
+    expected = struct.pack('<4sI4s4sIHHIIHH4sI',
+        b'RIFF', len(audio_data) + 44 - 8, b'WAVE', b'fmt ', 16,
+        7, 1, 8000, 8000, 1, 8, b'data', len(audio_data)
+    ) + audio_data
+    assert bytes(build_wav(audio_data)) == expected
+
+
+def test_pcm_wav_is_readable_by_wave_module():
+    pcm = struct.pack('<4h', 0, 1000, -1000, 32767)
+    audio_file = wav_file(memoryview(pcm), name="chunk.wav", audio_format=PCM_FORMAT,
+                          sample_rate=16000, bits_per_sample=16)
+    assert audio_file.name == "chunk.wav"
+    with wave.open(audio_file) as wav:
+        assert (wav.getframerate(), wav.getsampwidth(), wav.getnframes()) == (16000, 2, 4)
+        assert wav.readframes(4) == pcm
+    assert len(audio_file.getvalue()) == WAV_HEADER_SIZE + len(pcm)
@@ -0,0 +1,40 @@
+import pytest
+
+from app.services.audio_ring import OVERFLOW_ERROR, OVERFLOW_REJECT, AudioRingBuffer
+
+
+def test_views_across_wraparound_are_contiguous_and_zero_copy():
+    ring = AudioRingBuffer(10)
+    ring.write(b'0123456')
+    ring.consume(5)
+    ring.write(b'789ab')  # přes konec kruhu
+    view = ring.snapshot()
+    assert view.tobytes() == b'56789ab' and view.contiguous
+    assert view.obj is ring.view(ring.start, ring.written).obj  # pohled do bufferu, ne kopie
+    assert ring.view(8, 11).tobytes() == b'89a'
+
+
+def test_overwrite_keeps_latest_capacity():
+    ring = AudioRingBuffer(4)
+    for chunk in (b'ab', b'cd', b'ef'):
+        ring.write(chunk)
+    assert ring.snapshot().tobytes() == b'cdef'
+    assert (ring.start, ring.written, ring.overwritten) == (2, 6, 2)
+    with pytest.raises(IndexError):
+        ring.view(0, 3)
+    ring.write(b'0123456789')
+    assert ring.snapshot().tobytes() == b'6789' and ring.snapshot(2).tobytes() == b'89'
+
+
+def test_reject_and_error_policies():
+    ring = AudioRingBuffer(4, overflow=OVERFLOW_REJECT)
+    assert ring.write(b'abc') == 3 and ring.write(b'de') == 1
+    assert ring.snapshot().tobytes() == b'abcd' and ring.rejected == 1
+
+    strict = AudioRingBuffer(4, overflow=OVERFLOW_ERROR)
+    strict.write(b'abcd')
+    with pytest.raises(BufferError):
+        strict.write(b'e')
+    strict.clear()
+    strict.write(b'e')
+    assert strict.snapshot().tobytes() == b'e'
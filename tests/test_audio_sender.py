@@ -0,0 +1,127 @@
+import asyncio
+import base64
+import json
+import random
+import time
+
+from app.services.audio_sender import FRAME_BYTES, OutboundAudioSender, frame_payloads
+
+
+class VirtualClock:
+    """Virtuální čas; každé probuzení má náhodné zpoždění plánovače (0-8 ms)"""
+
+    def __init__(self, seed=3):
+        self.now = 0.0
+        self.rng = random.Random(seed)
+
+    def clock(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.now += delay + self.rng.uniform(0, 0.008)
+        await asyncio.sleep(0)
+
+
+class Recorder:
+    def __init__(self, clock):
+        self.clock = clock
+        self.messages = []
+
+    async def send_text(self, text):
+        self.messages.append((self.clock(), json.loads(text)))
+
+    def media_times(self):
+        return [t for t, msg in self.messages if msg['event'] == 'media']
+
+
+def test_frames_are_aligned_and_padded():
+    payloads = frame_payloads(b'\x01' * (FRAME_BYTES * 2 + 10))
+    frames = [base64.b64decode(p) for p in payloads]
+    assert [len(f) for f in frames] == [FRAME_BYTES] * 3
+    assert frames[2] == b'\x01' * 10 + b'\xff' * (FRAME_BYTES - 10)
+
+
+def test_pacing_does_not_drift_over_long_clip():
+    clock = VirtualClock()
+    recorder = Recorder(clock.clock)
+    sender = OutboundAudioSender(recorder.send_text, "MZ1", lead_frames=3, clock=clock.clock, sleep=clock.sleep)
+    frames = 60 * 50  # 60 s audia
+
+    async def run():
+        assert await sender.play(b'\x7f' * (FRAME_BYTES * frames), mark="intro")
+        await sender.stop()
+
+    asyncio.run(run())
+    times = recorder.media_times()
+    assert len(times) == frames
+    # Rámec n má jít v čase (n - 3) * 20 ms; chyba je jen zpoždění posledního probuzení, nesčítá se
+    errors = [t - max(0, (n - 3) * 0.02) for n, t in enumerate(times)]
+    assert 0 <= min(errors) and max(errors) <= 0.0081
+    assert abs(times[-1] - (frames - 1 - 3) * 0.02) <= 0.0081
+    assert recorder.messages[-1][1] == {"event": "mark", "streamSid": "MZ1", "mark": {"name": "intro"}}
+    assert sender.is_playing
+    sender.on_mark("intro")
+    assert not sender.is_playing
+
+
+def test_real_clock_pacing_error():
+    recorder = Recorder(time.monotonic)
+    sender = OutboundAudioSender(recorder.send_text, "MZ2", frame_ms=5, lead_frames=0)
+
+    async def run():
+        await sender.play(b'\x7f' * (FRAME_BYTES * 200))
+        await sender.stop()
+
+    asyncio.run(run())
+    times = recorder.media_times()
+    start = times[0]
+    errors = [abs(t - start - n * 0.005) for n, t in enumerate(times)]
+    # Celková délka odpovídá reálnému času (bez driftu), jednotlivé rámce v toleranci plánovače
+    assert abs(times[-1] - start - 199 * 0.005) < 0.02
+    assert sum(errors) / len(errors) < 0.01
+
+
+def test_clear_drops_queue_and_notifies_twilio():
+    clock = VirtualClock()
+    recorder = Recorder(clock.clock)
+    sender = OutboundAudioSender(recorder.send_text, "MZ3", clock=clock.clock, sleep=clock.sleep)
+
+    async def run():
+        first = asyncio.create_task(sender.play(b'\x7f' * (FRAME_BYTES * 500)))
+        second = asyncio.create_task(sender.play(b'\x7f' * (FRAME_BYTES * 500)))
+        while len(recorder.media_times()) < 10:
+            await asyncio.sleep(0)
+        await sender.clear()
+        results = await asyncio.gather(first, second)
+        await sender.stop()
+        return results
+
+    assert asyncio.run(run()) == [False, False]
+    events = [msg['event'] for _, msg in recorder.messages]
+    assert events.count('clear') == 1 and 'mark' not in events
+    assert events.index('clear') >= 10 and len(recorder.media_times()) <= 12
+    assert not sender.is_playing
+
+
+def test_send_failure_resolves_play_and_stop():
+    clock = VirtualClock()
+    recorder = Recorder(clock.clock)
+
+    async def failing_send(text):
+        if len(recorder.media_times()) == 4:
+            raise RuntimeError("WebSocket is closed")
+        await recorder.send_text(text)
+
+    sender = OutboundAudioSender(failing_send, "MZ4", clock=clock.clock, sleep=clock.sleep)
+
+    async def run():
+        first = asyncio.create_task(sender.play(b'\x7f' * (FRAME_BYTES * 50)))
+        second = asyncio.create_task(sender.play(b'\x7f' * (FRAME_BYTES * 50)))
+        results = await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+        await sender.stop()
+        return results
+
+    # Pátý rámec selže - oba klipy skončí False a stop() nevyhodí chybu
+    assert asyncio.run(run()) == [False, False]
+    assert len(recorder.media_times()) == 4
+    assert not sender.is_playing
@@ -0,0 +1,140 @@
+from app.services.adaptive_planner import plan_next_question
+from app.services.call_state import (
+    ANSWER_UPDATE_COLUMNS, CallState, CallStateCache, answer_update_values, apply_answer
+)
+
+QUESTIONS = [
+    {"question": "Q0", "correct_answer": "A0", "difficulty": "medium", "category": "Mazání"},
+    {"question": "Q1", "correct_answer": "A1", "difficulty": "easy", "category": "Chlazení"},
+    {"question": "Q2", "correct_answer": "A2", "difficulty": "hard", "category": "Bezpečnost"},
+]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _state(user_id=1, lesson_id=10):
+    return CallState(user={'id': user_id, 'current_lesson_level': 1}, lesson={'id': lesson_id})
+
+
+def _session(answers=()):
+    return {
+        'questions_data': QUESTIONS,
+        'total_questions': len(QUESTIONS),
+        'current_question_index': 0,
+        'answers': [{'question_index': i} for i in answers],
+        'scores': [100.0 for _ in answers],
+        'failed_categories': [],
+        'difficulty_score': 50.0,
+        'current_score': 0.0,
+        'is_completed': False,
+        'completed_at': None
+    }
+
+
+def test_ttl_slides_on_every_access():
+    clock = Clock()
+    cache = CallStateCache(ttl_seconds=60, clock=clock)
+    state = cache.put(_state(), call_sid="CA1")
+
+    for _ in range(3):
+        clock.now += 50  # Každý tah do TTL prodlouží platnost
+        assert cache.get(call_sid="CA1") is state
+
+    clock.now += 61
+    assert cache.get(call_sid="CA1") is None
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['evictions'] == 1
+
+
+def test_call_and_attempt_keys_alias_one_state():
+    cache = CallStateCache()
+    state = cache.put(_state(), attempt_id="7")
+
+    # Druhý request už zná CallSid - klíč se doplní k existujícímu stavu
+    assert cache.get(call_sid="CA1", attempt_id="7") is state
+    assert cache.get(call_sid="CA1") is state
+    assert state.keys == {"call:CA1", "attempt:7"}
+
+    cache.invalidate(attempt_id="7")
+    assert cache.get(call_sid="CA1") is None
+
+
+def test_conflicting_aliases_keep_first_state_and_drop_the_other():
+    cache = CallStateCache()
+    current = cache.put(_state(), call_sid="CA1")
+    stale = cache.put(_state(), attempt_id="7")
+
+    assert cache.get(call_sid="CA1", attempt_id="7") is current
+    assert cache.get(attempt_id="7") is current
+    assert not stale.keys
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['keys'] == 2
+
+
+def test_invalidate_user_and_lesson():
+    cache = CallStateCache()
+    cache.put(_state(user_id=1, lesson_id=10), call_sid="CA1", attempt_id="1")
+    cache.put(_state(user_id=2, lesson_id=10), call_sid="CA2")
+    cache.put(_state(user_id=3, lesson_id=20), call_sid="CA3")
+
+    cache.invalidate_user(1)
+    assert cache.get(call_sid="CA1") is None
+    assert cache.get(attempt_id="1") is None
+    assert cache.get(call_sid="CA2") is not None
+
+    cache.invalidate_lesson(10)
+    assert cache.get(call_sid="CA2") is None
+    assert cache.get(call_sid="CA3") is not None
+
+
+def test_max_entries_evicts_least_recently_used():
+    cache = CallStateCache(max_entries=2)
+    first = cache.put(_state(), call_sid="CA1")
+    cache.put(_state(), call_sid="CA2")
+    assert cache.get(call_sid="CA1") is first  # CA1 je teď nejčerstvější
+    cache.put(_state(), call_sid="CA3")
+
+    assert cache.get(call_sid="CA2") is None
+    assert cache.get(call_sid="CA1") is first
+    assert cache.get(call_sid="CA3") is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_apply_answer_advances_without_mutating_input():
+    session = _session()
+    updated = apply_answer(session, "nevím", 20.0, "Ne.", 0)
+
+    assert session['answers'] == [] and session['scores'] == []
+    assert updated['answers'][0]['user_answer'] == "nevím"
+    assert updated['failed_categories'] == ["Mazání"]
+    assert updated['difficulty_score'] == 45.0
+    # Po neúspěchu se vybere nejbližší lehčí otázka
+    assert updated['current_question_index'] == 1
+    assert updated['next_question']['question'] == "Q1"
+    assert not updated['is_completed']
+
+    # Jediný UPDATE přepíše přesně sloupce, které apply_answer mění
+    values = answer_update_values(updated)
+    assert tuple(values) == ANSWER_UPDATE_COLUMNS
+    assert values['answers'] is updated['answers']
+
+
+def test_apply_answer_uses_plan_and_completes_last_question():
+    session = _session(answers=[1])
+    plan = plan_next_question(session, 0)
+    updated = apply_answer(session, "mazáním", 95.0, "Správně.", 0, plan=plan)
+
+    assert updated['difficulty_score'] == plan.passed.difficulty_score
+    assert updated['next_question'] == plan.passed.next_question
+    assert updated['current_question_index'] == 2
+
+    final = apply_answer(updated, "nevím", 0.0, "Ne.", 2)
+    assert final['is_completed'] and final['completed_at'] is not None
+    assert final['next_question'] is None
+    assert final['current_score'] == 65.0
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+from app.services.connection_manager import (
+    CLOSE_GOING_AWAY, CLOSE_IDLE, MediaConnectionManager
+)
+
+
+class _FakeSocket:
+    def __init__(self):
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.sent = []
+        self.closed_with = None
+
+    async def receive_text(self):
+        return await self.inbox.get()
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _connect(manager, socket, endpoint="/audio"):
+    return manager.register(endpoint, socket.receive_text, socket.send_text, socket.close)
+
+
+def test_heartbeat_counts_rates_sends_keepalive_and_closes_idle():
+    async def scenario():
+        clock = _Clock()
+        manager = MediaConnectionManager(heartbeat_interval=5, idle_timeout=60, clock=clock)
+        talking, silent = _FakeSocket(), _FakeSocket()
+        first = _connect(manager, talking)
+        second = _connect(manager, silent, "/voice/media-stream")
+        first.bind("MZ1", "CA1")
+        second.bind("MZ2")
+
+        frame = json.dumps({"event": "media", "media": {"payload": "x" * 212}})
+        for _ in range(50):
+            talking.inbox.put_nowait(frame)
+            await first.receive_text()
+        clock.now += 10
+        await first.send_text("out")
+        await manager.heartbeat_once()
+
+        stats = manager.stats()
+        assert stats['live'] == 2 and stats['by_endpoint'] == {'/audio': 1, '/voice/media-stream': 1}
+        by_sid = {stream['stream_sid']: stream for stream in stats['streams']}
+        assert by_sid['MZ1']['rate_in_bps'] == round(50 * len(frame) / 10)
+        assert by_sid['MZ1']['heartbeats'] == 0  # Něco odešlo v tomto intervalu
+        assert json.loads(silent.sent[0]) == {"event": "media", "streamSid": "MZ2", "media": {"payload": ""}}
+
+        clock.now += 61
+        talking.inbox.put_nowait(frame)
+        await first.receive_text()
+        await manager.heartbeat_once()
+        assert silent.closed_with == CLOSE_IDLE and talking.closed_with is None
+        assert manager.stats()['closed_idle'] == 1
+        await manager.close()
+
+    asyncio.run(scenario())
+
+
+def test_drain_rejects_new_streams_and_waits_for_live_ones():
+    async def scenario():
+        manager = MediaConnectionManager(heartbeat_interval=3600)
+        finishing, stuck = _FakeSocket(), _FakeSocket()
+        first = _connect(manager, finishing)
+        _connect(manager, stuck)
+
+        async def call_ends():
+            await asyncio.sleep(0.05)
+            manager.unregister(first)
+
+        ending = asyncio.create_task(call_ends())
+        result = await manager.drain(timeout=0.2)
+        await ending
+        assert result == {'finished': 1, 'closed': 1}
+        assert finishing.closed_with is None and stuck.closed_with == CLOSE_GOING_AWAY
+        assert _connect(manager, _FakeSocket()) is None and manager.stats()['rejected'] == 1
+        await manager.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.czech_text import normalize_answer
+from app.services.evaluation_cache import EvaluationCache, evaluation_cache_key
+
+QUESTION = {
+    "question": "Jak se odstraňuje tramp oil?",
+    "correct_answer": "Separátorem oleje nebo skimmerem",
+    "keywords": ["separátor", "skimmer"]
+}
+
+
+def test_normalize_answer_folds_case_diacritics_and_suffixes():
+    assert normalize_answer("Separátorem!") == normalize_answer("separátoru") == "separator"
+    assert normalize_answer("Mazáním a chlazením.") == "mazan a chlazen"
+
+
+def test_cache_key_depends_on_question_content():
+    key = evaluation_cache_key(1, QUESTION, "separátorem")
+    assert key == evaluation_cache_key(1, QUESTION, "  Separátorem. ")
+    assert key != evaluation_cache_key(2, QUESTION, "separátorem")
+    assert key != evaluation_cache_key(1, dict(QUESTION, keywords=["separátor"]), "separátorem")
+
+
+def test_memory_tier_lru_and_lesson_invalidation():
+    cache = EvaluationCache(max_entries=2, persistent=False)
+    cache.put(1, QUESTION, "separátorem", 90, "Správně.")
+    assert cache.get(1, QUESTION, "Separátorem") == {"score": 90, "feedback": "Správně.", "lesson_id": 1}
+
+    cache.put(1, QUESTION, "skimmerem", 85, "Ano.")
+    cache.put(2, QUESTION, "nevím", 0, "Ne.")
+    assert cache.get(1, QUESTION, "separátorem") is None  # vytlačeno (LRU)
+
+    cache.invalidate_lesson(1)
+    assert cache.get(1, QUESTION, "skimmerem") is None
+    assert cache.get(2, QUESTION, "nevím")["score"] == 0
+    assert cache.stats()["memory_hits"] == 2
+
+
+class _Row:
+    def __init__(self, score, feedback, lesson_id):
+        self.score, self.feedback, self.lesson_id = score, feedback, lesson_id
+
+
+class _Session:
+    """Zaznamená vlákno dotazu a případný commit (žádný zápis při čtení)"""
+
+    def __init__(self, log, row=None):
+        self.log = log
+        self.row = row
+
+    def query(self, *columns):
+        self.log.append(('query', threading.get_ident()))
+        return self
+
+    def filter(self, *conditions):
+        return self
+
+    def update(self, values, synchronize_session=None):
+        self.log.append(('update', threading.get_ident()))
+
+    def first(self):
+        return self.row
+
+    def add(self, row):
+        self.log.append(('add', threading.get_ident()))
+
+    def commit(self):
+        self.log.append(('commit', threading.get_ident()))
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_async_tiers_keep_database_off_the_event_loop():
+    pytest.importorskip("sqlalchemy")
+
+    async def scenario():
+        log = []
+        loop_thread = threading.get_ident()
+        cache = EvaluationCache(persistent=True, session_factory=lambda: _Session(log, _Row(80, "Ano.", 1)))
+
+        assert await cache.lookup(1, QUESTION, "skimmerem") == {"score": 80, "feedback": "Ano.", "lesson_id": 1}
+        await cache.flush()
+        # Zásah v DB: čtení, počítadlo zásahů jedním UPDATE na pozadí
+        assert [kind for kind, _ in log] == ['query', 'query', 'update', 'commit']
+        assert await cache.lookup(1, QUESTION, "skimmerem") is not None
+        assert len(log) == 4  # Druhé čtení už z paměti
+
+        cache.store(1, QUESTION, "separátorem", 90, "Správně.")
+        assert (await cache.lookup(1, QUESTION, "separátorem"))["score"] == 90
+        await cache.flush()
+        assert [kind for kind, _ in log][4:] == ['query', 'commit']
+        assert all(thread != loop_thread for _, thread in log)
+        assert cache.stats()["persistent_hits"] == 1 and cache.stats()["memory_hits"] == 2
+
+    asyncio.run(scenario())
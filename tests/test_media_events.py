@@ -0,0 +1,37 @@
+import base64
+import json
+
+from app.services import media_events
+from app.services.media_events import MediaEventEncoder, TRACK_INBOUND, parse_media
+
+PAYLOAD = base64.b64encode(bytes(range(160))).decode('ascii')
+TWILIO_MEDIA = ('{"event":"media","sequenceNumber":"3","media":{"track":"inbound","chunk":"1",'
+                '"timestamp":"5","payload":"' + PAYLOAD + '"},"streamSid":"MZ1"}')
+
+
+def test_parse_media_fast_path_and_fallbacks():
+    track, payload = parse_media(TWILIO_MEDIA)
+    assert track is TRACK_INBOUND and payload == PAYLOAD
+    # Jiné formátování a pořadí klíčů -> plné parsování se stejným výsledkem
+    assert parse_media(json.dumps(json.loads(TWILIO_MEDIA), indent=1)) == (TRACK_INBOUND, PAYLOAD)
+    assert parse_media('{"event":"media","media":{"track":"outbound","payload":"a\\/b"}}') == ("outbound", "a/b")
+    assert parse_media(json.dumps({"event": "start", "start": {"mediaFormat": {}}})) is None
+    assert parse_media('{"event":"mark","mark":{"name":"media"}}') is None
+
+
+def test_parse_media_without_orjson(monkeypatch):
+    monkeypatch.setattr(media_events, "orjson", None)
+    assert parse_media(json.dumps({"media": {"payload": PAYLOAD}, "event": "media"})) == (TRACK_INBOUND, PAYLOAD)
+    assert media_events.dumps({"a": 1}) == '{"a":1}'
+
+
+def test_encoder_builds_valid_twilio_messages():
+    encoder = MediaEventEncoder('MZ"1')
+    assert json.loads(encoder.media(PAYLOAD)) == {
+        "event": "media", "streamSid": 'MZ"1', "media": {"payload": PAYLOAD, "track": "outbound"}
+    }
+    assert json.loads(MediaEventEncoder("MZ1", track=None).media("")) == {
+        "event": "media", "streamSid": "MZ1", "media": {"payload": ""}
+    }
+    assert json.loads(encoder.clear()) == {"event": "clear", "streamSid": 'MZ"1'}
+    assert json.loads(encoder.mark("turn-1-2")) == {"event": "mark", "streamSid": 'MZ"1', "mark": {"name": "turn-1-2"}}
@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+websockets = pytest.importorskip("websockets")
+
+from app.services.realtime_service import OpenAIRealtimeService, RealtimeMediaBridge  # noqa: E402
+
+
+class FakeTwilio:
+    """Strana Twilia: fronta příchozích zpráv a seznam odeslaných"""
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+
+    async def receive_text(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    def media(self, payload):
+        self.incoming.put_nowait(json.dumps({"event": "media", "streamSid": "MZ1", "media": {"payload": payload}}))
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def test_bridge_passes_mulaw_through_both_ways_and_handles_barge_in():
+    received = []
+
+    async def fake_openai(ws):
+        async for message in ws:
+            event = json.loads(message)
+            received.append(event)
+            if event["type"] == "input_audio_buffer.append" and len(received) == 4:
+                await ws.send(json.dumps({"type": "input_audio_buffer.speech_stopped"}))
+                await ws.send(json.dumps({"type": "response.created", "response": {"id": "resp_1"}}))
+                for index in range(3):
+                    await ws.send(json.dumps({"type": "response.audio.delta", "response_id": "resp_1",
+                                              "delta": _b64(bytes([index]) * 160)}))
+            if event["type"] == "input_audio_buffer.append" and len(received) == 6:
+                await ws.send(json.dumps({"type": "input_audio_buffer.speech_started"}))
+            if event["type"] == "response.cancel":
+                # Zpoždění z cesty - zbytek zrušené odpovědi se už nesmí přehrát
+                await ws.send(json.dumps({"type": "response.audio.delta", "response_id": "resp_1",
+                                          "delta": _b64(b'\\x09' * 160)}))
+                await ws.close()
+
+    async def scenario():
+        async with websockets.serve(fake_openai, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            service = OpenAIRealtimeService(api_key="test", url=f"ws://127.0.0.1:{port}")
+            await service.connect_to_openai("Lekce 1")
+            twilio = FakeTwilio()
+            bridge = RealtimeMediaBridge(twilio.receive_text, twilio.send_text, service)
+            twilio.incoming.put_nowait(json.dumps({"event": "start", "streamSid": "MZ1",
+                                                   "start": {"streamSid": "MZ1", "callSid": "CA1"}}))
+            frames = [_b64(bytes([0x7f - index]) * 160) for index in range(5)]
+            for payload in frames[:3]:
+                twilio.media(payload)
+            run = asyncio.create_task(bridge.run())
+            await asyncio.sleep(0.2)
+            for payload in frames[3:]:
+                twilio.media(payload)
+            await asyncio.wait_for(run, 2.0)
+            return frames, twilio.sent, bridge.stats()
+
+    frames, sent, stats = asyncio.run(scenario())
+    assert received[0]["type"] == "session.update"
+    assert received[0]["session"]["input_audio_format"] == "g711_ulaw"
+    assert "Lekce 1" in received[0]["session"]["instructions"]
+    assert [e["audio"] for e in received if e["type"] == "input_audio_buffer.append"] == frames
+    assert received[-1] == {"type": "response.cancel"}
+
+    media = [m for m in sent if m["event"] == "media"]
+    assert [m["media"]["payload"] for m in media] == [_b64(bytes([index]) * 160) for index in range(3)]
+    assert all(m["streamSid"] == "MZ1" for m in media)
+    assert sent[-1] == {"event": "clear", "streamSid": "MZ1"}
+    assert stats["frames_in"] == 5 and stats["barge_ins"] == 1 and stats["bytes_out"] == 480
+
+
+def test_inbound_queue_drops_oldest_frames_when_openai_lags():
+    class StalledOpenAI:
+        async def disconnect(self):
+            pass
+
+    async def scenario():
+        twilio = FakeTwilio()
+        bridge = RealtimeMediaBridge(twilio.receive_text, twilio.send_text, StalledOpenAI(), inbound_max_frames=3)
+        for index in range(5):
+            twilio.media(str(index))
+        twilio.incoming.put_nowait(json.dumps({"event": "stop"}))
+        await bridge._twilio_reader()
+        return [bridge.inbound.get_nowait() for _ in range(bridge.inbound.qsize())], bridge.stats()
+
+    queued, stats = asyncio.run(scenario())
+    assert queued == ["2", "3", "4"] and stats["frames_dropped"] == 2
+
+
+def test_lesson_context_comes_from_start_custom_parameters():
+    received = []
+    audio_arrived = asyncio.Event()
+
+    async def fake_openai(ws):
+        async for message in ws:
+            received.append(json.loads(message))
+            if received[-1]["type"] == "input_audio_buffer.append":
+                audio_arrived.set()
+
+    async def lesson_context(parameters):
+        return f"Lekce pokusu {parameters.get('attempt_id')}"
+
+    async def scenario():
+        async with websockets.serve(fake_openai, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            service = OpenAIRealtimeService(api_key="test", url=f"ws://127.0.0.1:{port}")
+            await service.connect_to_openai()
+            twilio = FakeTwilio()
+            bridge = RealtimeMediaBridge(twilio.receive_text, twilio.send_text, service,
+                                         lesson_context=lesson_context)
+            # Twilio <Stream> nemá query string - attempt_id je <Parameter> ve "start" eventu
+            twilio.incoming.put_nowait(json.dumps({"event": "start", "streamSid": "MZ1", "start": {
+                "streamSid": "MZ1", "callSid": "CA1", "customParameters": {"attempt_id": "42"}}}))
+            twilio.media(_b64(b'\x7f' * 160))
+            run = asyncio.create_task(bridge.run())
+            await asyncio.wait_for(audio_arrived.wait(), 2.0)
+            twilio.incoming.put_nowait(json.dumps({"event": "stop"}))
+            await asyncio.wait_for(run, 2.0)
+            return bridge
+
+    bridge = asyncio.run(scenario())
+    assert bridge.custom_parameters == {"attempt_id": "42"}
+    assert [event["type"] for event in received] == ["session.update", "session.update", "input_audio_buffer.append"]
+    assert "Lekce pokusu" not in received[0]["session"]["instructions"]
+    # Druhý session.update mění jen instrukce, formát audia zůstává z prvního
+    assert list(received[1]["session"]) == ["instructions"]
+    assert "Lekce pokusu 42" in received[1]["session"]["instructions"]
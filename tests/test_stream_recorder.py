@@ -0,0 +1,79 @@
+import asyncio
+import base64
+import json
+
+from app.services.connection_manager import MediaConnectionManager
+from app.services.media_events import MediaEventEncoder
+from app.services.stream_recorder import StreamRecorder, read_recording
+
+FRAME = bytes(range(160))
+START = json.dumps({"event": "start", "streamSid": "MZ1", "start": {"streamSid": "MZ1", "callSid": "CA1"}})
+
+
+def _media(frame):
+    return json.dumps({"event": "media", "streamSid": "MZ1",
+                       "media": {"track": "inbound", "payload": base64.b64encode(frame).decode('ascii')}})
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 50.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_recording_stores_raw_mulaw_and_round_trips(tmp_path):
+    clock = _Clock()
+    path = str(tmp_path / "call.twrec")
+    recorder = StreamRecorder(path, {'endpoint': '/audio', 'stream_sid': 'MZ1'}, clock)
+    recorder.record_inbound(START)
+    for index in range(50):
+        clock.now += 0.02
+        recorder.record_inbound(_media(FRAME))
+    recorder.record_outbound(MediaEventEncoder("MZ1").media(base64.b64encode(b'\x7f' * 160).decode('ascii')))
+    recorder.record_outbound(MediaEventEncoder("MZ1").mark("turn-1-1"))
+    recorder.close()
+
+    metadata, messages = read_recording(path)
+    assert metadata['endpoint'] == '/audio' and metadata['stream_sid'] == 'MZ1'
+    assert messages[0].text() == START and not messages[0].is_media
+    media = [message for message in messages if message.inbound and message.is_media]
+    assert len(media) == 50 and all(message.data == FRAME for message in media)
+    assert abs(media[-1].offset - 1.0) < 1e-6
+    assert messages[-2].data == b'\x7f' * 160 and not messages[-2].inbound
+    assert json.loads(messages[-1].text())["mark"]["name"] == "turn-1-1"
+    # Surové μ-law místo base64 JSON
+    assert recorder.stats()['bytes'] < 50 * len(_media(FRAME)) / 1.5
+
+
+def test_connection_records_armed_call_from_start_event(tmp_path):
+    async def scenario():
+        manager = MediaConnectionManager(heartbeat_interval=3600, record_dir=str(tmp_path))
+        manager.arm_recording("CA1")
+        inbox: asyncio.Queue = asyncio.Queue()
+        sent = []
+
+        async def send_text(text):
+            sent.append(text)
+
+        async def close(code=1000, reason=""):
+            pass
+
+        connection = manager.register("/voice/media-stream", inbox.get, send_text, close)
+        inbox.put_nowait(START)
+        await connection.receive_text()
+        connection.bind("MZ1", "CA1")
+        inbox.put_nowait(_media(FRAME))
+        await connection.receive_text()
+        await connection.send_text(MediaEventEncoder("MZ1").clear())
+        path = connection.recorder.path
+        assert manager.stats()['recording'] == 1
+        manager.unregister(connection)
+        await manager.close()
+        return path
+
+    path = asyncio.run(scenario())
+    _, messages = read_recording(path)
+    assert [message.is_media for message in messages] == [False, True, False]
+    assert messages[0].text() == START and messages[1].data == FRAME
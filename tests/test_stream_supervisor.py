@@ -0,0 +1,104 @@
+import asyncio
+import operator
+
+from app.services.stream_supervisor import (
+    OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST, StreamSupervisor, StreamSupervisorRegistry
+)
+
+
+def _run_burst(overflow, segments=10):
+    async def scenario():
+        processed = []
+        peak = 0
+        active = 0
+
+        async def handler(audio):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            processed.append(audio)
+
+        supervisor = StreamSupervisor(handler, name="test", max_in_flight=2, max_queue=2,
+                                      overflow=overflow, merge=operator.add, max_age_seconds=10)
+        await asyncio.sleep(0)
+        for index in range(segments):
+            supervisor.submit(bytes([index]))
+            await asyncio.sleep(0)
+        while supervisor.queue_depth or supervisor.in_flight:
+            await asyncio.sleep(0.01)
+        await supervisor.close()
+        return processed, peak, supervisor.stats()
+
+    return asyncio.run(scenario())
+
+
+def test_burst_is_bounded_and_merged_without_losing_audio():
+    processed, peak, stats = _run_burst("merge")
+    assert peak == 2
+    assert b''.join(sorted(processed)) == bytes(range(10))
+    assert stats['max_queue_depth'] == 2 and stats['merged'] == 6
+    assert stats['completed'] == len(processed) == 4
+
+
+def test_drop_policies():
+    processed, _, stats = _run_burst(OVERFLOW_DROP_OLDEST)
+    assert processed[-2:] == [b'\x08', b'\x09'] and stats['dropped'] == 6
+    processed, _, stats = _run_burst(OVERFLOW_DROP_NEWEST)
+    assert sorted(processed) == [b'\x00', b'\x01', b'\x02', b'\x03'] and stats['dropped'] == 6
+
+
+def test_errors_are_counted_and_close_cancels_in_flight():
+    async def scenario():
+        started = asyncio.Event()
+
+        async def handler(payload):
+            if payload == "boom":
+                raise RuntimeError("whisper down")
+            started.set()
+            await asyncio.sleep(10)
+
+        supervisor = StreamSupervisor(handler, name="test", max_in_flight=1, max_queue=5, max_age_seconds=10)
+        registry = StreamSupervisorRegistry()
+        registry.register("MZ1", supervisor)
+        supervisor.submit("boom")
+        supervisor.submit("long")
+        supervisor.submit("queued")
+        await started.wait()
+        assert registry.stats()['queued_total'] == 1 and registry.stats()['in_flight_total'] == 1
+        await registry.close("MZ1")
+        assert not supervisor.submit("late")
+        return supervisor.stats(), len(registry)
+
+    stats, remaining = asyncio.run(scenario())
+    assert stats['failed'] == 1 and "whisper down" in stats['last_error']
+    assert stats['dropped'] == 1 and stats['in_flight'] == 0
+    assert remaining == 0
+
+
+def test_stale_segments_are_skipped():
+    now = [0.0]
+
+    async def scenario():
+        processed = []
+        release = asyncio.Event()
+
+        async def handler(payload):
+            processed.append(payload)
+            await release.wait()
+
+        supervisor = StreamSupervisor(handler, name="test", max_in_flight=1, max_queue=5,
+                                      max_age_seconds=5, clock=lambda: now[0])
+        supervisor.submit("first")
+        supervisor.submit("old")
+        await asyncio.sleep(0.01)
+        now[0] = 10.0
+        supervisor.submit("fresh")
+        release.set()
+        await asyncio.sleep(0.01)
+        await supervisor.close()
+        return processed, supervisor.stats()
+
+    processed, stats = asyncio.run(scenario())
+    assert processed == ["first", "fresh"] and stats['stale'] == 1
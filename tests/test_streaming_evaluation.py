@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.streaming_evaluation import StreamingScoreParser, stream_evaluation
+
+
+def test_score_first_is_ready_after_first_sentence():
+    parser = StreamingScoreParser(score_first=True)
+    for delta in ["[SK", "ÓRE: 8", "0%]", " Chybí:", " skimmer."]:
+        parser.feed(delta)
+        assert not parser.is_ready
+    assert parser.score == 80
+    parser.feed(" Jinak")
+    assert parser.is_ready
+    assert parser.ready_feedback() == "Chybí: skimmer."
+
+
+def test_feedback_first_is_ready_with_score_tag():
+    parser = StreamingScoreParser(score_first=False)
+    parser.feed("Výborně, úplná odpověď!")
+    assert not parser.is_ready
+    parser.feed(" [SKÓRE: 100%]")
+    assert parser.is_ready
+    assert (parser.score, parser.ready_feedback()) == (100, "Výborně, úplná odpověď!")
+
+
+def test_abbreviations_and_ordinals_do_not_end_sentence():
+    parser = StreamingScoreParser(score_first=True)
+    parser.feed("[SKÓRE: 50%] Chybí např. skimmer, tzv. 2. stupeň ")
+    assert not parser.is_ready
+    parser.feed("filtrace. Jinak")
+    assert parser.is_ready
+    assert parser.ready_feedback() == "Chybí např. skimmer, tzv. 2. stupeň filtrace."
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class _Stream:
+    def __init__(self, deltas):
+        self.deltas = deltas
+
+    async def __aiter__(self):
+        for delta in self.deltas:
+            await asyncio.sleep(0)
+            yield _chunk(delta)
+
+
+def test_on_complete_gets_full_feedback_after_early_return():
+    async def scenario():
+        async def create(**kwargs):
+            return _Stream(["[SKÓRE: 60%]", " Chybí skimmer.", " Separátor", " je správně."])
+
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        completed = asyncio.get_running_loop().create_future()
+        result = await stream_evaluation(client, [], on_complete=completed.set_result)
+
+        assert result['feedback'] == "Chybí skimmer."
+        full = await asyncio.wait_for(completed, 1)
+        assert (full['score'], full['feedback']) == (60, "Chybí skimmer. Separátor je správně.")
+
+    asyncio.run(scenario())
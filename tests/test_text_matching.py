@@ -0,0 +1,36 @@
+from app.services.text_matching import AhoCorasick, KeywordMatcher, PhraseMatcher
+
+
+def test_aho_corasick_finds_overlapping_patterns_in_one_pass():
+    automaton = AhoCorasick()
+    for pattern in ("he", "she", "his", "hers"):
+        automaton.add(pattern, pattern)
+    matches = sorted((start, payload) for start, _, payload in automaton.iter_matches("ushers"))
+    assert matches == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_phrase_matcher_normalizes_and_matches_whole_words():
+    signals = PhraseMatcher(["to je všechno", "stačí", "ne"])
+    assert signals.find("To je všechno.") == {"to je všechno"}
+    assert signals.contains_any("Stačí!")
+    assert not signals.contains_any("nestačí to")
+    assert not signals.contains_any("není to tak")
+
+
+def test_phrase_matcher_does_not_stem_commands():
+    completion = PhraseMatcher(["končím", "dokončeno", "hotovo"])
+    assert completion.contains_any("Končím.")
+    for answer in ("na konci procesu", "do konce směny", "dokončení obrábění", "hotová emulze"):
+        assert not completion.contains_any(answer), answer
+
+    clear = PhraseMatcher(["nevím", "nemá"])
+    assert not clear.contains_any("nemám tušení")
+    assert not clear.contains_any("neví to")
+    assert clear.contains_any("Nevím, nemá to filtr")
+
+
+def test_keyword_matcher_handles_inflection_truncation_and_asr_variants():
+    matcher = KeywordMatcher(["separátor", "koncentrace", "emulze"], {"separátor": ["operátorem"]})
+    types = {kw: match_type for kw, match_type, _ in matcher.match("Operátorem, koncentr a emulzní")["matches"]}
+    assert types == {"separátor": "synonymum", "koncentrace": "substring", "emulze": "substring"}
+    assert matcher.match("SEPARÁTORU")["matches"][0][1] == "přesná"
@@ -0,0 +1,70 @@
+import asyncio
+
+from app.services.tts_cache import (
+    CALL_START_PROMPTS, FORMAT_WAV, MmapAudioStore, TTSCache
+)
+
+
+def test_memory_tier_is_bounded_by_bytes(tmp_path):
+    cache = TTSCache(max_memory_bytes=250, directory=str(tmp_path), persistent=False)
+    for index in range(3):
+        cache.put(f"text {index}", bytes([index]) * 100)
+    assert cache.stats()['memory_bytes'] == 200
+    assert cache.get("text 0") is None
+    assert cache.get("text 2") == b"\x02" * 100
+
+
+def test_disk_tier_survives_restart_and_key_includes_format(tmp_path):
+    cache = TTSCache(max_memory_bytes=1024, directory=str(tmp_path), persistent=True)
+    cache.put("Ahoj", b"mulaw-bytes")
+    cache.put("Ahoj", b"wav-bytes", audio_format=FORMAT_WAV)
+
+    restarted = TTSCache(max_memory_bytes=1024, directory=str(tmp_path), persistent=True)
+    assert restarted.get("Ahoj") == b"mulaw-bytes"
+    assert restarted.get("Ahoj", audio_format=FORMAT_WAV) == b"wav-bytes"
+    assert restarted.get("Ahoj", voice="alloy") is None
+    assert restarted.stats()['disk_hits'] == 2
+
+
+def test_store_ignores_index_entries_past_end_of_data(tmp_path):
+    store = MmapAudioStore(str(tmp_path))
+    store.put("a", b"12345")
+    store.close()
+    with open(tmp_path / MmapAudioStore.DATA_FILE, 'r+b') as data_file:
+        data_file.truncate(3)
+    assert MmapAudioStore(str(tmp_path)).get("a") is None
+
+
+def test_concurrent_requests_synthesize_once(tmp_path):
+    cache = TTSCache(max_memory_bytes=1024, directory=str(tmp_path), persistent=False)
+    calls = []
+
+    async def synthesize():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"audio"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_synthesize(CALL_START_PROMPTS[0], synthesize) for _ in range(10)))
+
+    assert asyncio.run(run()) == [b"audio"] * 10
+    assert len(calls) == 1
+
+
+def test_only_warm_up_texts_reach_disk(tmp_path):
+    cache = TTSCache(max_memory_bytes=1024, directory=str(tmp_path), persistent=True)
+
+    async def synthesize_text(text):
+        return text.encode('utf-8')
+
+    async def run():
+        await cache.get_or_synthesize("Jednorázová odpověď.", lambda: synthesize_text("x"))
+        await cache.warm_up([CALL_START_PROMPTS[0]], synthesize_text)
+
+    asyncio.run(run())
+    assert cache.get("Jednorázová odpověď.") == b"x"
+    assert cache.stats()['disk_entries'] == 1
+
+    restarted = TTSCache(max_memory_bytes=1024, directory=str(tmp_path), persistent=True)
+    assert restarted.get("Jednorázová odpověď.") is None
+    assert restarted.get(CALL_START_PROMPTS[0]) == CALL_START_PROMPTS[0].encode('utf-8')
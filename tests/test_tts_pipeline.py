@@ -0,0 +1,75 @@
+import asyncio
+
+from app.services.tts_pipeline import TTSPipeline, split_sentences
+
+REPLY = ("Bezpečnost práce začíná u ochranných pomůcek. Vždy si zkontrolujte helmu a rukavice. "
+         "Potom projděte pracoviště. Máte k tomu otázku?")
+
+
+def test_split_sentences_keeps_short_fragments_together():
+    assert split_sentences(REPLY) == [
+        "Bezpečnost práce začíná u ochranných pomůcek.",
+        "Vždy si zkontrolujte helmu a rukavice.",
+        "Potom projděte pracoviště.",
+        "Máte k tomu otázku?"
+    ]
+    assert split_sentences("Ano. To je správně.") == ["Ano. To je správně."]
+
+
+def test_sentences_synthesize_concurrently_and_play_in_order():
+    async def scenario():
+        active = peak = 0
+        played = []
+        # Pozdější věty jsou hotové dřív - pořadí přehrávání se nesmí změnit
+        delays = {sentence: 0.05 - index * 0.01 for index, sentence in enumerate(split_sentences(REPLY))}
+
+        async def synthesize(sentence):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(delays[sentence])
+            active -= 1
+            return sentence.encode('utf-8')
+
+        async def play(audio):
+            played.append(audio.decode('utf-8'))
+            await asyncio.sleep(0.02)
+            return True
+
+        pipeline = TTSPipeline(synthesize, play, max_concurrency=2)
+        assert await pipeline.speak(REPLY)
+        return pipeline, played, peak
+
+    pipeline, played, peak = asyncio.run(scenario())
+    assert played == split_sentences(REPLY) and peak == 2
+    assert pipeline.stats()['played'] == 4
+    # První audio po syntéze první věty (50 ms), ne celé odpovědi
+    assert pipeline.first_audio_ms < 90
+
+
+def test_barge_in_stops_playback_and_cancels_pending_synthesis():
+    async def scenario():
+        cancelled = []
+
+        async def synthesize(sentence):
+            try:
+                await asyncio.sleep(0.01 if sentence.startswith("Bezpečnost") else 1)
+            except asyncio.CancelledError:
+                cancelled.append(sentence)
+                raise
+            return b'audio'
+
+        async def play(audio):
+            return False  # Uživatel skočil do řeči
+
+        async def sentences():
+            for sentence in split_sentences(REPLY):
+                yield sentence
+
+        pipeline = TTSPipeline(synthesize, play, max_concurrency=3)
+        result = await pipeline.speak_stream(sentences())
+        return result, pipeline, cancelled
+
+    result, pipeline, cancelled = asyncio.run(scenario())
+    assert result is False and pipeline.interrupted and pipeline.played == 0
+    assert len(cancelled) >= 2
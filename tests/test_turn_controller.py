@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from app.services.audio_sender import FRAME_BYTES, OutboundAudioSender
+from app.services.turn_controller import TurnController
+
+
+def test_barge_in_cancels_stale_turn_and_clears_playback():
+    sent = []
+
+    async def send_text(text):
+        sent.append(json.loads(text))
+
+    async def scenario():
+        sender = OutboundAudioSender(send_text, "MZ1", frame_ms=5, lead_frames=0)
+        turns = TurnController("MZ1")
+        stages = []
+
+        async def reply(turn_id):
+            stages.append((turn_id, "stt"))
+            await asyncio.sleep(0.01)
+            stages.append((turn_id, "tts"))
+            await sender.play(b'\x7f' * (FRAME_BYTES * 100), turn_id=turn_id)
+            stages.append((turn_id, "done"))
+
+        first = turns.start_turn(reply)
+        await asyncio.sleep(0.05)  # první tah už přehrává
+        assert sender.sending_turn_id == first and turns.is_current(first)
+
+        cancelled = await turns.barge_in(sender)
+        second = turns.start_turn(reply)
+        await asyncio.sleep(0)
+        assert not turns.is_current(first) and turns.is_current(second)
+        await turns.close()
+        await sender.stop()
+        return turns, sender, stages, cancelled, first, second
+
+    turns, sender, stages, cancelled, first, second = asyncio.run(scenario())
+    assert cancelled == 1
+    assert (first, "done") not in stages
+    assert {"event": "clear", "streamSid": "MZ1"} in sent
+    assert 0 < sender.stats()['frames_by_turn'][first] < 100
+    stats = turns.stats()
+    assert (stats['turns_started'], stats['turns_cancelled'], stats['barge_ins']) == (2, 2, 1)
+    assert stats['in_flight'] == {}
+
+
+def test_marks_report_which_turn_was_played():
+    sent = []
+
+    async def send_text(text):
+        sent.append(json.loads(text))
+
+    async def scenario():
+        sender = OutboundAudioSender(send_text, "MZ2", frame_ms=1, lead_frames=0)
+        await sender.play(b'\x7f' * FRAME_BYTES, turn_id=4)
+        await sender.stop()
+        return sender
+
+    sender = asyncio.run(scenario())
+    mark = sent[-1]["mark"]["name"]
+    assert mark.startswith("turn-4-")
+    assert sender.played_turn_id is None
+    sender.on_mark(mark)
+    assert sender.played_turn_id == 4 and not sender.is_playing
@@ -0,0 +1,55 @@
+from twilio.twiml.voice_response import VoiceResponse
+
+from app.services.twiml_fragments import (
+    STATIC_FRAGMENTS, TURN_PLACEHOLDER, VOICE_PROCESS_URL, TwiMLFragmentRegistry, TwiMLResponse
+)
+
+
+def test_fragments_match_voice_response():
+    registry = TwiMLFragmentRegistry()
+    registry.warm_up()
+    for name, build in STATIC_FRAGMENTS.items():
+        expected = VoiceResponse()
+        build(expected, "cs-CZ", "Google.cs-CZ-Standard-A")
+        response = TwiMLResponse(registry, turn="t1").fragment(name)
+        assert str(response) == str(expected).replace(TURN_PLACEHOLDER, "t1"), name
+
+
+def test_dynamic_elements_are_escaped_like_voice_response():
+    registry = TwiMLFragmentRegistry()
+    text = 'Odpověď "A & B" <správně>'
+
+    expected = VoiceResponse()
+    expected.say(text, language="cs-CZ", rate="0.8")
+    gather = expected.gather(input='speech', timeout=10, action='/voice/process', method='POST')
+    gather.say(text, language="cs-CZ")
+    expected.pause(length=1)
+    expected.redirect('/voice/process?attempt=2&reminder=true')
+    expected.hangup()
+
+    response = TwiMLResponse(registry)
+    response.say(text, language="cs-CZ", rate="0.8")
+    response.gather(input='speech', timeout=10, action='/voice/process', method='POST').say(text, language="cs-CZ")
+    response.pause(length=1)
+    response.redirect('/voice/process?attempt=2&reminder=true')
+    response.hangup()
+
+    assert str(response) == str(expected)
+
+
+def test_empty_response():
+    assert str(TwiMLResponse(TwiMLFragmentRegistry())) == str(VoiceResponse())
+
+
+def test_each_response_gets_its_own_turn_token():
+    registry = TwiMLFragmentRegistry()
+    first = str(TwiMLResponse(registry).fragment("beep_gather"))
+    second = TwiMLResponse(registry)
+    second.gather(input='speech', action=VOICE_PROCESS_URL, method='POST').say("Další otázka?")
+    second.redirect(VOICE_PROCESS_URL + '&reminder=true')
+    second = str(second)
+
+    assert TURN_PLACEHOLDER not in first and TURN_PLACEHOLDER not in second
+    assert first.count('/voice/process?turn=') == 1
+    assert second.count('/voice/process?turn=') == 2
+    assert first.split('turn=')[1][:12] != second.split('turn=')[1][:12]
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import math
+import random
+
+import numpy as np
+
+from app.services.audio_codec import ulaw_encode
+from app.services.audio_sender import FRAME_BYTES, OutboundAudioSender
+from app.services.turn_controller import TurnController
+from app.services.vad import VoiceActivityDetector
+
+RATE = 8000
+
+
+def _noise(rng, ms, level):
+    return [rng.gauss(0, level) for _ in range(ms * RATE // 1000)]
+
+
+def _voiced(rng, ms, noise_level, f0=140.0, amplitude=6000):
+    """Znělá řeč: harmonické f0 s obálkou slabik (~4 Hz) a šumem pozadí"""
+    samples = []
+    for n in range(ms * RATE // 1000):
+        t = n / RATE
+        envelope = 0.55 + 0.45 * math.sin(2 * math.pi * 4 * t)
+        tone = sum(math.sin(2 * math.pi * f0 * k * t) / k for k in range(1, 6))
+        samples.append(amplitude * envelope * tone / 2 + rng.gauss(0, noise_level))
+    return samples
+
+
+def _fricative(rng, ms, noise_level, amplitude=900):
+    """Neznělá souhláska: slabý vysokofrekvenční šum (střídání znaménka)"""
+    return [(-1) ** n * abs(rng.gauss(0, amplitude)) + rng.gauss(0, noise_level) for n in range(ms * RATE // 1000)]
+
+
+def _word_sequence(rng, noise_level, words=4):
+    # Slova oddělená krátkými pauzami (kratšími než hangover)
+    samples = []
+    for _ in range(words):
+        samples += _voiced(rng, 250, noise_level) + _fricative(rng, 60, noise_level) + _noise(rng, 120, noise_level)
+    return samples
+
+
+def _ulaw(samples):
+    return ulaw_encode(np.clip(np.array(samples), -32768, 32767).astype(np.int16))
+
+
+def _corpus():
+    """Offline korpus μ-law streamů (deterministický) s očekávaným počtem promluv"""
+    rng = random.Random(7)
+    quiet = []
+    for _ in range(3):
+        quiet += _noise(rng, 1500, 40) + _word_sequence(rng, 40)
+    quiet += _noise(rng, 1500, 40)
+
+    noisy = []
+    for _ in range(2):
+        noisy += _noise(rng, 2000, 350) + _word_sequence(rng, 350)
+    noisy += _noise(rng, 1500, 350)
+
+    clicks = []
+    for _ in range(5):
+        clicks += _noise(rng, 800, 40) + _voiced(rng, 40, 40)
+    clicks += _noise(rng, 800, 40)
+
+    monologue = _noise(rng, 500, 40) + _voiced(rng, 20000, 40) + _noise(rng, 1500, 40)
+
+    return {
+        'quiet_three_answers': (_ulaw(quiet), 3),
+        'noisy_line_two_answers': (_ulaw(noisy), 2),
+        'clicks_only': (_ulaw(clicks), 0),
+        'long_monologue': (_ulaw(monologue), 2),
+    }
+
+
+def _run(stream, chunk=160):
+    vad = VoiceActivityDetector()
+    utterances = []
+    for offset in range(0, len(stream), chunk):
+        utterances += vad.feed(stream[offset:offset + chunk])
+    final = vad.flush()
+    return utterances + ([final] if final else [])
+
+
+def test_corpus_utterance_counts():
+    for name, (stream, expected) in _corpus().items():
+        assert len(_run(stream)) == expected, name
+
+
+def test_utterance_covers_whole_answer():
+    stream, _ = _corpus()['quiet_three_answers']
+    for utterance in _run(stream):
+        # 4 slova * 430 ms, plus pre-roll a ořezaný hangover
+        assert 1500 <= utterance.duration_ms <= 2300, utterance
+        assert len(utterance.audio) == utterance.duration_ms * 8
+
+
+def test_chunk_size_does_not_change_segmentation():
+    stream, _ = _corpus()['noisy_line_two_answers']
+    twilio = [(u.start_ms, u.end_ms) for u in _run(stream, 160)]
+    odd = [(u.start_ms, u.end_ms) for u in _run(stream, 333)]
+    assert twilio == odd
+
+
+def test_stop_mid_utterance_flushes_remaining_speech():
+    rng = random.Random(1)
+    stream = _ulaw(_noise(rng, 1000, 40) + _voiced(rng, 900, 40))
+    vad = VoiceActivityDetector()
+    assert vad.feed(stream) == []
+    utterance = vad.flush()
+    assert utterance is not None and utterance.forced
+
+
+def test_stt_calls_reduced_against_fixed_flush():
+    total_stream = b''.join(stream for stream, _ in _corpus().values())
+    fixed_flush_calls = len(total_stream) // 800
+    vad_calls = len(_run(total_stream))
+    assert vad_calls * 50 < fixed_flush_calls
+
+
+def test_short_burst_does_not_barge_in():
+    rng = random.Random(5)
+    burst = _ulaw(_noise(rng, 500, 40) + _voiced(rng, 160, 40) + _noise(rng, 1000, 40))
+    answer = _ulaw(_voiced(rng, 600, 40) + _noise(rng, 1000, 40))
+    sent = []
+
+    async def send_text(text):
+        sent.append(json.loads(text))
+
+    async def scenario():
+        # Stejná logika jako smyčka /audio: barge-in při potvrzení řeči, ne při nástupu
+        sender = OutboundAudioSender(send_text, "MZ1", frame_ms=1, lead_frames=0)
+        turns = TurnController("MZ1")
+        vad = VoiceActivityDetector()
+        playback = asyncio.create_task(sender.play(b'\x7f' * (FRAME_BYTES * 5000)))
+        onsets = []
+        utterances = []
+
+        async def feed(stream):
+            for offset in range(0, len(stream), 160):
+                was_speaking, was_confirmed = vad.in_speech, vad.speech_confirmed
+                utterances.extend(vad.feed(stream[offset:offset + 160]))
+                if vad.in_speech and not was_speaking:
+                    onsets.append(offset)
+                if vad.speech_confirmed and not was_confirmed:
+                    await turns.barge_in(sender)
+                await asyncio.sleep(0)
+
+        await feed(burst)
+        after_burst = (len(onsets), turns.stats()['barge_ins'], len(utterances), playback.done())
+        await feed(answer)
+        played = await playback
+        await turns.close()
+        await sender.stop()
+        return after_burst, turns.stats()['barge_ins'], utterances, played
+
+    after_burst, barge_ins, utterances, played = asyncio.run(scenario())
+    # Krátký úsek spustí nástup, ale nepřeruší přehrávání a promluvu nevydá
+    assert after_burst == (1, 0, 0, False)
+    # Skutečná odpověď (600 ms) přehrávání přeruší právě jednou
+    assert barge_ins == 1 and len(utterances) == 1 and played is False
+    assert [msg['event'] for msg in sent].count('clear') == 1
@@ -0,0 +1,72 @@
+import asyncio
+
+from app.services.voice_metrics import Histogram, VoiceMetrics
+
+
+def test_spans_are_tagged_with_turn_labels():
+    metrics = VoiceMetrics(enabled=True)
+    with metrics.turn("voice_process", call_sid="CA1"):
+        with metrics.span("form_parse"):
+            pass
+        metrics.tag_turn(lesson=0)
+        metrics.observe("llm", 120.0)
+        metrics.observe("llm", 30.0)
+
+    snapshot = {(s['endpoint'], s['stage'], s['lesson']): s for s in metrics.snapshot()['stages']}
+    assert set(snapshot) == {
+        ("voice_process", "turn", "0"), ("voice_process", "form_parse", "0"), ("voice_process", "llm", "0")
+    }
+    # Opakovaná fáze v jednom tahu se sčítá
+    assert snapshot[("voice_process", "llm", "0")]['count'] == 1
+    turns = metrics.recent_turns("CA1")
+    assert turns[0]['stages']['llm'] == 150.0 and turns[0]['lesson'] == "0"
+
+
+def test_tasks_inherit_turn_and_late_spans_go_to_histogram():
+    metrics = VoiceMetrics(enabled=True)
+
+    async def turn():
+        with metrics.turn("voice_process", call_sid="CA2", lesson=1):
+            task = asyncio.create_task(asyncio.sleep(0.01))
+            with metrics.span("evaluation_wait"):
+                await task
+            late = asyncio.create_task(_late())
+        await late
+
+    async def _late():
+        await asyncio.sleep(0.01)
+        metrics.observe("llm_total", 42.0)
+
+    asyncio.run(turn())
+    stages = {(s['stage'], s['lesson']): s for s in metrics.snapshot()['stages']}
+    assert stages[("evaluation_wait", "1")]['p50_ms'] >= 10
+    assert stages[("llm_total", "1")]['count'] == 1
+    assert "llm_total" not in metrics.recent_turns("CA2")[0]['stages']
+
+
+def test_prometheus_buckets_are_cumulative():
+    metrics = VoiceMetrics(enabled=True)
+    for value in (0.5, 7, 7, 20000):
+        metrics.observe("llm", value)
+    text = metrics.prometheus()
+    labels = 'endpoint="",stage="llm",lesson=""'
+    assert f'voice_stage_duration_seconds_bucket{{{labels},le="0.001"}} 1' in text
+    assert f'voice_stage_duration_seconds_bucket{{{labels},le="0.01"}} 3' in text
+    assert f'voice_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 4' in text
+    assert f'voice_stage_duration_seconds_count{{{labels}}} 4' in text
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = VoiceMetrics(enabled=False)
+    with metrics.turn("voice_process", call_sid="CA3"):
+        with metrics.span("llm"):
+            pass
+    assert metrics.snapshot()['stages'] == []
+
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    for value in [3] * 90 + [700] * 10:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 5
+    assert histogram.quantile(0.95) == 1000
@@ -0,0 +1,100 @@
+import asyncio
+import random
+
+from app.services.webhook_idempotency import CachedResponse, WebhookIdempotencyStore, webhook_idempotency_key
+
+
+class FakeTurn:
+    """Simuluje tah /voice/process: pomalé LLM hodnocení + zápis odpovědi do TestSession."""
+
+    def __init__(self, fail_first=False):
+        self.llm_calls = 0
+        self.answers = []
+        self.fail_first = fail_first
+
+    def handler(self, speech):
+        async def handle():
+            self.llm_calls += 1
+            await asyncio.sleep(0.02)
+            if self.fail_first and self.llm_calls == 1:
+                raise RuntimeError("LLM timeout")
+            self.answers.append(speech)
+            return CachedResponse(f"<Response><Say>{speech}: {len(self.answers)}</Say></Response>".encode())
+        return handle
+
+
+def _key(speech, confidence="0.91"):
+    form = [("CallSid", "CA1"), ("SpeechResult", speech), ("Confidence", confidence)]
+    return webhook_idempotency_key("CA1", "/voice/process", form)
+
+
+def test_retry_storm_processes_each_turn_once():
+    store = WebhookIdempotencyStore(ttl_seconds=30)
+    turn = FakeTurn()
+
+    async def storm():
+        rng = random.Random(7)
+
+        async def twilio_retry(speech, delay):
+            await asyncio.sleep(delay)
+            return await store.run(_key(speech), turn.handler(speech))
+
+        first = [twilio_retry("separátorem", rng.uniform(0, 0.05)) for _ in range(20)]
+        second = [twilio_retry("skimmerem", 0.1 + rng.uniform(0, 0.05)) for _ in range(20)]
+        return await asyncio.gather(*first, *second)
+
+    responses = asyncio.run(storm())
+
+    assert turn.llm_calls == 2
+    assert turn.answers == ["separátorem", "skimmerem"]
+    assert {r.body for r in responses[:20]} == {b"<Response><Say>separ\xc3\xa1torem: 1</Say></Response>"}
+    assert {r.body for r in responses[20:]} == {b"<Response><Say>skimmerem: 2</Say></Response>"}
+    assert store.stats()["processed"] == 2
+    assert store.stats()["replayed"] + store.stats()["coalesced"] == 38
+
+
+def test_failed_turn_is_not_cached_and_retry_is_processed():
+    store = WebhookIdempotencyStore(ttl_seconds=30)
+    turn = FakeTurn(fail_first=True)
+
+    async def run():
+        results = await asyncio.gather(
+            *[store.run(_key("nevím"), turn.handler("nevím")) for _ in range(5)],
+            return_exceptions=True
+        )
+        retry = await store.run(_key("nevím"), turn.handler("nevím"))
+        return results, retry
+
+    results, retry = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert turn.answers == ["nevím"]
+    assert retry.body == "<Response><Say>nevím: 1</Say></Response>".encode()
+
+
+def test_key_prefers_twilio_token_and_distinguishes_answers():
+    assert _key("ano") == _key("ano")
+    assert _key("ano") != _key("ano", confidence="0.5")
+    form = [("SpeechResult", "ano")]
+    assert webhook_idempotency_key("CA1", "/voice/process", form, token="t1") == \
+        webhook_idempotency_key("CA1", "/voice/process", [("SpeechResult", "jo")], token="t1")
+
+
+def test_replay_window_expires():
+    store = WebhookIdempotencyStore(ttl_seconds=0)
+    turn = FakeTurn()
+
+    async def run():
+        await store.run(_key("ano"), turn.handler("ano"))
+        await store.run(_key("ano"), turn.handler("ano"))
+
+    asyncio.run(run())
+    assert turn.llm_calls == 2
+
+
+def test_same_answer_to_different_gathers_gets_different_key():
+    # Gather callback nemá SequenceNumber; "nevím" se stejnou confidence na dvě otázky po sobě
+    form = [("CallSid", "CA1"), ("SpeechResult", "nevím"), ("Confidence", "0.91")]
+    first = webhook_idempotency_key("CA1", "/voice/process", form, "turn=a1b2")
+    second = webhook_idempotency_key("CA1", "/voice/process", form, "turn=c3d4")
+    assert first != second
+    assert first == webhook_idempotency_key("CA1", "/voice/process", form, "turn=a1b2")  # Opakování téhož webhooku
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Skript pro předsyntetizování TTS cache (app/services/tts_cache.py)
+Úvodní hlášky hovoru na /audio se uloží jako μ-law na disk (TTS_CACHE_DIR),
+začátek hovoru je pak okamžitý. Úvody lekcí a otázky čte Twilio <Say>,
+přes OpenAI TTS nejdou, proto se nesyntetizují.
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import openai
+from app.services.tts_cache import tts_cache, synthesize_mulaw, CALL_START_PROMPTS
+
+
+async def warm_up(texts):
+    client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return await tts_cache.warm_up(texts, lambda text: asyncio.to_thread(synthesize_mulaw, client, text))
+
+
+if __name__ == "__main__":
+    print("🔊 Předsyntetizování TTS cache...")
+    print("=" * 50)
+    
+    if not os.getenv('OPENAI_API_KEY'):
+        print("❌ CHYBA! OPENAI_API_KEY není nastaven.")
+        sys.exit(1)
+    
+    texts = list(CALL_START_PROMPTS)
+    print(f"📝 Textů k syntéze: {len(texts)}")
+    result = asyncio.run(warm_up(texts))
+    
+    print("=" * 50)
+    print(f"✅ Už v cache: {result['cached']}, nově syntetizováno: {result['synthesized']}, chyby: {result['failed']}")
+    print(f"💾 Cache: {tts_cache.stats()['disk_entries']} záznamů v {tts_cache.directory}")